@@ -10,13 +10,14 @@ from app.models.vendor import Vendor
 from app.models.product import ProductMaster, MedicineMaster
 from app.models.pi import PI, PIItem
 from app.models.eopa import EOPA, EOPAItem
-from app.models.po import PurchaseOrder, POItem
+from app.models.po import PurchaseOrder, POItem, POConsolidatedEOPA
 from app.models.material import MaterialReceipt, DispatchAdvice, WarehouseGRN
 from app.models.terms_conditions import (
     TermsConditionsMaster,
     VendorTermsConditions,
     PartnerVendorMedicines,
 )
+from app.models.document_sequence import DocumentSequence
 
 # -----------------------------------------------------------
 # Alembic Config Setup
@@ -0,0 +1,87 @@
+"""add_document_sequences
+
+Revision ID: add_document_sequences
+Revises: 5374a7ebec48
+Create Date: 2025-11-24 10:15:00.000000
+
+Counter table for document numbers (PI, EOPA, PO, MR, DA, GRN) and material codes
+(RM-, PM-), keyed by (document type, fiscal year, prefix). Counters are seeded from
+the highest existing number of every prefix.
+"""
+from alembic import op
+import sqlalchemy as sa
+import re
+from datetime import datetime
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_document_sequences'
+down_revision = '5374a7ebec48'
+branch_labels = None
+depends_on = None
+
+
+# (document_type, table, number column)
+NUMBERED_TABLES = [
+    ("PI", "pi", "pi_number"),
+    ("EOPA", "eopa", "eopa_number"),
+    ("PO", "purchase_orders", "po_number"),
+    ("MR", "material_receipts", "receipt_number"),
+    ("DA", "dispatch_advice", "dispatch_number"),
+    ("GRN", "warehouse_grn", "grn_number"),
+    ("RM_CODE", "raw_material_master", "rm_code"),
+    ("PM_CODE", "packing_material_master", "pm_code"),
+]
+
+NUMBER_PATTERN = re.compile(r"^(.*\D)(\d+)$")
+FISCAL_YEAR_PATTERN = re.compile(r"^\d{2}-\d{2}$")
+
+
+def upgrade() -> None:
+    document_sequences = op.create_table(
+        'document_sequences',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('document_type', sa.String(length=20), nullable=False),
+        sa.Column('fiscal_year', sa.String(length=10), nullable=False, server_default=''),
+        sa.Column('prefix', sa.String(length=100), nullable=False),
+        sa.Column('last_value', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('document_type', 'fiscal_year', 'prefix', name='uq_document_sequences_key')
+    )
+    op.create_index(op.f('ix_document_sequences_id'), 'document_sequences', ['id'], unique=False)
+
+    # Seed counters from the highest existing number per prefix
+    bind = op.get_bind()
+    now = datetime.utcnow()
+    rows = []
+
+    for document_type, table, column in NUMBERED_TABLES:
+        counters = {}
+        for (number,) in bind.execute(sa.text(f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL")):
+            match = NUMBER_PATTERN.match(number)
+            if not match:
+                continue
+            prefix, sequence = match.group(1), int(match.group(2))
+            counters[prefix] = max(counters.get(prefix, 0), sequence)
+
+        for prefix, last_value in counters.items():
+            fiscal_year = next(
+                (part for part in prefix.split("/") if FISCAL_YEAR_PATTERN.match(part)),
+                ""
+            )
+            rows.append({
+                "document_type": document_type,
+                "fiscal_year": fiscal_year,
+                "prefix": prefix,
+                "last_value": last_value,
+                "updated_at": now
+            })
+
+    if rows:
+        op.bulk_insert(document_sequences, rows)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_document_sequences_id'), table_name='document_sequences')
+    op.drop_table('document_sequences')
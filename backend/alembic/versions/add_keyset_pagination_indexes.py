@@ -0,0 +1,37 @@
+"""add_keyset_pagination_indexes
+
+Revision ID: add_keyset_pagination_indexes
+Revises: add_document_sequences
+Create Date: 2025-11-26 09:30:00.000000
+
+Composite (created_at, id) indexes backing cursor pagination of the PO, PI, EOPA,
+vendor and medicine lists. Built CONCURRENTLY on PostgreSQL so that large tables
+stay writable during the migration. Raw materials page on the existing unique
+rm_code index.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_keyset_pagination_indexes'
+down_revision = 'add_document_sequences'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ['purchase_orders', 'pi', 'eopa', 'vendors', 'medicine_master']
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(
+                f'ix_{table}_created_at_id', table, ['created_at', 'id'],
+                unique=False, postgresql_concurrently=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.drop_index(f'ix_{table}_created_at_id', table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,38 @@
+"""add_po_consolidated_eopas
+
+Revision ID: add_po_consolidated_eopas
+Revises: add_po_items_po_id_index
+Create Date: 2025-11-28 09:30:00.000000
+
+EOPAs covered by each consolidated RM/PM PO (POST /api/po/consolidate). A PO
+only carries the lowest covered EOPA in eopa_id; per-EOPA RM/PM generation
+uses this table to skip EOPAs whose demand is already on a consolidated PO.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_po_consolidated_eopas'
+down_revision = 'add_po_items_po_id_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'po_consolidated_eopas',
+        sa.Column('po_id', sa.Integer(), nullable=False),
+        sa.Column('eopa_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['po_id'], ['purchase_orders.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['eopa_id'], ['eopa.id']),
+        sa.PrimaryKeyConstraint('po_id', 'eopa_id')
+    )
+    op.create_index(
+        op.f('ix_po_consolidated_eopas_eopa_id'), 'po_consolidated_eopas', ['eopa_id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_po_consolidated_eopas_eopa_id'), table_name='po_consolidated_eopas')
+    op.drop_table('po_consolidated_eopas')
@@ -0,0 +1,30 @@
+"""add_po_items_po_id_index
+
+Revision ID: add_po_items_po_id_index
+Revises: add_keyset_pagination_indexes
+Create Date: 2025-11-26 14:00:00.000000
+
+Index on po_items.po_id (PostgreSQL does not index foreign keys), used by the
+per-page item aggregates of GET /api/po/summary and by item loading per PO.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_po_items_po_id_index'
+down_revision = 'add_keyset_pagination_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_po_items_po_id'), 'po_items', ['po_id'],
+            unique=False, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_po_items_po_id'), table_name='po_items', postgresql_concurrently=True)
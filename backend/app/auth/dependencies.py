@@ -6,6 +6,7 @@ from typing import List
 from app.database.session import get_db
 from app.models.user import User, UserRole
 from app.auth.utils import decode_access_token
+from app.auth.principal_cache import Principal, principal_cache
 from app.exceptions.base import AppException
 
 security = HTTPBearer()
@@ -14,8 +15,13 @@ security = HTTPBearer()
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user"""
+) -> Principal:
+    """
+    Get current authenticated user
+    
+    Active users are served from the principal cache; the users table is only
+    queried on a cache miss.
+    """
     token = credentials.credentials
     payload = decode_access_token(token)
     
@@ -26,6 +32,10 @@ async def get_current_user(
     if username is None:
         raise AppException("Invalid token payload", "ERR_AUTH_FAILED", 401)
     
+    principal = principal_cache.get(username)
+    if principal is not None:
+        return principal
+    
     user = db.query(User).filter(User.username == username).first()
     if user is None:
         raise AppException("User not found", "ERR_AUTH_FAILED", 401)
@@ -33,12 +43,14 @@ async def get_current_user(
     if not user.is_active:
         raise AppException("User account is inactive", "ERR_FORBIDDEN", 403)
     
-    return user
+    principal = Principal.from_user(user)
+    principal_cache.put(principal)
+    return principal
 
 
 def require_role(allowed_roles: List[UserRole]):
     """Dependency to check if user has required role"""
-    async def role_checker(current_user: User = Depends(get_current_user)) -> User:
+    async def role_checker(current_user: Principal = Depends(get_current_user)) -> Principal:
         if current_user.role not in allowed_roles:
             raise AppException(
                 f"Permission denied. Required roles: {', '.join([r.value for r in allowed_roles])}",
@@ -0,0 +1,140 @@
+"""
+Principal Cache - In-memory cache of authenticated users
+
+get_current_user resolves the JWT subject to a user on every API call. Active users
+are cached here as immutable Principal snapshots keyed by username, so authorizing
+a request does not need a database round trip.
+
+Entries are dropped eagerly when a User row is changed or deleted through any
+session of this worker (SQLAlchemy session events), and expire after a short TTL
+so that changes made by other workers are picked up as well. Eviction is
+least-recently-used once the cache reaches its maximum size.
+"""
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from typing import Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import threading
+
+from app.config import settings
+from app.models.user import User, UserRole
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    Authenticated user as seen by the routers.
+
+    Exposes the same attributes routers read from User (id, username, email,
+    full_name, role, is_active) but is detached from any session.
+    """
+    id: int
+    username: str
+    email: str
+    full_name: str
+    role: UserRole
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            full_name=user.full_name,
+            role=user.role,
+            is_active=user.is_active
+        )
+
+
+class PrincipalCache:
+    """Bounded, thread-safe LRU cache of active principals with a TTL"""
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: int = 60):
+        self.max_size = max_size
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl.total_seconds() > 0
+
+    def get(self, username: str) -> Optional[Principal]:
+        """Return the cached principal, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+
+            stored_at, principal = entry
+            if datetime.utcnow() - stored_at > self.ttl:
+                del self._entries[username]
+                return None
+
+            self._entries.move_to_end(username)
+            return principal
+
+    def put(self, principal: Principal) -> None:
+        """Store an active principal, evicting the least recently used entries"""
+        if not self.enabled or not principal.is_active:
+            return
+
+        with self._lock:
+            self._entries[principal.username] = (datetime.utcnow(), principal)
+            self._entries.move_to_end(principal.username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username: str) -> None:
+        """Drop one principal"""
+        with self._lock:
+            self._entries.pop(username, None)
+
+    def clear(self) -> None:
+        """Drop every principal"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_on_flush(session, flush_context):
+    """Drop principals whose user row was changed (role, active flag, ...) or deleted"""
+    for instance in (*session.dirty, *session.deleted):
+        if isinstance(instance, User):
+            # A renamed user is cached under the old username
+            usernames = {instance.username, *(inspect(instance).attrs.username.history.deleted or ())}
+            for username in usernames:
+                principal_cache.invalidate(username)
+            session.info.setdefault("stale_principals", set()).update(usernames)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    """Drop again on commit: another request may have cached the old row in between"""
+    for username in session.info.pop("stale_principals", ()):
+        principal_cache.invalidate(username)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session, previous_transaction):
+    session.info.pop("stale_principals", None)
+
+
+@event.listens_for(Session, "after_bulk_update")
+@event.listens_for(Session, "after_bulk_delete")
+def _invalidate_on_bulk(context):
+    """Query.update()/delete() bypass the flush; drop everything if the users table was hit"""
+    if issubclass(context.mapper.class_, User):
+        principal_cache.clear()
@@ -1,11 +1,25 @@
 import bcrypt
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional, TypeVar
 
 from app.config import settings
 
 
+# bcrypt is deliberately slow (~250 ms per call). Async endpoints run it on this
+# bounded pool so the event loop stays free; max_workers caps concurrent hashing.
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+
+T = TypeVar("T")
+
+
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
@@ -16,6 +30,19 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
 
+async def run_in_password_pool(func: Callable[..., T], *args) -> T:
+    """Run func(*args) on the bounded password worker pool and await the result"""
+    loop = asyncio.get_running_loop()
+    # Keep request context (e.g. per-request query stats) in the worker thread
+    call = functools.partial(contextvars.copy_context().run, func, *args)
+    return await loop.run_in_executor(_password_executor, call)
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the password worker pool"""
+    return await run_in_password_pool(hash_password, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
     to_encode = data.copy()
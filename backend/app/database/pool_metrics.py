@@ -0,0 +1,106 @@
+"""
+Connection pool telemetry
+
+TimedQueuePool / TimedAsyncAdaptedQueuePool are drop-in QueuePool classes that
+time every checkout (the wait for a free connection, including opening a new
+one) and count checkout timeouts. Counters are per process, i.e. per gunicorn
+worker; multiply by the worker count when sizing against Postgres
+max_connections.
+"""
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+from typing import Any, Dict, List
+import threading
+import time
+
+
+# Upper bounds (ms) of the checkout wait histogram buckets; the last bucket is open-ended
+WAIT_BUCKETS_MS: List[float] = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000]
+
+
+class PoolMetrics:
+    """Thread-safe checkout counters and wait time histogram of one pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record_checkout(self, wait_seconds: float) -> None:
+        wait_ms = wait_seconds * 1000
+        index = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if wait_ms <= bound), len(WAIT_BUCKETS_MS))
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self.buckets[index] += 1
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            labels = [f"<={bound}ms" for bound in WAIT_BUCKETS_MS] + [f">{WAIT_BUCKETS_MS[-1]}ms"]
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 3),
+                "wait_histogram": dict(zip(labels, self.buckets)),
+            }
+
+
+class _TimedCheckoutMixin:
+    """Times QueuePool._do_get, which blocks while the pool is exhausted"""
+
+    @property
+    def metrics(self) -> PoolMetrics:
+        # Pool.__init__ signatures differ between pool classes; create lazily
+        metrics = self.__dict__.get("_metrics")
+        if metrics is None:
+            metrics = self.__dict__.setdefault("_metrics", PoolMetrics())
+        return metrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_checkout(time.perf_counter() - started)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    """QueuePool recording checkout wait times"""
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool recording checkout wait times"""
+
+
+def pool_status(pool: Pool) -> Dict[str, Any]:
+    """Live occupancy and, for timed pools, checkout metrics of a pool"""
+    status: Dict[str, Any] = {"pool_class": type(pool).__name__}
+
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+            "recycle_seconds": pool._recycle,
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            # QueuePool counts overflow from -size until every pooled slot is open
+            "overflow": max(pool.overflow(), 0),
+        })
+
+    if isinstance(pool, _TimedCheckoutMixin):
+        status.update(pool.metrics.snapshot())
+
+    return status
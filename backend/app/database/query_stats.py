@@ -0,0 +1,119 @@
+"""
+Per-request SQL statement counting
+
+track_queries() (used by the query_stats middleware in main.py) collects every
+statement executed while a request is served - sync sessions, async sessions via
+run_sync, services - into a QueryStats object held in a context variable.
+Statements are keyed by their SQL text, which still carries bind placeholders, so
+a lookup repeated per loop iteration (an N+1 pattern) shows up as one statement
+with a high count.
+
+count_queries(connection) counts the statements of one connection or engine
+instead, for tests and scripts that drive the app from another thread.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional
+import threading
+import time
+
+
+class QueryStats:
+    """Statement count, total DB time and per-statement repeat counts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, elapsed_seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_ms += elapsed_seconds * 1000
+            self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> List[Dict[str, Any]]:
+        """Statements executed at least threshold times (likely N+1), most frequent first"""
+        with self._lock:
+            return [
+                {"count": count, "statement": " ".join(statement.split())[:300]}
+                for statement, count in self.statements.most_common()
+                if count >= threshold
+            ]
+
+    def report(self) -> str:
+        """Human-readable summary, e.g. for assertion messages"""
+        lines = [f"{self.count} statements, {self.total_ms:.1f} ms"]
+        for entry in self.repeated(2):
+            lines.append(f"  {entry['count']:>4} x {entry['statement']}")
+        return "\n".join(lines)
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """QueryStats of the request being served, if tracked"""
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    Collect the statements executed in this context (and in threads / greenlets
+    started from it, which inherit the context) into a new QueryStats
+    """
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_stats_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is not None:
+        started = conn.info.get("query_stats_started")
+        if started:
+            stats.record(statement, time.perf_counter() - started.pop())
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_failed_statement(exception_context):
+    # after_cursor_execute does not run for a failed statement
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_stats_started"):
+        conn.info["query_stats_started"].pop()
+
+
+@contextmanager
+def count_queries(connectable) -> Iterator[QueryStats]:
+    """Collect the statements executed on one Connection or Engine while the block runs"""
+    stats = QueryStats()
+    started: List[float] = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        started.append(time.perf_counter())
+
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stats.record(statement, time.perf_counter() - started.pop() if started else 0.0)
+
+    event.listen(connectable, "before_cursor_execute", _before)
+    event.listen(connectable, "after_cursor_execute", _after)
+    try:
+        yield stats
+    finally:
+        event.remove(connectable, "before_cursor_execute", _before)
+        event.remove(connectable, "after_cursor_execute", _after)
@@ -1,12 +1,31 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from fastapi import Request, Response
+from typing import Any, Dict
 from app.config import settings
+from app.database.pool_metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool
+from app.database import slow_query_log
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    echo=False
-)
+
+def engine_options(url: str, poolclass) -> Dict[str, Any]:
+    """Pool options from Settings; SQLite (tests, scripts) keeps its default pool"""
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING, "echo": False}
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            poolclass=poolclass,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        )
+    return options
+
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL, TimedQueuePool))
+if settings.SLOW_QUERY_LOG:
+    slow_query_log.install(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -18,3 +37,115 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Async driver used for each sync dialect when ASYNC_DATABASE_URL is not set
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+# Read-your-writes: a request carrying this header, or arriving within
+# READ_YOUR_WRITES_SECONDS of a successful mutation by the same client (cookie),
+# reads from the primary instead of the replica
+READ_PRIMARY_HEADER = "X-Read-Primary"
+READ_PRIMARY_COOKIE = "read_primary"
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Async engines / session factories by name ("primary", "replica"), created on first use
+_async_engines: Dict[str, AsyncEngine] = {}
+_async_sessions: Dict[str, async_sessionmaker] = {}
+
+
+def to_async_url(url: str) -> str:
+    """Swap the driver of a sync database URL for its async counterpart"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS:
+        url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    return url.render_as_string(hide_password=False)
+
+
+def async_database_url() -> str:
+    """ASYNC_DATABASE_URL, or DATABASE_URL with its driver swapped for the async one"""
+    return settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL)
+
+
+def _async_session_factory(name: str) -> async_sessionmaker:
+    """
+    Session factory of the named async engine, created on first use
+
+    Engines are created lazily so that processes which never serve async reads
+    (scripts, migrations) do not need the async driver installed.
+    """
+    if name not in _async_sessions:
+        url = async_database_url() if name == "primary" else to_async_url(settings.READ_DATABASE_URL)
+        async_engine = create_async_engine(url, **engine_options(url, TimedAsyncAdaptedQueuePool))
+        if settings.SLOW_QUERY_LOG:
+            slow_query_log.install(async_engine.sync_engine)
+        _async_engines[name] = async_engine
+        _async_sessions[name] = async_sessionmaker(
+            async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+    return _async_sessions[name]
+
+
+async def get_async_db():
+    """
+    Async database session dependency (primary database)
+
+    Existing ORM query code runs unchanged through `await db.run_sync(fn)`: fn
+    receives a regular Session whose I/O is awaited on the async connection, so
+    the event loop serves other requests while the query runs. Serialize ORM
+    objects inside fn (lazy loads outside run_sync are not allowed).
+    """
+    async with _async_session_factory("primary")() as db:
+        yield db
+
+
+def reads_from_primary(request: Request) -> bool:
+    """Whether this request asked for read-your-writes (header or recent-mutation cookie)"""
+    if request.headers.get(READ_PRIMARY_HEADER, "").lower() in ("1", "true", "yes"):
+        return True
+    return READ_PRIMARY_COOKIE in request.cookies
+
+
+def use_read_replica(request: Request) -> bool:
+    """Route this request's reads to the replica (configured and no read-your-writes override)"""
+    return bool(settings.READ_DATABASE_URL) and not reads_from_primary(request)
+
+
+async def get_read_db(request: Request):
+    """
+    Async session for read-only endpoints (use like get_async_db)
+
+    Served by READ_DATABASE_URL when configured, otherwise (or when the request
+    needs to read its own writes) by the primary. Never write through it.
+    """
+    name = "replica" if use_read_replica(request) else "primary"
+    async with _async_session_factory(name)() as db:
+        yield db
+
+
+def mark_read_your_writes(request: Request, response: Response) -> None:
+    """After a successful mutation, pin the client's reads to the primary for a short window"""
+    if (
+        settings.READ_DATABASE_URL
+        and request.method in MUTATING_METHODS
+        and response.status_code < 400
+        and not request.url.path.startswith("/api/auth/")  # login does not write
+    ):
+        response.set_cookie(
+            READ_PRIMARY_COOKIE, "1",
+            max_age=settings.READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+            samesite="lax"
+        )
+
+
+def database_engines() -> Dict[str, Any]:
+    """Engines created so far in this process, by name (for pool telemetry)"""
+    engines = {"primary": engine}
+    for name, async_engine in _async_engines.items():
+        engines[f"async_{name}"] = async_engine.sync_engine
+    return engines
@@ -0,0 +1,201 @@
+"""
+Slow query log (opt-in with SLOW_QUERY_LOG)
+
+install() attaches cursor event listeners to an engine. Every statement slower
+than SLOW_QUERY_THRESHOLD_MS is recorded with its bound parameters and the
+request that ran it (X-Request-ID, method, route template). On PostgreSQL a
+sampled share (SLOW_QUERY_EXPLAIN_SAMPLE_RATE) of slow SELECTs is re-run as
+EXPLAIN (ANALYZE, BUFFERS) on the same connection, inside a savepoint, and the
+plan is stored with the entry.
+
+Entries go to an in-memory ring buffer of the worker process (the oldest are
+dropped once SLOW_QUERY_STORE_SIZE is reached), served by
+GET /api/internal/slow-queries. Like pool metrics, each gunicorn worker keeps
+its own log.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from fastapi import Request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+import logging
+import random
+import threading
+import time
+
+from app.config import settings
+
+logger = logging.getLogger("pharma")
+
+# Longest repr kept per bound parameter
+MAX_PARAMETER_LENGTH = 200
+
+_STARTED_KEY = "slow_query_started"
+
+_current_request: ContextVar[Optional[Request]] = ContextVar("slow_query_request", default=None)
+
+
+class SlowQueryStore:
+    """Thread-safe ring buffer of slow query entries, newest last"""
+
+    def __init__(self, max_size: int = 500):
+        self._entries: deque = deque(maxlen=max_size)
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+
+    def list(
+        self,
+        limit: int = 50,
+        route: Optional[str] = None,
+        min_duration_ms: float = 0
+    ) -> List[Dict[str, Any]]:
+        """Newest entries first, optionally filtered by route template and duration"""
+        with self._lock:
+            entries = list(self._entries)
+        matching = [
+            entry for entry in reversed(entries)
+            if entry["duration_ms"] >= min_duration_ms and (route is None or entry["route"] == route)
+        ]
+        return matching[:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+slow_query_store = SlowQueryStore(max_size=settings.SLOW_QUERY_STORE_SIZE)
+
+
+@contextmanager
+def query_request_context(request: Request) -> Iterator[None]:
+    """Attribute statements executed while the block runs to request"""
+    token = _current_request.set(request)
+    try:
+        yield
+    finally:
+        _current_request.reset(token)
+
+
+def _request_fields() -> Dict[str, Optional[str]]:
+    request = _current_request.get()
+    if request is None:
+        return {"request_id": None, "method": None, "route": None, "path": None}
+    route = request.scope.get("route")
+    return {
+        "request_id": getattr(request.state, "request_id", None),
+        "method": request.method,
+        "route": getattr(route, "path", None),
+        "path": request.url.path,
+    }
+
+
+def _short(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = value if isinstance(value, str) else repr(value)
+    return text if len(text) <= MAX_PARAMETER_LENGTH else text[:MAX_PARAMETER_LENGTH] + "..."
+
+
+def _format_parameters(parameters: Any, executemany: bool) -> Any:
+    """JSON-friendly, truncated copy of the bound parameters (first set for executemany)"""
+    if executemany:
+        parameter_sets = list(parameters or [])
+        return {
+            "executemany": len(parameter_sets),
+            "first": _format_parameters(parameter_sets[0], False) if parameter_sets else None
+        }
+    if isinstance(parameters, dict):
+        return {key: _short(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_short(value) for value in parameters]
+    return _short(parameters)
+
+
+def _explainable(conn, statement: str, context, executemany: bool) -> bool:
+    """Only plain PostgreSQL reads: ANALYZE executes the statement again"""
+    if executemany or conn.dialect.name != "postgresql":
+        return False
+    if context is not None and context.execution_options.get("stream_results"):
+        return False  # the server-side cursor is still open on this connection
+    return statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "WITH")
+
+
+def _explain(conn, statement: str, parameters: Any) -> Optional[str]:
+    """EXPLAIN (ANALYZE, BUFFERS) plan as text; rolled back to a savepoint either way"""
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters)
+            return "\n".join(row[0] for row in cursor.fetchall())
+        except Exception as e:
+            logger.warning({"event": "SLOW_QUERY_EXPLAIN_FAILED", "error": str(e)})
+            return None
+        finally:
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_STARTED_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get(_STARTED_KEY)
+    if not started:
+        return
+    duration_ms = (time.perf_counter() - started.pop()) * 1000
+    if duration_ms < settings.SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    entry = {
+        "recorded_at": datetime.utcnow().isoformat() + "Z",
+        "engine": conn.engine.url.render_as_string(hide_password=True),
+        "duration_ms": round(duration_ms, 3),
+        "statement": statement,
+        "parameters": _format_parameters(parameters, executemany),
+        **_request_fields(),
+        "plan": None,
+    }
+    if (
+        _explainable(conn, statement, context, executemany)
+        and random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE
+    ):
+        entry["plan"] = _explain(conn, statement, parameters)
+
+    slow_query_store.add(entry)
+
+
+def _discard_failed_statement(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get(_STARTED_KEY):
+        conn.info[_STARTED_KEY].pop()
+
+
+def install(engine: Engine) -> None:
+    """Record slow statements of engine (for an AsyncEngine pass its sync_engine)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _discard_failed_statement)
+
+
+def uninstall(engine: Engine) -> None:
+    """Stop recording statements of engine"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", _after_cursor_execute)
+        event.remove(engine, "handle_error", _discard_failed_statement)
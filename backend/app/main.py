@@ -8,9 +8,12 @@ import os
 from app.models.base import Base
 
 
-from app.database.session import engine
+from app.database.session import engine, mark_read_your_writes
+from app.database.query_stats import track_queries
+from app.database.slow_query_log import query_request_context
+from app.config import settings
 from app.models import base
-from app.routers import auth, vendors, pi, eopa, po, products, material, users, invoice, analytics, configuration, raw_material, packing_material, terms_conditions
+from app.routers import auth, vendors, pi, eopa, po, products, material, users, invoice, analytics, configuration, raw_material, packing_material, terms_conditions, internal
 from app.routers import countries as countries_router
 from app.routers.material_balance import router as material_balance_router
 from app.exceptions.handlers import app_exception_handler, validation_exception_handler
@@ -56,10 +59,45 @@ app.add_middleware(
 @app.middleware("http")
 async def add_request_id(request: Request, call_next):
     request.state.request_id = str(uuid.uuid4())
-    response = await call_next(request)
+    with query_request_context(request):
+        response = await call_next(request)
     response.headers["X-Request-ID"] = request.state.request_id
     return response
 
+# Read-your-writes: pin a client's reads to the primary right after it mutates data
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    response = await call_next(request)
+    mark_read_your_writes(request, response)
+    return response
+
+# SQL statements per request: stats headers in development, log over-budget / N+1 requests
+EXPOSE_QUERY_STATS = settings.QUERY_STATS_HEADERS or os.getenv("ENV", "production") == "development"
+
+@app.middleware("http")
+async def query_stats(request: Request, call_next):
+    with track_queries() as stats:
+        response = await call_next(request)
+
+    if EXPOSE_QUERY_STATS:
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Query-Time-Ms"] = f"{stats.total_ms:.1f}"
+
+    repeated = stats.repeated(settings.QUERY_REPEAT_THRESHOLD) if settings.QUERY_REPEAT_THRESHOLD else []
+    over_count = settings.QUERY_BUDGET_PER_REQUEST and stats.count > settings.QUERY_BUDGET_PER_REQUEST
+    over_time = settings.QUERY_TIME_BUDGET_MS and stats.total_ms > settings.QUERY_TIME_BUDGET_MS
+    if over_count or over_time or repeated:
+        logger.warning({
+            "event": "QUERY_BUDGET_EXCEEDED" if over_count or over_time else "REPEATED_QUERIES",
+            "request_id": getattr(request.state, "request_id", None),
+            "method": request.method,
+            "path": request.url.path,
+            "query_count": stats.count,
+            "query_time_ms": round(stats.total_ms, 1),
+            "repeated": repeated[:5]
+        })
+    return response
+
 # Exception handlers
 app.add_exception_handler(AppException, app_exception_handler)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
@@ -81,6 +119,7 @@ app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics &
 app.include_router(configuration.router, prefix="/api/config", tags=["Configuration"])
 app.include_router(terms_conditions.router)  # Already has /api/terms prefix
 app.include_router(material_balance_router)
+app.include_router(internal.router, prefix="/api/internal", tags=["Internal"])
 
 @app.get("/")
 async def root():
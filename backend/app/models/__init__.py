@@ -7,11 +7,12 @@ from app.models.raw_material import RawMaterialMaster, MedicineRawMaterial
 from app.models.packing_material import PackingMaterialMaster, MedicinePackingMaterial
 from app.models.pi import PI, PIItem
 from app.models.eopa import EOPA, EOPAItem
-from app.models.po import PurchaseOrder, POItem, POStatus, POType
+from app.models.po import PurchaseOrder, POItem, POStatus, POType, POConsolidatedEOPA
 from app.models.po_terms import POTermsConditions
 from app.models.material import MaterialReceipt
 from app.models.invoice import VendorInvoice, VendorInvoiceItem, InvoiceType, InvoiceStatus
 from app.models.terms_conditions import TermsConditionsMaster, VendorTermsConditions, PartnerVendorMedicines
+from app.models.document_sequence import DocumentSequence
 
 __all__ = [
     "Country",
@@ -30,6 +31,7 @@ __all__ = [
     "POItem",
     "POStatus",
     "POType",
+    "POConsolidatedEOPA",
     "POTermsConditions",
     "MaterialReceipt",
     "VendorInvoice",
@@ -39,6 +41,7 @@ __all__ = [
     "TermsConditionsMaster",
     "VendorTermsConditions",
     "PartnerVendorMedicines",
+    "DocumentSequence",
 ]
 
 
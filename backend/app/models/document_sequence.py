@@ -0,0 +1,32 @@
+from sqlalchemy import String, Integer, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+
+from app.models.base import Base
+
+
+class DocumentSequence(Base):
+    """
+    Document Number Counter
+
+    One row per (document type, fiscal year, prefix) holding the last allocated
+    sequence value. Numbers are allocated with a single atomic UPDATE ... RETURNING,
+    so concurrent workers never mint the same document number.
+
+    Document types: PI, EOPA, PO, MR, DA, GRN, RM_CODE, PM_CODE
+    Fiscal year is empty for material codes (RM-0001, PM-0001).
+    """
+    __tablename__ = "document_sequences"
+    __table_args__ = (
+        UniqueConstraint("document_type", "fiscal_year", "prefix", name="uq_document_sequences_key"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    document_type: Mapped[str] = mapped_column(String(20))
+    fiscal_year: Mapped[str] = mapped_column(String(10), default="")
+    prefix: Mapped[str] = mapped_column(String(100))
+    last_value: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DocumentSequence(type={self.document_type}, prefix={self.prefix}, last_value={self.last_value})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import String, ForeignKey, Numeric, Date, Text, Enum as SQLEnum
+from sqlalchemy import String, ForeignKey, Numeric, Date, Text, Enum as SQLEnum, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime, date
 from typing import List, Optional
@@ -25,6 +25,10 @@ class EOPA(Base):
     Workflow: PI → EOPA (with items) → PO (vendor resolution from Medicine Master)
     """
     __tablename__ = "eopa"
+    __table_args__ = (
+        # Keyset pagination of list endpoints
+        Index("ix_eopa_created_at_id", "created_at", "id"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     eopa_number: Mapped[str] = mapped_column(String(50), unique=True, index=True)
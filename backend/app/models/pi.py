@@ -1,4 +1,4 @@
-from sqlalchemy import String, ForeignKey, Numeric, Date, Text, Enum as SQLEnum
+from sqlalchemy import String, ForeignKey, Numeric, Date, Text, Enum as SQLEnum, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime, date
 from typing import List, Optional
@@ -16,6 +16,10 @@ class PIStatus(str, enum.Enum):
 class PI(Base):
     """Proforma Invoice"""
     __tablename__ = "pi"
+    __table_args__ = (
+        # Keyset pagination of list endpoints
+        Index("ix_pi_created_at_id", "created_at", "id"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     pi_number: Mapped[str] = mapped_column(String(50), unique=True, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import String, ForeignKey, Numeric, Date, Text, Enum as SQLEnum, Boolean
+from sqlalchemy import String, ForeignKey, Numeric, Date, Text, Enum as SQLEnum, Boolean, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from decimal import Decimal
 from datetime import datetime, date
@@ -38,6 +38,10 @@ class PurchaseOrder(Base):
     - Status updated based on invoice receipts
     """
     __tablename__ = "purchase_orders"
+    __table_args__ = (
+        # Keyset pagination of list endpoints
+        Index("ix_purchase_orders_created_at_id", "created_at", "id"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     po_number: Mapped[str] = mapped_column(String(50), unique=True, index=True)
@@ -118,6 +122,7 @@ class PurchaseOrder(Base):
     material_receipts: Mapped[List["MaterialReceipt"]] = relationship("MaterialReceipt", back_populates="purchase_order")
     invoices: Mapped[List["VendorInvoice"]] = relationship("VendorInvoice", back_populates="purchase_order")
     terms_conditions: Mapped[List["POTermsConditions"]] = relationship("POTermsConditions", back_populates="purchase_order", cascade="all, delete-orphan")
+    consolidated_eopas: Mapped[List["POConsolidatedEOPA"]] = relationship("POConsolidatedEOPA", cascade="all, delete-orphan")
 
 
 class POItem(Base):
@@ -132,7 +137,7 @@ class POItem(Base):
     __tablename__ = "po_items"
     
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    po_id: Mapped[int] = mapped_column(ForeignKey("purchase_orders.id"))
+    po_id: Mapped[int] = mapped_column(ForeignKey("purchase_orders.id"), index=True)
     medicine_id: Mapped[Optional[int]] = mapped_column(ForeignKey("medicine_master.id"), nullable=True)
     raw_material_id: Mapped[Optional[int]] = mapped_column(ForeignKey("raw_material_master.id"), nullable=True)
     packing_material_id: Mapped[Optional[int]] = mapped_column(ForeignKey("packing_material_master.id"), nullable=True)
@@ -190,3 +195,16 @@ class POItem(Base):
     medicine: Mapped[Optional["MedicineMaster"]] = relationship("MedicineMaster")
     raw_material: Mapped[Optional["RawMaterialMaster"]] = relationship("RawMaterialMaster")
     packing_material: Mapped[Optional["PackingMaterialMaster"]] = relationship("PackingMaterialMaster")
+
+
+class POConsolidatedEOPA(Base):
+    """
+    EOPA whose RM/PM demand a consolidated PO covers (POST /api/po/consolidate).
+    
+    A PO has a single eopa_id, so the EOPAs behind a consolidated PO are recorded
+    here; per-EOPA RM/PM generation skips EOPAs covered by a live consolidated PO.
+    """
+    __tablename__ = "po_consolidated_eopas"
+    
+    po_id: Mapped[int] = mapped_column(ForeignKey("purchase_orders.id", ondelete="CASCADE"), primary_key=True)
+    eopa_id: Mapped[int] = mapped_column(ForeignKey("eopa.id"), primary_key=True, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import String, ForeignKey, Numeric, Text, JSON
+from sqlalchemy import String, ForeignKey, Numeric, Text, JSON, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from decimal import Decimal
 from datetime import datetime
@@ -29,6 +29,10 @@ class ProductMaster(Base):
 
 class MedicineMaster(Base):
     __tablename__ = "medicine_master"
+    __table_args__ = (
+        # Keyset pagination of list endpoints
+        Index("ix_medicine_master_created_at_id", "created_at", "id"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     medicine_code: Mapped[str] = mapped_column(String(50), unique=True, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Enum as SQLEnum, Text, ForeignKey
+from sqlalchemy import String, Enum as SQLEnum, Text, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 from typing import List, Optional
@@ -16,6 +16,10 @@ class VendorType(str, enum.Enum):
 
 class Vendor(Base):
     __tablename__ = "vendors"
+    __table_args__ = (
+        # Keyset pagination of list endpoints
+        Index("ix_vendors_created_at_id", "created_at", "id"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     vendor_code: Mapped[str] = mapped_column(String(50), unique=True, index=True)
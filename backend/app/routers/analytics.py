@@ -2,10 +2,10 @@
 Analytics Router - Business Intelligence & Insights Endpoints
 """
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any
 
-from app.database.session import get_db
+from app.database.session import get_read_db
 from app.services.analytics_service import AnalyticsService
 from app.auth.dependencies import get_current_user
 from app.models.user import User
@@ -16,7 +16,7 @@ router = APIRouter()
 @router.get("/invoice-po-matching", response_model=Dict[str, Any])
 async def get_invoice_po_matching(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get invoice-PO matching status with visual indicators.
@@ -26,8 +26,7 @@ async def get_invoice_po_matching(
     - ⚠ partial: Some discrepancies
     - ✗ mismatch: Significant issues
     """
-    service = AnalyticsService(db)
-    results = service.get_invoice_po_matching_status()
+    results = await db.run_sync(lambda session: AnalyticsService(session).get_invoice_po_matching_status())
     
     return {
         "success": True,
@@ -44,15 +43,14 @@ async def get_invoice_po_matching(
 @router.get("/quantity-discrepancies", response_model=Dict[str, Any])
 async def get_quantity_discrepancies(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get quantity discrepancies across all POs.
     
     Shows over-shipments and under-shipments.
     """
-    service = AnalyticsService(db)
-    results = service.get_quantity_discrepancies()
+    results = await db.run_sync(lambda session: AnalyticsService(session).get_quantity_discrepancies())
     
     return {
         "success": True,
@@ -69,7 +67,7 @@ async def get_quantity_discrepancies(
 @router.get("/vendor-performance", response_model=Dict[str, Any])
 async def get_vendor_performance(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get vendor performance ratings.
@@ -79,8 +77,7 @@ async def get_vendor_performance(
     - 🟡 Average (70-89%)
     - 🔴 Poor (<70%)
     """
-    service = AnalyticsService(db)
-    results = service.get_vendor_performance_ratings()
+    results = await db.run_sync(lambda session: AnalyticsService(session).get_vendor_performance_ratings())
     
     return {
         "success": True,
@@ -1,21 +1,36 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from datetime import datetime
+from typing import Optional, Tuple
 import logging
 
 from app.database.session import get_db
 from app.schemas.user import LoginSchema, TokenResponse, UserResponse
 from app.models.user import User
-from app.auth.utils import verify_password, create_access_token
+from app.auth.utils import verify_password, create_access_token, run_in_password_pool
 from app.exceptions.base import AppException
 
 router = APIRouter()
 logger = logging.getLogger("pharma")
 
 
+def _authenticate(db: Session, credentials: LoginSchema) -> Tuple[Optional[User], bool]:
+    """Load the user and verify the password (blocking; runs on the password pool)"""
+    user = db.query(User).filter(User.username == credentials.username).first()
+    if not user:
+        return None, False
+    return user, verify_password(credentials.password, user.hashed_password)
+
+
 @router.post("/login", response_model=dict)
 async def login(credentials: LoginSchema, db: Session = Depends(get_db)):
-    """User login"""
+    """
+    User login
+    
+    The user lookup and bcrypt verification run together on the bounded password
+    worker pool, so a burst of logins neither stalls the event loop nor holds more
+    pooled DB connections than there are password workers.
+    """
     logger.info({
         "event": "LOGIN_ATTEMPT", 
         "username": credentials.username,
@@ -23,7 +38,7 @@ async def login(credentials: LoginSchema, db: Session = Depends(get_db)):
         "password_length": len(credentials.password)
     })
     
-    user = db.query(User).filter(User.username == credentials.username).first()
+    user, password_match = await run_in_password_pool(_authenticate, db, credentials)
     
     if not user:
         logger.warning({
@@ -33,7 +48,6 @@ async def login(credentials: LoginSchema, db: Session = Depends(get_db)):
         })
         raise AppException("Invalid credentials", "ERR_AUTH_FAILED", 401)
     
-    password_match = verify_password(credentials.password, user.hashed_password)
     logger.info({
         "event": "PASSWORD_VERIFICATION",
         "username": credentials.username,
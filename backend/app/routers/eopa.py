@@ -1,20 +1,25 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, date
 from decimal import Decimal
 import logging
 
-from app.database.session import get_db
+from app.database.session import get_db, get_read_db
 from app.schemas.eopa import (
     EOPACreate, EOPAUpdate, EOPAResponse, EOPAApproveSchema
 )
+from app.schemas.configuration import ConfigSnapshot
 from app.models.eopa import EOPA, EOPAStatus, EOPAItem
 from app.models.pi import PI, PIItem
 from app.models.product import MedicineMaster
 from app.models.user import User, UserRole
 from app.auth.dependencies import get_current_user, require_role
 from app.utils.number_generator import generate_eopa_number
+from app.utils.pagination import keyset_page
 from app.exceptions.base import AppException
+from app.services.configuration_service import get_config_snapshot
+from app.services.incremental_explosion import apply_eopa_quantity_changes
 
 router = APIRouter()
 logger = logging.getLogger("pharma")
@@ -24,7 +29,8 @@ logger = logging.getLogger("pharma")
 async def create_eopa(
     eopa_data: EOPACreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    config: ConfigSnapshot = Depends(get_config_snapshot)
 ):
     """
     Create ONE EOPA per PI with multiple line items.
@@ -59,7 +65,7 @@ async def create_eopa(
         )
     
     # Generate EOPA number (EOPA/YY-YY/####)
-    eopa_number = generate_eopa_number(db)
+    eopa_number = generate_eopa_number(db, config)
     
     # Create ONE EOPA for the entire PI
     eopa = EOPA(
@@ -118,31 +124,37 @@ async def list_eopas(
     limit: int = 100,
     status: EOPAStatus = None,
     pi_id: int = None,
+    cursor: str = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     List EOPAs (PI-level) with their line items.
     
     Each EOPA represents one PI with multiple line items (EOPA items).
+    Oldest first; pass `next_cursor` as `cursor` for the next page.
     """
-    query = db.query(EOPA).options(
-        joinedload(EOPA.pi).joinedload(PI.partner_vendor),
-        joinedload(EOPA.items).joinedload(EOPAItem.pi_item).joinedload(PIItem.medicine)
-    )
-    
-    if status:
-        query = query.filter(EOPA.status == status)
-    
-    if pi_id:
-        query = query.filter(EOPA.pi_id == pi_id)
-    
-    eopas = query.offset(skip).limit(limit).all()
-    
+    def _load(session: Session):
+        query = session.query(EOPA).options(
+            joinedload(EOPA.pi).joinedload(PI.partner_vendor),
+            joinedload(EOPA.items).joinedload(EOPAItem.pi_item).joinedload(PIItem.medicine)
+        )
+        
+        if status:
+            query = query.filter(EOPA.status == status)
+        
+        if pi_id:
+            query = query.filter(EOPA.pi_id == pi_id)
+        
+        eopas, next_cursor = keyset_page(query, EOPA.created_at, EOPA.id, limit, cursor=cursor, skip=skip)
+        return [EOPAResponse.model_validate(eopa).model_dump() for eopa in eopas], next_cursor
+    
+    data, next_cursor = await db.run_sync(_load)
     return {
         "success": True,
         "message": "EOPAs retrieved successfully",
-        "data": [EOPAResponse.model_validate(eopa).model_dump() for eopa in eopas],
+        "data": data,
+        "next_cursor": next_cursor,
         "timestamp": datetime.utcnow().isoformat() + "Z"
     }
 
@@ -151,21 +163,23 @@ async def list_eopas(
 async def get_eopa(
     eopa_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get EOPA by ID with all line items"""
-    eopa = db.query(EOPA).options(
-        joinedload(EOPA.pi).joinedload(PI.partner_vendor),
-        joinedload(EOPA.items).joinedload(EOPAItem.pi_item).joinedload(PIItem.medicine)
-    ).filter(EOPA.id == eopa_id).first()
-    
-    if not eopa:
-        raise AppException("EOPA not found", "ERR_NOT_FOUND", 404)
+    def _load(session: Session):
+        eopa = session.query(EOPA).options(
+            joinedload(EOPA.pi).joinedload(PI.partner_vendor),
+            joinedload(EOPA.items).joinedload(EOPAItem.pi_item).joinedload(PIItem.medicine)
+        ).filter(EOPA.id == eopa_id).first()
+        
+        if not eopa:
+            raise AppException("EOPA not found", "ERR_NOT_FOUND", 404)
+        return EOPAResponse.model_validate(eopa).model_dump()
     
     return {
         "success": True,
         "message": "EOPA retrieved successfully",
-        "data": EOPAResponse.model_validate(eopa).model_dump(),
+        "data": await db.run_sync(_load),
         "timestamp": datetime.utcnow().isoformat() + "Z"
     }
 
@@ -178,22 +192,34 @@ async def update_eopa(
     db: Session = Depends(get_db)
 ):
     """
-    Update EOPA remarks.
+    Update EOPA remarks and line item quantities.
     
-    Note: EOPA line item quantities/prices are managed via individual EOPA items,
-    not through this endpoint. This endpoint only updates EOPA-level remarks.
+    Remarks can only change while the EOPA is PENDING. Item quantities can also
+    change on an APPROVED EOPA as long as its POs are still DRAFT: only the
+    quantity deltas are exploded through the BOM and applied to the affected
+    DRAFT PO items (no full re-explosion or PO regeneration).
     """
     eopa = db.query(EOPA).filter(EOPA.id == eopa_id).first()
     if not eopa:
         raise AppException("EOPA not found", "ERR_NOT_FOUND", 404)
     
-    if eopa.status != EOPAStatus.PENDING:
-        raise AppException("Cannot update approved/rejected EOPA", "ERR_VALIDATION", 400)
+    if eopa.status == EOPAStatus.REJECTED:
+        raise AppException("Cannot update rejected EOPA", "ERR_VALIDATION", 400)
+    
+    if eopa.status != EOPAStatus.PENDING and not eopa_data.items:
+        raise AppException("Only item quantities can be updated on an approved EOPA", "ERR_VALIDATION", 400)
     
     # Update remarks if provided
     if eopa_data.remarks is not None:
+        if eopa.status != EOPAStatus.PENDING:
+            raise AppException("Cannot update remarks of approved EOPA", "ERR_VALIDATION", 400)
         eopa.remarks = eopa_data.remarks
     
+    reexplosion = None
+    if eopa_data.items:
+        quantities = {item.id: Decimal(str(item.quantity)) for item in eopa_data.items}
+        reexplosion = apply_eopa_quantity_changes(db, eopa, quantities)
+    
     eopa.updated_at = datetime.utcnow()
     
     db.commit()
@@ -203,13 +229,19 @@ async def update_eopa(
         "event": "EOPA_UPDATED",
         "eopa_id": eopa.id,
         "eopa_number": eopa.eopa_number,
+        "items_changed": reexplosion["eopa_items_changed"] if reexplosion else 0,
+        "po_ids": reexplosion["po_ids"] if reexplosion else [],
         "updated_by": current_user.username
     })
     
+    data = EOPAResponse.model_validate(eopa).model_dump()
+    if reexplosion is not None:
+        data["reexplosion"] = reexplosion
+    
     return {
         "success": True,
         "message": "EOPA updated successfully",
-        "data": EOPAResponse.model_validate(eopa).model_dump(),
+        "data": data,
         "timestamp": datetime.utcnow().isoformat() + "Z"
     }
 
@@ -300,23 +332,25 @@ async def approve_eopa(
 async def get_eopas_by_pi(
     pi_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all EOPAs for a specific PI"""
-    # Verify PI exists
-    pi = db.query(PI).filter(PI.id == pi_id).first()
-    if not pi:
-        raise AppException("PI not found", "ERR_NOT_FOUND", 404)
-    
-    # Fetch EOPAs linked to this PI
-    eopas = db.query(EOPA).options(
-        joinedload(EOPA.pi).joinedload(PI.partner_vendor),
-        joinedload(EOPA.items).joinedload(EOPAItem.pi_item).joinedload(PIItem.medicine)
-    ).filter(EOPA.pi_id == pi_id).all()
+    def _load(session: Session):
+        # Verify PI exists
+        pi = session.query(PI).filter(PI.id == pi_id).first()
+        if not pi:
+            raise AppException("PI not found", "ERR_NOT_FOUND", 404)
+        
+        # Fetch EOPAs linked to this PI
+        eopas = session.query(EOPA).options(
+            joinedload(EOPA.pi).joinedload(PI.partner_vendor),
+            joinedload(EOPA.items).joinedload(EOPAItem.pi_item).joinedload(PIItem.medicine)
+        ).filter(EOPA.pi_id == pi_id).all()
+        return [EOPAResponse.model_validate(eopa).model_dump() for eopa in eopas]
     
     return {
         "success": True,
         "message": f"EOPAs for PI #{pi_id} retrieved successfully",
-        "data": [EOPAResponse.model_validate(eopa).model_dump() for eopa in eopas],
+        "data": await db.run_sync(_load),
         "timestamp": datetime.utcnow().isoformat() + "Z"
     }
@@ -0,0 +1,95 @@
+"""
+Internal Router - Operational telemetry (Admin only)
+
+Endpoints:
+- GET /api/internal/pool-metrics - Connection pool occupancy and checkout wait times
+- GET /api/internal/slow-queries - Recent slow statements with request and plan
+- DELETE /api/internal/slow-queries - Clear the slow query log
+"""
+from fastapi import APIRouter, Depends, Query
+from datetime import datetime
+from typing import Optional
+import os
+
+from app.config import settings
+from app.database.session import database_engines
+from app.database.pool_metrics import WAIT_BUCKETS_MS, pool_status
+from app.database.slow_query_log import slow_query_store
+from app.models.user import UserRole
+from app.auth.dependencies import require_role
+
+router = APIRouter()
+
+
+@router.get("/pool-metrics", response_model=dict, dependencies=[Depends(require_role([UserRole.ADMIN]))])
+async def get_pool_metrics():
+    """
+    Live connection pool metrics of the worker process serving this request.
+    
+    Each gunicorn worker has its own pools, so repeated calls may hit different
+    workers (see worker_pid). Size pools so that
+    workers × per-worker max connections stays below Postgres max_connections.
+    """
+    pools = {
+        name: pool_status(engine.pool)
+        for name, engine in database_engines().items()
+    }
+    
+    return {
+        "success": True,
+        "message": "Pool metrics retrieved successfully",
+        "data": {
+            "worker_pid": os.getpid(),
+            "configured": {
+                "pool_size": settings.DB_POOL_SIZE,
+                "max_overflow": settings.DB_MAX_OVERFLOW,
+                "pool_recycle_seconds": settings.DB_POOL_RECYCLE_SECONDS,
+                "pool_timeout_seconds": settings.DB_POOL_TIMEOUT_SECONDS,
+                "pool_pre_ping": settings.DB_POOL_PRE_PING,
+                "max_connections_per_engine": settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW,
+            },
+            "wait_buckets_ms": WAIT_BUCKETS_MS,
+            "pools": pools
+        },
+        "timestamp": datetime.utcnow().isoformat() + "Z"
+    }
+
+
+@router.get("/slow-queries", response_model=dict, dependencies=[Depends(require_role([UserRole.ADMIN]))])
+async def get_slow_queries(
+    limit: int = Query(50, ge=1, le=500),
+    route: Optional[str] = Query(None, description="Route template, e.g. /api/po/{po_id}"),
+    min_duration_ms: float = Query(0, ge=0)
+):
+    """
+    Most recent slow statements recorded by this worker process, newest first.
+    
+    Empty unless SLOW_QUERY_LOG is enabled. Entries carry the X-Request-ID of the
+    request that ran them, so a slow response can be traced to its statements.
+    """
+    return {
+        "success": True,
+        "message": "Slow queries retrieved successfully",
+        "data": {
+            "worker_pid": os.getpid(),
+            "enabled": settings.SLOW_QUERY_LOG,
+            "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+            "explain_sample_rate": settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+            "recorded": slow_query_store.recorded,
+            "retained": len(slow_query_store),
+            "queries": slow_query_store.list(limit=limit, route=route, min_duration_ms=min_duration_ms)
+        },
+        "timestamp": datetime.utcnow().isoformat() + "Z"
+    }
+
+
+@router.delete("/slow-queries", response_model=dict, dependencies=[Depends(require_role([UserRole.ADMIN]))])
+async def clear_slow_queries():
+    """Clear this worker's slow query log"""
+    slow_query_store.clear()
+    return {
+        "success": True,
+        "message": "Slow query log cleared",
+        "data": None,
+        "timestamp": datetime.utcnow().isoformat() + "Z"
+    }
@@ -10,17 +10,20 @@ Endpoints:
 from fastapi import APIRouter, Depends, Path
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import logging
 
-from app.database.session import get_db
+from app.database.session import get_db, get_read_db
 from app.schemas.invoice import InvoiceCreate, InvoiceResponse
+from app.schemas.configuration import ConfigSnapshot
 from app.services.invoice_service import InvoiceService
 from app.services.invoice_pdf_service import InvoicePDFService
 from app.models.user import User, UserRole
 from app.models.invoice import VendorInvoice, VendorInvoiceItem
 from app.auth.dependencies import get_current_user, require_role
 from app.exceptions.base import AppException
+from app.services.configuration_service import get_config_snapshot
 
 router = APIRouter()
 logger = logging.getLogger("pharma")
@@ -102,7 +105,7 @@ async def process_vendor_invoice(
 )
 async def get_po_invoices(
     po_id: int = Path(description="Purchase Order ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all invoices for a Purchase Order.
@@ -110,12 +113,13 @@ async def get_po_invoices(
     Returns:
         List of invoices with line items and pricing details
     """
-    service = InvoiceService(db)
-    invoices = service.get_po_invoices(po_id)
+    def _load(session: Session):
+        invoices = InvoiceService(session).get_po_invoices(po_id)
+        return [InvoiceResponse.model_validate(inv).model_dump() for inv in invoices]
     
     return {
         "success": True,
-        "data": [InvoiceResponse.model_validate(inv).model_dump() for inv in invoices]
+        "data": await db.run_sync(_load)
     }
 
 
@@ -126,7 +130,7 @@ async def get_po_invoices(
 )
 async def get_invoice_by_number(
     invoice_number: str = Path(description="Invoice Number"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get invoice details by invoice number.
@@ -134,12 +138,13 @@ async def get_invoice_by_number(
     Returns:
         Invoice with PO details, vendor info, and line items
     """
-    service = InvoiceService(db)
-    invoice = service.get_invoice_by_number(invoice_number)
+    def _load(session: Session):
+        invoice = InvoiceService(session).get_invoice_by_number(invoice_number)
+        return InvoiceResponse.model_validate(invoice).model_dump()
     
     return {
         "success": True,
-        "data": InvoiceResponse.model_validate(invoice).model_dump()
+        "data": await db.run_sync(_load)
     }
 
 
@@ -149,7 +154,7 @@ async def get_invoice_by_number(
     dependencies=[Depends(require_role([UserRole.ADMIN, UserRole.PROCUREMENT_OFFICER, UserRole.ACCOUNTANT]))]
 )
 async def get_all_invoices(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all vendor invoices with PO and vendor details.
@@ -157,12 +162,13 @@ async def get_all_invoices(
     Returns:
         List of all invoices with line items, PO info, and vendor details
     """
-    service = InvoiceService(db)
-    invoices = service.get_all_invoices()
+    def _load(session: Session):
+        invoices = InvoiceService(session).get_all_invoices()
+        return [InvoiceResponse.model_validate(inv).model_dump() for inv in invoices]
     
     return {
         "success": True,
-        "data": [InvoiceResponse.model_validate(inv).model_dump() for inv in invoices]
+        "data": await db.run_sync(_load)
     }
 
 
@@ -241,8 +247,9 @@ async def process_invoice(
 @router.get("/{invoice_id}/download-pdf", dependencies=[Depends(get_current_user)])
 async def download_invoice_pdf(
     invoice_id: int = Path(description="Invoice ID"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+    config: ConfigSnapshot = Depends(get_config_snapshot)
 ):
     """
     Generate and download Invoice PDF.
@@ -251,18 +258,20 @@ async def download_invoice_pdf(
     Includes batch tracking, GST details, and dispatch info (for FG invoices).
     """
     # Get Invoice with all relationships
-    invoice = db.query(VendorInvoice).options(
+    invoice = await db.run_sync(lambda session: session.query(VendorInvoice).options(
         joinedload(VendorInvoice.vendor),
         joinedload(VendorInvoice.purchase_order),
         joinedload(VendorInvoice.items).joinedload(VendorInvoiceItem.medicine)
-    ).filter(VendorInvoice.id == invoice_id).first()
+    ).filter(VendorInvoice.id == invoice_id).first())
     
     if not invoice:
         raise AppException("Invoice not found", "ERR_NOT_FOUND", 404)
     
     try:
-        pdf_service = InvoicePDFService(db)  # Pass db session for config access
-        pdf_buffer = pdf_service.generate_invoice_pdf(invoice)
+        # Letterhead from the request config snapshot
+        pdf_buffer = await db.run_sync(
+            lambda session: InvoicePDFService(session, config).generate_invoice_pdf(invoice)
+        )
         
         logger.info({
             "event": "INVOICE_PDF_GENERATED",
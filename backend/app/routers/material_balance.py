@@ -2,7 +2,8 @@ from app.exceptions.base import AppException
 
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from app.database.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.session import get_db, get_read_db
 from app.services.material_balance_service import get_material_balance_summary, get_packing_balance_summary
 from app.models.material_balance import MaterialBalance
 from sqlalchemy.orm import joinedload
@@ -25,16 +26,20 @@ def delete_material_balance(id: int, db: Session = Depends(get_db)):
         'id': id
     }
 @router.get("/summary/{raw_material_id}", response_model=MaterialBalanceSummary)
-def material_balance_summary(raw_material_id: int, db: Session = Depends(get_db)):
-    return get_material_balance_summary(db, raw_material_id)
+async def material_balance_summary(raw_material_id: int, db: AsyncSession = Depends(get_read_db)):
+    return await db.run_sync(get_material_balance_summary, raw_material_id)
 
 @router.get("/pmsummary/{packing_material_id}", response_model=MaterialBalanceSummary)
-def packing_material_balance_summary(packing_material_id: int, db: Session = Depends(get_db)):
-    return get_packing_balance_summary(db, packing_material_id)
+async def packing_material_balance_summary(packing_material_id: int, db: AsyncSession = Depends(get_read_db)):
+    return await db.run_sync(get_packing_balance_summary, packing_material_id)
 # New endpoint: get all material balance rows
 
 @router.get("/all")
-def get_all_material_balance(db: Session = Depends(get_db)):
+async def get_all_material_balance(db: AsyncSession = Depends(get_read_db)):
+    return await db.run_sync(_load_all_material_balance)
+
+
+def _load_all_material_balance(db: Session):
     rows = db.query(MaterialBalance).options(
         joinedload(MaterialBalance.po),
         joinedload(MaterialBalance.invoice),
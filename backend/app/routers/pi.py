@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, date
 from decimal import Decimal
 import logging
 
-from app.database.session import get_db
+from app.database.session import get_db, get_read_db
 from app.schemas.pi import PICreate, PIResponse, PIApprovalSchema
+from app.schemas.configuration import ConfigSnapshot
 from app.models.pi import PI, PIItem, PIStatus
 from app.models.eopa import EOPA
 from app.models.product import MedicineMaster
@@ -15,8 +17,10 @@ from app.models.vendor import Vendor, VendorType
 from app.models.country import Country
 from app.auth.dependencies import get_current_user, require_role
 from app.utils.number_generator import generate_pi_number, generate_eopa_number
+from app.utils.pagination import keyset_page
 from app.exceptions.base import AppException
 from app.services.pi_pdf_service import PIPDFService
+from app.services.configuration_service import get_config_snapshot
 
 router = APIRouter()
 logger = logging.getLogger("pharma")
@@ -26,7 +30,8 @@ logger = logging.getLogger("pharma")
 async def create_pi(
     pi_data: PICreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    config: ConfigSnapshot = Depends(get_config_snapshot)
 ):
     """Create Proforma Invoice"""
     # Validate partner vendor
@@ -38,7 +43,7 @@ async def create_pi(
         raise AppException("Vendor must be of type PARTNER", "ERR_VALIDATION", 400)
     
     # Generate PI number
-    pi_number = generate_pi_number(db)
+    pi_number = generate_pi_number(db, config)
     
     # Calculate total amount
     total_amount = sum(item.quantity * item.unit_price for item in pi_data.items)
@@ -104,22 +109,28 @@ async def create_pi(
 async def list_pis(
     skip: int = 0,
     limit: int = 100,
+    cursor: str = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """List Proforma Invoices"""
-    pis = db.query(PI).options(
-        joinedload(PI.items).joinedload(PIItem.medicine).joinedload(MedicineMaster.manufacturer_vendor),
-        joinedload(PI.items).joinedload(PIItem.medicine).joinedload(MedicineMaster.rm_vendor),
-        joinedload(PI.items).joinedload(PIItem.medicine).joinedload(MedicineMaster.pm_vendor),
-        joinedload(PI.country),
-        joinedload(PI.partner_vendor).joinedload(Vendor.country)
-    ).offset(skip).limit(limit).all()
+    """List Proforma Invoices (oldest first; continue with `cursor` = `next_cursor`)"""
+    def _load(session: Session):
+        query = session.query(PI).options(
+            joinedload(PI.items).joinedload(PIItem.medicine).joinedload(MedicineMaster.manufacturer_vendor),
+            joinedload(PI.items).joinedload(PIItem.medicine).joinedload(MedicineMaster.rm_vendor),
+            joinedload(PI.items).joinedload(PIItem.medicine).joinedload(MedicineMaster.pm_vendor),
+            joinedload(PI.country),
+            joinedload(PI.partner_vendor).joinedload(Vendor.country)
+        )
+        pis, next_cursor = keyset_page(query, PI.created_at, PI.id, limit, cursor=cursor, skip=skip)
+        return [PIResponse.model_validate(pi).model_dump() for pi in pis], next_cursor
     
+    data, next_cursor = await db.run_sync(_load)
     return {
         "success": True,
         "message": "PIs retrieved successfully",
-        "data": [PIResponse.model_validate(pi).model_dump() for pi in pis],
+        "data": data,
+        "next_cursor": next_cursor,
         "timestamp": datetime.utcnow().isoformat() + "Z"
     }
 
@@ -128,23 +139,25 @@ async def list_pis(
 async def get_pi(
     pi_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get PI by ID"""
-    pi = db.query(PI).options(
-        joinedload(PI.items).joinedload(PIItem.medicine).joinedload(MedicineMaster.manufacturer_vendor),
-        joinedload(PI.items).joinedload(PIItem.medicine).joinedload(MedicineMaster.rm_vendor),
-        joinedload(PI.items).joinedload(PIItem.medicine).joinedload(MedicineMaster.pm_vendor),
-        joinedload(PI.country),
-        joinedload(PI.partner_vendor).joinedload(Vendor.country)
-    ).filter(PI.id == pi_id).first()
-    if not pi:
-        raise AppException("PI not found", "ERR_NOT_FOUND", 404)
+    def _load(session: Session):
+        pi = session.query(PI).options(
+            joinedload(PI.items).joinedload(PIItem.medicine).joinedload(MedicineMaster.manufacturer_vendor),
+            joinedload(PI.items).joinedload(PIItem.medicine).joinedload(MedicineMaster.rm_vendor),
+            joinedload(PI.items).joinedload(PIItem.medicine).joinedload(MedicineMaster.pm_vendor),
+            joinedload(PI.country),
+            joinedload(PI.partner_vendor).joinedload(Vendor.country)
+        ).filter(PI.id == pi_id).first()
+        if not pi:
+            raise AppException("PI not found", "ERR_NOT_FOUND", 404)
+        return PIResponse.model_validate(pi).model_dump()
     
     return {
         "success": True,
         "message": "PI retrieved successfully",
-        "data": PIResponse.model_validate(pi).model_dump(),
+        "data": await db.run_sync(_load),
         "timestamp": datetime.utcnow().isoformat() + "Z"
     }
 
@@ -220,7 +233,8 @@ async def approve_pi(
     pi_id: int,
     approval_data: PIApprovalSchema,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    config: ConfigSnapshot = Depends(get_config_snapshot)
 ):
     """
     Approve or reject PI.
@@ -266,7 +280,7 @@ async def approve_pi(
             eopa_number = existing_eopa.eopa_number
         else:
             # Generate EOPA number
-            eopa_number = generate_eopa_number(db)
+            eopa_number = generate_eopa_number(db, config)
             
             # Create ONE EOPA for the entire PI
             eopa = EOPA(
@@ -373,8 +387,9 @@ async def delete_pi(
 @router.get("/{pi_id}/download-pdf", dependencies=[Depends(get_current_user)])
 async def download_pi_pdf(
     pi_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+    config: ConfigSnapshot = Depends(get_config_snapshot)
 ):
     """
     Generate and download PI PDF.
@@ -382,19 +397,19 @@ async def download_pi_pdf(
     Returns PDF file with professional letterhead and formatting.
     """
     # Get PI with all relationships
-    pi = db.query(PI).options(
+    pi = await db.run_sync(lambda session: session.query(PI).options(
         joinedload(PI.partner_vendor),
         joinedload(PI.country),
         joinedload(PI.items).joinedload(PIItem.medicine),
         joinedload(PI.approver)
-    ).filter(PI.id == pi_id).first()
+    ).filter(PI.id == pi_id).first())
     
     if not pi:
         raise AppException("Proforma Invoice not found", "ERR_NOT_FOUND", 404)
     
     try:
-        pdf_service = PIPDFService(db)  # Pass db session for config access
-        pdf_buffer = pdf_service.generate_pi_pdf(pi)
+        # Letterhead from the request config snapshot
+        pdf_buffer = await db.run_sync(lambda session: PIPDFService(session, config).generate_pi_pdf(pi))
         
         logger.info({
             "event": "PI_PDF_GENERATED",
@@ -1,14 +1,17 @@
 
 from fastapi import APIRouter, Depends, Body
 from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 import logging
 import time
 from typing import List
 
-from app.database.session import get_db
-from app.schemas.po import POCreate, POResponse, POUpdateRequest
+from app.database.session import get_db, get_read_db
+from app.schemas.po import POBatchGenerateRequest, POBulkRecalculateRequest, POConsolidationRequest, POBulkTransitionRequest, POCreate, POResponse, POSummaryResponse, POUpdateRequest
+from app.schemas.configuration import ConfigSnapshot
 from app.models.po import PurchaseOrder, POItem, POType, POStatus
 from app.models.vendor import Vendor
 from app.models.eopa import EOPA, EOPAStatus
@@ -16,10 +19,16 @@ from app.models.product import MedicineMaster
 from app.models.user import User, UserRole
 from app.auth.dependencies import get_current_user, require_role
 from app.utils.number_generator import generate_po_number
+from app.utils.pagination import keyset_page
 from app.exceptions.base import AppException
-from app.services.po_service import POGenerationService
+from app.services.po_service import PO_ITEM_MATERIAL_COLUMN, POGenerationService, recalculate_po_amounts
+from app.services.po_batch import MAX_BATCH_EOPAS, po_batch_jobs, start_po_batch
+from app.services.mrp_consolidation import MRPConsolidationService
+from app.services.po_loaders import load_po, po_loader_options
+from app.services.po_transitions import MAX_BULK_TRANSITION_POS, PO_TRANSITIONS, apply_po_transition
 from app.services.pdf_service import POPDFService
 from app.services.email_service import EmailService
+from app.services.configuration_service import get_config_snapshot
 
 router = APIRouter()
 logger = logging.getLogger("pharma")
@@ -30,7 +39,8 @@ async def generate_pos_from_eopa(
     eopa_id: int,
     po_quantities: dict = None,  # Optional custom quantities
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    config: ConfigSnapshot = Depends(get_config_snapshot)
 ):
     """
     Generate Purchase Orders from an approved EOPA.
@@ -52,7 +62,7 @@ async def generate_pos_from_eopa(
     Returns:
         Summary of created POs with PO numbers and details
     """
-    service = POGenerationService(db)
+    service = POGenerationService(db, config)
     
     try:
         result = service.generate_pos_from_eopa(eopa_id, current_user.id, po_quantities)
@@ -84,7 +94,8 @@ async def generate_pos_from_eopa(
 async def generate_pos_from_eopa_body(
     payload: dict,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    config: ConfigSnapshot = Depends(get_config_snapshot)
 ):
     """
     Generate Purchase Orders from an approved EOPA (body-based).
@@ -101,7 +112,7 @@ async def generate_pos_from_eopa_body(
         if not eopa_id:
             raise AppException("eopa_id is required", "ERR_VALIDATION", 400)
 
-        service = POGenerationService(db)
+        service = POGenerationService(db, config)
         result = service.generate_pos_from_eopa(eopa_id, current_user.id, po_quantities)
 
         return {
@@ -125,12 +136,103 @@ async def generate_pos_from_eopa_body(
         )
 
 
+@router.post("/generate-batch", response_model=dict, dependencies=[Depends(require_role([UserRole.ADMIN, UserRole.PROCUREMENT_OFFICER]))])
+async def generate_pos_batch(
+    request: POBatchGenerateRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    config: ConfigSnapshot = Depends(get_config_snapshot)
+):
+    """
+    Generate FG, RM and PM POs for many approved EOPAs in a background job.
+    
+    Each EOPA is generated like /generate-from-eopa/{eopa_id}, in its own
+    transaction, on a bounded worker pool; a failing EOPA is rolled back and
+    reported without affecting the others.
+    
+    Returns the job immediately; poll GET /api/po/generate-batch/{job_id} for
+    per-EOPA progress and results.
+    """
+    if not request.eopa_ids:
+        raise AppException("eopa_ids must not be empty", "ERR_VALIDATION", 400)
+    if len(set(request.eopa_ids)) > MAX_BATCH_EOPAS:
+        raise AppException(
+            f"At most {MAX_BATCH_EOPAS} EOPAs can be generated in one batch",
+            "ERR_VALIDATION",
+            400
+        )
+    
+    job = start_po_batch(db.get_bind(), request.eopa_ids, current_user.id, config)
+    
+    return {
+        "success": True,
+        "message": f"PO generation started for {len(job.eopas)} EOPA(s)",
+        "data": job.to_dict(),
+        "timestamp": datetime.utcnow().isoformat() + "Z"
+    }
+
+
+@router.get("/generate-batch/{job_id}", response_model=dict, dependencies=[Depends(require_role([UserRole.ADMIN, UserRole.PROCUREMENT_OFFICER]))])
+async def get_pos_batch(job_id: str):
+    """Progress of a batch PO generation job, with results and errors per EOPA"""
+    job = po_batch_jobs.get(job_id)
+    if not job:
+        raise AppException("Batch job not found", "ERR_NOT_FOUND", 404)
+    
+    data = job.to_dict()
+    return {
+        "success": True,
+        "message": f"{data['completed']} of {data['total']} EOPA(s) processed",
+        "data": data,
+        "timestamp": datetime.utcnow().isoformat() + "Z"
+    }
+
+
+@router.post("/consolidate", response_model=dict, dependencies=[Depends(require_role([UserRole.ADMIN, UserRole.PROCUREMENT_OFFICER]))])
+async def consolidate_material_pos(
+    request: POConsolidationRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    config: ConfigSnapshot = Depends(get_config_snapshot)
+):
+    """
+    Consolidate the RM/PM demand of many approved EOPAs into one DRAFT PO per vendor.
+    
+    Requirements of all EOPAs are exploded in one pass, aggregated by
+    (vendor, material, UoM) and netted against open PO quantities and the
+    material balance. With preview=true the netted plan is returned and
+    nothing is written.
+    """
+    service = MRPConsolidationService(db, config)
+    
+    if request.preview:
+        result = service.plan(request.eopa_ids, request.kinds)
+        message = f"Consolidation preview for {len(result['eopa_ids'])} EOPA(s)"
+    else:
+        result = service.consolidate(request.eopa_ids, current_user.id, request.kinds)
+        message = f"Created {result['total_pos_created']} consolidated PO(s) for {len(result['eopa_ids'])} EOPA(s)"
+        logger.info({
+            "event": "MRP_CONSOLIDATION_FROM_API",
+            "eopa_ids": result["eopa_ids"],
+            "total_pos_created": result["total_pos_created"],
+            "user": current_user.username
+        })
+    
+    return {
+        "success": True,
+        "message": message,
+        "data": result,
+        "timestamp": datetime.utcnow().isoformat() + "Z"
+    }
+
+
 @router.post("/generate-rm-pos/{eopa_id}", response_model=dict, dependencies=[Depends(require_role([UserRole.ADMIN, UserRole.PROCUREMENT_OFFICER]))])
 async def generate_rm_pos_from_explosion(
     eopa_id: int,
     rm_po_overrides: dict = None,  # Optional user overrides from preview
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    config: ConfigSnapshot = Depends(get_config_snapshot)
 ):
     """
     Generate Raw Material POs from BOM explosion.
@@ -153,7 +255,7 @@ async def generate_rm_pos_from_explosion(
         Summary of created RM POs with PO numbers and details
     """
     try:
-        po_service = POGenerationService(db)
+        po_service = POGenerationService(db, config)
         
         # Extract rm_pos list if provided in nested structure
         overrides_list = None
@@ -201,7 +303,8 @@ async def generate_pm_pos_from_explosion(
     eopa_id: int,
     pm_po_overrides: dict = None,  # Optional user overrides from preview
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    config: ConfigSnapshot = Depends(get_config_snapshot)
 ):
     """
     Generate Packing Material POs from BOM explosion.
@@ -224,7 +327,7 @@ async def generate_pm_pos_from_explosion(
         Summary of created PM POs with PO numbers and details
     """
     try:
-        po_service = POGenerationService(db)
+        po_service = POGenerationService(db, config)
         
         # Extract pm_pos list if provided in nested structure
         overrides_list = None
@@ -271,7 +374,8 @@ async def generate_pm_pos_from_explosion(
 async def create_po(
     po_data: POCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    config: ConfigSnapshot = Depends(get_config_snapshot)
 ):
     """Create Purchase Order from EOPA"""
     # Get EOPA
@@ -303,7 +407,7 @@ async def create_po(
         raise AppException("Vendor not mapped for this PO type in Medicine Master", "ERR_VENDOR_MISMATCH", 400)
 
     # Generate PO number
-    po_number = generate_po_number(db, po_data.po_type.value)
+    po_number = generate_po_number(db, po_data.po_type.value, config=config)
 
     # Ensure po_date is not null
     from datetime import date
@@ -362,34 +466,41 @@ async def list_pos(
     limit: int = 50,  # Reduced default limit from 100 to 50
     po_type: POType = None,
     eopa_id: int = None,
+    cursor: str = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """List Purchase Orders with optional filters"""
-    start_time = time.time()
-    
-    query = db.query(PurchaseOrder).options(
-        joinedload(PurchaseOrder.vendor),
-        joinedload(PurchaseOrder.eopa),
-        joinedload(PurchaseOrder.items).joinedload(POItem.medicine),
-        joinedload(PurchaseOrder.items).joinedload(POItem.raw_material),
-        joinedload(PurchaseOrder.items).joinedload(POItem.packing_material)
-    )
-    
-    if po_type:
-        query = query.filter(PurchaseOrder.po_type == po_type)
-    
-    if eopa_id:
-        query = query.filter(PurchaseOrder.eopa_id == eopa_id)
+    """
+    List Purchase Orders with optional filters, most recent first.
     
-    # Order by most recent first
-    pos = query.order_by(PurchaseOrder.created_at.desc()).offset(skip).limit(limit).all()
+    Pass `next_cursor` from the response as `cursor` to fetch the next page;
+    `skip` is honoured only when no cursor is given. Grids that do not show
+    items should use GET /api/po/summary instead.
+    """
+    start_time = time.time()
     
-    query_time = time.time() - start_time
-    logger.info(f"PO query took {query_time:.2f}s, fetched {len(pos)} records")
+    def _load(session: Session):
+        query = session.query(PurchaseOrder).options(*po_loader_options("detail"))
+        
+        if po_type:
+            query = query.filter(PurchaseOrder.po_type == po_type)
+        
+        if eopa_id:
+            query = query.filter(PurchaseOrder.eopa_id == eopa_id)
+        
+        # Order by most recent first
+        pos, next_cursor = keyset_page(
+            query, PurchaseOrder.created_at, PurchaseOrder.id, limit,
+            cursor=cursor, skip=skip, descending=True
+        )
+        
+        query_time = time.time() - start_time
+        logger.info(f"PO query took {query_time:.2f}s, fetched {len(pos)} records")
+        
+        # Convert to response
+        return [POResponse.model_validate(po).model_dump() for po in pos], next_cursor
     
-    # Convert to response
-    response_data = [POResponse.model_validate(po).model_dump() for po in pos]
+    response_data, next_cursor = await db.run_sync(_load)
     # Debug: log PO items for first PO
     if response_data and response_data[0].get('items'):
         logger.info({
@@ -405,6 +516,96 @@ async def list_pos(
         "success": True,
         "message": "Purchase Orders retrieved successfully",
         "data": response_data,
+        "next_cursor": next_cursor,
+        "timestamp": datetime.utcnow().isoformat() + "Z"
+    }
+
+
+@router.get("/summary", response_model=dict)
+async def list_po_summaries(
+    skip: int = 0,
+    limit: int = 50,
+    po_type: POType = None,
+    eopa_id: int = None,
+    vendor_id: int = None,
+    status: POStatus = None,
+    cursor: str = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    PO grid listing: header columns with item counts and totals, most recent first.
+    
+    Items are not loaded; counts and sums are aggregated in SQL for the page's
+    POs only. Use GET /api/po/{po_id} for item detail. Paginates like GET /api/po/.
+    """
+    def _load(session: Session):
+        query = session.query(
+            PurchaseOrder.id,
+            PurchaseOrder.po_number,
+            PurchaseOrder.po_date,
+            PurchaseOrder.po_type,
+            PurchaseOrder.status,
+            PurchaseOrder.eopa_id,
+            EOPA.eopa_number,
+            PurchaseOrder.vendor_id,
+            Vendor.vendor_name,
+            PurchaseOrder.delivery_date,
+            PurchaseOrder.currency_code,
+            PurchaseOrder.created_at
+        ).outerjoin(
+            Vendor, Vendor.id == PurchaseOrder.vendor_id
+        ).outerjoin(
+            EOPA, EOPA.id == PurchaseOrder.eopa_id
+        )
+        
+        if po_type:
+            query = query.filter(PurchaseOrder.po_type == po_type)
+        if eopa_id:
+            query = query.filter(PurchaseOrder.eopa_id == eopa_id)
+        if vendor_id:
+            query = query.filter(PurchaseOrder.vendor_id == vendor_id)
+        if status:
+            query = query.filter(PurchaseOrder.status == status)
+        
+        rows, next_cursor = keyset_page(
+            query, PurchaseOrder.created_at, PurchaseOrder.id, limit,
+            cursor=cursor, skip=skip, descending=True
+        )
+        
+        # Item aggregates of this page only (uses the po_items.po_id index)
+        totals = {}
+        if rows:
+            totals = {
+                row.po_id: row for row in session.query(
+                    POItem.po_id,
+                    func.count(POItem.id).label("item_count"),
+                    func.coalesce(func.sum(POItem.ordered_quantity), 0).label("ordered_quantity"),
+                    func.coalesce(func.sum(POItem.fulfilled_quantity), 0).label("fulfilled_quantity"),
+                    func.coalesce(func.sum(POItem.value_amount), 0).label("value_amount"),
+                    func.coalesce(func.sum(POItem.gst_amount), 0).label("gst_amount"),
+                    func.coalesce(func.sum(POItem.total_amount), 0).label("total_amount")
+                ).filter(
+                    POItem.po_id.in_([row.id for row in rows])
+                ).group_by(POItem.po_id)
+            }
+        
+        summaries = []
+        for row in rows:
+            summary = row._asdict()
+            if row.id in totals:
+                item_totals = totals[row.id]._asdict()
+                item_totals.pop("po_id")
+                summary.update(item_totals)
+            summaries.append(POSummaryResponse.model_validate(summary).model_dump())
+        return summaries, next_cursor
+    
+    data, next_cursor = await db.run_sync(_load)
+    return {
+        "success": True,
+        "message": "Purchase Order summaries retrieved successfully",
+        "data": data,
+        "next_cursor": next_cursor,
         "timestamp": datetime.utcnow().isoformat() + "Z"
     }
 
@@ -413,24 +614,17 @@ async def list_pos(
 async def get_po(
     po_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get Purchase Order by ID"""
-    po = db.query(PurchaseOrder).options(
-        joinedload(PurchaseOrder.vendor),
-        joinedload(PurchaseOrder.eopa),
-        joinedload(PurchaseOrder.items).joinedload(POItem.medicine),
-        joinedload(PurchaseOrder.items).joinedload(POItem.raw_material),
-        joinedload(PurchaseOrder.items).joinedload(POItem.packing_material)
-    ).filter(PurchaseOrder.id == po_id).first()
-    
-    if not po:
-        raise AppException("Purchase Order not found", "ERR_NOT_FOUND", 404)
+    def _load(session: Session):
+        po = load_po(session, po_id, "detail")
+        return POResponse.model_validate(po).model_dump()
     
     return {
         "success": True,
         "message": "Purchase Order retrieved successfully",
-        "data": POResponse.model_validate(po).model_dump(),
+        "data": await db.run_sync(_load),
         "timestamp": datetime.utcnow().isoformat() + "Z"
     }
 
@@ -485,23 +679,27 @@ async def update_po(
     # Update PO items if provided
     # FIX B: Support both UPDATE existing items and INSERT new items
     if po_data.items:
+        # Index the PO's items once by ID and by material ID instead of a lookup per item
+        material_column = PO_ITEM_MATERIAL_COLUMN.get(po.po_type)
+        items_by_id = {}
+        items_by_material = {}
+        for existing_item in db.query(POItem).filter(POItem.po_id == po_id).order_by(POItem.id).all():
+            items_by_id[existing_item.id] = existing_item
+            if material_column:
+                items_by_material.setdefault(getattr(existing_item, material_column), existing_item)
+        
         for item_data in po_data.items:
             # Check if this is a new item (no ID) or existing item
             item_id = getattr(item_data, 'id', None)
             
             if item_id and item_id > 0:
                 # UPDATE existing item
-                po_item = db.query(POItem).filter(POItem.id == item_id, POItem.po_id == po_id).first()
-            else:
+                po_item = items_by_id.get(item_id)
+            elif material_column:
                 # Try to match by material ID
-                if po.po_type == POType.FG:
-                    po_item = db.query(POItem).filter(POItem.medicine_id == item_data.medicine_id, POItem.po_id == po_id).first()
-                elif po.po_type == POType.RM:
-                    po_item = db.query(POItem).filter(POItem.raw_material_id == getattr(item_data, 'raw_material_id', None), POItem.po_id == po_id).first()
-                elif po.po_type == POType.PM:
-                    po_item = db.query(POItem).filter(POItem.packing_material_id == getattr(item_data, 'packing_material_id', None), POItem.po_id == po_id).first()
-                else:
-                    po_item = None
+                po_item = items_by_material.get(getattr(item_data, material_column, None))
+            else:
+                po_item = None
             
             logger.info({
                 "event": "PO_ITEM_UPDATE_ATTEMPT",
@@ -540,6 +738,8 @@ async def update_po(
                         unit=getattr(item_data, 'unit', 'pcs')
                     )
                     db.add(new_po_item)
+                    if material_column:
+                        items_by_material.setdefault(getattr(new_po_item, material_column), new_po_item)
                     logger.info({
                         "event": "PO_ITEM_INSERTED",
                         "po_id": po_id,
@@ -561,13 +761,7 @@ async def update_po(
     })
     
     # Reload with relationships
-    po = db.query(PurchaseOrder).options(
-        joinedload(PurchaseOrder.vendor),
-        joinedload(PurchaseOrder.eopa),
-        joinedload(PurchaseOrder.items).joinedload(POItem.medicine),
-        joinedload(PurchaseOrder.items).joinedload(POItem.raw_material),
-        joinedload(PurchaseOrder.items).joinedload(POItem.packing_material)
-    ).filter(PurchaseOrder.id == po_id).first()
+    po = load_po(db, po_id, "detail")
     
     return {
         "success": True,
@@ -577,6 +771,47 @@ async def update_po(
     }
 
 
+@router.post("/recalculate-bulk", response_model=dict, dependencies=[Depends(require_role([UserRole.ADMIN, UserRole.PROCUREMENT_OFFICER]))])
+async def recalculate_pos_bulk(
+    request: POBulkRecalculateRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Recalculate commercial amounts of many POs at once (e.g. after GST rate changes).
+    
+    Scope: `po_ids`, all POs of `eopa_id`, or both combined; `all_pos` recalculates
+    every PO. CLOSED POs are skipped. Runs as two set-based UPDATE statements
+    regardless of the number of POs.
+    """
+    if not request.all_pos and request.po_ids is None and request.eopa_id is None:
+        raise AppException("Provide po_ids, eopa_id or all_pos", "ERR_VALIDATION", 400)
+    if request.all_pos and (request.po_ids is not None or request.eopa_id is not None):
+        raise AppException("all_pos cannot be combined with po_ids or eopa_id", "ERR_VALIDATION", 400)
+    
+    start_time = time.time()
+    counts = recalculate_po_amounts(db, po_ids=request.po_ids, eopa_id=request.eopa_id)
+    db.commit()
+    
+    logger.info({
+        "event": "PO_BULK_RECALCULATED",
+        "po_ids": request.po_ids,
+        "eopa_id": request.eopa_id,
+        "all_pos": request.all_pos,
+        "po_count": counts["po_count"],
+        "item_count": counts["item_count"],
+        "duration_ms": round((time.time() - start_time) * 1000, 3),
+        "user": current_user.username
+    })
+    
+    return {
+        "success": True,
+        "message": f"Recalculated {counts['po_count']} Purchase Order(s)",
+        "data": counts,
+        "timestamp": datetime.utcnow().isoformat() + "Z"
+    }
+
+
 @router.post("/{po_id}/recalculate", response_model=dict, dependencies=[Depends(require_role([UserRole.ADMIN, UserRole.PROCUREMENT_OFFICER]))])
 async def recalculate_po(
     po_id: int,
@@ -596,12 +831,7 @@ async def recalculate_po(
     - GST rates change
     - Manual recalculation is needed
     """
-    from app.services.po_service import calculate_po_item_amounts, calculate_po_totals
-    
-    # Get PO with all items
-    po = db.query(PurchaseOrder).options(
-        joinedload(PurchaseOrder.items)
-    ).filter(PurchaseOrder.id == po_id).first()
+    po = db.query(PurchaseOrder).filter(PurchaseOrder.id == po_id).first()
     
     if not po:
         raise AppException("Purchase Order not found", "ERR_NOT_FOUND", 404)
@@ -609,15 +839,10 @@ async def recalculate_po(
     if po.status == POStatus.CLOSED:
         raise AppException("Cannot recalculate a closed PO", "ERR_VALIDATION", 400)
     
-    # Recalculate each item
-    for item in po.items:
-        calculate_po_item_amounts(item)
-    
-    # Recalculate PO totals
-    calculate_po_totals(po)
-    
-    po.updated_at = datetime.utcnow()
+    # Item amounts and PO totals in SQL; the items are not loaded
+    recalculate_po_amounts(db, po_ids=[po_id])
     db.commit()
+    db.refresh(po)
     
     logger.info({
         "event": "PO_RECALCULATED",
@@ -630,13 +855,7 @@ async def recalculate_po(
     })
     
     # Reload with all relationships
-    po = db.query(PurchaseOrder).options(
-        joinedload(PurchaseOrder.vendor),
-        joinedload(PurchaseOrder.eopa),
-        joinedload(PurchaseOrder.items).joinedload(POItem.medicine),
-        joinedload(PurchaseOrder.items).joinedload(POItem.raw_material),
-        joinedload(PurchaseOrder.items).joinedload(POItem.packing_material)
-    ).filter(PurchaseOrder.id == po_id).first()
+    po = load_po(db, po_id, "detail")
     
     return {
         "success": True,
@@ -649,8 +868,9 @@ async def recalculate_po(
 @router.get("/{po_id}/download-pdf", dependencies=[Depends(get_current_user)])
 async def download_po_pdf(
     po_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+    config: ConfigSnapshot = Depends(get_config_snapshot)
 ):
     """
     Generate and download PO PDF.
@@ -658,24 +878,11 @@ async def download_po_pdf(
     Returns PDF file with professional letterhead and formatting.
     """
     # Get PO with all relationships (including approval workflow and terms)
-    po = db.query(PurchaseOrder).options(
-        joinedload(PurchaseOrder.vendor),
-        joinedload(PurchaseOrder.items).joinedload(POItem.medicine),
-        joinedload(PurchaseOrder.items).joinedload(POItem.raw_material),
-        joinedload(PurchaseOrder.items).joinedload(POItem.packing_material),
-        joinedload(PurchaseOrder.preparer),
-        joinedload(PurchaseOrder.checker),
-        joinedload(PurchaseOrder.approver),
-        joinedload(PurchaseOrder.verifier),
-        joinedload(PurchaseOrder.terms_conditions)
-    ).filter(PurchaseOrder.id == po_id).first()
-    
-    if not po:
-        raise AppException("Purchase Order not found", "ERR_NOT_FOUND", 404)
+    po = await db.run_sync(load_po, po_id, "pdf")
     
     try:
-        pdf_service = POPDFService(db)  # Pass db session for config access
-        pdf_buffer = pdf_service.generate_po_pdf(po)
+        # Letterhead from the request config snapshot
+        pdf_buffer = await db.run_sync(lambda session: POPDFService(session, config).generate_po_pdf(po))
         
         logger.info({
             "event": "PO_PDF_GENERATED",
@@ -711,7 +918,8 @@ async def send_po_email(
     po_id: int,
     email_data: dict,  # {"to_emails": ["vendor@example.com"], "cc_emails": [], "subject": "", "body": ""}
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    config: ConfigSnapshot = Depends(get_config_snapshot)
 ):
     """
     Send PO email to vendor with PDF attachment.
@@ -724,15 +932,7 @@ async def send_po_email(
         Success/failure status with message
     """
     # Get PO with all relationships
-    po = db.query(PurchaseOrder).options(
-        joinedload(PurchaseOrder.vendor),
-        joinedload(PurchaseOrder.items).joinedload(POItem.medicine),
-        joinedload(PurchaseOrder.items).joinedload(POItem.raw_material),
-        joinedload(PurchaseOrder.items).joinedload(POItem.packing_material)
-    ).filter(PurchaseOrder.id == po_id).first()
-    
-    if not po:
-        raise AppException("Purchase Order not found", "ERR_NOT_FOUND", 404)
+    po = load_po(db, po_id, "email")
     
     # Validate email data
     to_emails = email_data.get("to_emails", [])
@@ -740,7 +940,7 @@ async def send_po_email(
         raise AppException("to_emails is required and must be a list", "ERR_VALIDATION", 400)
     
     try:
-        email_service = EmailService(db)
+        email_service = EmailService(db, config)
         result = email_service.send_po_email(
             po=po,
             to_emails=to_emails,
@@ -837,11 +1037,90 @@ async def test_email_configuration(
 
 
 
+@router.post("/bulk-transition", response_model=dict, dependencies=[Depends(require_role([UserRole.ADMIN, UserRole.PROCUREMENT_OFFICER]))])
+async def bulk_transition_pos(
+    request: POBulkTransitionRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    config: ConfigSnapshot = Depends(get_config_snapshot)
+):
+    """
+    Apply one workflow step to many POs in a single transaction.
+    
+    Actions (same rules as the single-PO endpoints):
+    - mark_pending: DRAFT → PENDING_APPROVAL
+    - approve: PENDING_APPROVAL → APPROVED (ADMIN only)
+    - mark_ready: APPROVED → READY
+    - send: READY → SENT (no email)
+    
+    POs that are missing or in the wrong status are reported per PO and skipped;
+    with all_or_nothing=true any such PO leaves all of them unchanged.
+    """
+    transition = PO_TRANSITIONS.get(request.action)
+    if transition is None:
+        raise AppException(
+            f"Invalid action. Must be one of: {', '.join(PO_TRANSITIONS)}",
+            "ERR_VALIDATION",
+            400
+        )
+    if current_user.role not in transition.roles:
+        raise AppException(
+            f"Permission denied. Required roles: {', '.join([r.value for r in transition.roles])}",
+            "ERR_FORBIDDEN",
+            403
+        )
+    if not request.po_ids:
+        raise AppException("po_ids must not be empty", "ERR_VALIDATION", 400)
+    if len(request.po_ids) > MAX_BULK_TRANSITION_POS:
+        raise AppException(
+            f"At most {MAX_BULK_TRANSITION_POS} POs can be transitioned at once",
+            "ERR_VALIDATION",
+            400
+        )
+    
+    results = apply_po_transition(
+        db, request.action, request.po_ids, current_user.id,
+        all_or_nothing=request.all_or_nothing, config=config
+    )
+    db.commit()
+    
+    applied = [result for result in results if result["success"]]
+    for result in applied:
+        logger.info({
+            "event": transition.event,
+            "po_id": result["po_id"],
+            "po_number": result["po_number"],
+            "user": current_user.username,
+            "bulk": True
+        })
+    logger.info({
+        "event": "PO_BULK_TRANSITION",
+        "action": request.action,
+        "requested": len(results),
+        "applied": len(applied),
+        "all_or_nothing": request.all_or_nothing,
+        "user": current_user.username
+    })
+    
+    return {
+        "success": True,
+        "message": f"{len(applied)} of {len(results)} Purchase Order(s) moved to {transition.to_status.value}",
+        "data": {
+            "action": request.action,
+            "applied": len(applied),
+            "failed": len(results) - len(applied),
+            "results": results
+        },
+        "timestamp": datetime.utcnow().isoformat() + "Z"
+    }
+
+
 @router.post("/{po_id}/mark-pending", response_model=dict, dependencies=[Depends(require_role([UserRole.ADMIN, UserRole.PROCUREMENT_OFFICER]))])
 async def mark_po_pending(
     po_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    config: ConfigSnapshot = Depends(get_config_snapshot)
 ):
     """Mark PO as pending approval (DRAFT → PENDING_APPROVAL)"""
     po = db.query(PurchaseOrder).filter(PurchaseOrder.id == po_id).first()
@@ -852,7 +1131,7 @@ async def mark_po_pending(
 
     # Re-generate PO number to remove DRAFT from number
     from app.utils.number_generator import generate_po_number
-    new_po_number = generate_po_number(db, po.po_type.value, is_draft=False)
+    new_po_number = generate_po_number(db, po.po_type.value, is_draft=False, config=config)
     po.po_number = new_po_number
     po.status = POStatus.PENDING_APPROVAL
     po.prepared_by = current_user.id
@@ -1021,7 +1300,8 @@ async def send_po_to_vendor(
     po_id: int,
     send_email: bool = False,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    config: ConfigSnapshot = Depends(get_config_snapshot)
 ):
     """Send PO to vendor (READY → SENT)"""
     po = db.query(PurchaseOrder).options(
@@ -1041,7 +1321,7 @@ async def send_po_to_vendor(
     # Optionally send email
     if send_email and po.vendor and po.vendor.email:
         try:
-            email_service = EmailService(db)
+            email_service = EmailService(db, config)
             email_result = email_service.send_po_email(
                 po=po,
                 to_emails=[po.vendor.email],
@@ -1085,29 +1365,27 @@ async def send_po_to_vendor(
 async def get_pos_by_eopa(
     eopa_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all Purchase Orders generated from a specific EOPA"""
     from app.models.eopa import EOPA
-    from app.models.vendor import Vendor
-    
-    # Verify EOPA exists
-    eopa = db.query(EOPA).filter(EOPA.id == eopa_id).first()
-    if not eopa:
-        raise AppException("EOPA not found", "ERR_NOT_FOUND", 404)
     
-    # Fetch POs linked to this EOPA
-    pos = db.query(PurchaseOrder).options(
-        joinedload(PurchaseOrder.vendor),
-        joinedload(PurchaseOrder.items).joinedload(POItem.medicine),
-        joinedload(PurchaseOrder.items).joinedload(POItem.raw_material),
-        joinedload(PurchaseOrder.items).joinedload(POItem.packing_material)
-    ).filter(PurchaseOrder.eopa_id == eopa_id).all()
+    def _load(session: Session):
+        # Verify EOPA exists
+        eopa = session.query(EOPA).filter(EOPA.id == eopa_id).first()
+        if not eopa:
+            raise AppException("EOPA not found", "ERR_NOT_FOUND", 404)
+        
+        # Fetch POs linked to this EOPA
+        pos = session.query(PurchaseOrder).options(
+            *po_loader_options("detail")
+        ).filter(PurchaseOrder.eopa_id == eopa_id).all()
+        return [POResponse.model_validate(po).model_dump() for po in pos]
     
     return {
         "success": True,
         "message": f"Purchase Orders for EOPA #{eopa_id} retrieved successfully",
-        "data": [POResponse.model_validate(po).model_dump() for po in pos],
+        "data": await db.run_sync(_load),
         "timestamp": datetime.utcnow().isoformat() + "Z"
     }
 
@@ -1116,7 +1394,8 @@ async def get_pos_by_eopa(
 async def generate_po_by_vendor(
     payload: dict,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    config: ConfigSnapshot = Depends(get_config_snapshot)
 ):
     """
     Generate a single PO for a specific vendor and PO type from EOPA.
@@ -1142,16 +1421,6 @@ async def generate_po_by_vendor(
     
     Returns mode="update" if DRAFT exists, mode="create" if new PO created
     """
-    # Local imports to avoid circular references and fix incorrect modules
-    from datetime import date, timedelta
-    from decimal import Decimal
-    from app.models.eopa import EOPA, EOPAItem
-    from app.models.vendor import Vendor
-    from app.models.product import MedicineMaster
-    from app.models.raw_material import RawMaterialMaster
-    from app.models.packing_material import PackingMaterialMaster
-    from app.utils.number_generator import generate_po_number
-    
     eopa_id = payload.get('eopa_id')
     vendor_id = payload.get('vendor_id')
     po_type = payload.get('po_type')
@@ -1160,257 +1429,23 @@ async def generate_po_by_vendor(
     if not all([eopa_id, vendor_id, po_type]):
         raise AppException("Missing required fields: eopa_id, vendor_id, po_type", "ERR_VALIDATION", 400)
     
-    # Validate EOPA
-    eopa = db.query(EOPA).options(
-        joinedload(EOPA.items)
-    ).filter(EOPA.id == eopa_id).first()
-    if not eopa:
-        raise AppException("EOPA not found", "ERR_NOT_FOUND", 404)
-    
-    if eopa.status != "APPROVED":
-        raise AppException("EOPA must be APPROVED to generate POs", "ERR_EOPA_NOT_APPROVED", 400)
-    
-    # Validate vendor
-    vendor = db.query(Vendor).filter(Vendor.id == vendor_id).first()
-    if not vendor:
-        raise AppException("Vendor not found", "ERR_NOT_FOUND", 404)
-    
-    # BUG FIX: Check for existing PO in priority order: DRAFT → PENDING → APPROVED → READY → SENT
-    # Search in order of status priority
-    status_priority = [
-        POStatus.DRAFT,
-        POStatus.PENDING_APPROVAL,
-        POStatus.APPROVED,
-        POStatus.READY,
-        POStatus.SENT
-    ]
-    
-    existing_po = None
-    for status in status_priority:
-        existing_po = db.query(PurchaseOrder).filter(
-            PurchaseOrder.eopa_id == eopa_id,
-            PurchaseOrder.vendor_id == vendor_id,
-            PurchaseOrder.po_type == po_type,
-            PurchaseOrder.status == status
-        ).order_by(PurchaseOrder.created_at.desc()).first()
-        
-        if existing_po:
-            break
-    
-    if existing_po:
-        # UPDATE MODE - Return existing PO with items (regardless of status)
-        logger.info({
-            "event": "PO_FOUND",
-            "po_id": existing_po.id,
-            "po_number": existing_po.po_number,
-            "po_status": existing_po.status.value if hasattr(existing_po.status, 'value') else str(existing_po.status),
-            "vendor_id": vendor_id,
-            "eopa_id": eopa_id,
-            "user": current_user.username
-        })
-        
-        # Load existing items
-        existing_items = db.query(POItem).options(
-            joinedload(POItem.medicine),
-            joinedload(POItem.raw_material),
-            joinedload(POItem.packing_material)
-        ).filter(POItem.po_id == existing_po.id).all()
-        
-        items_data = []
-        for po_item in existing_items:
-            item_dict = {
-                "id": po_item.id,
-                "medicine_id": po_item.medicine_id,
-                "raw_material_id": po_item.raw_material_id,
-                "packing_material_id": po_item.packing_material_id,
-                "medicine_name": po_item.medicine.medicine_name if po_item.medicine else None,
-                "raw_material_name": po_item.raw_material.rm_name if po_item.raw_material else None,
-                "packing_material_name": po_item.packing_material.pm_name if po_item.packing_material else None,
-                "ordered_quantity": float(po_item.ordered_quantity) if po_item.ordered_quantity else 0,
-                "fulfilled_quantity": float(po_item.fulfilled_quantity) if po_item.fulfilled_quantity else 0,
-                "unit": po_item.unit
-            }
-            items_data.append(item_dict)
-        
-        po_status_str = existing_po.status.value if hasattr(existing_po.status, 'value') else str(existing_po.status)
-        
-        return {
-            "success": True,
-            "message": f"Found existing {po_status_str} PO {existing_po.po_number}",
-            "data": {
-                "mode": "update",
-                "po_id": existing_po.id,
-                "po_number": existing_po.po_number,
-                "po_status": po_status_str,
-                "po_type": po_type,
-                "vendor_name": vendor.vendor_name,
-                "items": items_data
-            },
-            "timestamp": datetime.utcnow().isoformat() + "Z"
-        }
-    
-    # CREATE MODE - No existing DRAFT, create new PO
-    po_number = generate_po_number(db, po_type)
-    
-    po = PurchaseOrder(
-        po_number=po_number,
-        po_date=date.today(),
-        po_type=po_type,
+    result = POGenerationService(db, config).generate_po_for_vendor(
         eopa_id=eopa_id,
         vendor_id=vendor_id,
-        delivery_date=date.today() + timedelta(days=30),  # Default 30 days
-        status=POStatus.DRAFT,
-        created_by=current_user.id
+        po_type=po_type,
+        items=items,
+        current_user_id=current_user.id
     )
     
-    db.add(po)
-    db.flush()
-    
-    # FIX A: If no items provided, auto-generate from EOPA based on PO type
-    if not items or len(items) == 0:
-        # Auto-generate items from EOPA based on po_type
-        eopa_with_items = db.query(EOPA).options(
-            joinedload(EOPA.items).joinedload(EOPAItem.pi_item)
-        ).filter(EOPA.id == eopa_id).first()
-        
-        items = []
-        for eopa_item in (eopa_with_items.items if eopa_with_items else []):
-            if not eopa_item.pi_item or not eopa_item.pi_item.medicine_id:
-                continue
-            
-            medicine = db.query(MedicineMaster).filter(MedicineMaster.id == eopa_item.pi_item.medicine_id).first()
-            if not medicine:
-                continue
-            
-            eopa_qty = float(eopa_item.quantity or 0)
-            
-            if po_type == 'FG':
-                # BUG FIX #2: Filter by vendor - only include if medicine manufacturer matches target vendor
-                if medicine.manufacturer_vendor_id == vendor_id:
-                    items.append({
-                        'medicine_id': medicine.id,
-                        'ordered_quantity': eopa_qty,
-                        'eopa_quantity': eopa_qty,
-                        'unit': 'PCS'
-                    })
-            elif po_type == 'RM':
-                # Fetch RM BOM for this medicine
-                rm_bom_items = db.query(MedicineMaster).filter(MedicineMaster.id == medicine.id).first()
-                if hasattr(rm_bom_items, 'raw_materials'):
-                    for bom_item in rm_bom_items.raw_materials:
-                        # BUG FIX #2: Filter by vendor - only include if BOM item vendor matches target vendor
-                        item_vendor_id = getattr(bom_item, 'vendor_id', None) or medicine.rm_vendor_id
-                        if item_vendor_id == vendor_id:
-                            qty_required = float(getattr(bom_item, 'qty_required_per_unit', 0))
-                            exploded_qty = eopa_qty * qty_required
-                            if bom_item.raw_material_id and exploded_qty > 0:
-                                items.append({
-                                    'raw_material_id': bom_item.raw_material_id,
-                                    'ordered_quantity': exploded_qty,
-                                    'eopa_quantity': exploded_qty,
-                                    'unit': getattr(bom_item, 'uom', 'KG')
-                                })
-            elif po_type == 'PM':
-                # Fetch PM BOM for this medicine
-                pm_bom_items = db.query(MedicineMaster).filter(MedicineMaster.id == medicine.id).first()
-                if hasattr(pm_bom_items, 'packing_materials'):
-                    for bom_item in pm_bom_items.packing_materials:
-                        # BUG FIX #2: Filter by vendor - only include if BOM item vendor matches target vendor
-                        item_vendor_id = getattr(bom_item, 'vendor_id', None) or medicine.pm_vendor_id
-                        if item_vendor_id == vendor_id:
-                            qty_required = float(getattr(bom_item, 'qty_required_per_unit', 0))
-                            exploded_qty = eopa_qty * qty_required
-                            if bom_item.packing_material_id and exploded_qty > 0:
-                                items.append({
-                                    'packing_material_id': bom_item.packing_material_id,
-                                    'ordered_quantity': exploded_qty,
-                                    'eopa_quantity': exploded_qty,
-                                    'unit': getattr(bom_item, 'uom', 'PCS')
-                                })
-    
-    # Create PO items from payload
-    # PART B: fulfilled_quantity = EOPA qty (stored ONCE), ordered_quantity = user editable
-    items_data = []
-    for item in items:
-        medicine_id = item.get('medicine_id')
-        raw_material_id = item.get('raw_material_id')
-        packing_material_id = item.get('packing_material_id')
-        ordered_quantity = item.get('ordered_quantity', 0)
-        eopa_quantity = item.get('eopa_quantity', ordered_quantity)  # Use eopa_quantity if provided, else ordered_quantity
-        unit = item.get('unit', 'pcs')
-        
-        # Skip invalid items
-        if not any([medicine_id, raw_material_id, packing_material_id]) or not ordered_quantity:
-            continue
-        
-        # PART B: fulfilled_quantity stores EOPA original qty, ordered_quantity is editable
-        po_item = POItem(
-            po_id=po.id,
-            medicine_id=medicine_id,
-            raw_material_id=raw_material_id,
-            packing_material_id=packing_material_id,
-            ordered_quantity=Decimal(str(ordered_quantity)),
-            fulfilled_quantity=Decimal(str(eopa_quantity)),  # EOPA original qty - NEVER modified
-            unit=unit
-        )
-        db.add(po_item)
-        db.flush()
-        
-        # Fetch names for response
-        medicine_name = None
-        raw_material_name = None
-        packing_material_name = None
-        
-        if medicine_id:
-            medicine = db.query(MedicineMaster).filter(MedicineMaster.id == medicine_id).first()
-            medicine_name = medicine.medicine_name if medicine else None
-        
-        if raw_material_id:
-            rm = db.query(RawMaterialMaster).filter(RawMaterialMaster.id == raw_material_id).first()
-            raw_material_name = rm.rm_name if rm else None
-        
-        if packing_material_id:
-            pm = db.query(PackingMaterialMaster).filter(PackingMaterialMaster.id == packing_material_id).first()
-            packing_material_name = pm.pm_name if pm else None
-        
-        items_data.append({
-            "id": po_item.id,
-            "medicine_id": medicine_id,
-            "raw_material_id": raw_material_id,
-            "packing_material_id": packing_material_id,
-            "medicine_name": medicine_name,
-            "raw_material_name": raw_material_name,
-            "packing_material_name": packing_material_name,
-            "ordered_quantity": float(ordered_quantity),
-            "fulfilled_quantity": float(eopa_quantity),
-            "unit": unit
-        })
-    
-    db.commit()
-    db.refresh(po)
-    
-    logger.info({
-        "event": "PO_GENERATED_SINGLE",
-        "po_id": po.id,
-        "po_number": po_number,
-        "po_type": po_type,
-        "vendor_id": vendor_id,
-        "eopa_id": eopa_id,
-        "items_count": len(items_data),
-        "user": current_user.username
-    })
+    if result["mode"] == "update":
+        message = f"Found existing {result['po_status']} PO {result['po_number']}"
+    else:
+        message = f"Successfully generated {result['po_type']} PO {result['po_number']} for vendor {result['vendor_name']}"
     
     return {
         "success": True,
-        "message": f"Successfully generated {po_type} PO {po_number} for vendor {vendor.vendor_name}",
-        "data": {
-            "mode": "create",
-            "po_id": po.id,
-            "po_number": po_number,
-            "po_type": po_type,
-            "vendor_name": vendor.vendor_name,
-            "items": items_data
-        },
+        "message": message,
+        "data": result,
         "timestamp": datetime.utcnow().isoformat() + "Z"
     }
 
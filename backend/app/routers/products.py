@@ -9,6 +9,7 @@ from app.schemas.product import ProductMasterCreate, ProductMasterResponse, Medi
 from app.models.product import ProductMaster, MedicineMaster
 from app.models.user import User, UserRole
 from app.auth.dependencies import get_current_user, require_role
+from app.utils.pagination import keyset_page
 from app.exceptions.base import AppException
 
 router = APIRouter()
@@ -180,20 +181,25 @@ async def create_medicine_master(
 async def list_medicines(
     skip: int = 0,
     limit: int = 100,
+    cursor: str = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """List medicine masters"""
-    medicines = db.query(MedicineMaster).options(
+    """List medicine masters (oldest first; continue with `cursor` = `next_cursor`)"""
+    query = db.query(MedicineMaster).options(
         joinedload(MedicineMaster.manufacturer_vendor),
         joinedload(MedicineMaster.rm_vendor),
         joinedload(MedicineMaster.pm_vendor)
-    ).offset(skip).limit(limit).all()
+    )
+    medicines, next_cursor = keyset_page(
+        query, MedicineMaster.created_at, MedicineMaster.id, limit, cursor=cursor, skip=skip
+    )
     
     return {
         "success": True,
         "message": "Medicines retrieved successfully",
         "data": [MedicineMasterResponse.model_validate(m).model_dump() for m in medicines],
+        "next_cursor": next_cursor,
         "timestamp": datetime.utcnow().isoformat() + "Z"
     }
 
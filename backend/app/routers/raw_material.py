@@ -21,6 +21,7 @@ from app.schemas.raw_material import (
 from app.models.raw_material import RawMaterialMaster, MedicineRawMaterial
 from app.models.user import User, UserRole
 from app.auth.dependencies import get_current_user, require_role
+from app.utils.pagination import keyset_page
 from app.exceptions.base import AppException
 from app.services.rm_explosion_service import RMExplosionService
 from datetime import datetime
@@ -71,10 +72,12 @@ async def create_raw_material(
 async def get_raw_materials(
     is_active: Optional[bool] = Query(None, description="Filter by active status"),
     category: Optional[str] = Query(None, description="Filter by category"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size (default: all raw materials)"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all raw materials"""
+    """Get all raw materials, or one page of them when limit/cursor is given"""
     query = db.query(RawMaterialMaster).options(
         joinedload(RawMaterialMaster.default_vendor)
     )
@@ -85,12 +88,19 @@ async def get_raw_materials(
     if category:
         query = query.filter(RawMaterialMaster.category == category)
     
-    raw_materials = query.order_by(RawMaterialMaster.rm_code).all()
+    next_cursor = None
+    if limit or cursor:
+        raw_materials, next_cursor = keyset_page(
+            query, RawMaterialMaster.rm_code, RawMaterialMaster.id, limit or 100, cursor=cursor
+        )
+    else:
+        raw_materials = query.order_by(RawMaterialMaster.rm_code).all()
     
     return {
         "success": True,
         "message": f"Retrieved {len(raw_materials)} raw materials",
         "data": [RawMaterialResponse.model_validate(rm).model_dump() for rm in raw_materials],
+        "next_cursor": next_cursor,
         "timestamp": datetime.utcnow().isoformat() + "Z"
     }
 
@@ -8,7 +8,7 @@ from app.database.session import get_db
 from app.schemas.user import UserCreate, UserResponse, UserUpdate
 from app.models.user import User, UserRole
 from app.auth.dependencies import get_current_user, require_role
-from app.auth.utils import hash_password
+from app.auth.utils import hash_password_async
 from app.exceptions.base import AppException
 
 router = APIRouter()
@@ -37,7 +37,7 @@ async def create_user(
         username=user_data.username,
         email=user_data.email,
         full_name=user_data.full_name,
-        hashed_password=hash_password(user_data.password),
+        hashed_password=await hash_password_async(user_data.password),
         role=user_data.role
     )
     
@@ -1,13 +1,15 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 import logging
 
-from app.database.session import get_db
+from app.database.session import get_db, get_read_db
 from app.schemas.vendor import VendorCreate, VendorResponse, VendorUpdate
 from app.models.vendor import Vendor
 from app.models.user import User, UserRole
 from app.auth.dependencies import get_current_user, require_role
+from app.utils.pagination import keyset_page
 from app.exceptions.base import AppException
 
 router = APIRouter()
@@ -80,24 +82,33 @@ async def list_vendors(
     limit: int = 100,
     vendor_type: str = None,
     country_id: int = None,
+    cursor: str = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """List vendors with optional filtering by type and country"""
-    query = db.query(Vendor).options(joinedload(Vendor.country))
-    
-    if vendor_type:
-        query = query.filter(Vendor.vendor_type == vendor_type)
-    
-    if country_id:
-        query = query.filter(Vendor.country_id == country_id)
-    
-    vendors = query.offset(skip).limit(limit).all()
-    
+    """
+    List vendors with optional filtering by type and country.
+    
+    Oldest first; pass `next_cursor` as `cursor` for the next page.
+    """
+    def _load(session: Session):
+        query = session.query(Vendor).options(joinedload(Vendor.country))
+        
+        if vendor_type:
+            query = query.filter(Vendor.vendor_type == vendor_type)
+        
+        if country_id:
+            query = query.filter(Vendor.country_id == country_id)
+        
+        vendors, next_cursor = keyset_page(query, Vendor.created_at, Vendor.id, limit, cursor=cursor, skip=skip)
+        return [VendorResponse.model_validate(v).model_dump() for v in vendors], next_cursor
+    
+    data, next_cursor = await db.run_sync(_load)
     return {
         "success": True,
         "message": "Vendors retrieved successfully",
-        "data": [VendorResponse.model_validate(v).model_dump() for v in vendors],
+        "data": data,
+        "next_cursor": next_cursor,
         "timestamp": datetime.utcnow().isoformat() + "Z"
     }
 
@@ -106,17 +117,19 @@ async def list_vendors(
 async def get_vendor(
     vendor_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get vendor by ID"""
-    vendor = db.query(Vendor).options(joinedload(Vendor.country)).filter(Vendor.id == vendor_id).first()
-    if not vendor:
-        raise AppException("Vendor not found", "ERR_NOT_FOUND", 404)
+    def _load(session: Session):
+        vendor = session.query(Vendor).options(joinedload(Vendor.country)).filter(Vendor.id == vendor_id).first()
+        if not vendor:
+            raise AppException("Vendor not found", "ERR_NOT_FOUND", 404)
+        return VendorResponse.model_validate(vendor).model_dump()
     
     return {
         "success": True,
         "message": "Vendor retrieved successfully",
-        "data": VendorResponse.model_validate(vendor).model_dump(),
+        "data": await db.run_sync(_load),
         "timestamp": datetime.utcnow().isoformat() + "Z"
     }
 
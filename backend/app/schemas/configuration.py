@@ -1,7 +1,7 @@
 """
 Configuration Schemas - Request/Response models for configuration API
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Any, Dict, Optional
 from datetime import datetime
 
@@ -48,3 +48,45 @@ class ConfigurationPublicResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+class CompanyProfile(BaseModel):
+    """Company letterhead details (email falls back to each document's own default)"""
+    model_config = ConfigDict(frozen=True)
+    
+    name: str = "PharmaCo Industries Ltd."
+    address: str = "123 Pharma Street, Medical District"
+    city: str = "Mumbai, Maharashtra 400001"
+    phone: str = "+91 22 1234 5678"
+    email: Optional[str] = None
+    gst: str = "27AABCP1234F1Z5"
+
+
+class NumberingTemplates(BaseModel):
+    """Document number formats ({FY} and {SEQ:04d} placeholders)"""
+    model_config = ConfigDict(frozen=True)
+    
+    pi_format: str = "PI/{FY}/{SEQ:04d}"
+    eopa_format: str = "EOPA/{FY}/{SEQ:04d}"
+    po_rm_format: str = "PO/RM/{FY}/{SEQ:04d}"
+    po_pm_format: str = "PO/PM/{FY}/{SEQ:04d}"
+    po_fg_format: str = "PO/FG/{FY}/{SEQ:04d}"
+    grn_format: str = "GRN/{DATE}/{SEQ:04d}"
+    dispatch_format: str = "DA/{FY}/{SEQ:04d}"
+    invoice_format: str = "INV/{FY}/{SEQ:04d}"
+
+
+class ConfigSnapshot(BaseModel):
+    """
+    Immutable configuration snapshot resolved once per request
+    
+    Injected with Depends(get_config_snapshot) and passed down to number
+    generators and PDF services instead of repeated config lookups.
+    """
+    model_config = ConfigDict(frozen=True)
+    
+    company: CompanyProfile = Field(default_factory=CompanyProfile)
+    fiscal_year: str
+    numbering: NumberingTemplates = Field(default_factory=NumberingTemplates)
+    currency_code: str = "INR"
+    currency_symbol: str = "₹"
@@ -94,9 +94,16 @@ class EOPACreate(BaseModel):
     remarks: Optional[str] = None
 
 
+class EOPAItemQuantityUpdate(BaseModel):
+    """New quantity of one EOPA line item"""
+    id: int
+    quantity: float = Field(..., gt=0)
+
+
 class EOPAUpdate(BaseModel):
-    """Update EOPA remarks"""
+    """Update EOPA remarks and/or line item quantities"""
     remarks: Optional[str] = None
+    items: Optional[List[EOPAItemQuantityUpdate]] = None
 
 
 class EOPAResponse(BaseModel):
@@ -350,3 +350,56 @@ class POResponse(POBase):
     
     class Config:
         from_attributes = True
+
+
+class POSummaryResponse(BaseModel):
+    """PO grid row: header columns and item aggregates, without the items themselves"""
+    id: int
+    po_number: str
+    po_date: date
+    po_type: POType
+    status: POStatus
+    eopa_id: int
+    eopa_number: Optional[str] = None
+    vendor_id: Optional[int] = None
+    vendor_name: Optional[str] = None
+    delivery_date: Optional[date] = None
+    currency_code: Optional[str] = None
+    created_at: datetime
+    
+    # Aggregated over po_items in SQL
+    item_count: int = 0
+    ordered_quantity: float = 0
+    fulfilled_quantity: float = 0
+    value_amount: Decimal = Decimal("0")
+    gst_amount: Decimal = Decimal("0")
+    total_amount: Decimal = Decimal("0")
+    
+    class Config:
+        from_attributes = True
+
+
+class POBulkRecalculateRequest(BaseModel):
+    """Scope of a bulk recalculation: PO IDs, all POs of an EOPA, or every open PO"""
+    po_ids: Optional[List[int]] = None
+    eopa_id: Optional[int] = None
+    all_pos: bool = False
+
+
+class POBulkTransitionRequest(BaseModel):
+    """Workflow step to apply to many POs: mark_pending, approve, mark_ready or send"""
+    action: str
+    po_ids: List[int]
+    all_or_nothing: bool = False
+
+
+class POBatchGenerateRequest(BaseModel):
+    """Approved EOPAs to generate FG/RM/PM POs for in one background job"""
+    eopa_ids: List[int]
+
+
+class POConsolidationRequest(BaseModel):
+    """EOPAs whose RM/PM demand is netted into one DRAFT PO per vendor (preview writes nothing)"""
+    eopa_ids: List[int]
+    kinds: List[str] = ["RM", "PM"]
+    preview: bool = False
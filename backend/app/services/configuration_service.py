@@ -1,47 +1,123 @@
 """
 Configuration Service - Business logic for managing system configuration
 
-Implements caching mechanism for frequently accessed configs.
+Implements a process-wide caching mechanism for frequently accessed configs.
 """
+from fastapi import Depends
 from sqlalchemy.orm import Session
-from typing import Dict, Any, Optional, List
+from sqlalchemy import func
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime, timedelta
+import copy
 import logging
+import threading
 
+from app.config import settings
+from app.database.session import get_db
 from app.models.configuration import SystemConfiguration
+from app.schemas.configuration import CompanyProfile, ConfigSnapshot, NumberingTemplates
 from app.exceptions.base import AppException
 
 
 logger = logging.getLogger("pharma")
 
 
-class ConfigurationService:
+class ConfigStore:
     """
-    Configuration Service with in-memory caching
+    Process-wide configuration cache shared by all ConfigurationService instances.
     
-    Cache is refreshed every 5 minutes or on write operations.
+    - The whole system_configuration table is held in memory per worker
+    - At most once per check interval (default 1 second) a cheap version query
+      (row count, max updated_at, max id) is compared with the loaded version;
+      a change made by any worker triggers a reload, so writes propagate to
+      all gunicorn workers within about a second
+    - Refresh is single-flight: concurrent callers wait for one reload
+    - Writes through ConfigurationService invalidate the local store immediately
     """
     
-    _cache: Dict[str, Dict[str, Any]] = {}
-    _cache_timestamp: Optional[datetime] = None
-    _cache_ttl_minutes = 5
+    def __init__(self, check_interval_seconds: float = 1.0, ttl_seconds: int = 300):
+        self.check_interval = timedelta(seconds=check_interval_seconds)
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._values: Dict[str, Dict[str, Any]] = {}
+        self._version: Optional[Tuple] = None
+        self._loaded_at: Optional[datetime] = None
+        self._checked_at: Optional[datetime] = None
+        self._lock = threading.Lock()
     
-    def __init__(self, db: Session):
-        self.db = db
+    @property
+    def loaded_at(self) -> Optional[datetime]:
+        return self._loaded_at
+    
+    def __len__(self) -> int:
+        return len(self._values)
+    
+    def _is_fresh(self, now: datetime) -> bool:
+        return self._checked_at is not None and now - self._checked_at < self.check_interval
     
-    def _refresh_cache(self):
-        """Refresh configuration cache from database"""
-        configs = self.db.query(SystemConfiguration).all()
-        self._cache = {config.config_key: config.config_value for config in configs}
-        self._cache_timestamp = datetime.utcnow()
-        logger.info({"event": "CONFIG_CACHE_REFRESHED", "count": len(self._cache)})
+    @staticmethod
+    def _current_version(db: Session) -> Tuple:
+        """Version stamp of the configuration table (changes on insert, update, delete)"""
+        return tuple(db.query(
+            func.count(SystemConfiguration.id),
+            func.max(SystemConfiguration.updated_at),
+            func.max(SystemConfiguration.id)
+        ).one())
     
-    def _is_cache_stale(self) -> bool:
-        """Check if cache needs refresh"""
-        if not self._cache_timestamp:
-            return True
-        age = datetime.utcnow() - self._cache_timestamp
-        return age > timedelta(minutes=self._cache_ttl_minutes)
+    def values(self, db: Session) -> Dict[str, Dict[str, Any]]:
+        """
+        Return all configuration values, refreshing from the database if needed.
+        
+        Args:
+            db: Session used for the version check / reload
+        
+        Returns:
+            Dict mapping config_key → config_value (shared, do not mutate)
+        """
+        if self._is_fresh(datetime.utcnow()):
+            return self._values
+        
+        with self._lock:
+            # Another thread may have refreshed while we were waiting
+            now = datetime.utcnow()
+            if self._is_fresh(now):
+                return self._values
+            
+            version = self._current_version(db)
+            expired = self._loaded_at is None or now - self._loaded_at > self.ttl
+            
+            if version != self._version or expired:
+                configs = db.query(SystemConfiguration).all()
+                self._values = {config.config_key: config.config_value for config in configs}
+                self._version = version
+                self._loaded_at = now
+                logger.info({"event": "CONFIG_CACHE_REFRESHED", "count": len(self._values)})
+            
+            self._checked_at = now
+            return self._values
+    
+    def invalidate(self):
+        """Force a version check on the next read"""
+        with self._lock:
+            self._checked_at = None
+            self._version = None
+
+
+config_store = ConfigStore(
+    check_interval_seconds=settings.CONFIG_CACHE_CHECK_SECONDS,
+    ttl_seconds=settings.CONFIG_CACHE_TTL_SECONDS
+)
+
+
+class ConfigurationService:
+    """
+    Configuration Service backed by the process-wide ConfigStore
+    
+    Cache is shared by all instances, re-validated at most once per second and
+    invalidated on write operations.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
     
     def get_config(self, key: str, use_cache: bool = True) -> Dict[str, Any]:
         """
@@ -58,13 +134,12 @@ class ConfigurationService:
             AppException: If key not found
         """
         if use_cache:
-            if self._is_cache_stale():
-                self._refresh_cache()
-            
-            if key in self._cache:
-                return self._cache[key]
+            values = config_store.values(self.db)
+            if key not in values:
+                raise AppException(f"Configuration key '{key}' not found", "ERR_CONFIG_NOT_FOUND", 404)
+            return copy.deepcopy(values[key])
         
-        # Cache miss or cache disabled - query database
+        # Cache disabled - query database
         config = self.db.query(SystemConfiguration).filter(
             SystemConfiguration.config_key == key
         ).first()
@@ -132,8 +207,8 @@ class ConfigurationService:
         self.db.commit()
         self.db.refresh(config)
         
-        # Invalidate cache
-        self._refresh_cache()
+        # Invalidate cache (other workers pick the change up on their next version check)
+        config_store.invalidate()
         
         logger.info({
             "event": "CONFIG_CREATED",
@@ -183,8 +258,8 @@ class ConfigurationService:
         self.db.commit()
         self.db.refresh(config)
         
-        # Invalidate cache
-        self._refresh_cache()
+        # Invalidate cache (other workers pick the change up on their next version check)
+        config_store.invalidate()
         
         logger.info({
             "event": "CONFIG_UPDATED",
@@ -214,8 +289,8 @@ class ConfigurationService:
         self.db.delete(config)
         self.db.commit()
         
-        # Invalidate cache
-        self._refresh_cache()
+        # Invalidate cache (other workers pick the change up on their next version check)
+        config_store.invalidate()
         
         logger.info({
             "event": "CONFIG_DELETED",
@@ -259,16 +334,57 @@ class ConfigurationService:
             return self.get_config("document_numbering")
         except AppException:
             # Return defaults
-            return {
-                "pi_format": "PI/{FY}/{SEQ:04d}",
-                "eopa_format": "EOPA/{FY}/{SEQ:04d}",
-                "po_rm_format": "PO/RM/{FY}/{SEQ:04d}",
-                "po_pm_format": "PO/PM/{FY}/{SEQ:04d}",
-                "po_fg_format": "PO/FG/{FY}/{SEQ:04d}",
-                "grn_format": "GRN/{DATE}/{SEQ:04d}",
-                "dispatch_format": "DA/{FY}/{SEQ:04d}",
-                "invoice_format": "INV/{FY}/{SEQ:04d}"
-            }
+            return NumberingTemplates().model_dump()
+    
+    def get_snapshot(self) -> ConfigSnapshot:
+        """
+        Build an immutable snapshot of company profile, fiscal year, numbering
+        formats and currency from a single read of the config store.
+        
+        Missing keys fall back to defaults, so this never raises for absent config.
+        """
+        from app.utils.number_generator import calculate_financial_year  # Lazy import
+        
+        values = config_store.values(self.db)
+        
+        company = {}
+        company_name = values.get("company_name")
+        if isinstance(company_name, dict) and company_name.get("value"):
+            company["name"] = company_name["value"]
+        
+        address = values.get("company_address")
+        if isinstance(address, dict):
+            if "street" in address:
+                postal_code = address.get("zip") or address.get("postal_code") or ""
+                company["address"] = address.get("street", "")
+                company["city"] = f"{address.get('city', '')}, {address.get('state', '')} {postal_code}".strip()
+            elif address.get("value"):
+                company["address"] = address["value"]
+            for field in ("phone", "email", "gst"):
+                if address.get(field):
+                    company[field] = address[field]
+        
+        currency = values.get("default_currency")
+        currency = currency if isinstance(currency, dict) else {}
+        currency_code = currency.get("value", "INR")
+        currency_symbol = currency.get("symbol") or ("₹" if currency_code == "INR" else "$")
+        
+        fiscal_year = values.get("fiscal_year")
+        if isinstance(fiscal_year, dict) and fiscal_year.get("value"):
+            fiscal_year = fiscal_year["value"]
+        else:
+            fiscal_year = calculate_financial_year()
+        
+        numbering = values.get("document_numbering")
+        numbering = numbering if isinstance(numbering, dict) else {}
+        
+        return ConfigSnapshot(
+            company=CompanyProfile(**company),
+            fiscal_year=fiscal_year,
+            numbering=NumberingTemplates(**numbering),
+            currency_code=currency_code,
+            currency_symbol=currency_symbol
+        )
     
     def get_vendor_rules(self) -> Dict[str, Any]:
         """Get vendor and medicine master rules"""
@@ -282,3 +398,13 @@ class ConfigurationService:
                 "enable_fallback_vendor": True,
                 "require_vendor_mapping": True
             }
+
+
+def get_config_snapshot(db: Session = Depends(get_db)) -> ConfigSnapshot:
+    """
+    FastAPI dependency returning the request's configuration snapshot.
+    
+    FastAPI caches dependencies per request, so the snapshot is built once and
+    shared by every consumer (number generators, PDF services) of that request.
+    """
+    return ConfigurationService(db).get_snapshot()
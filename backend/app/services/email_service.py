@@ -15,13 +15,14 @@ import os
 from sqlalchemy.orm import Session
 
 from app.models.po import PurchaseOrder
+from app.schemas.configuration import ConfigSnapshot
 from app.services.pdf_service import POPDFService
 
 
 class EmailService:
     """Send emails with PO PDFs"""
     
-    def __init__(self, db: Session = None):
+    def __init__(self, db: Session = None, config: Optional[ConfigSnapshot] = None):
         self.db = db
         
         # Load configuration from database if available, otherwise use environment variables
@@ -49,7 +50,7 @@ class EmailService:
         else:
             self._load_from_env()
         
-        self.pdf_service = POPDFService(db)
+        self.pdf_service = POPDFService(db, config)
     
     def _load_from_env(self):
         """Load SMTP configuration from environment variables"""
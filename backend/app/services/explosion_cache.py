@@ -0,0 +1,177 @@
+"""
+Explosion Cache - In-memory cache of RM/PM explosion results
+
+Results are keyed by (EOPA ID, material kind, include_inactive, BOM version stamp).
+The version stamp is computed with one aggregate query over the EOPA items and the
+BOM rows / material masters of the medicines they reference, so an entry written by
+one worker is never served after another worker changes the BOM or the EOPA items.
+
+Local changes are also invalidated eagerly through SQLAlchemy session events, and
+entries expire after a TTL so that vendor master edits are picked up as well.
+Eviction is least-recently-used once the cache reaches its maximum size.
+"""
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from typing import Any, Hashable, Optional, Tuple
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import copy
+import logging
+import threading
+
+from app.config import settings
+from app.models.eopa import EOPA, EOPAItem
+from app.models.pi import PIItem
+from app.models.raw_material import RawMaterialMaster, MedicineRawMaterial
+from app.models.packing_material import PackingMaterialMaster, MedicinePackingMaterial
+from app.models.vendor import Vendor
+
+logger = logging.getLogger("pharma")
+
+
+class ExplosionCache:
+    """
+    Bounded, thread-safe LRU cache for explosion results.
+
+    Keys are tuples whose first element is the EOPA ID. Values are deep-copied on
+    the way in and out so callers can freely mutate what they receive.
+    """
+
+    def __init__(self, max_size: int = 256, ttl_seconds: int = 300):
+        self.max_size = max_size
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._entries: "OrderedDict[Tuple, Tuple[datetime, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[Any]:
+        """Return a copy of the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            stored_at, value = entry
+            if datetime.utcnow() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+
+        return copy.deepcopy(value)
+
+    def put(self, key: Tuple[Hashable, ...], value: Any) -> None:
+        """Store a copy of value, evicting the least recently used entries"""
+        if not self.enabled:
+            return
+
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (datetime.utcnow(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_eopa(self, eopa_id: int) -> None:
+        """Drop every entry of one EOPA"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == eopa_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+explosion_cache = ExplosionCache(
+    max_size=settings.EXPLOSION_CACHE_SIZE,
+    ttl_seconds=settings.EXPLOSION_CACHE_TTL_SECONDS
+)
+
+
+def bom_version_stamp(db: Session, eopa_id: int) -> Tuple:
+    """
+    Compute the version stamp of an EOPA's explosion inputs in one query.
+
+    The stamp combines count / max ID / max updated_at of the EOPA items and of the
+    RM and PM BOM rows (plus material master updated_at) of the medicines in the EOPA.
+    Any insert, update or delete of those rows changes the stamp.
+
+    Args:
+        db: Database session
+        eopa_id: EOPA ID
+
+    Returns:
+        Tuple of aggregate values (hashable)
+    """
+    medicine_ids = (
+        select(PIItem.medicine_id)
+        .join(EOPAItem, EOPAItem.pi_item_id == PIItem.id)
+        .where(EOPAItem.eopa_id == eopa_id)
+    )
+
+    def _aggregate(column, *where):
+        return select(column).where(*where).scalar_subquery()
+
+    columns = [
+        _aggregate(EOPA.updated_at, EOPA.id == eopa_id),
+        _aggregate(func.count(EOPAItem.id), EOPAItem.eopa_id == eopa_id),
+        _aggregate(func.max(EOPAItem.id), EOPAItem.eopa_id == eopa_id),
+        _aggregate(func.max(EOPAItem.updated_at), EOPAItem.eopa_id == eopa_id),
+    ]
+
+    for bom_model, material_model, material_fk in (
+        (MedicineRawMaterial, RawMaterialMaster, MedicineRawMaterial.raw_material_id),
+        (MedicinePackingMaterial, PackingMaterialMaster, MedicinePackingMaterial.packing_material_id),
+    ):
+        in_eopa = bom_model.medicine_id.in_(medicine_ids)
+        columns.extend([
+            _aggregate(func.count(bom_model.id), in_eopa),
+            _aggregate(func.max(bom_model.id), in_eopa),
+            _aggregate(func.max(bom_model.updated_at), in_eopa),
+            select(func.max(material_model.updated_at))
+            .select_from(bom_model)
+            .join(material_model, material_model.id == material_fk)
+            .where(in_eopa)
+            .scalar_subquery(),
+        ])
+
+    return tuple(db.execute(select(*columns)).one())
+
+
+# Models whose changes affect explosion results of every EOPA
+_BOM_MODELS = (
+    MedicineRawMaterial,
+    MedicinePackingMaterial,
+    RawMaterialMaster,
+    PackingMaterialMaster,
+    Vendor,
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_on_flush(session, flush_context):
+    """Invalidate cached explosions touched by this flush"""
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, _BOM_MODELS):
+            explosion_cache.clear()
+            return
+        if isinstance(instance, EOPAItem) and instance.eopa_id is not None:
+            explosion_cache.invalidate_eopa(instance.eopa_id)
+        elif isinstance(instance, EOPA) and instance.id is not None:
+            explosion_cache.invalidate_eopa(instance.id)
+
+
+@event.listens_for(Session, "after_bulk_update")
+@event.listens_for(Session, "after_bulk_delete")
+def _invalidate_on_bulk(context):
+    """Query.update()/delete() bypass the flush; drop everything if a BOM/EOPA table was hit"""
+    if issubclass(context.mapper.class_, (*_BOM_MODELS, EOPA, EOPAItem)):
+        explosion_cache.clear()
@@ -0,0 +1,254 @@
+"""
+Incremental Re-explosion - apply EOPA quantity changes to DRAFT POs as deltas
+
+Changing the quantity of one EOPA line used to require a full re-explosion and
+PO regeneration. apply_eopa_quantity_changes() instead explodes only the
+quantity delta of each changed EOPA item (MaterialExplosionEngine.explode_item
+with quantity=delta, so wastage and BOM coefficients apply exactly as in a full
+explosion) and adds the result to the matching items of the EOPA's DRAFT POs:
+
+- FG: the item of the medicine on the manufacturer's FG PO for that medicine
+- RM/PM: the item of the material on the vendor's RM/PM PO (for PM, of the same
+  language and artwork version)
+
+Only the changed EOPA items, the affected PO items and their POs are written.
+Manual edits of other draft PO quantities are kept. Deltas that have no DRAFT
+PO of the vendor to go to are returned as unmatched (generate POs for them).
+"""
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.orm import Session, joinedload
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Tuple
+import logging
+
+from app.exceptions.base import AppException
+from app.models.eopa import EOPA, EOPAItem, EOPAStatus
+from app.models.pi import PIItem
+from app.models.po import PurchaseOrder, POItem, POType, POStatus, POConsolidatedEOPA
+from app.services.material_explosion_engine import MATERIAL_SPECS, MaterialExplosionEngine
+from app.services.po_service import PO_ITEM_MATERIAL_COLUMN, POGenerationService, po_item_key, recalculate_po_amounts
+
+logger = logging.getLogger("pharma")
+
+_ITEM_VALUES = {POType.RM: POGenerationService._rm_item_values, POType.PM: POGenerationService._pm_item_values}
+
+
+def apply_eopa_quantity_changes(db: Session, eopa: EOPA, quantities: Dict[int, Decimal]) -> Dict[str, Any]:
+    """
+    Set new EOPA item quantities and apply the deltas to the EOPA's DRAFT POs.
+
+    The caller commits. Only PENDING EOPAs (no POs yet) and APPROVED EOPAs whose
+    POs, including consolidated POs covering them, are all still DRAFT (or
+    CANCELLED) can change.
+
+    Args:
+        db: Database session
+        eopa: EOPA being edited
+        quantities: New quantity per EOPA item ID
+
+    Returns:
+        {"eopa_items_changed", "po_ids", "po_items_updated", "po_items_inserted",
+         "po_items_deleted", "unmatched": [{"po_type", "vendor_id", material column, "quantity"}
+         (PM also "language", "artwork_version")]}
+    """
+    if eopa.status not in (EOPAStatus.PENDING, EOPAStatus.APPROVED):
+        raise AppException("Cannot update rejected EOPA", "ERR_VALIDATION", 400)
+
+    items = db.query(EOPAItem).options(
+        joinedload(EOPAItem.pi_item).joinedload(PIItem.medicine)
+    ).filter(EOPAItem.eopa_id == eopa.id, EOPAItem.id.in_(list(quantities))).all()
+
+    missing = sorted(set(quantities) - {item.id for item in items})
+    if missing:
+        raise AppException(f"EOPA item(s) not found in this EOPA: {missing}", "ERR_NOT_FOUND", 404)
+
+    # Quantity delta per changed EOPA item
+    deltas: List[Tuple[EOPAItem, Decimal]] = []
+    now = datetime.utcnow()
+    for item in items:
+        new_quantity = Decimal(str(quantities[item.id]))
+        delta = new_quantity - Decimal(str(item.quantity))
+        if delta:
+            deltas.append((item, delta))
+            item.quantity = new_quantity
+            item.estimated_total = new_quantity * Decimal(str(item.estimated_unit_price))
+            item.updated_at = now
+
+    result = {
+        "eopa_items_changed": len(deltas),
+        "po_ids": [],
+        "po_items_updated": 0,
+        "po_items_inserted": 0,
+        "po_items_deleted": 0,
+        "unmatched": []
+    }
+    if not deltas or eopa.status != EOPAStatus.APPROVED:
+        return result
+
+    # Consolidated POs covering the EOPA receive its deltas too
+    submitted = db.query(PurchaseOrder.po_number).filter(
+        or_(
+            PurchaseOrder.eopa_id == eopa.id,
+            PurchaseOrder.consolidated_eopas.any(POConsolidatedEOPA.eopa_id == eopa.id)
+        ),
+        PurchaseOrder.status.notin_([POStatus.DRAFT, POStatus.CANCELLED])
+    ).limit(1).scalar()
+    if submitted:
+        raise AppException(
+            f"PO {submitted} of this EOPA has left DRAFT; quantities can no longer change",
+            "ERR_VALIDATION",
+            400
+        )
+
+    po_deltas = _explode_deltas(db, deltas)
+    if not po_deltas:
+        return result
+
+    _apply_po_deltas(db, eopa.id, po_deltas, result)
+
+    logger.info({
+        "event": "EOPA_QUANTITIES_REEXPLODED",
+        "eopa_id": eopa.id,
+        **{key: value for key, value in result.items() if key != "unmatched"},
+        "unmatched": len(result["unmatched"])
+    })
+    return result
+
+
+def _explode_deltas(db: Session, deltas: List[Tuple[EOPAItem, Decimal]]) -> Dict[Tuple[POType, int, Any], Dict]:
+    """
+    PO item quantity deltas by (po_type, vendor_id, po_item_key), with the exploded row.
+
+    A PM in another language or artwork version is another PO item, as in a full
+    explosion (po_item_key follows spec.consolidation_key). FG deltas go to the
+    medicine's manufacturer; RM/PM deltas are the BOM explosion of the quantity
+    delta (BOM of the changed medicines, one query per kind).
+    """
+    engine = MaterialExplosionEngine(db)
+    medicine_ids = {item.pi_item.medicine.id for item, _ in deltas if item.pi_item.medicine}
+
+    po_deltas: Dict[Tuple[POType, int, Any], Dict] = {}
+
+    def add(po_type: POType, vendor_id: int, quantity: Decimal, row: Dict[str, Any]):
+        key = (po_type, vendor_id, po_item_key(po_type, row))
+        if key in po_deltas:
+            po_deltas[key]["quantity"] += quantity
+        else:
+            po_deltas[key] = {"quantity": quantity, "row": row}
+
+    for item, delta in deltas:
+        medicine = item.pi_item.medicine
+        if medicine and medicine.manufacturer_vendor_id:
+            add(POType.FG, medicine.manufacturer_vendor_id, delta, {"medicine_id": medicine.id})
+
+    for po_type in _ITEM_VALUES:
+        spec = MATERIAL_SPECS[po_type.value]
+        bom_by_medicine = engine.load_bom_by_medicine(spec, medicine_ids)
+        for item, delta in deltas:
+            for row in engine.explode_item(spec, item, bom_by_medicine, quantity=delta):
+                add(po_type, row["vendor_id"], row["qty_required"], row)
+
+    return {key: value for key, value in po_deltas.items() if value["quantity"]}
+
+
+def _apply_po_deltas(
+    db: Session,
+    eopa_id: int,
+    po_deltas: Dict[Tuple[POType, int, Any], Dict],
+    result: Dict[str, Any]
+) -> None:
+    """
+    Add the deltas to the EOPA's DRAFT PO items (one read, then batched writes).
+    
+    Items are looked up across all DRAFT POs of a vendor and type, since FG
+    generation writes one PO per medicine. A material missing from the drafts
+    is inserted into the vendor's (lowest) RM/PM draft with the values PO
+    generation writes; a medicine is never added to another medicine's FG PO.
+    Consolidated POs covering the EOPA count as its POs.
+    """
+    vendor_ids = {vendor_id for (_, vendor_id, _) in po_deltas}
+    drafts = db.query(PurchaseOrder.id, PurchaseOrder.po_type, PurchaseOrder.vendor_id).filter(
+        or_(
+            PurchaseOrder.eopa_id == eopa_id,
+            PurchaseOrder.consolidated_eopas.any(POConsolidatedEOPA.eopa_id == eopa_id)
+        ),
+        PurchaseOrder.status == POStatus.DRAFT,
+        PurchaseOrder.vendor_id.in_(vendor_ids)
+    ).order_by(PurchaseOrder.id).all()
+    po_keys = {po.id: (po.po_type, po.vendor_id) for po in drafts}
+    insert_po_ids: Dict[Tuple[POType, int], int] = {}
+    for po in drafts:
+        if po.po_type != POType.FG:
+            insert_po_ids.setdefault((po.po_type, po.vendor_id), po.id)
+
+    # Existing items of those POs for the affected materials, in one query
+    po_items: Dict[Tuple[POType, int, Any], Any] = {}
+    if po_keys:
+        for po_item in db.query(
+            POItem.id, POItem.po_id, POItem.ordered_quantity,
+            POItem.medicine_id, POItem.raw_material_id, POItem.packing_material_id,
+            POItem.language, POItem.artwork_version
+        ).filter(POItem.po_id.in_(list(po_keys))).order_by(POItem.id).all():
+            po_type, vendor_id = po_keys[po_item.po_id]
+            key = (po_type, vendor_id, po_item_key(po_type, po_item))
+            if key in po_deltas:
+                po_items.setdefault(key, po_item)
+
+    updates, inserts, deletes = [], [], []
+    touched_po_ids = set()
+    for key, change in po_deltas.items():
+        po_type, vendor_id, _ = key
+        po_item = po_items.get(key)
+        if po_item is not None:
+            new_quantity = Decimal(str(po_item.ordered_quantity)) + change["quantity"]
+            if new_quantity > 0:
+                updates.append({"id": po_item.id, "ordered_quantity": new_quantity})
+            else:
+                deletes.append(po_item.id)
+            touched_po_ids.add(po_item.po_id)
+        elif change["quantity"] > 0 and (po_type, vendor_id) in insert_po_ids:
+            po_id = insert_po_ids[(po_type, vendor_id)]
+            inserts.append({
+                **_ITEM_VALUES[po_type](change["row"]),
+                "po_id": po_id,
+                "ordered_quantity": change["quantity"],
+                "fulfilled_quantity": Decimal("0")
+            })
+            touched_po_ids.add(po_id)
+        else:
+            material_column = PO_ITEM_MATERIAL_COLUMN[po_type]
+            unmatched = {
+                "po_type": po_type.value,
+                "vendor_id": vendor_id,
+                material_column: change["row"][material_column],
+                "quantity": change["quantity"]
+            }
+            if po_type == POType.PM:
+                unmatched.update(language=change["row"]["language"], artwork_version=change["row"]["artwork_version"])
+            result["unmatched"].append(unmatched)
+
+    if updates:
+        db.execute(update(POItem), updates)
+    if inserts:
+        db.execute(insert(POItem), inserts)
+    if deletes:
+        db.execute(
+            delete(POItem).where(POItem.id.in_(deletes)).execution_options(synchronize_session=False)
+        )
+
+    if touched_po_ids:
+        po_ids = sorted(touched_po_ids)
+        # total_ordered_qty is the sum of the items, as written by PO generation
+        db.execute(
+            update(PurchaseOrder)
+            .where(PurchaseOrder.id.in_(po_ids))
+            .values(total_ordered_qty=select(
+                func.coalesce(func.sum(POItem.ordered_quantity), 0)
+            ).where(POItem.po_id == PurchaseOrder.id).scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
+        recalculate_po_amounts(db, po_ids=po_ids)
+        result["po_ids"] = po_ids
+
+    result.update(po_items_updated=len(updates), po_items_inserted=len(inserts), po_items_deleted=len(deletes))
@@ -20,56 +20,35 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from io import BytesIO
 from datetime import datetime
 from sqlalchemy.orm import Session
+from typing import Optional
 
+from app.schemas.configuration import CompanyProfile, ConfigSnapshot
 from app.services.configuration_service import ConfigurationService
 
 
 class InvoicePDFService:
     """Generate Vendor Invoice PDFs"""
     
-    def __init__(self, db: Session = None):
+    def __init__(self, db: Session = None, config: Optional[ConfigSnapshot] = None):
         self.db = db
         self.styles = getSampleStyleSheet()
         self._create_custom_styles()
-        self._load_company_config()
+        self._load_company_config(config)
     
-    def _load_company_config(self):
-        """Load company configuration from database"""
-        if not self.db:
-            # Fallback to defaults if no DB session
-            self.COMPANY_NAME = "PharmaCo Industries Ltd."
-            self.COMPANY_ADDRESS = "123 Pharma Street, Medical District"
-            self.COMPANY_CITY = "Mumbai, Maharashtra 400001"
-            self.COMPANY_PHONE = "+91 22 1234 5678"
-            self.COMPANY_EMAIL = "procurement@pharmaco.com"
-            self.COMPANY_GST = "27AABCP1234F1Z5"
-            self.CURRENCY_SYMBOL = "₹"
-            return
-        
-        config_service = ConfigurationService(self.db)
-        
-        # Load company info
-        company_name_config = config_service.get_config("company_name", use_cache=True)
-        self.COMPANY_NAME = company_name_config.config_value.get("value", "PharmaCo Industries Ltd.") if company_name_config else "PharmaCo Industries Ltd."
-        
-        company_address_config = config_service.get_config("company_address", use_cache=True)
-        if company_address_config:
-            addr = company_address_config.config_value
-            self.COMPANY_ADDRESS = addr.get("street", "123 Pharma Street")
-            self.COMPANY_CITY = f"{addr.get('city', 'Mumbai')}, {addr.get('state', 'Maharashtra')} {addr.get('zip', '400001')}"
-            self.COMPANY_PHONE = addr.get("phone", "+91 22 1234 5678")
-            self.COMPANY_EMAIL = addr.get("email", "procurement@pharmaco.com")
-            self.COMPANY_GST = addr.get("gst", "27AABCP1234F1Z5")
-        else:
-            self.COMPANY_ADDRESS = "123 Pharma Street, Medical District"
-            self.COMPANY_CITY = "Mumbai, Maharashtra 400001"
-            self.COMPANY_PHONE = "+91 22 1234 5678"
-            self.COMPANY_EMAIL = "procurement@pharmaco.com"
-            self.COMPANY_GST = "27AABCP1234F1Z5"
-        
-        currency_config = config_service.get_config("default_currency", use_cache=True)
-        currency_code = currency_config.config_value.get("value", "INR") if currency_config else "INR"
-        self.CURRENCY_SYMBOL = "₹" if currency_code == "INR" else "$"
+    def _load_company_config(self, config: Optional[ConfigSnapshot] = None):
+        """Load company configuration from the request's config snapshot (or the config store)"""
+        if config is None and self.db:
+            config = ConfigurationService(self.db).get_snapshot()
+        
+        # Fallback to defaults if no DB session
+        company = config.company if config else CompanyProfile()
+        self.COMPANY_NAME = company.name
+        self.COMPANY_ADDRESS = company.address
+        self.COMPANY_CITY = company.city
+        self.COMPANY_PHONE = company.phone
+        self.COMPANY_EMAIL = company.email or "procurement@pharmaco.com"
+        self.COMPANY_GST = company.gst
+        self.CURRENCY_SYMBOL = config.currency_symbol if config else "₹"
     
     def _create_custom_styles(self):
         """Create custom paragraph styles"""
@@ -0,0 +1,515 @@
+"""
+Material Explosion Engine
+
+Shared Bill of Materials (BOM) explosion used by the RM and PM explosion services
+and by PO generation.
+
+The engine loads the EOPA → EOPA items → PI items → Medicine graph once, preloads
+the BOM of every medicine in the EOPA with one IN query per material kind, and
+explodes any combination of kinds (RM, PM) from that shared data. FG PO generation
+reuses the same loaded EOPA graph for its manufacturer grouping.
+
+Each material kind plugs in through a MaterialSpec that describes its BOM model,
+output row shape and vendor consolidation key.
+
+Set-based results are cached per EOPA and BOM version stamp (see explosion_cache),
+so a preview followed by PO generation explodes the EOPA only once.
+"""
+from sqlalchemy.orm import Session, joinedload
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set
+from decimal import Decimal
+from collections import defaultdict
+import logging
+
+from app.models.eopa import EOPA, EOPAItem
+from app.models.pi import PIItem
+from app.models.product import MedicineMaster
+from app.models.raw_material import RawMaterialMaster, MedicineRawMaterial
+from app.models.packing_material import PackingMaterialMaster, MedicinePackingMaterial
+from app.models.vendor import Vendor
+from app.services.explosion_cache import explosion_cache, bom_version_stamp
+from app.exceptions.base import AppException
+
+logger = logging.getLogger("pharma")
+
+
+class MaterialSpec(ABC):
+    """
+    Describes how one material kind plugs into the explosion engine.
+
+    Subclasses provide the BOM model, the material relationship on the BOM row,
+    the output row shape and the key used to consolidate duplicate materials
+    within a vendor group.
+    """
+
+    kind: str = ""
+    bom_model = None
+    material_model = None
+    material_attr: str = ""
+    items_key: str = ""
+    total_key: str = ""
+
+    def bom_options(self) -> list:
+        """Eager-load material, material default vendor and BOM override vendor"""
+        material_rel = getattr(self.bom_model, self.material_attr)
+        return [
+            joinedload(material_rel).joinedload(self.material_model.default_vendor),
+            joinedload(self.bom_model.vendor)
+        ]
+
+    @abstractmethod
+    def missing_bom_message(self, medicine: MedicineMaster) -> str:
+        """Error message when a medicine has no BOM of this kind"""
+
+    @abstractmethod
+    def missing_vendor_message(self, material, medicine: MedicineMaster) -> str:
+        """Error message when a BOM material has no vendor"""
+
+    @abstractmethod
+    def build_row(self, bom_row, material, vendor: Vendor, medicine: MedicineMaster,
+                  eopa_item: EOPAItem, total_qty: Decimal) -> Dict[str, Any]:
+        """Requirement row for one BOM line of one EOPA item"""
+
+    @abstractmethod
+    def consolidation_key(self, row: Dict[str, Any]):
+        """Key that identifies duplicate materials within a vendor group"""
+
+
+class RawMaterialSpec(MaterialSpec):
+    """Raw material (RM) BOM explosion"""
+
+    kind = "RM"
+    bom_model = MedicineRawMaterial
+    material_model = RawMaterialMaster
+    material_attr = "raw_material"
+    items_key = "raw_materials"
+    total_key = "total_raw_materials"
+
+    def missing_bom_message(self, medicine: MedicineMaster) -> str:
+        return (
+            f"No Bill of Materials defined for medicine '{medicine.medicine_name}'. "
+            f"Please add raw material mappings in Medicine Master."
+        )
+
+    def missing_vendor_message(self, material: RawMaterialMaster, medicine: MedicineMaster) -> str:
+        return (
+            f"No vendor assigned for raw material '{material.rm_name}' "
+            f"in medicine '{medicine.medicine_name}'. "
+            f"Please assign a vendor in Medicine Master or Raw Material Master."
+        )
+
+    def build_row(self, bom_row: MedicineRawMaterial, material: RawMaterialMaster, vendor: Vendor,
+                  medicine: MedicineMaster, eopa_item: EOPAItem, total_qty: Decimal) -> Dict[str, Any]:
+        # HSN and GST (priority: medicine_rm > raw_material)
+        return {
+            "raw_material_id": material.id,
+            "raw_material_code": material.rm_code,
+            "raw_material_name": material.rm_name,
+            "vendor_id": vendor.id,
+            "vendor_name": vendor.vendor_name,
+            "vendor_code": vendor.vendor_code,
+            "vendor_type": vendor.vendor_type.value,
+            "qty_required": total_qty,
+            "uom": bom_row.uom,
+            "hsn_code": bom_row.hsn_code or material.hsn_code,
+            "gst_rate": bom_row.gst_rate or material.gst_rate,
+            "medicine_id": medicine.id,
+            "medicine_name": medicine.medicine_name,
+            "eopa_item_id": eopa_item.id,
+            "notes": bom_row.notes,
+            "is_critical": bom_row.is_critical
+        }
+
+    def consolidation_key(self, row: Dict[str, Any]):
+        # Use raw_material_id as consolidation key
+        return row["raw_material_id"]
+
+
+class PackingMaterialSpec(MaterialSpec):
+    """Packing material (PM) BOM explosion"""
+
+    kind = "PM"
+    bom_model = MedicinePackingMaterial
+    material_model = PackingMaterialMaster
+    material_attr = "packing_material"
+    items_key = "packing_materials"
+    total_key = "total_packing_materials"
+
+    def missing_bom_message(self, medicine: MedicineMaster) -> str:
+        return (
+            f"No Packing Material BOM defined for medicine '{medicine.medicine_name}'. "
+            f"Please add packing material mappings in Medicine Master."
+        )
+
+    def missing_vendor_message(self, material: PackingMaterialMaster, medicine: MedicineMaster) -> str:
+        return (
+            f"No vendor assigned for packing material '{material.pm_name}' "
+            f"in medicine '{medicine.medicine_name}'. "
+            f"Please assign a vendor in Medicine Master or Packing Material Master."
+        )
+
+    def build_row(self, bom_row: MedicinePackingMaterial, material: PackingMaterialMaster, vendor: Vendor,
+                  medicine: MedicineMaster, eopa_item: EOPAItem, total_qty: Decimal) -> Dict[str, Any]:
+        # HSN and GST (priority: medicine_pm > packing_material)
+        # Artwork and language (priority: medicine_pm override > packing_material default)
+        return {
+            "packing_material_id": material.id,
+            "packing_material_code": material.pm_code,
+            "packing_material_name": material.pm_name,
+            "pm_type": material.pm_type,
+            "language": bom_row.language_override or material.language,
+            "artwork_version": bom_row.artwork_version_override or material.artwork_version,
+            "gsm": material.gsm,
+            "ply": material.ply,
+            "dimensions": material.dimensions,
+            "vendor_id": vendor.id,
+            "vendor_name": vendor.vendor_name,
+            "vendor_code": vendor.vendor_code,
+            "vendor_type": vendor.vendor_type.value,
+            "qty_required": total_qty,
+            "uom": bom_row.uom,
+            "hsn_code": bom_row.hsn_code or material.hsn_code,
+            "gst_rate": bom_row.gst_rate or material.gst_rate,
+            "medicine_id": medicine.id,
+            "medicine_name": medicine.medicine_name,
+            "eopa_item_id": eopa_item.id,
+            "notes": bom_row.notes,
+            "is_critical": bom_row.is_critical
+        }
+
+    def consolidation_key(self, row: Dict[str, Any]):
+        # Use packing_material_id + language + artwork_version as consolidation key
+        return (row["packing_material_id"], row["language"], row["artwork_version"])
+
+
+MATERIAL_SPECS: Dict[str, MaterialSpec] = {
+    "RM": RawMaterialSpec(),
+    "PM": PackingMaterialSpec(),
+}
+
+
+class MaterialExplosionEngine:
+    """
+    Single-pass BOM explosion for one EOPA.
+
+    Key Responsibilities:
+    1. Load the EOPA item/medicine graph once
+    2. Preload BOM rows, materials and vendors per kind with one IN query
+    3. Calculate requirements with wastage for every requested kind
+    4. Group and consolidate requirements by vendor
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def load_eopa(self, eopa_id: int) -> EOPA:
+        """Load EOPA with items → PI items → medicines (shared by RM, PM and FG)"""
+        eopa = self.db.query(EOPA).options(
+            joinedload(EOPA.items).joinedload(EOPAItem.pi_item).joinedload(PIItem.medicine)
+        ).filter(EOPA.id == eopa_id).first()
+
+        if not eopa:
+            raise AppException(f"EOPA with ID {eopa_id} not found", "ERR_NOT_FOUND", 404)
+
+        return eopa
+
+    def explode(
+        self,
+        eopa_id: int,
+        kinds: Iterable[str] = ("RM", "PM"),
+        include_inactive: bool = False,
+        set_based: bool = True,
+        eopa: Optional[EOPA] = None,
+        use_cache: bool = True,
+        bom_by_kind: Optional[Dict[str, Dict[int, List]]] = None
+    ) -> Dict[str, Dict]:
+        """
+        Explode an EOPA into material requirements for each requested kind.
+
+        Args:
+            eopa_id: EOPA ID to explode
+            kinds: Material kinds to explode ("RM", "PM")
+            include_inactive: Include inactive materials (default False)
+            set_based: Preload BOMs with one IN query per kind (default True);
+                when False the BOM is queried once per EOPA item
+            eopa: Already-loaded EOPA (with items → pi_item → medicine) to reuse
+            use_cache: Serve/store results in the explosion cache (default True).
+                Only set-based explosions are cached.
+            bom_by_kind: BOM maps already loaded with load_bom_by_medicine, per kind
+                (e.g. shared by a batch of EOPAs). Kinds found here are not loaded
+                again, and their results are not stored in the cache since the
+                BOM may predate the version stamp.
+
+        Returns:
+            Dict mapping kind → explosion result
+            ({"eopa_id", "eopa_number", "total_vendors", "grouped_by_vendor"})
+        """
+        kinds = list(kinds)
+        results: Dict[str, Dict] = {}
+
+        # Unflushed changes in this session are invisible to the version stamp
+        use_cache = (
+            use_cache and set_based and explosion_cache.enabled
+            and not (self.db.new or self.db.dirty or self.db.deleted)
+        )
+
+        stamp = None
+        if use_cache:
+            stamp = bom_version_stamp(self.db, eopa_id)
+            for kind in kinds:
+                cached = explosion_cache.get((eopa_id, kind, include_inactive, stamp))
+                if cached is not None:
+                    results[kind] = cached
+
+            if len(results) == len(kinds):
+                logger.debug({"event": "EXPLOSION_CACHE_HIT", "eopa_id": eopa_id, "kinds": kinds})
+                return results
+
+        if eopa is None:
+            eopa = self.load_eopa(eopa_id)
+
+        medicine_ids = self.medicine_ids(eopa)
+
+        for kind in kinds:
+            if kind in results:
+                continue
+            spec = MATERIAL_SPECS[kind]
+            preloaded = bom_by_kind is not None and kind in bom_by_kind
+            if preloaded:
+                bom_by_medicine = bom_by_kind[kind]
+            else:
+                bom_by_medicine = self.load_bom_by_medicine(spec, medicine_ids) if set_based else None
+            results[kind] = self._explode_kind(spec, eopa, bom_by_medicine, include_inactive)
+
+            if use_cache and not preloaded:
+                explosion_cache.put((eopa_id, kind, include_inactive, stamp), results[kind])
+
+        return {kind: results[kind] for kind in kinds}
+
+    @staticmethod
+    def medicine_ids(eopa: EOPA) -> Set[int]:
+        """Distinct medicine IDs referenced by the EOPA items"""
+        return {
+            eopa_item.pi_item.medicine.id
+            for eopa_item in eopa.items
+            if eopa_item.pi_item.medicine
+        }
+
+    def _bom_query(self, spec: MaterialSpec):
+        """Active BOM rows of a kind with material and vendors eager-loaded"""
+        return self.db.query(spec.bom_model).options(
+            *spec.bom_options()
+        ).filter(
+            spec.bom_model.is_active == True
+        ).order_by(spec.bom_model.id)
+
+    def load_bom_by_medicine(self, spec: MaterialSpec, medicine_ids: Set[int]) -> Dict[int, List]:
+        """
+        Load the active BOM of several medicines in one round trip.
+
+        Args:
+            spec: Material kind to load
+            medicine_ids: Medicine IDs referenced by the EOPA
+
+        Returns:
+            Dict mapping medicine_id → BOM rows (in BOM row order)
+        """
+        bom_by_medicine: Dict[int, List] = defaultdict(list)
+        if not medicine_ids:
+            return bom_by_medicine
+
+        bom_rows = self._bom_query(spec).filter(
+            spec.bom_model.medicine_id.in_(medicine_ids)
+        ).all()
+
+        for bom_row in bom_rows:
+            bom_by_medicine[bom_row.medicine_id].append(bom_row)
+
+        return bom_by_medicine
+
+    def _explode_kind(
+        self,
+        spec: MaterialSpec,
+        eopa: EOPA,
+        bom_by_medicine: Optional[Dict[int, List]],
+        include_inactive: bool
+    ) -> Dict:
+        """Explode every EOPA item for one material kind and group the result by vendor"""
+        logger.info({
+            "event": f"{spec.kind}_EXPLOSION_STARTED",
+            "eopa_id": eopa.id,
+            "eopa_number": eopa.eopa_number,
+            "total_eopa_items": len(eopa.items)
+        })
+
+        requirements = []
+        for eopa_item in eopa.items:
+            requirements.extend(
+                self.explode_item(spec, eopa_item, bom_by_medicine, include_inactive)
+            )
+
+        grouped_by_vendor = self.group_by_vendor(spec, requirements)
+
+        logger.info({
+            "event": f"{spec.kind}_EXPLOSION_COMPLETED",
+            "eopa_id": eopa.id,
+            spec.total_key: len(requirements),
+            "total_vendors": len(grouped_by_vendor)
+        })
+
+        return {
+            "eopa_id": eopa.id,
+            "eopa_number": eopa.eopa_number,
+            "total_vendors": len(grouped_by_vendor),
+            "grouped_by_vendor": grouped_by_vendor
+        }
+
+    def explode_item(
+        self,
+        spec: MaterialSpec,
+        eopa_item: EOPAItem,
+        bom_by_medicine: Optional[Dict[int, List]],
+        include_inactive: bool = False,
+        quantity: Optional[Decimal] = None
+    ) -> List[Dict]:
+        """
+        Explode a single EOPA item into material requirement rows.
+
+        Args:
+            spec: Material kind
+            eopa_item: EOPA item (with pi_item → medicine loaded)
+            bom_by_medicine: Preloaded BOM map, or None to query this medicine's BOM
+            include_inactive: Include inactive materials
+            quantity: Quantity to explode (defaults to the EOPA item quantity)
+
+        Returns:
+            List of requirement rows (not consolidated)
+        """
+        pi_item = eopa_item.pi_item
+        medicine = pi_item.medicine
+
+        if not medicine:
+            logger.warning({
+                "event": f"{spec.kind}_EXPLOSION_SKIPPED_NO_MEDICINE",
+                "eopa_item_id": eopa_item.id,
+                "pi_item_id": pi_item.id
+            })
+            return []
+
+        # Get medicine BOM
+        if bom_by_medicine is not None:
+            bom_rows = bom_by_medicine.get(medicine.id, [])
+        else:
+            bom_rows = self._bom_query(spec).filter(
+                spec.bom_model.medicine_id == medicine.id
+            ).all()
+
+        if not bom_rows:
+            logger.warning({
+                "event": f"{spec.kind}_EXPLOSION_NO_BOM",
+                "medicine_id": medicine.id,
+                "medicine_name": medicine.medicine_name,
+                "eopa_item_id": eopa_item.id
+            })
+            # Don't skip - raise error to ensure BOM is defined
+            raise AppException(spec.missing_bom_message(medicine), "ERR_BOM_NOT_DEFINED", 400)
+
+        if quantity is None:
+            quantity = Decimal(str(eopa_item.quantity))
+
+        rows = []
+        for bom_row in bom_rows:
+            material = getattr(bom_row, spec.material_attr)
+            if not include_inactive and not material.is_active:
+                continue
+
+            # Determine vendor (priority: BOM row vendor > material default vendor)
+            vendor = bom_row.vendor or material.default_vendor
+
+            if not vendor:
+                raise AppException(
+                    spec.missing_vendor_message(material, medicine),
+                    "ERR_VENDOR_NOT_MAPPED",
+                    400
+                )
+
+            # Formula: (EOPA quantity) × (qty_required_per_unit) × (1 + wastage_percentage/100)
+            rows.append(spec.build_row(
+                bom_row, material, vendor, medicine, eopa_item,
+                self.required_quantity(quantity, bom_row)
+            ))
+
+        return rows
+
+    @staticmethod
+    def required_quantity(quantity: Decimal, bom_row) -> Decimal:
+        """Material quantity for `quantity` units of medicine, including wastage"""
+        base_qty = quantity * bom_row.qty_required_per_unit
+        wastage_multiplier = Decimal("1") + (bom_row.wastage_percentage / Decimal("100"))
+        return base_qty * wastage_multiplier
+
+    def group_by_vendor(
+        self,
+        spec: MaterialSpec,
+        requirements: List[Dict],
+        key: Optional[Callable[[Dict[str, Any]], Hashable]] = None
+    ) -> List[Dict]:
+        """
+        Group material requirements by vendor.
+
+        Consolidates duplicate materials from the same vendor (per spec.consolidation_key)
+        by summing quantities. Rows may come from one EOPA or from several.
+
+        Args:
+            spec: Material kind
+            requirements: List of material requirement rows
+            key: Consolidation key of a row within its vendor group
+                (default spec.consolidation_key)
+
+        Returns:
+            List of vendor groups with consolidated materials, sorted by vendor name
+        """
+        vendor_groups = defaultdict(list)
+
+        # First pass: group by vendor
+        for row in requirements:
+            vendor_groups[row["vendor_id"]].append(row)
+
+        # Second pass: consolidate duplicates within each vendor
+        result = []
+        for vendor_id, rows in vendor_groups.items():
+            consolidated = {}
+            vendor_info = None
+
+            for row in rows:
+                if vendor_info is None:
+                    vendor_info = {
+                        "vendor_id": row["vendor_id"],
+                        "vendor_name": row["vendor_name"],
+                        "vendor_code": row["vendor_code"],
+                        "vendor_type": row["vendor_type"]
+                    }
+
+                row_key = (key or spec.consolidation_key)(row)
+
+                if row_key in consolidated:
+                    # Sum quantities for duplicate materials
+                    consolidated[row_key]["qty_required"] += row["qty_required"]
+                    # Append notes if different
+                    if row["notes"] and row["notes"] not in (consolidated[row_key]["notes"] or ""):
+                        existing_notes = consolidated[row_key]["notes"] or ""
+                        consolidated[row_key]["notes"] = f"{existing_notes}; {row['notes']}" if existing_notes else row["notes"]
+                else:
+                    consolidated[row_key] = dict(row)
+
+            result.append({
+                **vendor_info,
+                "total_items": len(consolidated),
+                spec.items_key: list(consolidated.values())
+            })
+
+        # Sort by vendor name
+        result.sort(key=lambda x: x["vendor_name"])
+
+        return result
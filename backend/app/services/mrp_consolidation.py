@@ -0,0 +1,332 @@
+"""
+MRP Consolidation - RM/PM demand of many EOPAs netted into one draft PO per vendor
+
+Per-EOPA generation (/generate-rm-pos, /generate-pm-pos) creates one PO per
+vendor and EOPA, so ten EOPAs needing the same API from the same vendor give
+ten small POs. A consolidation run instead:
+
+1. Loads all EOPAs (items → PI items → medicines) with one query and the BOM of
+   every medicine in the run with one IN query per kind
+2. Explodes every EOPA item with MaterialExplosionEngine.explode_item
+3. Aggregates the requirements of all EOPAs by (vendor, material, UoM) with
+   MaterialExplosionEngine.group_by_vendor
+4. Nets the gross requirement against supply already on order or in stock:
+   - open PO quantity: ordered - fulfilled on RM/PM PO items of the vendor in
+     the same unit, for POs that are not CLOSED or CANCELLED. DRAFT POs count
+     too, so a run after per-EOPA generation never orders twice (delete those
+     drafts first to have them replaced by consolidated POs)
+   - material balance: received beyond ordered in the material_balance ledger
+     of the vendor (a negative balance_qty sum is stock on hand; a positive one
+     is still outstanding and already counted as open PO quantity)
+5. Writes one DRAFT PO per vendor for the net quantities (bulk insert)
+
+A PO belongs to a single EOPA, so each consolidated PO is attached to the
+lowest EOPA ID it covers and lists every covered EOPA in its remarks. The
+covered EOPAs are recorded in po_consolidated_eopas: per-EOPA generation of a
+covered EOPA skips (generate-from-eopa) or rejects (generate-rm-pos /
+generate-pm-pos) the RM/PM demand that is already on a live consolidated PO.
+"""
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session, joinedload
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from app.exceptions.base import AppException
+from app.models.eopa import EOPA, EOPAItem, EOPAStatus
+from app.models.material_balance import MaterialBalance
+from app.models.pi import PIItem
+from app.models.po import PurchaseOrder, POItem, POType, POStatus, POConsolidatedEOPA
+from app.schemas.configuration import ConfigSnapshot
+from app.services.material_explosion_engine import MATERIAL_SPECS, MaterialExplosionEngine
+from app.services.po_service import PO_ITEM_MATERIAL_COLUMN, POGenerationService, insert_purchase_orders
+from app.utils.number_generator import reserve_po_numbers
+
+logger = logging.getLogger("pharma")
+
+# Largest eopa_ids list accepted by POST /api/po/consolidate
+MAX_CONSOLIDATION_EOPAS = 100
+
+# PO statuses whose outstanding quantity counts as supply
+OPEN_PO_STATUSES = (
+    POStatus.DRAFT,
+    POStatus.PENDING_APPROVAL,
+    POStatus.APPROVED,
+    POStatus.READY,
+    POStatus.SENT,
+    POStatus.ACKNOWLEDGED,
+    POStatus.PARTIAL,
+)
+
+_MATERIAL_KEYS = {"RM": "raw_material_id", "PM": "packing_material_id"}
+_ITEM_VALUES = {"RM": POGenerationService._rm_item_values, "PM": POGenerationService._pm_item_values}
+
+
+class MRPConsolidationService:
+    """Explode, aggregate and net the RM/PM demand of many approved EOPAs"""
+
+    def __init__(self, db: Session, config: Optional[ConfigSnapshot] = None):
+        self.db = db
+        self.config = config
+        self.engine = MaterialExplosionEngine(db)
+
+    def plan(self, eopa_ids: List[int], kinds: Iterable[str] = ("RM", "PM")) -> Dict:
+        """
+        Consolidated, netted requirements of the EOPAs (nothing is written).
+
+        Returns:
+            Dict with eopa_ids, eopa_numbers and per kind the vendor groups:
+            {"RM": [{"vendor_id", "vendor_name", ..., "raw_materials": [row, ...]}], "PM": [...]}
+            Each row carries gross_qty, open_po_qty and material_balance_qty (the
+            supply netted off), qty_required (net) and source_eopas
+            ([{"eopa_id", "qty_required"}]). Fully covered rows and vendors are left out.
+        """
+        kinds = self._validate_kinds(kinds)
+        eopas = self._load_eopas(eopa_ids)
+        medicine_ids = set().union(*(self.engine.medicine_ids(eopa) for eopa in eopas))
+
+        result: Dict[str, Any] = {
+            "eopa_ids": [eopa.id for eopa in eopas],
+            "eopa_numbers": {eopa.id: eopa.eopa_number for eopa in eopas},
+        }
+        for kind in kinds:
+            spec = MATERIAL_SPECS[kind]
+            bom_by_medicine = self.engine.load_bom_by_medicine(spec, medicine_ids)
+
+            # Explode every EOPA item against the shared BOM
+            requirements = []
+            for eopa in eopas:
+                for eopa_item in eopa.items:
+                    for row in self.engine.explode_item(spec, eopa_item, bom_by_medicine):
+                        row["eopa_id"] = eopa.id
+                        requirements.append(row)
+
+            result[kind] = self._net(kind, self._aggregate(spec, requirements))
+
+        logger.info({
+            "event": "MRP_CONSOLIDATION_PLANNED",
+            "eopa_ids": result["eopa_ids"],
+            **{f"{kind.lower()}_vendors": len(result[kind]) for kind in kinds}
+        })
+        return result
+
+    def consolidate(
+        self,
+        eopa_ids: List[int],
+        current_user_id: int,
+        kinds: Iterable[str] = ("RM", "PM")
+    ) -> Dict:
+        """
+        Plan the run and write one DRAFT PO per vendor and kind for the net quantities.
+
+        Returns:
+            The plan plus purchase_orders: one summary per PO written
+            (po_number, po_type, vendor_id, eopa_id, source_eopa_ids,
+            total_ordered_qty, items_count)
+        """
+        kinds = self._validate_kinds(kinds)
+        plan = self.plan(eopa_ids, kinds)
+
+        groups = [(kind, group) for kind in kinds for group in plan[kind]]
+        po_numbers = iter(reserve_po_numbers(
+            self.db, [(kind, None) for kind, _ in groups], config=self.config
+        ))
+
+        headers = []
+        header_items = []
+        summaries = []
+        for kind, group in groups:
+            spec = MATERIAL_SPECS[kind]
+            rows = group[spec.items_key]
+            source_eopa_ids = sorted({
+                source["eopa_id"] for row in rows for source in row["source_eopas"]
+            })
+            items = [{**_ITEM_VALUES[kind](row), "fulfilled_quantity": Decimal("0")} for row in rows]
+            total_ordered_qty = sum((item["ordered_quantity"] for item in items), Decimal("0"))
+
+            headers.append({
+                "po_number": next(po_numbers),
+                "po_date": date.today(),
+                "po_type": POType(kind),
+                "eopa_id": source_eopa_ids[0],
+                "vendor_id": group["vendor_id"],
+                "status": POStatus.DRAFT,
+                "total_ordered_qty": total_ordered_qty,
+                "total_fulfilled_qty": Decimal("0.00"),
+                "remarks": "Consolidated demand of EOPA " + ", ".join(
+                    plan["eopa_numbers"][eopa_id] for eopa_id in source_eopa_ids
+                ),
+                "created_by": current_user_id
+            })
+            header_items.append(items)
+            summaries.append({
+                "po_number": headers[-1]["po_number"],
+                "po_type": kind,
+                "vendor_id": group["vendor_id"],
+                "eopa_id": source_eopa_ids[0],
+                "source_eopa_ids": source_eopa_ids,
+                "total_ordered_qty": float(total_ordered_qty),
+                "items_count": len(items)
+            })
+
+        try:
+            po_ids = insert_purchase_orders(self.db, headers, header_items)
+            coverage = [
+                {"po_id": po_id, "eopa_id": eopa_id}
+                for po_id, summary in zip(po_ids, summaries)
+                for eopa_id in summary["source_eopa_ids"]
+            ]
+            if coverage:
+                self.db.execute(insert(POConsolidatedEOPA), coverage)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error({
+                "event": "MRP_CONSOLIDATION_FAILED",
+                "eopa_ids": plan["eopa_ids"],
+                "error": str(e)
+            })
+            raise AppException(
+                f"Failed to write consolidated POs: {str(e)}",
+                "ERR_PO_GENERATION",
+                500
+            )
+
+        logger.info({
+            "event": "MRP_CONSOLIDATION_COMPLETED",
+            "eopa_ids": plan["eopa_ids"],
+            "po_numbers": [summary["po_number"] for summary in summaries],
+            "created_by": current_user_id
+        })
+        return {**plan, "total_pos_created": len(summaries), "purchase_orders": summaries}
+
+    @staticmethod
+    def _validate_kinds(kinds: Iterable[str]) -> List[str]:
+        kinds = list(dict.fromkeys(kinds))
+        invalid = [kind for kind in kinds if kind not in _MATERIAL_KEYS]
+        if not kinds or invalid:
+            raise AppException("kinds must be a non-empty subset of: RM, PM", "ERR_VALIDATION", 400)
+        return kinds
+
+    def _load_eopas(self, eopa_ids: List[int]) -> List[EOPA]:
+        """All EOPAs of the run with items → PI items → medicines, in one query; all must be APPROVED"""
+        eopa_ids = list(dict.fromkeys(eopa_ids))
+        if not eopa_ids:
+            raise AppException("eopa_ids must not be empty", "ERR_VALIDATION", 400)
+        if len(eopa_ids) > MAX_CONSOLIDATION_EOPAS:
+            raise AppException(
+                f"At most {MAX_CONSOLIDATION_EOPAS} EOPAs can be consolidated at once",
+                "ERR_VALIDATION",
+                400
+            )
+
+        eopas = self.db.query(EOPA).options(
+            joinedload(EOPA.items).joinedload(EOPAItem.pi_item).joinedload(PIItem.medicine)
+        ).filter(EOPA.id.in_(eopa_ids)).order_by(EOPA.id).all()
+
+        missing = sorted(set(eopa_ids) - {eopa.id for eopa in eopas})
+        if missing:
+            raise AppException(f"EOPA(s) not found: {missing}", "ERR_NOT_FOUND", 404)
+
+        not_approved = [eopa.eopa_number for eopa in eopas if eopa.status != EOPAStatus.APPROVED]
+        if not_approved:
+            raise AppException(
+                f"EOPAs must be approved before generating POs: {', '.join(not_approved)}",
+                "ERR_VALIDATION",
+                400
+            )
+        return eopas
+
+    def _aggregate(self, spec, requirements: List[Dict]) -> List[Dict]:
+        """Requirements of all EOPAs grouped by vendor and consolidated by (material, UoM), with sources"""
+        def row_key(row):
+            return (spec.consolidation_key(row), row["uom"])
+
+        sources: Dict[Tuple, Dict[int, Decimal]] = defaultdict(lambda: defaultdict(Decimal))
+        for row in requirements:
+            sources[(row["vendor_id"], row_key(row))][row["eopa_id"]] += row["qty_required"]
+
+        groups = self.engine.group_by_vendor(spec, requirements, key=row_key)
+        for group in groups:
+            for row in group[spec.items_key]:
+                row.pop("eopa_id", None)
+                row.pop("eopa_item_id", None)
+                row["source_eopas"] = [
+                    {"eopa_id": eopa_id, "qty_required": qty}
+                    for eopa_id, qty in sorted(sources[(group["vendor_id"], row_key(row))].items())
+                ]
+        return groups
+
+    def _net(self, kind: str, groups: List[Dict]) -> List[Dict]:
+        """Subtract open PO quantities and material balance surplus from the gross requirements"""
+        spec = MATERIAL_SPECS[kind]
+        material_key = _MATERIAL_KEYS[kind]
+        vendor_ids = {group["vendor_id"] for group in groups}
+        material_ids = {row[material_key] for group in groups for row in group[spec.items_key]}
+        open_po_qty, balance_qty = self._supply(kind, vendor_ids, material_ids)
+
+        netted = []
+        for group in groups:
+            rows = []
+            for row in group[spec.items_key]:
+                gross = row["qty_required"]
+                supply_key = (group["vendor_id"], row[material_key])
+
+                # Supply is used up row by row (e.g. PM rows of one material in several languages)
+                from_open_pos = min(gross, open_po_qty.get((*supply_key, row["uom"]), Decimal("0")))
+                if from_open_pos:
+                    open_po_qty[(*supply_key, row["uom"])] -= from_open_pos
+                from_balance = min(gross - from_open_pos, balance_qty.get(supply_key, Decimal("0")))
+                if from_balance:
+                    balance_qty[supply_key] -= from_balance
+
+                row.update(
+                    gross_qty=gross,
+                    open_po_qty=from_open_pos,
+                    material_balance_qty=from_balance,
+                    qty_required=gross - from_open_pos - from_balance
+                )
+                if row["qty_required"] > 0:
+                    rows.append(row)
+
+            if rows:
+                netted.append({**group, "total_items": len(rows), spec.items_key: rows})
+        return netted
+
+    def _supply(self, kind: str, vendor_ids, material_ids) -> Tuple[Dict[Tuple, Decimal], Dict[Tuple, Decimal]]:
+        """
+        Open PO quantity by (vendor, material, unit) and material balance surplus
+        by (vendor, material), one aggregate query each.
+        """
+        if not vendor_ids or not material_ids:
+            return {}, {}
+
+        po_material = getattr(POItem, PO_ITEM_MATERIAL_COLUMN[POType(kind)])
+        outstanding = POItem.ordered_quantity - func.coalesce(POItem.fulfilled_quantity, 0)
+        open_po_qty = {
+            (vendor_id, material_id, unit): Decimal(str(quantity))
+            for vendor_id, material_id, unit, quantity in self.db.query(
+                PurchaseOrder.vendor_id, po_material, POItem.unit, func.sum(outstanding)
+            ).join(POItem, POItem.po_id == PurchaseOrder.id).filter(
+                PurchaseOrder.po_type == POType(kind),
+                PurchaseOrder.status.in_(OPEN_PO_STATUSES),
+                PurchaseOrder.vendor_id.in_(vendor_ids),
+                po_material.in_(material_ids),
+                outstanding > 0
+            ).group_by(PurchaseOrder.vendor_id, po_material, POItem.unit).all()
+        }
+
+        balance_material = getattr(MaterialBalance, _MATERIAL_KEYS[kind])
+        balance_qty = {
+            (vendor_id, material_id): -Decimal(str(balance))
+            for vendor_id, material_id, balance in self.db.query(
+                MaterialBalance.vendor_id, balance_material, func.sum(MaterialBalance.balance_qty)
+            ).filter(
+                MaterialBalance.vendor_id.in_(vendor_ids),
+                balance_material.in_(material_ids)
+            ).group_by(MaterialBalance.vendor_id, balance_material).all()
+            if balance is not None and balance < 0
+        }
+        return open_po_qty, balance_qty
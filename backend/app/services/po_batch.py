@@ -0,0 +1,323 @@
+"""
+Batch PO Generation - FG/RM/PM POs for many approved EOPAs in one job
+
+POST /api/po/generate-batch starts a job and returns its ID straight away;
+GET /api/po/generate-batch/{job_id} reports per-EOPA progress and results.
+
+Each EOPA runs POGenerationService.generate_pos_from_eopa (the same FG → RM → PM
+flow as /generate-from-eopa/{id}) on a worker of a bounded thread pool, in its
+own session and transaction: the commits inside generation become savepoints,
+so an EOPA's POs are written all or nothing and one failing EOPA does not
+affect the others.
+
+PO numbers are reserved in short transactions of their own (sequence_bind), not
+in the EOPA's transaction: every EOPA numbers its first FG PO from the same
+counter row, and holding that row lock until the EOPA commits would make the
+workers (and concurrent /consolidate or bulk transitions) wait for each other.
+The numbers of an EOPA that fails and rolls back are not reused, so batch
+generation can leave gaps in PO numbering.
+
+The RM/PM BOM of every medicine in the batch is loaded once, before the first
+EOPA runs, and shared read-only by all workers; the configuration snapshot of
+the starting request is shared as well.
+
+Jobs live in memory in the worker process that started them (like the slow
+query log), so progress must be polled from the same process; the oldest
+finished jobs are dropped after PO_BATCH_JOB_HISTORY jobs.
+"""
+from sqlalchemy import select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Union
+import enum
+import logging
+import threading
+import uuid
+
+from app.config import settings
+from app.exceptions.base import AppException
+from app.models.eopa import EOPAItem
+from app.models.pi import PIItem
+from app.schemas.configuration import ConfigSnapshot
+from app.services.material_explosion_engine import MATERIAL_SPECS, MaterialExplosionEngine
+from app.services.po_service import POGenerationService
+
+logger = logging.getLogger("pharma")
+
+# Largest eopa_ids list accepted by POST /api/po/generate-batch
+MAX_BATCH_EOPAS = 100
+
+
+class BatchStatus(str, enum.Enum):
+    PENDING = "PENDING"        # Queued, not started
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"    # EOPA only: POs generated and committed
+    FAILED = "FAILED"          # EOPA: rolled back; job: could not run at all
+    COMPLETED = "COMPLETED"    # Job only: every EOPA finished (some may have failed)
+
+
+class POBatchJob:
+    """Progress and per-EOPA results of one batch; updated by the pool workers"""
+
+    def __init__(self, eopa_ids: List[int], created_by: int):
+        self.job_id = uuid.uuid4().hex
+        self.created_by = created_by
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.status = BatchStatus.PENDING
+        self.error: Optional[str] = None
+        self.eopas: Dict[int, Dict[str, Any]] = {
+            eopa_id: {"eopa_id": eopa_id, "status": BatchStatus.PENDING, "result": None,
+                      "error": None, "error_code": None}
+            for eopa_id in eopa_ids
+        }
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (BatchStatus.COMPLETED, BatchStatus.FAILED)
+
+    def update_eopa(self, eopa_id: int, **values) -> None:
+        with self._lock:
+            self.eopas[eopa_id].update(values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Response payload: job summary with one entry per EOPA, in request order"""
+        with self._lock:
+            eopas = [{**entry, "status": entry["status"].value} for entry in self.eopas.values()]
+            status, error = self.status, self.error
+            started_at, finished_at = self.started_at, self.finished_at
+
+        counts = {state: 0 for state in BatchStatus}
+        for entry in eopas:
+            counts[BatchStatus(entry["status"])] += 1
+
+        return {
+            "job_id": self.job_id,
+            "status": status.value,
+            "error": error,
+            "total": len(eopas),
+            "completed": counts[BatchStatus.SUCCEEDED] + counts[BatchStatus.FAILED],
+            "succeeded": counts[BatchStatus.SUCCEEDED],
+            "failed": counts[BatchStatus.FAILED],
+            "total_pos_created": sum(
+                entry["result"]["total_pos_created"] for entry in eopas if entry["result"]
+            ),
+            "created_by": self.created_by,
+            "created_at": self.created_at.isoformat() + "Z",
+            "started_at": started_at.isoformat() + "Z" if started_at else None,
+            "finished_at": finished_at.isoformat() + "Z" if finished_at else None,
+            "eopas": eopas
+        }
+
+
+class POBatchJobStore:
+    """Thread-safe registry of batch jobs; drops the oldest finished jobs beyond max_jobs"""
+
+    def __init__(self, max_jobs: int = 100):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, POBatchJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, job: POBatchJob) -> None:
+        with self._lock:
+            self._jobs[job.job_id] = job
+            for job_id in [job_id for job_id, stored in self._jobs.items() if stored.finished]:
+                if len(self._jobs) <= self.max_jobs:
+                    break
+                del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[POBatchJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._jobs.clear()
+
+
+po_batch_jobs = POBatchJobStore(max_jobs=settings.PO_BATCH_JOB_HISTORY)
+
+# One runner thread per job fans EOPAs out to the worker pool; each worker holds
+# one DB connection while it generates
+_job_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="po-batch-job")
+_eopa_executor = ThreadPoolExecutor(max_workers=settings.PO_BATCH_WORKERS, thread_name_prefix="po-batch")
+
+
+def start_po_batch(
+    bind: Union[Engine, Connection],
+    eopa_ids: List[int],
+    current_user_id: int,
+    config: Optional[ConfigSnapshot] = None
+) -> POBatchJob:
+    """
+    Register a batch job and start it in the background.
+
+    Args:
+        bind: Engine the workers open their connections from (the request
+            session's bind). A single Connection (e.g. a session inside an outer
+            transaction) cannot be shared between threads, so its EOPAs run one
+            after another in the job's runner thread.
+        eopa_ids: Approved EOPAs to generate POs for (duplicates are ignored)
+        current_user_id: User creating the POs
+        config: Configuration snapshot of the request, shared by all EOPAs
+
+    Returns:
+        The job (PENDING or already RUNNING)
+    """
+    job = POBatchJob(list(dict.fromkeys(eopa_ids)), current_user_id)
+    po_batch_jobs.add(job)
+    _job_executor.submit(run_po_batch, job, bind, config)
+
+    logger.info({
+        "event": "PO_BATCH_STARTED",
+        "job_id": job.job_id,
+        "eopa_ids": list(job.eopas),
+        "created_by": current_user_id
+    })
+    return job
+
+
+def run_po_batch(job: POBatchJob, bind: Union[Engine, Connection], config: Optional[ConfigSnapshot] = None) -> POBatchJob:
+    """Preload the batch's BOM, generate every EOPA and mark the job COMPLETED (blocks until done)"""
+    job.status = BatchStatus.RUNNING
+    job.started_at = datetime.utcnow()
+
+    try:
+        bom_by_kind = preload_batch_boms(bind, list(job.eopas))
+
+        if isinstance(bind, Engine):
+            futures = [
+                _eopa_executor.submit(_generate_eopa, job, bind, eopa_id, config, bom_by_kind)
+                for eopa_id in job.eopas
+            ]
+            for future in futures:
+                future.result()
+        else:
+            for eopa_id in job.eopas:
+                _generate_eopa(job, bind, eopa_id, config, bom_by_kind)
+
+        job.status = BatchStatus.COMPLETED
+    except Exception as e:
+        job.status = BatchStatus.FAILED
+        job.error = str(e)
+        logger.error({
+            "event": "PO_BATCH_FAILED",
+            "job_id": job.job_id,
+            "error": str(e)
+        })
+    finally:
+        job.finished_at = datetime.utcnow()
+
+    summary = job.to_dict()
+    logger.info({
+        "event": "PO_BATCH_FINISHED",
+        "job_id": job.job_id,
+        "status": summary["status"],
+        "succeeded": summary["succeeded"],
+        "failed": summary["failed"],
+        "total_pos_created": summary["total_pos_created"],
+        "duration_ms": round((job.finished_at - job.started_at).total_seconds() * 1000, 2)
+    })
+    return job
+
+
+def preload_batch_boms(bind: Union[Engine, Connection], eopa_ids: List[int]) -> Dict[str, Dict[int, List]]:
+    """
+    Load the RM and PM BOM of every medicine in the batch (one IN query per kind).
+
+    The session is closed before returning; the BOM rows keep their eager-loaded
+    material and vendors and are only read by the workers.
+    """
+    with Session(bind=bind, autoflush=False) as db:
+        medicine_ids = set(db.execute(
+            select(PIItem.medicine_id)
+            .join(EOPAItem, EOPAItem.pi_item_id == PIItem.id)
+            .where(EOPAItem.eopa_id.in_(eopa_ids), PIItem.medicine_id.is_not(None))
+            .distinct()
+        ).scalars())
+
+        engine = MaterialExplosionEngine(db)
+        return {
+            kind: engine.load_bom_by_medicine(spec, medicine_ids)
+            for kind, spec in MATERIAL_SPECS.items()
+        }
+
+
+@contextmanager
+def eopa_transaction(bind: Union[Engine, Connection]) -> Iterator[Session]:
+    """
+    Session for one EOPA whose commits are savepoints of a single transaction.
+
+    The transaction commits when the block succeeds and rolls back otherwise.
+    On a Connection that is already in a transaction a SAVEPOINT is used instead.
+    """
+    connection = bind.connect() if isinstance(bind, Engine) else bind
+    transaction = connection.begin_nested() if connection.in_transaction() else connection.begin()
+    db = Session(bind=connection, autoflush=False, join_transaction_mode="create_savepoint")
+    try:
+        try:
+            yield db
+        finally:
+            # Ends the savepoint the session may have begun after its last commit
+            db.close()
+        transaction.commit()
+    except Exception:
+        if transaction.is_active:
+            transaction.rollback()
+        raise
+    finally:
+        if connection is not bind:
+            connection.close()
+
+
+def _generate_eopa(
+    job: POBatchJob,
+    bind: Union[Engine, Connection],
+    eopa_id: int,
+    config: Optional[ConfigSnapshot],
+    bom_by_kind: Dict[str, Dict[int, List]]
+) -> None:
+    """Generate one EOPA's POs in its own transaction and record the outcome on the job"""
+    job.update_eopa(eopa_id, status=BatchStatus.RUNNING)
+
+    try:
+        with eopa_transaction(bind) as db:
+            # A shared Connection has a single transaction; numbers join it there
+            sequence_bind = bind if isinstance(bind, Engine) else None
+            result = POGenerationService(db, config, sequence_bind=sequence_bind).generate_pos_from_eopa(
+                eopa_id, job.created_by, bom_by_kind=bom_by_kind
+            )
+    except AppException as e:
+        job.update_eopa(eopa_id, status=BatchStatus.FAILED, error=e.message, error_code=e.error_code)
+        logger.warning({
+            "event": "PO_BATCH_EOPA_FAILED",
+            "job_id": job.job_id,
+            "eopa_id": eopa_id,
+            "error": e.message
+        })
+        return
+    except Exception as e:
+        job.update_eopa(eopa_id, status=BatchStatus.FAILED, error="Failed to generate Purchase Orders",
+                        error_code="ERR_PO_GENERATION")
+        logger.error({
+            "event": "PO_BATCH_EOPA_FAILED",
+            "job_id": job.job_id,
+            "eopa_id": eopa_id,
+            "error": str(e)
+        })
+        return
+
+    job.update_eopa(eopa_id, status=BatchStatus.SUCCEEDED, result={
+        "eopa_number": result["eopa_number"],
+        "total_pos_created": result["total_pos_created"],
+        "fg_pos_created": result["fg_pos_created"],
+        "rm_pos_created": result["rm_pos_created"],
+        "pm_pos_created": result["pm_pos_created"],
+        "purchase_orders": result["purchase_orders"]
+    })
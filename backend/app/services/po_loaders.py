@@ -0,0 +1,71 @@
+"""
+PO Loader Profiles - eager-loading strategies per use of a Purchase Order
+
+Many-to-one relationships (vendor, EOPA, users, an item's material) are joined:
+each adds columns, not rows. Collections (items, terms) are loaded with
+selectinload, one extra SELECT ... WHERE po_id IN (...) each, instead of being
+joined: joining items and terms to the PO multiplies the result to
+items × terms rows, every one repeating the PO and vendor columns.
+
+Profiles:
+- summary: header with vendor, EOPA and ship-to manufacturer; items load lazily
+- detail:  POResponse (GET /api/po/{po_id}, list and update responses)
+- pdf:     POPDFService (items, approval users, terms)
+- email:   EmailService (body uses items; the attachment is the PDF)
+
+Benchmark: scripts/benchmark_po_loaders.py
+"""
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import Dict, List
+
+from app.models.po import PurchaseOrder, POItem
+from app.exceptions.base import AppException
+
+
+_ITEMS_WITH_MATERIALS = selectinload(PurchaseOrder.items).options(
+    joinedload(POItem.medicine),
+    joinedload(POItem.raw_material),
+    joinedload(POItem.packing_material)
+)
+
+_SUMMARY = [
+    joinedload(PurchaseOrder.vendor),
+    joinedload(PurchaseOrder.eopa),
+    joinedload(PurchaseOrder.ship_to_manufacturer)
+]
+
+_PDF = [
+    joinedload(PurchaseOrder.vendor),
+    _ITEMS_WITH_MATERIALS,
+    joinedload(PurchaseOrder.preparer),
+    joinedload(PurchaseOrder.checker),
+    joinedload(PurchaseOrder.approver),
+    joinedload(PurchaseOrder.verifier),
+    selectinload(PurchaseOrder.terms_conditions)
+]
+
+PO_LOADER_PROFILES: Dict[str, List] = {
+    "summary": _SUMMARY,
+    "detail": [*_SUMMARY, _ITEMS_WITH_MATERIALS],
+    "pdf": _PDF,
+    "email": _PDF,
+}
+
+
+def po_loader_options(profile: str) -> List:
+    """Loader options of a profile, for session.query(PurchaseOrder).options(...)"""
+    try:
+        return PO_LOADER_PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown PO loader profile: {profile}")
+
+
+def load_po(db: Session, po_id: int, profile: str = "detail") -> PurchaseOrder:
+    """Purchase Order with the relationships of `profile` loaded; 404 if missing"""
+    po = db.query(PurchaseOrder).options(
+        *po_loader_options(profile)
+    ).filter(PurchaseOrder.id == po_id).first()
+
+    if not po:
+        raise AppException("Purchase Order not found", "ERR_NOT_FOUND", 404)
+    return po
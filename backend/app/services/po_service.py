@@ -5,20 +5,25 @@ CRITICAL BUSINESS RULES:
 1. POs contain ONLY quantities, NO pricing
 2. Pricing comes from vendor invoices after shipment
 """
-from sqlalchemy.orm import Session, joinedload
-from datetime import date
-from decimal import Decimal
-from typing import List, Dict, Tuple, Optional
+from sqlalchemy import and_, case, delete, func, insert, or_, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, joinedload, selectinload
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Callable, List, Dict, Tuple, Optional, Iterator
 import logging
 
-from app.models.po import PurchaseOrder, POItem, POType, POStatus
+from app.models.po import PurchaseOrder, POItem, POType, POStatus, POConsolidatedEOPA
 from app.models.eopa import EOPA, EOPAItem, EOPAStatus
-from app.models.pi import PIItem
 from app.models.product import MedicineMaster
+from app.models.raw_material import RawMaterialMaster
+from app.models.packing_material import PackingMaterialMaster
 from app.models.vendor import Vendor
-from app.utils.number_generator import generate_po_number
+from app.schemas.configuration import ConfigSnapshot
+from app.utils.number_generator import generate_po_number, reserve_po_numbers
 from app.services.rm_explosion_service import RMExplosionService
 from app.services.pm_explosion_service import PMExplosionService
+from app.services.material_explosion_engine import MaterialExplosionEngine
 from app.exceptions.base import AppException
 
 logger = logging.getLogger("pharma")
@@ -94,6 +99,80 @@ def calculate_po_totals(po: PurchaseOrder) -> PurchaseOrder:
     return po
 
 
+def recalculate_po_amounts(
+    db: Session,
+    po_ids: Optional[List[int]] = None,
+    eopa_id: Optional[int] = None,
+    include_closed: bool = False
+) -> Dict[str, int]:
+    """
+    Recalculate item amounts and PO totals in SQL (no items are loaded).
+    
+    Same rules as calculate_po_item_amounts + calculate_po_totals, applied with one
+    UPDATE of po_items and one UPDATE of purchase_orders FROM an aggregate of the
+    items, however many POs are in scope. Scope: the given PO IDs and/or all POs
+    of an EOPA; every PO when neither is given. CLOSED POs are skipped unless
+    include_closed is set. Objects already in the session are not refreshed;
+    commit (or expire) before reading them.
+    
+    Returns:
+        {"po_count": POs updated, "item_count": items updated}
+    """
+    scope = []
+    if po_ids is not None:
+        scope.append(PurchaseOrder.id.in_(po_ids))
+    if eopa_id is not None:
+        scope.append(PurchaseOrder.eopa_id == eopa_id)
+    if not include_closed:
+        scope.append(PurchaseOrder.status != POStatus.CLOSED)
+    
+    # Item amounts: value = rate × qty, gst = value × rate / 100, zero when unpriced
+    priced = and_(
+        POItem.rate_per_unit.isnot(None), POItem.rate_per_unit != 0,
+        POItem.ordered_quantity.isnot(None), POItem.ordered_quantity != 0
+    )
+    value_amount = case((priced, POItem.rate_per_unit * POItem.ordered_quantity), else_=0)
+    gst_amount = case(
+        (and_(priced, POItem.gst_rate != 0),
+         POItem.rate_per_unit * POItem.ordered_quantity * POItem.gst_rate / Decimal("100")),
+        else_=0
+    )
+    items_result = db.execute(
+        update(POItem)
+        .where(POItem.po_id.in_(select(PurchaseOrder.id).where(*scope)))
+        .values(value_amount=value_amount, gst_amount=gst_amount, total_amount=value_amount + gst_amount)
+        .execution_options(synchronize_session=False)
+    )
+    
+    # PO totals; the outer join keeps POs without items (totals become zero)
+    totals = (
+        select(
+            PurchaseOrder.id.label("po_id"),
+            func.coalesce(func.sum(POItem.value_amount), 0).label("value_amount"),
+            func.coalesce(func.sum(POItem.gst_amount), 0).label("gst_amount"),
+            func.coalesce(func.sum(POItem.total_amount), 0).label("total_amount")
+        )
+        .select_from(PurchaseOrder)
+        .outerjoin(POItem, POItem.po_id == PurchaseOrder.id)
+        .where(*scope)
+        .group_by(PurchaseOrder.id)
+        .subquery()
+    )
+    po_result = db.execute(
+        update(PurchaseOrder)
+        .where(PurchaseOrder.id == totals.c.po_id)
+        .values(
+            total_value_amount=totals.c.value_amount,
+            total_gst_amount=totals.c.gst_amount,
+            total_invoice_amount=totals.c.total_amount,
+            updated_at=datetime.utcnow()
+        )
+        .execution_options(synchronize_session=False)
+    )
+    
+    return {"po_count": po_result.rowcount, "item_count": items_result.rowcount}
+
+
 def validate_po_item_material_type(item_data: dict) -> None:
     """
     Validate that exactly ONE material type is specified for a PO item.
@@ -127,13 +206,226 @@ def validate_po_item_material_type(item_data: dict) -> None:
         )
 
 
+# PO item column identifying the material, per PO type
+PO_ITEM_MATERIAL_COLUMN = {
+    POType.FG: "medicine_id",
+    POType.RM: "raw_material_id",
+    POType.PM: "packing_material_id",
+}
+
+# PO item columns identifying one item of a PO, per PO type. PM items are kept
+# per language and artwork version, as in PackingMaterialSpec.consolidation_key.
+PO_ITEM_KEY_COLUMNS = {
+    POType.FG: ("medicine_id",),
+    POType.RM: ("raw_material_id",),
+    POType.PM: ("packing_material_id", "language", "artwork_version"),
+}
+
+
+def po_item_key(po_type: POType, item: Any) -> Tuple:
+    """Key of a PO item within a PO of po_type; item is a dict of column values or a POItem (or row)"""
+    columns = PO_ITEM_KEY_COLUMNS[po_type]
+    if isinstance(item, dict):
+        return tuple(item.get(column) for column in columns)
+    return tuple(getattr(item, column) for column in columns)
+
+
+def quantize_to_columns(model, values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Round numeric values to the scale of their Numeric column, as the database stores them.
+    
+    Exploded quantities carry full Decimal precision (fractional BOM coefficients,
+    wastage), while stored values are rounded to the column scale; comparing the
+    two unrounded would report every such row as changed.
+    """
+    columns = model.__table__.c
+    rounded = dict(values)
+    for column, value in values.items():
+        scale = getattr(columns[column].type, "scale", None) if column in columns else None
+        if scale is not None and isinstance(value, (Decimal, float, int)) and not isinstance(value, bool):
+            rounded[column] = Decimal(str(value)).quantize(Decimal(1).scaleb(-scale), rounding=ROUND_HALF_UP)
+    return rounded
+
+
+def consolidated_po_numbers(db: Session, eopa_id: int) -> Dict[POType, List[str]]:
+    """
+    Numbers of the live (not CANCELLED) consolidated RM/PM POs covering an EOPA, by PO type.
+    
+    The demand of a covered EOPA is already ordered on those POs, so per-EOPA
+    RM/PM generation must not order it again.
+    """
+    covered: Dict[POType, List[str]] = {}
+    for po_type, po_number in db.query(PurchaseOrder.po_type, PurchaseOrder.po_number).join(
+        POConsolidatedEOPA, POConsolidatedEOPA.po_id == PurchaseOrder.id
+    ).filter(
+        POConsolidatedEOPA.eopa_id == eopa_id,
+        PurchaseOrder.status != POStatus.CANCELLED
+    ).order_by(PurchaseOrder.id).all():
+        covered.setdefault(po_type, []).append(po_number)
+    return covered
+
+
+def merge_po_items(
+    db: Session,
+    po: PurchaseOrder,
+    desired_items: List[Dict],
+    existing_items: Optional[List[POItem]] = None
+) -> Dict[str, int]:
+    """
+    Bring the items of a PO in line with desired_items, touching only rows that change.
+    
+    Items are matched by po_item_key: the material ID (PO_ITEM_MATERIAL_COLUMN),
+    and for PM also language and artwork version. Matched items whose values
+    differ are updated in place, keeping their ID, rate and other fields not in
+    desired_items; new items are inserted and items no longer wanted (or
+    duplicates of an item) are deleted. Numeric values are rounded to their
+    column scale before comparing, so fractional explosion results that round to
+    the stored value count as unchanged. Each kind of change is one bulk
+    statement. Session objects of changed items are not refreshed; commit (or
+    expire) before reading them.
+    
+    Args:
+        po: Purchase Order (flushed, so po.id is set)
+        desired_items: Column values per item, including the po_item_key columns;
+            entries with the same key are combined (quantities added)
+        existing_items: Current items of the PO if already loaded (queried otherwise)
+        
+    Returns:
+        {"inserted": n, "updated": n, "deleted": n, "unchanged": n}
+    """
+    desired: Dict[Tuple, Dict] = {}
+    for values in desired_items:
+        key = po_item_key(po.po_type, values)
+        if key in desired:
+            desired[key]["ordered_quantity"] += values["ordered_quantity"]
+        else:
+            desired[key] = dict(values)
+    
+    if existing_items is None:
+        existing_items = db.query(POItem).filter(POItem.po_id == po.id).all()
+    current: Dict[Tuple, POItem] = {}
+    deleted_ids = []
+    for item in existing_items:
+        key = po_item_key(po.po_type, item)
+        if key in desired and key not in current:
+            current[key] = item
+        else:
+            deleted_ids.append(item.id)
+    
+    inserts = []
+    updates = []
+    for key, values in desired.items():
+        values = quantize_to_columns(POItem, values)
+        item = current.get(key)
+        if item is None:
+            inserts.append({"po_id": po.id, "fulfilled_quantity": Decimal("0"), **values})
+        elif any(getattr(item, column) != value for column, value in values.items()):
+            updates.append({"id": item.id, **values})
+    
+    if deleted_ids:
+        db.execute(
+            delete(POItem)
+            .where(POItem.id.in_(deleted_ids))
+            .execution_options(synchronize_session=False)
+        )
+    if updates:
+        db.execute(update(POItem), updates)
+    if inserts:
+        db.execute(insert(POItem), inserts)
+    
+    return {
+        "inserted": len(inserts),
+        "updated": len(updates),
+        "deleted": len(deleted_ids),
+        "unchanged": len(current) - len(updates)
+    }
+
+
+def insert_purchase_orders(
+    db: Session,
+    purchase_orders: List[Dict],
+    items: List[List[Dict]]
+) -> List[int]:
+    """
+    Bulk-insert PO headers and their items without the ORM unit of work.
+    
+    Headers are written with one INSERT ... RETURNING id and all items with one
+    executemany INSERT (both sent in batches by the driver), instead of adding
+    objects one by one and flushing per PO. Every item is checked with
+    validate_po_item_material_type before anything is written.
+    
+    Args:
+        purchase_orders: Column values per PO header
+        items: Column values of each PO's items (po_id is filled in), aligned
+            with purchase_orders
+        
+    Returns:
+        IDs of the inserted POs, in the order of purchase_orders
+    """
+    for po_items in items:
+        for item in po_items:
+            validate_po_item_material_type(item)
+    
+    if not purchase_orders:
+        return []
+    
+    # Store the same rounded values merge_po_items compares against
+    purchase_orders = [quantize_to_columns(PurchaseOrder, header) for header in purchase_orders]
+    items = [[quantize_to_columns(POItem, item) for item in po_items] for po_items in items]
+    
+    po_ids = db.execute(
+        insert(PurchaseOrder).returning(PurchaseOrder.id, sort_by_parameter_order=True),
+        purchase_orders
+    ).scalars().all()
+    
+    item_rows = [
+        {**item, "po_id": po_id}
+        for po_id, po_items in zip(po_ids, items)
+        for item in po_items
+    ]
+    if item_rows:
+        db.execute(insert(POItem), item_rows)
+    
+    return po_ids
+
+
 class POGenerationService:
     """Service for generating Purchase Orders from EOPA"""
     
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: Session,
+        config: Optional[ConfigSnapshot] = None,
+        sequence_bind: Optional[Engine] = None
+    ):
+        """
+        Args:
+            db: Database session the POs are written in
+            config: Request config snapshot
+            sequence_bind: Engine to reserve PO numbers on in short transactions
+                of their own, so the counter row locks are not held until db
+                commits (numbers of a rolled-back generation are then lost).
+                By default numbers are reserved in db's transaction.
+        """
         self.db = db
+        self.config = config
+        self.sequence_bind = sequence_bind
     
-    def generate_pos_from_eopa(self, eopa_id: int, current_user_id: int, custom_quantities: dict = None) -> Dict:
+    def _reserve_po_numbers(self, po_keys: List[Tuple[str, Optional[int]]]) -> List[str]:
+        """Reserve draft PO numbers (see reserve_po_numbers) per sequence_bind"""
+        if self.sequence_bind is None:
+            return reserve_po_numbers(self.db, po_keys, config=self.config)
+        
+        with Session(bind=self.sequence_bind) as sequence_db, sequence_db.begin():
+            return reserve_po_numbers(sequence_db, po_keys, config=self.config)
+    
+    def generate_pos_from_eopa(
+        self,
+        eopa_id: int,
+        current_user_id: int,
+        custom_quantities: dict = None,
+        bom_by_kind: Optional[Dict[str, Dict[int, List]]] = None
+    ) -> Dict:
         """
         Generate Purchase Orders from an approved EOPA.
         
@@ -150,29 +442,15 @@ class POGenerationService:
             current_user_id: User creating the POs
             custom_quantities: Optional dict with custom quantities per PO type
                 Format: {"po_quantities": [{"eopa_item_id": 1, "po_type": "RM", "quantity": 100}]}
+            bom_by_kind: Optional RM/PM BOM maps preloaded for several EOPAs
+                (see po_batch), used instead of loading this EOPA's BOM
             
         Returns:
             Dict with created POs summary
         """
-        # Load EOPA with all relationships
-        eopa = self.db.query(EOPA).options(
-            joinedload(EOPA.items)
-                .joinedload(EOPAItem.pi_item)
-                .joinedload(PIItem.medicine)
-                .joinedload(MedicineMaster.manufacturer_vendor),
-            joinedload(EOPA.items)
-                .joinedload(EOPAItem.pi_item)
-                .joinedload(PIItem.medicine)
-                .joinedload(MedicineMaster.rm_vendor),
-            joinedload(EOPA.items)
-                .joinedload(EOPAItem.pi_item)
-                .joinedload(PIItem.medicine)
-                .joinedload(MedicineMaster.pm_vendor),
-            joinedload(EOPA.pi)
-        ).filter(EOPA.id == eopa_id).first()
-        
-        if not eopa:
-            raise AppException("EOPA not found", "ERR_NOT_FOUND", 404)
+        # Load EOPA → items → PI items → medicines once; shared by FG grouping and RM/PM explosion
+        explosion_engine = MaterialExplosionEngine(self.db)
+        eopa = explosion_engine.load_eopa(eopa_id)
         
         if eopa.status != EOPAStatus.APPROVED:
             raise AppException(
@@ -184,9 +462,10 @@ class POGenerationService:
         if not eopa.items or len(eopa.items) == 0:
             raise AppException("EOPA has no items", "ERR_VALIDATION", 400)
         
-        # Check if POs already generated
+        # Check if POs already generated (consolidated POs attached to this EOPA do not count)
         existing_pos = self.db.query(PurchaseOrder).filter(
-            PurchaseOrder.eopa_id == eopa_id
+            PurchaseOrder.eopa_id == eopa_id,
+            ~PurchaseOrder.consolidated_eopas.any()
         ).all()
         
         if existing_pos:
@@ -199,10 +478,8 @@ class POGenerationService:
         # Group ONLY FG POs by vendor and medicine
         po_groups = self._group_items_by_vendor_and_type(eopa.items)
 
-        # Prepare RM explosion grouped by vendor for RM POs
-        rm_explosion_service = RMExplosionService(self.db)
-        rm_explosion = rm_explosion_service.explode_eopa_to_raw_materials(eopa_id)
-        rm_vendor_groups = rm_explosion.get("grouped_by_vendor", [])
+        # Explode RM and PM in one pass over the loaded EOPA (validates BOMs before any PO is created)
+        explosions = explosion_engine.explode(eopa_id, kinds=("RM", "PM"), eopa=eopa, bom_by_kind=bom_by_kind)
         
         # Build custom quantities and units lookup
         qty_lookup = {}
@@ -225,61 +502,89 @@ class POGenerationService:
         created_pos = []
         
         try:
+            # Reserve all FG PO numbers in one round trip
+            fg_po_numbers = iter(self._reserve_po_numbers(
+                [(po_type.value, sequence) for (_, po_type, _, sequence) in po_groups]
+            ))
+            
+            # All manufacturers in one query
+            vendor_ids = {vendor_id for (vendor_id, _, _, _) in po_groups if vendor_id not in (None, -1)}
+            vendors = {
+                vendor.id: vendor
+                for vendor in self.db.query(Vendor).filter(Vendor.id.in_(vendor_ids)).all()
+            } if vendor_ids else {}
+            
+            headers = []
+            header_items = []
             for (vendor_id, po_type, medicine_id, sequence), item in po_groups.items():
                 # Check for custom quantity and unit
                 custom_qty = qty_lookup.get((item.id, po_type.value))
                 custom_unit = unit_lookup.get((item.id, po_type.value))
                 
-                po = self._create_purchase_order(
+                built = self._build_purchase_order(
                     eopa=eopa,
                     vendor_id=vendor_id,
                     po_type=po_type,
                     items=[item],  # Single item per PO
                     medicine_sequence=sequence,
                     current_user_id=current_user_id,
+                    vendors=vendors,
                     custom_quantity=custom_qty,
-                    unit=custom_unit
+                    unit=custom_unit,
+                    po_number=next(fg_po_numbers)
                 )
-                if po:  # Only add if PO was created (not skipped due to material balance)
-                    created_pos.append(po)
+                if built:  # Only add if PO is needed (not skipped due to material balance)
+                    headers.append(built[0])
+                    header_items.append(built[1])
+            
+            # Write all FG POs and their items in bulk
+            insert_purchase_orders(self.db, headers, header_items)
+            created_pos = [
+                {
+                    "po_number": header["po_number"],
+                    "po_type": header["po_type"].value,
+                    "vendor_id": header["vendor_id"],
+                    "total_ordered_qty": float(header["total_ordered_qty"]),
+                    "items_count": len(po_items)
+                }
+                for header, po_items in zip(headers, header_items)
+            ]
             
             # Commit FG POs first
             self.db.commit()
 
-            # Next, generate RM and PM POs via explosion services to ensure correct item IDs
-            rm_result = self.generate_rm_pos_from_explosion(
-                eopa_id=eopa_id,
-                current_user_id=current_user_id,
-                rm_po_overrides=None
-            )
-            pm_result = self.generate_pm_pos_from_explosion(
-                eopa_id=eopa_id,
-                current_user_id=current_user_id,
-                pm_po_overrides=None
-            )
+            # Next, generate RM and PM POs via explosion services to ensure correct item IDs,
+            # except for demand already ordered on consolidated POs
+            covered = consolidated_po_numbers(self.db, eopa_id)
+            rm_result = pm_result = {}
+            if POType.RM not in covered:
+                rm_result = self.generate_rm_pos_from_explosion(
+                    eopa_id=eopa_id,
+                    current_user_id=current_user_id,
+                    rm_po_overrides=None,
+                    explosion_result=explosions["RM"]
+                )
+            if POType.PM not in covered:
+                pm_result = self.generate_pm_pos_from_explosion(
+                    eopa_id=eopa_id,
+                    current_user_id=current_user_id,
+                    pm_po_overrides=None,
+                    explosion_result=explosions["PM"]
+                )
             
             logger.info({
                 "event": "POS_GENERATED_FROM_EOPA",
                 "eopa_id": eopa_id,
                 "eopa_number": eopa.eopa_number,
                 "total_pos_created": len(created_pos),
-                "po_numbers": [po.po_number for po in created_pos],
+                "po_numbers": [po["po_number"] for po in created_pos],
                 "created_by": current_user_id
             })
             
             # Compose combined summary
             rm_created = rm_result.get("total_rm_pos_created", 0)
             pm_created = pm_result.get("total_pm_pos_created", 0)
-            combined_list = [
-                {
-                    "po_number": po.po_number,
-                    "po_type": po.po_type.value,
-                    "vendor_id": po.vendor_id,
-                    "total_ordered_qty": float(po.total_ordered_qty),
-                    "items_count": len(po.items)
-                }
-                for po in created_pos
-            ]
+            combined_list = created_pos
 
             return {
                 "eopa_id": eopa_id,
@@ -288,7 +593,8 @@ class POGenerationService:
                 "fg_pos_created": len(created_pos),
                 "rm_pos_created": rm_created,
                 "pm_pos_created": pm_created,
-                "purchase_orders": combined_list
+                "purchase_orders": combined_list,
+                "consolidated_po_numbers": {po_type.value: numbers for po_type, numbers in covered.items()}
             }
             
         except Exception as e:
@@ -363,7 +669,7 @@ class POGenerationService:
         
         return po_groups
     
-    def _create_purchase_order(
+    def _build_purchase_order(
         self,
         eopa: EOPA,
         vendor_id: int,
@@ -371,11 +677,16 @@ class POGenerationService:
         items: List[EOPAItem],
         medicine_sequence: int,
         current_user_id: int,
+        vendors: Dict[int, Vendor],
         custom_quantity: Decimal = None,
-        unit: str = None
-    ) -> Optional[PurchaseOrder]:
+        unit: str = None,
+        po_number: Optional[str] = None
+    ) -> Optional[Tuple[Dict, List[Dict]]]:
         """
-        Create a single FG Purchase Order with items (QUANTITY ONLY, NO PRICING).
+        Build a single FG Purchase Order with items (QUANTITY ONLY, NO PRICING).
+        
+        Nothing is written: the header and item column values are returned for
+        insert_purchase_orders, which writes all POs of a generation at once.
         
         CRITICAL BUSINESS RULE:
         - FG PO → Only medicine_id is populated
@@ -394,9 +705,11 @@ class POGenerationService:
             po_type: Type of PO (FG, RM, PM)
             items: EOPA items to include
             current_user_id: User creating the PO
+            vendors: Preloaded vendors by ID (the vendor must be among them)
+            po_number: Pre-reserved PO number (generated here when not provided)
             
         Returns:
-            Created PurchaseOrder instance or None if no PO needed
+            (PO header values, item values) or None if no PO needed
         """
         # Convert -1 (unassigned marker) back to None
         if vendor_id == -1:
@@ -404,7 +717,7 @@ class POGenerationService:
         
         # Verify vendor exists (allow None for unassigned vendors)
         if vendor_id is not None:
-            vendor = self.db.query(Vendor).filter(Vendor.id == vendor_id).first()
+            vendor = vendors.get(vendor_id)
             if not vendor:
                 raise AppException(
                     f"Vendor {vendor_id} not found",
@@ -419,29 +732,15 @@ class POGenerationService:
                 "medicine_sequence": medicine_sequence
             })
         
-        # Generate PO number with medicine sequence
-        po_number = generate_po_number(self.db, po_type.value, medicine_sequence, is_draft=True)
-        
-        # Create PO (NO PRICING)
-        po = PurchaseOrder(
-            po_number=po_number,
-            po_date=date.today(),
-            po_type=po_type,
-            eopa_id=eopa.id,
-            vendor_id=vendor_id,
-            status=POStatus.DRAFT,
-            total_ordered_qty=Decimal("0.00"),
-            total_fulfilled_qty=Decimal("0.00"),
-            created_by=current_user_id
-        )
-        
-        self.db.add(po)
-        self.db.flush()  # Get PO ID
+        # Generate PO number with medicine sequence (unless reserved by the caller)
+        if po_number is None:
+            po_number = generate_po_number(
+                self.db, po_type.value, medicine_sequence, is_draft=True, config=self.config
+            )
         
-        # Create PO items with material balance check
+        # Build PO items with material balance check
         total_ordered_qty = Decimal("0.00")
-        po_items_created = 0
-        skipped_due_to_balance = False
+        po_items = []
         
         for eopa_item in items:
             medicine = eopa_item.pi_item.medicine
@@ -470,17 +769,16 @@ class POGenerationService:
             # RM/PM handled via explosion services
             if po_type == POType.FG:
                 # FG PO: Only populate medicine_id
-                po_item = POItem(
-                    po_id=po.id,
-                    medicine_id=medicine.id,
-                    raw_material_id=None,
-                    packing_material_id=None,
-                    ordered_quantity=effective_qty,
-                    fulfilled_quantity=Decimal("0.00"),
-                    unit=unit or 'pcs',
-                    hsn_code=hsn_code,
-                    pack_size=pack_size
-                )
+                po_items.append({
+                    "medicine_id": medicine.id,
+                    "raw_material_id": None,
+                    "packing_material_id": None,
+                    "ordered_quantity": effective_qty,
+                    "fulfilled_quantity": Decimal("0.00"),
+                    "unit": unit or 'pcs',
+                    "hsn_code": hsn_code,
+                    "pack_size": pack_size
+                })
             else:
                 # RM/PM POs should not use this method
                 logger.warning({
@@ -490,13 +788,10 @@ class POGenerationService:
                 })
                 continue
             
-            self.db.add(po_item)
             total_ordered_qty += effective_qty
-            po_items_created += 1
         
-        # If no items were added, delete the PO and return None
-        if po_items_created == 0:
-            self.db.delete(po)
+        # If no items were added, skip the PO
+        if not po_items:
             logger.info({
                 "event": "PO_CANCELLED_NO_ITEMS",
                 "po_number": po_number,
@@ -505,8 +800,18 @@ class POGenerationService:
             })
             return None
         
-        # Update PO total ordered quantity
-        po.total_ordered_qty = total_ordered_qty
+        # PO header (NO PRICING)
+        header = {
+            "po_number": po_number,
+            "po_date": date.today(),
+            "po_type": po_type,
+            "eopa_id": eopa.id,
+            "vendor_id": vendor_id,
+            "status": POStatus.DRAFT,
+            "total_ordered_qty": total_ordered_qty,
+            "total_fulfilled_qty": Decimal("0.00"),
+            "created_by": current_user_id
+        }
         
         logger.info({
             "event": "PO_CREATED",
@@ -515,18 +820,269 @@ class POGenerationService:
             "vendor_id": vendor_id,
             "vendor_name": vendor.vendor_name if vendor_id else "NOT ASSIGNED",
             "eopa_id": eopa.id,
-            "items_count": po_items_created,
+            "items_count": len(po_items),
             "total_ordered_qty": float(total_ordered_qty),
             "created_by": current_user_id
         })
         
-        return po
+        return header, po_items
+    
+    def _prepare_material_po_groups(
+        self,
+        eopa_id: int,
+        po_type: POType,
+        vendor_groups: List[Dict],
+        items_key: str
+    ) -> Tuple[List[Dict], Dict[int, PurchaseOrder], Iterator[str]]:
+        """
+        Prepare RM/PM vendor groups for PO generation with a fixed number of queries.
+        
+        1. Drops groups without materials and groups whose vendor does not exist
+        2. Loads existing DRAFT POs of this EOPA and PO type for the vendors
+        3. Reserves PO numbers for the groups that need a new PO in one round trip
+        
+        Args:
+            eopa_id: EOPA ID
+            po_type: POType.RM or POType.PM
+            vendor_groups: Vendor groups from explosion or user overrides
+            items_key: "raw_materials" or "packing_materials"
+            
+        Returns:
+            Tuple of (valid_vendor_groups, draft_po_by_vendor_id, reserved_po_numbers)
+        """
+        groups = [
+            group for group in vendor_groups
+            if group.get(items_key) or group.get("items", [])
+        ]
+        vendor_ids = {group.get("vendor_id") for group in groups if group.get("vendor_id")}
+        
+        known_vendor_ids = set()
+        draft_pos: Dict[int, PurchaseOrder] = {}
+        if vendor_ids:
+            known_vendor_ids = {
+                vendor_id for (vendor_id,) in
+                self.db.query(Vendor.id).filter(Vendor.id.in_(vendor_ids)).all()
+            }
+            for po in self.db.query(PurchaseOrder).filter(
+                PurchaseOrder.eopa_id == eopa_id,
+                PurchaseOrder.vendor_id.in_(vendor_ids),
+                PurchaseOrder.po_type == po_type,
+                PurchaseOrder.status == POStatus.DRAFT
+            ).order_by(PurchaseOrder.id).all():
+                draft_pos.setdefault(po.vendor_id, po)
+        
+        valid_groups = []
+        for group in groups:
+            vendor_id = group.get("vendor_id")
+            if vendor_id and vendor_id not in known_vendor_ids:
+                logger.warning({
+                    "event": f"{po_type.value}_PO_VENDOR_NOT_FOUND",
+                    "vendor_id": vendor_id
+                })
+                continue
+            valid_groups.append(group)
+        
+        # One new PO per vendor without a DRAFT PO (groups without vendor always get a new PO)
+        new_po_count = 0
+        vendors_with_po = set(draft_pos)
+        for group in valid_groups:
+            vendor_id = group.get("vendor_id")
+            if not vendor_id or vendor_id not in vendors_with_po:
+                new_po_count += 1
+                if vendor_id:
+                    vendors_with_po.add(vendor_id)
+        
+        new_po_numbers = self._reserve_po_numbers([(po_type.value, None)] * new_po_count)
+        
+        return valid_groups, draft_pos, iter(new_po_numbers)
+    
+    def _load_po_items(self, pos) -> Dict[int, List[POItem]]:
+        """Items of the given POs grouped by PO ID, in one query"""
+        items: Dict[int, List[POItem]] = {po.id: [] for po in pos}
+        if items:
+            for item in self.db.query(POItem).filter(
+                POItem.po_id.in_(list(items))
+            ).order_by(POItem.id).all():
+                items[item.po_id].append(item)
+        return items
+    
+    @staticmethod
+    def _rm_item_values(rm: Dict) -> Dict:
+        """PO item values of one exploded (or overridden) raw material"""
+        # CRITICAL: RM PO Item - populate raw_material_id, NULL for medicine_id and packing_material_id
+        return {
+            "raw_material_id": rm.get("raw_material_id"),
+            "medicine_id": None,
+            "packing_material_id": None,
+            "ordered_quantity": Decimal(str(rm.get("qty_required") or rm.get("quantity", 0))),
+            "unit": rm.get("uom"),
+            "hsn_code": rm.get("hsn_code"),
+            "gst_rate": Decimal(str(rm.get("gst_rate", 0))) if rm.get("gst_rate") else None
+        }
+    
+    @staticmethod
+    def _pm_item_values(pm: Dict) -> Dict:
+        """PO item values of one exploded (or overridden) packing material"""
+        # CRITICAL: PM PO Item - populate packing_material_id, NULL for medicine_id and raw_material_id
+        return {
+            "packing_material_id": pm.get("packing_material_id"),
+            "medicine_id": None,
+            "raw_material_id": None,
+            "ordered_quantity": Decimal(str(pm.get("qty_required") or pm.get("quantity", 0))),
+            "unit": pm.get("uom"),
+            "language": pm.get("language"),
+            "artwork_version": pm.get("artwork_version"),
+            "gsm": Decimal(str(pm.get("gsm"))) if pm.get("gsm") else None,
+            "ply": pm.get("ply"),
+            "box_dimensions": pm.get("dimensions"),
+            "hsn_code": pm.get("hsn_code"),
+            "gst_rate": Decimal(str(pm.get("gst_rate", 0))) if pm.get("gst_rate") else None
+        }
+    
+    def _write_material_pos(
+        self,
+        eopa_id: int,
+        po_type: POType,
+        vendor_groups: List[Dict],
+        items_key: str,
+        item_values: Callable[[Dict], Dict],
+        current_user_id: int
+    ) -> List[Dict]:
+        """
+        Write the RM/PM POs of vendor groups (ONE PO per vendor); the caller commits.
+        
+        A vendor's existing DRAFT PO is reused and its items merged (merge_po_items);
+        all new POs and their items are written at the end with insert_purchase_orders.
+        Items with the same po_item_key within a group are combined.
+        
+        Returns:
+            One summary per PO: po_number, po_type, vendor_id, total_ordered_qty,
+            items_count and item_changes
+        """
+        label = po_type.value
+        material_column = PO_ITEM_MATERIAL_COLUMN[po_type]
+        
+        # Validate vendors, find existing DRAFT POs and reserve new PO numbers up front
+        vendor_groups, draft_pos, new_po_numbers = self._prepare_material_po_groups(
+            eopa_id, po_type, vendor_groups, items_key
+        )
+        # Current items of the DRAFT POs being reused, loaded once for the merge
+        draft_items = self._load_po_items(draft_pos.values())
+        
+        summaries: Dict[Tuple[str, Any], Dict] = {}
+        new_pos: Dict[Any, Tuple[Dict, List[Dict]]] = {}
+        changed_drafts = set()
+        
+        for index, vendor_group in enumerate(vendor_groups):
+            vendor_id = vendor_group.get("vendor_id")
+            materials = vendor_group.get(items_key) or vendor_group.get("items", [])
+            
+            # Existing DRAFT PO for this vendor and EOPA, else a new PO (a later
+            # group of the same vendor replaces the items, as for a reused draft)
+            existing_po = draft_pos.get(vendor_id)
+            new_po_key = vendor_id or f"unassigned-{index}"
+            if existing_po:
+                po_number = existing_po.po_number
+            elif new_po_key in new_pos:
+                po_number = new_pos[new_po_key][0]["po_number"]
+            else:
+                po_number = next(new_po_numbers)
+            
+            # Desired PO items (one per po_item_key)
+            desired: Dict[Tuple, Dict] = {}
+            total_ordered_qty = Decimal("0.00")
+            for material in materials:
+                if not material.get(material_column):
+                    logger.warning({
+                        "event": f"{label}_PO_ITEM_SKIPPED_NO_{material_column.upper()}",
+                        "po_number": po_number,
+                        "vendor_id": vendor_id,
+                        "eopa_id": eopa_id,
+                        label.lower(): material,
+                        "message": f"Skipping PO item creation: {material_column} is missing or None."
+                    })
+                    continue
+                values = item_values(material)
+                key = po_item_key(po_type, values)
+                if key in desired:
+                    desired[key]["ordered_quantity"] += values["ordered_quantity"]
+                else:
+                    desired[key] = values
+                total_ordered_qty += values["ordered_quantity"]
+            desired_items = list(desired.values())
+            
+            if existing_po:
+                # Update existing DRAFT PO: only changed items are written
+                existing_items = draft_items.pop(existing_po.id, None)
+                changes = merge_po_items(self.db, existing_po, desired_items, existing_items)
+                existing_po.total_ordered_qty = float(total_ordered_qty)
+                if changes["inserted"] or changes["updated"] or changes["deleted"]:
+                    changed_drafts.add(existing_po.id)
+                summary_key = ("po", existing_po.id)
+                logger.info({
+                    "event": f"{label}_PO_UPDATED",
+                    "po_id": existing_po.id,
+                    "po_number": po_number,
+                    "vendor_id": vendor_id,
+                    **changes
+                })
+            else:
+                new_pos[new_po_key] = (
+                    {
+                        "po_number": po_number,
+                        "po_date": date.today(),
+                        "po_type": po_type,
+                        "eopa_id": eopa_id,
+                        "vendor_id": vendor_id,
+                        "status": POStatus.DRAFT,
+                        "total_ordered_qty": total_ordered_qty,
+                        "total_fulfilled_qty": Decimal("0.00"),
+                        "created_by": current_user_id
+                    },
+                    [{**values, "fulfilled_quantity": Decimal("0")} for values in desired_items]
+                )
+                changes = {"inserted": len(desired_items), "updated": 0, "deleted": 0, "unchanged": 0}
+                summary_key = ("new", new_po_key)
+            
+            items_count = changes["inserted"] + changes["updated"] + changes["unchanged"]
+            summaries[summary_key] = {
+                "po_number": po_number,
+                "po_type": label,
+                "vendor_id": vendor_id,
+                "total_ordered_qty": float(total_ordered_qty),
+                "items_count": items_count,
+                "item_changes": changes
+            }
+            
+            logger.info({
+                "event": f"{label}_PO_CREATED",
+                "po_number": po_number,
+                "vendor_id": vendor_id,
+                "eopa_id": eopa_id,
+                "items_count": items_count,
+                "total_ordered_qty": float(total_ordered_qty),
+                "created_by": current_user_id
+            })
+        
+        # All new POs and their items in bulk
+        insert_purchase_orders(
+            self.db,
+            [header for header, _ in new_pos.values()],
+            [items for _, items in new_pos.values()]
+        )
+        
+        # Rates of updated items are kept: bring their amounts and PO totals up to date
+        if changed_drafts:
+            recalculate_po_amounts(self.db, po_ids=sorted(changed_drafts))
+        
+        return list(summaries.values())
     
     def generate_rm_pos_from_explosion(
         self,
         eopa_id: int,
         current_user_id: int,
-        rm_po_overrides: Optional[List[Dict]] = None
+        rm_po_overrides: Optional[List[Dict]] = None,
+        explosion_result: Optional[Dict] = None
     ) -> Dict:
         """
         Generate Raw Material POs using BOM explosion.
@@ -538,6 +1094,8 @@ class POGenerationService:
             current_user_id: User creating the POs
             rm_po_overrides: Optional list of vendor groups with user overrides
                 Format: [{"vendor_id": 1, "items": [{"raw_material_id": 1, "quantity": 100, "uom": "KG", ...}]}]
+            explosion_result: Optional precomputed RM explosion (from MaterialExplosionEngine)
+                reused instead of exploding the EOPA again
                 
         Returns:
             Dict with created RM POs summary
@@ -554,15 +1112,15 @@ class POGenerationService:
                 400
             )
         
-        # Perform RM explosion
-        rm_explosion_service = RMExplosionService(self.db)
+        self._reject_consolidated(eopa, POType.RM)
         
         if rm_po_overrides:
             # Use user-provided overrides
             vendor_groups = rm_po_overrides
         else:
-            # Use computed explosion
-            explosion_result = rm_explosion_service.explode_eopa_to_raw_materials(eopa_id)
+            # Use computed explosion (reuse the caller's result when provided)
+            if explosion_result is None:
+                explosion_result = RMExplosionService(self.db).explode_eopa_to_raw_materials(eopa_id)
             vendor_groups = explosion_result.get("grouped_by_vendor", [])
         
         if not vendor_groups:
@@ -572,114 +1130,11 @@ class POGenerationService:
                 400
             )
         
-        created_pos = []
-        
         try:
-            for vendor_group in vendor_groups:
-                vendor_id = vendor_group.get("vendor_id")
-                raw_materials = vendor_group.get("raw_materials") or vendor_group.get("items", [])
-                
-                if not raw_materials:
-                    continue
-                
-                # Validate vendor exists
-                if vendor_id:
-                    vendor = self.db.query(Vendor).filter(Vendor.id == vendor_id).first()
-                    if not vendor:
-                        logger.warning({
-                            "event": "RM_PO_VENDOR_NOT_FOUND",
-                            "vendor_id": vendor_id
-                        })
-                        continue
-                
-                # Check for existing DRAFT PO for this vendor and EOPA
-                existing_po = self.db.query(PurchaseOrder).filter(
-                    PurchaseOrder.eopa_id == eopa_id,
-                    PurchaseOrder.vendor_id == vendor_id,
-                    PurchaseOrder.po_type == POType.RM,
-                    PurchaseOrder.status == POStatus.DRAFT
-                ).first()
-                
-                if existing_po:
-                    # Update existing DRAFT PO
-                    po = existing_po
-                    # Delete existing items to recreate them with new quantities
-                    self.db.query(POItem).filter(POItem.po_id == po.id).delete()
-                    logger.info({
-                        "event": "RM_PO_UPDATED",
-                        "po_id": po.id,
-                        "po_number": po.po_number,
-                        "vendor_id": vendor_id
-                    })
-                else:
-                    # Generate RM PO number
-                    po_number = generate_po_number(self.db, "RM", is_draft=True)
-                    
-                    # Create new RM PO
-                    po = PurchaseOrder(
-                        po_number=po_number,
-                        po_date=date.today(),
-                        po_type=POType.RM,
-                        eopa_id=eopa_id,
-                        vendor_id=vendor_id,
-                        status=POStatus.DRAFT,
-                        total_ordered_qty=Decimal("0.00"),
-                        total_fulfilled_qty=Decimal("0.00"),
-                        created_by=current_user_id
-                    )
-                    
-                    self.db.add(po)
-                    self.db.flush()  # Get PO ID
-                    
-                po_number = po.po_number
-                # Create PO items (one per raw material)
-                total_ordered_qty = Decimal("0.00")
-                
-                for rm in raw_materials:
-                    raw_material_id = rm.get("raw_material_id")
-                    if not raw_material_id:
-                        logger.warning({
-                            "event": "RM_PO_ITEM_SKIPPED_NO_RAW_MATERIAL_ID",
-                            "po_id": po.id,
-                            "vendor_id": vendor_id,
-                            "eopa_id": eopa_id,
-                            "rm": rm,
-                            "message": "Skipping PO item creation: raw_material_id is missing or None."
-                        })
-                        continue
-                    qty_required = Decimal(str(rm.get("qty_required") or rm.get("quantity", 0)))
-                    uom = rm.get("uom")
-                    hsn_code = rm.get("hsn_code")
-                    gst_rate = Decimal(str(rm.get("gst_rate", 0))) if rm.get("gst_rate") else None
-                    
-                    # CRITICAL: RM PO Item - populate raw_material_id, NULL for medicine_id and packing_material_id
-                    po_item = POItem(
-                        po_id=po.id,
-                        raw_material_id=raw_material_id,
-                        medicine_id=None,
-                        packing_material_id=None,
-                        ordered_quantity=float(qty_required),
-                        fulfilled_quantity=0.0,
-                        unit=uom,
-                        hsn_code=hsn_code,
-                        gst_rate=gst_rate
-                    )
-                    self.db.add(po_item)
-                    total_ordered_qty += qty_required
-                
-                # Update PO total
-                po.total_ordered_qty = float(total_ordered_qty)
-                created_pos.append(po)
-                
-                logger.info({
-                    "event": "RM_PO_CREATED",
-                    "po_number": po_number,
-                    "vendor_id": vendor_id,
-                    "eopa_id": eopa_id,
-                    "items_count": len(raw_materials),
-                    "total_ordered_qty": float(total_ordered_qty),
-                    "created_by": current_user_id
-                })
+            created_pos = self._write_material_pos(
+                eopa_id, POType.RM, vendor_groups, "raw_materials",
+                self._rm_item_values, current_user_id
+            )
             
             self.db.commit()
             
@@ -687,23 +1142,14 @@ class POGenerationService:
                 "event": "RM_POS_GENERATED_FROM_EXPLOSION",
                 "eopa_id": eopa_id,
                 "total_rm_pos_created": len(created_pos),
-                "po_numbers": [po.po_number for po in created_pos],
+                "po_numbers": [po["po_number"] for po in created_pos],
                 "created_by": current_user_id
             })
             
             return {
                 "eopa_id": eopa_id,
                 "total_rm_pos_created": len(created_pos),
-                "purchase_orders": [
-                    {
-                        "po_number": po.po_number,
-                        "po_type": po.po_type.value,
-                        "vendor_id": po.vendor_id,
-                        "total_ordered_qty": float(po.total_ordered_qty),
-                        "items_count": len(po.items)
-                    }
-                    for po in created_pos
-                ]
+                "purchase_orders": created_pos
             }
             
         except Exception as e:
@@ -723,7 +1169,8 @@ class POGenerationService:
         self,
         eopa_id: int,
         current_user_id: int,
-        pm_po_overrides: Optional[List[Dict]] = None
+        pm_po_overrides: Optional[List[Dict]] = None,
+        explosion_result: Optional[Dict] = None
     ) -> Dict:
         """
         Generate Packing Material POs using BOM explosion.
@@ -735,6 +1182,8 @@ class POGenerationService:
             current_user_id: User creating the POs
             pm_po_overrides: Optional list of vendor groups with user overrides
                 Format: [{"vendor_id": 1, "items": [{"packing_material_id": 1, "quantity": 1000, "uom": "PCS", "language": "EN", ...}]}]
+            explosion_result: Optional precomputed PM explosion (from MaterialExplosionEngine)
+                reused instead of exploding the EOPA again
                 
         Returns:
             Dict with created PM POs summary
@@ -751,15 +1200,15 @@ class POGenerationService:
                 400
             )
         
-        # Perform PM explosion
-        pm_explosion_service = PMExplosionService(self.db)
+        self._reject_consolidated(eopa, POType.PM)
         
         if pm_po_overrides:
             # Use user-provided overrides
             vendor_groups = pm_po_overrides
         else:
-            # Use computed explosion
-            explosion_result = pm_explosion_service.explode_eopa_to_packing_materials(eopa_id)
+            # Use computed explosion (reuse the caller's result when provided)
+            if explosion_result is None:
+                explosion_result = PMExplosionService(self.db).explode_eopa_to_packing_materials(eopa_id)
             vendor_groups = explosion_result.get("grouped_by_vendor", [])
         
         if not vendor_groups:
@@ -769,124 +1218,11 @@ class POGenerationService:
                 400
             )
         
-        created_pos = []
-        
         try:
-            for vendor_group in vendor_groups:
-                vendor_id = vendor_group.get("vendor_id")
-                packing_materials = vendor_group.get("packing_materials") or vendor_group.get("items", [])
-                
-                if not packing_materials:
-                    continue
-                
-                # Validate vendor exists
-                if vendor_id:
-                    vendor = self.db.query(Vendor).filter(Vendor.id == vendor_id).first()
-                    if not vendor:
-                        logger.warning({
-                            "event": "PM_PO_VENDOR_NOT_FOUND",
-                            "vendor_id": vendor_id
-                        })
-                        continue
-                
-                # Check for existing DRAFT PO for this vendor and EOPA
-                existing_po = self.db.query(PurchaseOrder).filter(
-                    PurchaseOrder.eopa_id == eopa_id,
-                    PurchaseOrder.vendor_id == vendor_id,
-                    PurchaseOrder.po_type == POType.PM,
-                    PurchaseOrder.status == POStatus.DRAFT
-                ).first()
-                
-                if existing_po:
-                    # Update existing DRAFT PO
-                    po = existing_po
-                    # Delete existing items to recreate them with new quantities
-                    self.db.query(POItem).filter(POItem.po_id == po.id).delete()
-                    logger.info({
-                        "event": "PM_PO_UPDATED",
-                        "po_id": po.id,
-                        "po_number": po.po_number,
-                        "vendor_id": vendor_id
-                    })
-                else:
-                    # Generate PM PO number
-                    po_number = generate_po_number(self.db, "PM", is_draft=True)
-                    
-                    # Create new PM PO
-                    po = PurchaseOrder(
-                        po_number=po_number,
-                        po_date=date.today(),
-                        po_type=POType.PM,
-                        eopa_id=eopa_id,
-                        vendor_id=vendor_id,
-                        status=POStatus.DRAFT,
-                        total_ordered_qty=Decimal("0.00"),
-                        total_fulfilled_qty=Decimal("0.00"),
-                        created_by=current_user_id
-                    )
-                    
-                    self.db.add(po)
-                    self.db.flush()  # Get PO ID
-                
-                # Create PO items (one per packing material)
-                total_ordered_qty = Decimal("0.00")
-                
-                for pm in packing_materials:
-                    packing_material_id = pm.get("packing_material_id")
-                    if not packing_material_id:
-                        logger.warning({
-                            "event": "PM_PO_ITEM_SKIPPED_NO_PACKING_MATERIAL_ID",
-                            "po_id": po.id,
-                            "vendor_id": vendor_id,
-                            "eopa_id": eopa_id,
-                            "pm": pm,
-                            "message": "Skipping PO item creation: packing_material_id is missing or None."
-                        })
-                        continue
-                    qty_required = Decimal(str(pm.get("qty_required") or pm.get("quantity", 0)))
-                    uom = pm.get("uom")
-                    language = pm.get("language")
-                    artwork_version = pm.get("artwork_version")
-                    gsm = Decimal(str(pm.get("gsm"))) if pm.get("gsm") else None
-                    ply = pm.get("ply")
-                    dimensions = pm.get("dimensions")
-                    hsn_code = pm.get("hsn_code")
-                    gst_rate = Decimal(str(pm.get("gst_rate", 0))) if pm.get("gst_rate") else None
-                    
-                    # CRITICAL: PM PO Item - populate packing_material_id, NULL for medicine_id and raw_material_id
-                    po_item = POItem(
-                        po_id=po.id,
-                        packing_material_id=packing_material_id,
-                        medicine_id=None,
-                        raw_material_id=None,
-                        ordered_quantity=float(qty_required),
-                        fulfilled_quantity=0.0,
-                        unit=uom,
-                        language=language,
-                        artwork_version=artwork_version,
-                        gsm=gsm,
-                        ply=ply,
-                        box_dimensions=dimensions,
-                        hsn_code=hsn_code,
-                        gst_rate=gst_rate
-                    )
-                    
-                    self.db.add(po_item)
-                    total_ordered_qty += qty_required
-                
-                # Update PO total
-                po.total_ordered_qty = float(total_ordered_qty)
-                created_pos.append(po)
-                
-                logger.info({
-                    "event": "PM_PO_CREATED",
-                    "po_number": po_number,
-                    "vendor_id": vendor_id,
-                    "eopa_id": eopa_id,
-                    "items_count": len(packing_materials),
-                    "total_ordered_qty": float(total_ordered_qty),
-                    "created_by": current_user_id
-                })
+            created_pos = self._write_material_pos(
+                eopa_id, POType.PM, vendor_groups, "packing_materials",
+                self._pm_item_values, current_user_id
+            )
             
             self.db.commit()
             
@@ -894,23 +1230,14 @@ class POGenerationService:
                 "event": "PM_POS_GENERATED_FROM_EXPLOSION",
                 "eopa_id": eopa_id,
                 "total_pm_pos_created": len(created_pos),
-                "po_numbers": [po.po_number for po in created_pos],
+                "po_numbers": [po["po_number"] for po in created_pos],
                 "created_by": current_user_id
             })
             
             return {
                 "eopa_id": eopa_id,
                 "total_pm_pos_created": len(created_pos),
-                "purchase_orders": [
-                    {
-                        "po_number": po.po_number,
-                        "po_type": po.po_type.value,
-                        "vendor_id": po.vendor_id,
-                        "total_ordered_qty": float(po.total_ordered_qty),
-                        "items_count": len(po.items)
-                    }
-                    for po in created_pos
-                ]
+                "purchase_orders": created_pos
             }
             
         except Exception as e:
@@ -925,3 +1252,285 @@ class POGenerationService:
                 "ERR_PM_PO_GENERATION",
                 500
             )
+    
+    def _reject_consolidated(self, eopa: EOPA, po_type: POType) -> None:
+        """Refuse per-EOPA RM/PM generation when consolidated POs already cover the EOPA's demand"""
+        po_numbers = consolidated_po_numbers(self.db, eopa.id).get(po_type)
+        if po_numbers:
+            raise AppException(
+                f"{po_type.value} demand of EOPA {eopa.eopa_number} is already ordered on "
+                f"consolidated PO(s) {', '.join(po_numbers)}",
+                "ERR_EOPA_CONSOLIDATED",
+                400
+            )
+    
+    def generate_po_for_vendor(
+        self,
+        eopa_id: int,
+        vendor_id: int,
+        po_type: str,
+        items: List[Dict],
+        current_user_id: int
+    ) -> Dict:
+        """
+        Generate a single PO for one vendor and PO type from an EOPA, or return
+        the vendor's existing PO (POST /api/po/generate-po-by-vendor).
+        
+        PART A: PO reuse - an existing PO (DRAFT first, then PENDING_APPROVAL,
+        APPROVED, READY, SENT) is returned with its items instead of creating one
+        PART B: fulfilled_quantity = EOPA qty (set ONCE, never modified), ordered_quantity = user editable
+        
+        Without items, they are derived from the EOPA: FG lines of medicines made
+        by the vendor, or the RM/PM BOM lines supplied by the vendor.
+        
+        All referenced masters are loaded into ID maps up front, so the number of
+        queries does not depend on the number of EOPA lines or items.
+        
+        Returns:
+            Dict with mode ("update" or "create"), po_id, po_number, po_status,
+            po_type, vendor_name and items
+        """
+        try:
+            po_type = POType(po_type).value
+        except ValueError:
+            raise AppException(f"Invalid po_type: {po_type}", "ERR_VALIDATION", 400)
+        
+        # Validate EOPA (lines and PI items in the same query)
+        eopa = self.db.query(EOPA).options(
+            joinedload(EOPA.items).joinedload(EOPAItem.pi_item)
+        ).filter(EOPA.id == eopa_id).first()
+        if not eopa:
+            raise AppException("EOPA not found", "ERR_NOT_FOUND", 404)
+        
+        if eopa.status != EOPAStatus.APPROVED:
+            raise AppException("EOPA must be APPROVED to generate POs", "ERR_EOPA_NOT_APPROVED", 400)
+        
+        # Validate vendor
+        vendor = self.db.query(Vendor).filter(Vendor.id == vendor_id).first()
+        if not vendor:
+            raise AppException("Vendor not found", "ERR_NOT_FOUND", 404)
+        
+        # Existing PO in priority order: DRAFT → PENDING → APPROVED → READY → SENT (newest first per status)
+        status_priority = [
+            POStatus.DRAFT,
+            POStatus.PENDING_APPROVAL,
+            POStatus.APPROVED,
+            POStatus.READY,
+            POStatus.SENT
+        ]
+        # A consolidated PO covering the EOPA is the vendor's PO for it as well
+        candidates = self.db.query(PurchaseOrder).filter(
+            or_(
+                PurchaseOrder.eopa_id == eopa_id,
+                PurchaseOrder.consolidated_eopas.any(POConsolidatedEOPA.eopa_id == eopa_id)
+            ),
+            PurchaseOrder.vendor_id == vendor_id,
+            PurchaseOrder.po_type == po_type,
+            PurchaseOrder.status.in_(status_priority)
+        ).order_by(PurchaseOrder.created_at.desc()).all()
+        existing_po = min(candidates, key=lambda po: status_priority.index(po.status), default=None)
+        
+        if existing_po:
+            return self._existing_po_for_vendor(existing_po, vendor, po_type, current_user_id)
+        
+        # CREATE MODE - no existing PO
+        if not items:
+            items = self._vendor_items_from_eopa(eopa, vendor_id, po_type)
+        
+        po_number = generate_po_number(self.db, po_type, config=self.config)
+        header = {
+            "po_number": po_number,
+            "po_date": date.today(),
+            "po_type": po_type,
+            "eopa_id": eopa_id,
+            "vendor_id": vendor_id,
+            "delivery_date": date.today() + timedelta(days=30),  # Default 30 days
+            "status": POStatus.DRAFT,
+            "created_by": current_user_id
+        }
+        
+        # PART B: fulfilled_quantity stores EOPA original qty, ordered_quantity is editable
+        # Clients send RM/PM rows with the medicine_id of the BOM line as well;
+        # only the material column of the PO type is kept
+        material_column = PO_ITEM_MATERIAL_COLUMN[POType(po_type)]
+        item_values = []
+        for item in items:
+            ordered_quantity = item.get('ordered_quantity', 0)
+            eopa_quantity = item.get('eopa_quantity', ordered_quantity)  # Use eopa_quantity if provided, else ordered_quantity
+            
+            # Skip invalid items
+            if not item.get(material_column) or not ordered_quantity:
+                continue
+            
+            item_values.append({
+                "medicine_id": None,
+                "raw_material_id": None,
+                "packing_material_id": None,
+                material_column: item[material_column],
+                "ordered_quantity": Decimal(str(ordered_quantity)),
+                "fulfilled_quantity": Decimal(str(eopa_quantity)),  # EOPA original qty - NEVER modified
+                "unit": item.get('unit', 'pcs')
+            })
+        
+        # One INSERT for the header and one executemany INSERT for all items
+        [po_id] = insert_purchase_orders(self.db, [header], [item_values])
+        
+        po_items = self.db.query(POItem).filter(POItem.po_id == po_id).order_by(POItem.id).all()
+        names = self._material_names(po_items)
+        items_data = [self._po_item_data(po_item, names) for po_item in po_items]
+        
+        self.db.commit()
+        
+        logger.info({
+            "event": "PO_GENERATED_SINGLE",
+            "po_id": po_id,
+            "po_number": po_number,
+            "po_type": po_type,
+            "vendor_id": vendor_id,
+            "eopa_id": eopa_id,
+            "items_count": len(items_data),
+            "created_by": current_user_id
+        })
+        
+        return {
+            "mode": "create",
+            "po_id": po_id,
+            "po_number": po_number,
+            "po_status": POStatus.DRAFT.value,
+            "po_type": po_type,
+            "vendor_name": vendor.vendor_name,
+            "items": items_data
+        }
+    
+    def _existing_po_for_vendor(
+        self,
+        po: PurchaseOrder,
+        vendor: Vendor,
+        po_type: str,
+        current_user_id: int
+    ) -> Dict:
+        """UPDATE mode of generate_po_for_vendor: the existing PO with its items"""
+        po_status = po.status.value
+        logger.info({
+            "event": "PO_FOUND",
+            "po_id": po.id,
+            "po_number": po.po_number,
+            "po_status": po_status,
+            "vendor_id": vendor.id,
+            "eopa_id": po.eopa_id,
+            "user_id": current_user_id
+        })
+        
+        po_items = self.db.query(POItem).filter(POItem.po_id == po.id).order_by(POItem.id).all()
+        names = self._material_names(po_items)
+        
+        return {
+            "mode": "update",
+            "po_id": po.id,
+            "po_number": po.po_number,
+            "po_status": po_status,
+            "po_type": po_type,
+            "vendor_name": vendor.vendor_name,
+            "items": [self._po_item_data(po_item, names) for po_item in po_items]
+        }
+    
+    def _vendor_items_from_eopa(self, eopa: EOPA, vendor_id: int, po_type: str) -> List[Dict]:
+        """
+        Items of a vendor's PO derived from the EOPA lines.
+        
+        FG: lines whose medicine is manufactured by the vendor.
+        RM/PM: BOM lines supplied by the vendor (BOM vendor, else the medicine's
+        RM/PM vendor), quantity = EOPA qty × qty_required_per_unit.
+        Medicines and their BOM for the PO type are loaded in one round trip.
+        """
+        medicine_ids = {
+            eopa_item.pi_item.medicine_id
+            for eopa_item in eopa.items
+            if eopa_item.pi_item and eopa_item.pi_item.medicine_id
+        }
+        if not medicine_ids:
+            return []
+        
+        medicine_query = self.db.query(MedicineMaster).filter(MedicineMaster.id.in_(medicine_ids))
+        if po_type == POType.RM.value:
+            medicine_query = medicine_query.options(selectinload(MedicineMaster.raw_materials))
+        elif po_type == POType.PM.value:
+            medicine_query = medicine_query.options(selectinload(MedicineMaster.packing_materials))
+        medicines = {medicine.id: medicine for medicine in medicine_query.all()}
+        
+        items = []
+        for eopa_item in eopa.items:
+            if not eopa_item.pi_item or not eopa_item.pi_item.medicine_id:
+                continue
+            medicine = medicines.get(eopa_item.pi_item.medicine_id)
+            if not medicine:
+                continue
+            
+            eopa_qty = float(eopa_item.quantity or 0)
+            
+            if po_type == POType.FG.value:
+                # Only include if the medicine manufacturer is the target vendor
+                if medicine.manufacturer_vendor_id == vendor_id:
+                    items.append({
+                        'medicine_id': medicine.id,
+                        'ordered_quantity': eopa_qty,
+                        'eopa_quantity': eopa_qty,
+                        'unit': 'PCS'
+                    })
+                continue
+            
+            if po_type == POType.RM.value:
+                bom_items, material_key, default_vendor_id, default_unit = (
+                    medicine.raw_materials, 'raw_material_id', medicine.rm_vendor_id, 'KG'
+                )
+            else:
+                bom_items, material_key, default_vendor_id, default_unit = (
+                    medicine.packing_materials, 'packing_material_id', medicine.pm_vendor_id, 'PCS'
+                )
+            
+            for bom_item in bom_items:
+                # Only include if the BOM item vendor is the target vendor
+                item_vendor_id = getattr(bom_item, 'vendor_id', None) or default_vendor_id
+                if item_vendor_id != vendor_id:
+                    continue
+                exploded_qty = eopa_qty * float(getattr(bom_item, 'qty_required_per_unit', 0) or 0)
+                if getattr(bom_item, material_key) and exploded_qty > 0:
+                    items.append({
+                        material_key: getattr(bom_item, material_key),
+                        'ordered_quantity': exploded_qty,
+                        'eopa_quantity': exploded_qty,
+                        'unit': getattr(bom_item, 'uom', None) or default_unit
+                    })
+        
+        return items
+    
+    def _material_names(self, po_items: List[POItem]) -> Dict[str, Dict[int, str]]:
+        """Names of the medicines, raw materials and packing materials of po_items (one query per kind used)"""
+        masters = {
+            "medicine_id": (MedicineMaster.id, MedicineMaster.medicine_name),
+            "raw_material_id": (RawMaterialMaster.id, RawMaterialMaster.rm_name),
+            "packing_material_id": (PackingMaterialMaster.id, PackingMaterialMaster.pm_name),
+        }
+        names = {}
+        for column, (id_column, name_column) in masters.items():
+            ids = {getattr(po_item, column) for po_item in po_items if getattr(po_item, column)}
+            names[column] = dict(
+                self.db.query(id_column, name_column).filter(id_column.in_(ids)).all()
+            ) if ids else {}
+        return names
+    
+    @staticmethod
+    def _po_item_data(po_item: POItem, names: Dict[str, Dict[int, str]]) -> Dict:
+        """Response row of a PO item with material names"""
+        return {
+            "id": po_item.id,
+            "medicine_id": po_item.medicine_id,
+            "raw_material_id": po_item.raw_material_id,
+            "packing_material_id": po_item.packing_material_id,
+            "medicine_name": names["medicine_id"].get(po_item.medicine_id),
+            "raw_material_name": names["raw_material_id"].get(po_item.raw_material_id),
+            "packing_material_name": names["packing_material_id"].get(po_item.packing_material_id),
+            "ordered_quantity": float(po_item.ordered_quantity) if po_item.ordered_quantity else 0,
+            "fulfilled_quantity": float(po_item.fulfilled_quantity) if po_item.fulfilled_quantity else 0,
+            "unit": po_item.unit
+        }
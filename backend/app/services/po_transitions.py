@@ -0,0 +1,161 @@
+"""
+PO Status Transitions - apply one workflow step to many Purchase Orders at once
+
+Each transition mirrors a single-PO endpoint of app/routers/po.py:
+- mark_pending: DRAFT → PENDING_APPROVAL (final PO number, prepared_by/at)
+- approve:      PENDING_APPROVAL → APPROVED (approved_by/at)
+- mark_ready:   APPROVED → READY (verified_by/at)
+- send:         READY → SENT (sent_at)
+
+apply_po_transition() locks and validates all requested POs with one SELECT,
+then updates the valid ones with one set-based UPDATE (mark_pending updates by
+primary key in one executemany, as every PO gets its own number). Numbers are
+reserved with reserve_po_numbers in a single round trip. The caller commits.
+"""
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.po import PurchaseOrder, POStatus
+from app.models.user import UserRole
+from app.schemas.configuration import ConfigSnapshot
+from app.utils.number_generator import reserve_po_numbers
+
+# Largest po_ids list accepted by POST /api/po/bulk-transition
+MAX_BULK_TRANSITION_POS = 500
+
+
+@dataclass(frozen=True)
+class POTransition:
+    """One workflow step: allowed source statuses, target status and audit columns"""
+    from_statuses: Tuple[POStatus, ...]
+    to_status: POStatus
+    roles: Tuple[UserRole, ...]
+    error: str
+    event: str
+    user_column: Optional[str] = None
+    time_column: Optional[str] = None
+    renumber: bool = False
+
+
+PO_TRANSITIONS: Dict[str, POTransition] = {
+    "mark_pending": POTransition(
+        from_statuses=(POStatus.DRAFT,),
+        to_status=POStatus.PENDING_APPROVAL,
+        roles=(UserRole.ADMIN, UserRole.PROCUREMENT_OFFICER),
+        error="Only DRAFT POs can be marked as pending approval",
+        event="PO_MARKED_PENDING_APPROVAL",
+        user_column="prepared_by",
+        time_column="prepared_at",
+        renumber=True
+    ),
+    "approve": POTransition(
+        from_statuses=(POStatus.PENDING_APPROVAL,),
+        to_status=POStatus.APPROVED,
+        roles=(UserRole.ADMIN,),
+        error="Only PENDING_APPROVAL POs can be approved",
+        event="PO_APPROVED",
+        user_column="approved_by",
+        time_column="approved_at"
+    ),
+    "mark_ready": POTransition(
+        from_statuses=(POStatus.APPROVED,),
+        to_status=POStatus.READY,
+        roles=(UserRole.ADMIN, UserRole.PROCUREMENT_OFFICER),
+        error="Only APPROVED POs can be marked as ready",
+        event="PO_MARKED_READY",
+        user_column="verified_by",
+        time_column="verified_at"
+    ),
+    "send": POTransition(
+        from_statuses=(POStatus.READY,),
+        to_status=POStatus.SENT,
+        roles=(UserRole.ADMIN, UserRole.PROCUREMENT_OFFICER),
+        error="Only READY POs can be sent",
+        event="PO_SENT",
+        time_column="sent_at"
+    ),
+}
+
+
+def apply_po_transition(
+    db: Session,
+    action: str,
+    po_ids: List[int],
+    user_id: int,
+    all_or_nothing: bool = False,
+    config: Optional[ConfigSnapshot] = None
+) -> List[Dict[str, Any]]:
+    """
+    Validate and apply a transition to many POs in the caller's transaction.
+
+    Invalid POs (missing or in the wrong status) are reported and skipped; with
+    all_or_nothing a single invalid PO leaves every PO unchanged.
+
+    Returns:
+        One result per requested PO ID, in request order:
+        {"po_id", "success", "po_number", "from_status", "to_status", "error"}
+    """
+    transition = PO_TRANSITIONS[action]
+    po_ids = list(dict.fromkeys(po_ids))
+
+    # Lock the requested rows (in id order, so concurrent bulk requests cannot
+    # deadlock) so the validated status cannot change before the UPDATE
+    rows = db.query(
+        PurchaseOrder.id, PurchaseOrder.po_number, PurchaseOrder.po_type, PurchaseOrder.status
+    ).filter(PurchaseOrder.id.in_(po_ids)).order_by(PurchaseOrder.id).with_for_update().all()
+    found = {row.id: row for row in rows}
+
+    results = []
+    valid = []
+    for po_id in po_ids:
+        row = found.get(po_id)
+        if row is None:
+            results.append({"po_id": po_id, "success": False, "po_number": None,
+                            "from_status": None, "to_status": None,
+                            "error": "Purchase Order not found"})
+        elif row.status not in transition.from_statuses:
+            results.append({"po_id": po_id, "success": False, "po_number": row.po_number,
+                            "from_status": row.status.value, "to_status": None,
+                            "error": transition.error})
+        else:
+            results.append({"po_id": po_id, "success": True, "po_number": row.po_number,
+                            "from_status": row.status.value, "to_status": transition.to_status.value,
+                            "error": None})
+            valid.append(row)
+
+    if not valid or (all_or_nothing and len(valid) < len(po_ids)):
+        for result in results:
+            if result["success"]:
+                result.update(success=False, to_status=None,
+                              error="Not applied: other POs in the request are invalid")
+        return results
+
+    now = datetime.utcnow()
+    values = {"status": transition.to_status, "updated_at": now}
+    if transition.user_column:
+        values[transition.user_column] = user_id
+    if transition.time_column:
+        values[transition.time_column] = now
+
+    if transition.renumber:
+        numbers = reserve_po_numbers(db, [(row.po_type.value, None) for row in valid], is_draft=False, config=config)
+        renumbered = dict(zip((row.id for row in valid), numbers))
+        db.execute(
+            update(PurchaseOrder),
+            [{"id": po_id, "po_number": number, **values} for po_id, number in renumbered.items()]
+        )
+        for result in results:
+            if result["success"]:
+                result["po_number"] = renumbered[result["po_id"]]
+    else:
+        db.execute(
+            update(PurchaseOrder)
+            .where(PurchaseOrder.id.in_([row.id for row in valid]))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+    return results
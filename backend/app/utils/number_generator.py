@@ -1,88 +1,239 @@
+"""
+Document number generation
+
+All numbers are allocated from the document_sequences counter table, keyed by
+(document type, fiscal year, prefix). Allocation is a single atomic
+UPDATE ... RETURNING on that row, so it is O(1) and race-free across workers
+(the row lock is held until the caller's transaction commits or rolls back).
+The first allocation for a new key seeds the counter from the highest existing
+document number with that prefix.
+
+reserve_sequences / reserve_po_numbers reserve N consecutive values (for any number
+of prefixes) in one round trip for callers that create many documents at once.
+"""
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import update, insert, case
+from typing import Dict, List, Optional, Sequence, Tuple
+from collections import Counter
+from sqlalchemy.dialects import postgresql, sqlite
 import logging
 
+from app.models.document_sequence import DocumentSequence
+from app.schemas.configuration import ConfigSnapshot
+
 logger = logging.getLogger("pharma")
 
 
-def get_financial_year(db: Session = None):
+def calculate_financial_year() -> str:
+    """Financial year of the current date in YY-YY format (April = start of FY)"""
+    now = datetime.now()
+    if now.month >= 4:  # April onwards
+        return f"{now.year % 100:02d}-{(now.year + 1) % 100:02d}"
+    else:  # January to March
+        return f"{(now.year - 1) % 100:02d}-{now.year % 100:02d}"
+
+
+def _resolve_config(db: Session, config: Optional[ConfigSnapshot]) -> ConfigSnapshot:
+    """Use the request's config snapshot, or build one when called outside a request"""
+    if config is not None:
+        return config
+    from app.services.configuration_service import ConfigurationService  # Lazy import
+    return ConfigurationService(db).get_snapshot()
+
+
+def get_financial_year(db: Session = None, config: Optional[ConfigSnapshot] = None):
     """
     Get current financial year in YY-YY format (e.g., 24-25)
     
-    If db session provided, reads fiscal year config from database.
-    Otherwise, calculates from current date (April = start of FY).
+    Uses the config snapshot if given, otherwise reads the fiscal year config
+    when a db session is provided. Falls back to calculating from the current date.
     """
+    if config is not None:
+        return config.fiscal_year
+    
     if db:
         try:
-            # Lazy import to avoid circular dependency
-            from app.services.configuration_service import ConfigurationService
-            config_service = ConfigurationService(db)
-            fiscal_year_config = config_service.get_config("fiscal_year")
-            return fiscal_year_config.get("value", "24-25")
+            return _resolve_config(db, None).fiscal_year
         except Exception as e:
             logger.warning(f"Failed to get fiscal year from config, using calculated: {e}")
     
-    # Fallback: calculate from current date
-    now = datetime.now()
-    if now.month >= 4:  # April onwards
-        return f"{now.year % 100:02d}-{(now.year + 1) % 100:02d}"
-    else:  # January to March
-        return f"{(now.year - 1) % 100:02d}-{now.year % 100:02d}"
+    return calculate_financial_year()
 
 
-def generate_pi_number(db: Session) -> str:
-    """Generate PI number using configured format: PI/{FY}/{SEQ:04d}"""
-    from app.models.pi import PI
-    from app.services.configuration_service import ConfigurationService  # Lazy import
+def _max_existing_sequence(db: Session, number_column, prefix: str) -> int:
+    """Highest numeric suffix among existing documents whose number starts with prefix"""
+    numbers = db.query(number_column).filter(number_column.like(f"{prefix}%")).all()
     
-    config_service = ConfigurationService(db)
-    numbering = config_service.get_document_numbering()
-    format_template = numbering.get("pi_format", "PI/{FY}/{SEQ:04d}")
+    max_num = 0
+    for (number,) in numbers:
+        suffix = number[len(prefix):]
+        if suffix.isdigit():
+            max_num = max(max_num, int(suffix))
     
-    fy = get_financial_year(db)
-    prefix = format_template.replace("{FY}", fy).split("{SEQ")[0]
+    return max_num
+
+
+def _create_counter(
+    db: Session,
+    document_type: str,
+    prefix: str,
+    fiscal_year: str,
+    number_column,
+    count: int
+) -> int:
+    """
+    Create the counter of a new key (seeded from existing documents) and reserve count values.
     
-    # Get last number for this financial year
-    last_pi = db.query(PI).filter(
-        PI.pi_number.like(f"{prefix}%")
-    ).order_by(PI.pi_number.desc()).first()
+    Uses INSERT ... ON CONFLICT DO UPDATE so a concurrent first allocation
+    still increments the row created by the other worker.
     
-    if last_pi:
-        last_num = int(last_pi.pi_number.split("/")[-1])
-        new_num = last_num + 1
+    Returns:
+        Last reserved sequence value
+    """
+    table = DocumentSequence.__table__
+    now = datetime.utcnow()
+    
+    seed = _max_existing_sequence(db, number_column, prefix) if number_column is not None else 0
+    values = {
+        "document_type": document_type,
+        "fiscal_year": fiscal_year,
+        "prefix": prefix,
+        "last_value": seed + count,
+        "updated_at": now
+    }
+    
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = dialect_insert(table).values(**values).on_conflict_do_update(
+            index_elements=["document_type", "fiscal_year", "prefix"],
+            set_={"last_value": table.c.last_value + count, "updated_at": now}
+        )
     else:
-        new_num = 1
+        statement = insert(table).values(**values)
+    
+    last_value = db.execute(statement.returning(table.c.last_value)).scalar_one()
+    
+    logger.info({
+        "event": "DOCUMENT_SEQUENCE_CREATED",
+        "document_type": document_type,
+        "prefix": prefix,
+        "seed": seed
+    })
+    
+    return last_value
+
+
+def reserve_sequences(
+    db: Session,
+    document_type: str,
+    counts: Dict[str, int],
+    fiscal_year: str = "",
+    number_column=None
+) -> Dict[str, List[int]]:
+    """
+    Atomically reserve consecutive sequence values for one or more prefixes.
+    
+    All existing counters are advanced with a single UPDATE ... RETURNING;
+    only prefixes used for the first time cost an extra (seeding) statement.
+    
+    Args:
+        db: Database session (reservation joins the caller's transaction)
+        document_type: PI, EOPA, PO, MR, DA, GRN, RM_CODE, PM_CODE
+        counts: Number of values to reserve per prefix, e.g. {"PO/24-25/RM/DRAFT/": 12}
+        fiscal_year: Fiscal year the prefixes belong to ("" for material codes)
+        number_column: Document number column used to seed new counters
+    
+    Returns:
+        Dict mapping prefix → reserved values in ascending order
+    """
+    counts = {prefix: count for prefix, count in counts.items() if count > 0}
+    if not counts:
+        return {}
+    
+    table = DocumentSequence.__table__
+    
+    increment = case(counts, value=table.c.prefix) if len(counts) > 1 else next(iter(counts.values()))
+    rows = db.execute(
+        update(table)
+        .where(
+            table.c.document_type == document_type,
+            table.c.fiscal_year == fiscal_year,
+            table.c.prefix.in_(list(counts))
+        )
+        .values(last_value=table.c.last_value + increment, updated_at=datetime.utcnow())
+        .returning(table.c.prefix, table.c.last_value)
+    ).all()
+    last_values = {prefix: last_value for prefix, last_value in rows}
+    
+    # First use of a prefix: seed its counter from existing documents
+    for prefix, count in counts.items():
+        if prefix not in last_values:
+            last_values[prefix] = _create_counter(db, document_type, prefix, fiscal_year, number_column, count)
+    
+    return {
+        prefix: list(range(last_values[prefix] - count + 1, last_values[prefix] + 1))
+        for prefix, count in counts.items()
+    }
+
+
+def allocate_sequence(
+    db: Session,
+    document_type: str,
+    prefix: str,
+    fiscal_year: str = "",
+    number_column=None
+) -> int:
+    """
+    Atomically allocate the next sequence value for a document number prefix.
+    
+    Args:
+        db: Database session (allocation joins the caller's transaction)
+        document_type: PI, EOPA, PO, MR, DA, GRN, RM_CODE, PM_CODE
+        prefix: Number prefix, e.g. "PO/24-25/RM/DRAFT/"
+        fiscal_year: Fiscal year the prefix belongs to ("" for material codes)
+        number_column: Document number column used to seed a new counter
+    
+    Returns:
+        Allocated sequence value (1-based)
+    """
+    return reserve_sequences(db, document_type, {prefix: 1}, fiscal_year, number_column)[prefix][0]
+
+
+def generate_pi_number(db: Session, config: Optional[ConfigSnapshot] = None) -> str:
+    """Generate PI number using configured format: PI/{FY}/{SEQ:04d}"""
+    from app.models.pi import PI
+    
+    config = _resolve_config(db, config)
+    fy = config.fiscal_year
+    prefix = config.numbering.pi_format.replace("{FY}", fy).split("{SEQ")[0]
+    
+    new_num = allocate_sequence(db, "PI", prefix, fy, PI.pi_number)
     
     return f"{prefix}{new_num:04d}"
 
 
-def generate_eopa_number(db: Session) -> str:
+def generate_eopa_number(db: Session, config: Optional[ConfigSnapshot] = None) -> str:
     """Generate EOPA number using configured format: EOPA/{FY}/{SEQ:04d}"""
     from app.models.eopa import EOPA
-    from app.services.configuration_service import ConfigurationService  # Lazy import
-    
-    config_service = ConfigurationService(db)
-    numbering = config_service.get_document_numbering()
-    format_template = numbering.get("eopa_format", "EOPA/{FY}/{SEQ:04d}")
     
-    fy = get_financial_year(db)
-    prefix = format_template.replace("{FY}", fy).split("{SEQ")[0]
+    config = _resolve_config(db, config)
+    fy = config.fiscal_year
+    prefix = config.numbering.eopa_format.replace("{FY}", fy).split("{SEQ")[0]
     
-    last_eopa = db.query(EOPA).filter(
-        EOPA.eopa_number.like(f"{prefix}%")
-    ).order_by(EOPA.eopa_number.desc()).first()
-    
-    if last_eopa:
-        last_num = int(last_eopa.eopa_number.split("/")[-1])
-        new_num = last_num + 1
-    else:
-        new_num = 1
+    new_num = allocate_sequence(db, "EOPA", prefix, fy, EOPA.eopa_number)
     
     return f"{prefix}{new_num:04d}"
 
 
-def generate_po_number(db: Session, po_type: str, medicine_sequence: int = None, is_draft: bool = True) -> str:
+def generate_po_number(
+    db: Session,
+    po_type: str,
+    medicine_sequence: int = None,
+    is_draft: bool = True,
+    config: Optional[ConfigSnapshot] = None
+) -> str:
     """
     Generate PO number using configured format
     Draft PO formats:
@@ -100,38 +251,80 @@ def generate_po_number(db: Session, po_type: str, medicine_sequence: int = None,
         po_type: Type of PO (FG, RM, PM)
         medicine_sequence: Sequence number of medicine in EOPA (optional, for future use)
         is_draft: Whether this is a draft PO (default True)
+        config: Request config snapshot (resolved from the config store if omitted)
     """
     from app.models.po import PurchaseOrder
-    from app.services.configuration_service import ConfigurationService  # Lazy import
     
-    config_service = ConfigurationService(db)
-    numbering = config_service.get_document_numbering()
+    config = _resolve_config(db, config)
+    fy = config.fiscal_year
+    prefix = _po_number_prefix(config, po_type, medicine_sequence, is_draft)
     
-    fy = get_financial_year(db)
+    new_num = allocate_sequence(db, "PO", prefix, fy, PurchaseOrder.po_number)
     
+    return f"{prefix}{new_num:04d}"
+
+
+def _po_number_prefix(
+    config: ConfigSnapshot,
+    po_type: str,
+    medicine_sequence: int = None,
+    is_draft: bool = True
+) -> str:
+    """Resolve the PO number prefix (everything before the sequence)"""
+    fy = config.fiscal_year
     if medicine_sequence:
         # New format with medicine sequence: PO/YY-YY/TYPE/SEQ/0001
-        prefix = f"PO/{fy}/{po_type}/{medicine_sequence}/"
-    elif is_draft:
+        return f"PO/{fy}/{po_type}/{medicine_sequence}/"
+    
+    if is_draft:
         # Draft format: PO/YY-YY/TYPE/DRAFT/0001
-        prefix = f"PO/{fy}/{po_type}/DRAFT/"
-    else:
-        # Use configured format for final POs
-        format_key = f"po_{po_type.lower()}_format"
-        format_template = numbering.get(format_key, f"PO/{po_type}/{{FY}}/{{SEQ:04d}}")
-        prefix = format_template.replace("{FY}", fy).split("{SEQ")[0]
-    
-    last_po = db.query(PurchaseOrder).filter(
-        PurchaseOrder.po_number.like(f"{prefix}%")
-    ).order_by(PurchaseOrder.po_number.desc()).first()
-    
-    if last_po:
-        last_num = int(last_po.po_number.split("/")[-1])
-        new_num = last_num + 1
-    else:
-        new_num = 1
+        return f"PO/{fy}/{po_type}/DRAFT/"
     
-    return f"{prefix}{new_num:04d}"
+    # Use configured format for final POs
+    format_template = getattr(
+        config.numbering, f"po_{po_type.lower()}_format", f"PO/{po_type}/{{FY}}/{{SEQ:04d}}"
+    )
+    return format_template.replace("{FY}", fy).split("{SEQ")[0]
+
+
+def reserve_po_numbers(
+    db: Session,
+    po_keys: Sequence[Tuple[str, Optional[int]]],
+    is_draft: bool = True,
+    config: Optional[ConfigSnapshot] = None
+) -> List[str]:
+    """
+    Reserve PO numbers for several POs at once.
+    
+    Fiscal year and numbering formats are resolved once and all counters are
+    advanced in a single UPDATE ... RETURNING, so numbering N POs costs a
+    constant number of queries instead of N × (config + scan).
+    
+    Args:
+        db: Database session (reservation joins the caller's transaction)
+        po_keys: One (po_type, medicine_sequence) pair per PO to number;
+            medicine_sequence may be None
+        is_draft: Whether the POs are drafts (default True)
+        config: Request config snapshot (resolved from the config store if omitted)
+    
+    Returns:
+        PO numbers in the same order as po_keys
+    """
+    from app.models.po import PurchaseOrder
+    
+    if not po_keys:
+        return []
+    
+    config = _resolve_config(db, config)
+    fy = config.fiscal_year
+    prefixes = [
+        _po_number_prefix(config, po_type, medicine_sequence, is_draft)
+        for po_type, medicine_sequence in po_keys
+    ]
+    reserved = reserve_sequences(db, "PO", Counter(prefixes), fy, PurchaseOrder.po_number)
+    
+    sequences = {prefix: iter(values) for prefix, values in reserved.items()}
+    return [f"{prefix}{next(sequences[prefix]):04d}" for prefix in prefixes]
 
 
 def generate_receipt_number(db: Session) -> str:
@@ -141,15 +334,7 @@ def generate_receipt_number(db: Session) -> str:
     fy = get_financial_year()
     prefix = f"MR/{fy}/"
     
-    last_receipt = db.query(MaterialReceipt).filter(
-        MaterialReceipt.receipt_number.like(f"{prefix}%")
-    ).order_by(MaterialReceipt.receipt_number.desc()).first()
-    
-    if last_receipt:
-        last_num = int(last_receipt.receipt_number.split("/")[-1])
-        new_num = last_num + 1
-    else:
-        new_num = 1
+    new_num = allocate_sequence(db, "MR", prefix, fy, MaterialReceipt.receipt_number)
     
     return f"{prefix}{new_num:04d}"
 
@@ -161,15 +346,7 @@ def generate_dispatch_number(db: Session) -> str:
     fy = get_financial_year()
     prefix = f"DA/{fy}/"
     
-    last_dispatch = db.query(DispatchAdvice).filter(
-        DispatchAdvice.dispatch_number.like(f"{prefix}%")
-    ).order_by(DispatchAdvice.dispatch_number.desc()).first()
-    
-    if last_dispatch:
-        last_num = int(last_dispatch.dispatch_number.split("/")[-1])
-        new_num = last_num + 1
-    else:
-        new_num = 1
+    new_num = allocate_sequence(db, "DA", prefix, fy, DispatchAdvice.dispatch_number)
     
     return f"{prefix}{new_num:04d}"
 
@@ -181,15 +358,7 @@ def generate_grn_number(db: Session) -> str:
     fy = get_financial_year()
     prefix = f"GRN/{fy}/"
     
-    last_grn = db.query(WarehouseGRN).filter(
-        WarehouseGRN.grn_number.like(f"{prefix}%")
-    ).order_by(WarehouseGRN.grn_number.desc()).first()
-    
-    if last_grn:
-        last_num = int(last_grn.grn_number.split("/")[-1])
-        new_num = last_num + 1
-    else:
-        new_num = 1
+    new_num = allocate_sequence(db, "GRN", prefix, fy, WarehouseGRN.grn_number)
     
     return f"{prefix}{new_num:04d}"
 
@@ -200,19 +369,7 @@ def generate_rm_code(db: Session) -> str:
     
     prefix = "RM-"
     
-    last_rm = db.query(RawMaterialMaster).filter(
-        RawMaterialMaster.rm_code.like(f"{prefix}%")
-    ).order_by(RawMaterialMaster.rm_code.desc()).first()
-    
-    if last_rm:
-        try:
-            last_num = int(last_rm.rm_code.replace(prefix, ""))
-            new_num = last_num + 1
-        except ValueError:
-            # If existing codes don't follow pattern, start from 1
-            new_num = 1
-    else:
-        new_num = 1
+    new_num = allocate_sequence(db, "RM_CODE", prefix, number_column=RawMaterialMaster.rm_code)
     
     return f"{prefix}{new_num:04d}"
 
@@ -223,18 +380,6 @@ def generate_pm_code(db: Session) -> str:
     
     prefix = "PM-"
     
-    last_pm = db.query(PackingMaterialMaster).filter(
-        PackingMaterialMaster.pm_code.like(f"{prefix}%")
-    ).order_by(PackingMaterialMaster.pm_code.desc()).first()
-    
-    if last_pm:
-        try:
-            last_num = int(last_pm.pm_code.replace(prefix, ""))
-            new_num = last_num + 1
-        except ValueError:
-            # If existing codes don't follow pattern, start from 1
-            new_num = 1
-    else:
-        new_num = 1
+    new_num = allocate_sequence(db, "PM_CODE", prefix, number_column=PackingMaterialMaster.pm_code)
     
     return f"{prefix}{new_num:04d}"
@@ -0,0 +1,83 @@
+"""
+Keyset (cursor) pagination for list endpoints
+
+Pages are read in (sort column, id) order and continue strictly after the last
+row of the previous page, so deep pages cost the same as the first one (the
+composite index is range-scanned instead of skipping `offset` rows) and rows
+inserted meanwhile do not shift pages.
+
+The cursor handed to clients is opaque: URL-safe base64 of the last row's sort
+value and id. Offset pagination (`skip`) remains available for existing
+clients; it is used only when no cursor is sent.
+"""
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+from datetime import date, datetime
+from typing import Any, List, Optional, Tuple
+import base64
+import binascii
+import json
+
+from app.exceptions.base import AppException
+
+
+def encode_cursor(sort_column, row) -> str:
+    """Cursor pointing just after row"""
+    value = getattr(row, sort_column.key)
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    payload = json.dumps({"k": sort_column.key, "v": value, "id": row.id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(sort_column, cursor: str) -> Tuple[Any, int]:
+    """(sort value, id) of a cursor issued for sort_column"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["k"] != sort_column.key:
+            raise ValueError("cursor issued for another ordering")
+        value = payload["v"]
+        python_type = sort_column.type.python_type
+        if python_type is datetime:
+            value = datetime.fromisoformat(value)
+        elif python_type is date:
+            value = date.fromisoformat(value)
+        return value, int(payload["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise AppException(f"Invalid pagination cursor: {e}", "ERR_VALIDATION", 400)
+
+
+def keyset_page(
+    query: Query,
+    sort_column,
+    id_column,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    descending: bool = False
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    One page of query ordered by (sort_column, id_column).
+
+    Returns the rows and the cursor of the next page (None on the last page).
+    Without a cursor the page starts at offset `skip`.
+    """
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    if cursor:
+        value, last_id = decode_cursor(sort_column, cursor)
+        key = tuple_(sort_column, id_column)
+        query = query.filter(key < tuple_(value, last_id) if descending else key > tuple_(value, last_id))
+    elif skip:
+        query = query.offset(skip)
+
+    # One extra row tells whether another page follows
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(sort_column, rows[-1])
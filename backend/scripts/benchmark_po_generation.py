@@ -0,0 +1,203 @@
+"""
+Benchmark PO Generation - ORM unit of work vs bulk inserts
+
+Seeds one approved EOPA and --lines raw materials spread over --vendors RM
+vendors inside a transaction, then generates the RM POs (one per vendor) twice:
+with the per-object ORM writes generation used before (add + flush per PO,
+add per item) and with POGenerationService.generate_rm_pos_from_explosion,
+which writes headers and items with insert_purchase_orders. A regeneration of
+the same quantities is timed as well (DRAFT PO items are merged, so nothing is
+rewritten). Each run is rolled back to a savepoint; all seeded data is rolled
+back at the end.
+
+Usage:
+    python scripts/benchmark_po_generation.py [--lines 5000] [--vendors 20]
+"""
+import sys
+import argparse
+import time
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+# Add backend directory to path for imports
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import sessionmaker
+
+from app.database.session import engine
+from app.models.user import User, UserRole
+from app.models.country import Country
+from app.models.vendor import Vendor, VendorType
+from app.models.raw_material import RawMaterialMaster
+from app.models.pi import PI, PIStatus
+from app.models.eopa import EOPA, EOPAStatus
+from app.models.po import PurchaseOrder, POItem, POType, POStatus
+from app.services.po_service import POGenerationService
+from app.services.configuration_service import ConfigurationService
+
+
+class QueryCounter:
+    """Counts statements executed on a connection"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.count = 0
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.connection, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.connection, "before_cursor_execute", self._before_cursor_execute)
+
+
+def seed(db, line_count: int, vendor_count: int):
+    """Approved EOPA plus RM vendor groups (overrides format) covering line_count raw materials"""
+    user = User(username="bench_po_gen", email="bench_po_gen@example.com", hashed_password="x",
+                full_name="Bench PO Generation", role=UserRole.ADMIN)
+    country = Country(country_code="ZPG", country_name="Bench PO Gen Country", language="EN", currency="INR")
+    db.add_all([user, country])
+    db.flush()
+
+    partner = Vendor(vendor_code="BPG-PARTNER", vendor_name="Bench PO Gen Partner",
+                     vendor_type=VendorType.PARTNER, country_id=country.id)
+    vendors = [
+        Vendor(vendor_code=f"BPG-RM-{index:03d}", vendor_name=f"Bench RM Vendor {index}",
+               vendor_type=VendorType.RM, country_id=country.id)
+        for index in range(vendor_count)
+    ]
+    materials = [
+        RawMaterialMaster(rm_code=f"BPG-RM-{line:05d}", rm_name=f"Bench RM {line}", unit_of_measure="KG")
+        for line in range(line_count)
+    ]
+    db.add_all([partner, *vendors, *materials])
+    db.flush()
+
+    pi = PI(pi_number="PI/BENCH/POGEN", pi_date=date.today(), country_id=country.id,
+            partner_vendor_id=partner.id, total_amount=Decimal("0"), status=PIStatus.APPROVED,
+            created_by=user.id)
+    db.add(pi)
+    db.flush()
+    eopa = EOPA(eopa_number="EOPA/BENCH/POGEN", eopa_date=date.today(), pi_id=pi.id,
+                status=EOPAStatus.APPROVED, created_by=user.id)
+    db.add(eopa)
+    db.flush()
+
+    vendor_groups = [
+        {
+            "vendor_id": vendor.id,
+            "items": [
+                {"raw_material_id": material.id, "quantity": 10 + line % 90, "uom": "KG"}
+                for line, material in enumerate(materials) if line % vendor_count == index
+            ]
+        }
+        for index, vendor in enumerate(vendors)
+    ]
+    return eopa.id, user.id, vendor_groups
+
+
+def legacy_generate(db, eopa_id: int, user_id: int, vendor_groups):
+    """Per-object writes of the previous generation loop: add + flush per PO, add per item"""
+    for index, group in enumerate(vendor_groups):
+        po = PurchaseOrder(
+            po_number=f"PO/BENCH/LEGACY/{index:04d}", po_date=date.today(), po_type=POType.RM,
+            eopa_id=eopa_id, vendor_id=group["vendor_id"], status=POStatus.DRAFT,
+            total_ordered_qty=Decimal("0.00"), total_fulfilled_qty=Decimal("0.00"), created_by=user_id
+        )
+        db.add(po)
+        db.flush()  # Get PO ID
+
+        total_ordered_qty = Decimal("0.00")
+        for rm in group["items"]:
+            qty_required = Decimal(str(rm["quantity"]))
+            db.add(POItem(
+                po_id=po.id, raw_material_id=rm["raw_material_id"], medicine_id=None,
+                packing_material_id=None, ordered_quantity=float(qty_required),
+                fulfilled_quantity=0.0, unit=rm["uom"]
+            ))
+            total_ordered_qty += qty_required
+        po.total_ordered_qty = float(total_ordered_qty)
+    db.commit()
+
+
+def bulk_generate(db, eopa_id: int, user_id: int, vendor_groups):
+    # The request's config snapshot is resolved by the router, outside the generation
+    config = ConfigurationService(db).get_snapshot()
+    POGenerationService(db, config).generate_rm_pos_from_explosion(eopa_id, user_id, rm_po_overrides=vendor_groups)
+
+
+def po_item_totals(db, eopa_id: int):
+    """(POs, items, summed quantity) written for the EOPA"""
+    return db.query(
+        func.count(func.distinct(PurchaseOrder.id)), func.count(POItem.id), func.sum(POItem.ordered_quantity)
+    ).select_from(PurchaseOrder).join(POItem, POItem.po_id == PurchaseOrder.id).filter(
+        PurchaseOrder.eopa_id == eopa_id
+    ).one()
+
+
+def run(connection, strategy, eopa_id: int, user_id: int, vendor_groups, regenerate: bool = False):
+    """Time one strategy inside a savepoint that is rolled back afterwards"""
+    savepoint = connection.begin_nested()
+    db = sessionmaker(autoflush=False, bind=connection, join_transaction_mode="create_savepoint")()
+    try:
+        if regenerate:
+            strategy(db, eopa_id, user_id, vendor_groups)
+        with QueryCounter(connection) as counter:
+            start = time.perf_counter()
+            strategy(db, eopa_id, user_id, vendor_groups)
+            elapsed = time.perf_counter() - start
+        return counter.count, elapsed, tuple(po_item_totals(db, eopa_id))
+    finally:
+        db.close()
+        savepoint.rollback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk PO generation")
+    parser.add_argument("--lines", type=int, default=5000, help="RM PO lines to generate")
+    parser.add_argument("--vendors", type=int, default=20, help="RM vendors (one PO each)")
+    args = parser.parse_args()
+
+    connection = engine.connect()
+    transaction = connection.begin()
+    db = sessionmaker(autocommit=False, autoflush=False, bind=connection)()
+
+    print("=" * 72)
+    print(f"PO Generation Benchmark ({args.lines} lines, {args.vendors} vendors)")
+    print("=" * 72)
+    print(f"{'run':>12} | {'strategy':>8} | {'queries':>7} | {'time (ms)':>10} | {'POs':>4} | {'items':>6}")
+    print("-" * 72)
+
+    try:
+        eopa_id, user_id, vendor_groups = seed(db, args.lines, args.vendors)
+        db.flush()
+
+        results = {}
+        for label, strategy in (("orm", legacy_generate), ("bulk", bulk_generate)):
+            queries, elapsed, totals = run(connection, strategy, eopa_id, user_id, vendor_groups)
+            results[label] = totals
+            print(f"{'generate':>12} | {label:>8} | {queries:>7} | {elapsed * 1000:>10.1f} | {totals[0]:>4} | {totals[1]:>6}")
+
+        queries, elapsed, totals = run(connection, bulk_generate, eopa_id, user_id, vendor_groups, regenerate=True)
+        print(f"{'regenerate':>12} | {'bulk':>8} | {queries:>7} | {elapsed * 1000:>10.1f} | {totals[0]:>4} | {totals[1]:>6}")
+
+        if results["orm"][:2] != results["bulk"][:2] or Decimal(str(results["orm"][2])) != Decimal(str(results["bulk"][2])):
+            print(f"   ❌ Written POs differ between strategies: {results}")
+            sys.exit(1)
+    finally:
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+    print("-" * 72)
+    print("✅ Benchmark complete (seeded data rolled back)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Benchmark PO Loaders - hand-rolled joinedload chains vs loader profiles
+
+Seeds one PO with 500 line items (each with its own medicine), four approval
+users and a set of terms inside a transaction, then loads it with the joinedload
+chains the PO endpoints used before and with the matching loader profiles from
+app/services/po_loaders.py. Reports statements, rows fetched from the database
+and the median load time; all seeded data is rolled back at the end.
+
+Usage:
+    python scripts/benchmark_po_loaders.py [--items 500] [--terms 8] [--repeat 5]
+"""
+import sys
+import argparse
+import statistics
+import time
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+# Add backend directory to path for imports
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker, joinedload
+
+from app.database.session import engine
+from app.models.user import User, UserRole
+from app.models.country import Country
+from app.models.vendor import Vendor, VendorType
+from app.models.product import ProductMaster, MedicineMaster
+from app.models.pi import PI, PIStatus
+from app.models.eopa import EOPA, EOPAStatus
+from app.models.po import PurchaseOrder, POItem, POType, POStatus
+from app.models.po_terms import POTermsConditions
+from app.schemas.po import POResponse
+from app.services.po_loaders import po_loader_options
+
+
+# Options of GET /api/po/{po_id} and GET /api/po/{po_id}/download-pdf before loader profiles
+LEGACY_OPTIONS = {
+    "detail": [
+        joinedload(PurchaseOrder.vendor),
+        joinedload(PurchaseOrder.eopa),
+        joinedload(PurchaseOrder.items).joinedload(POItem.medicine),
+        joinedload(PurchaseOrder.items).joinedload(POItem.raw_material),
+        joinedload(PurchaseOrder.items).joinedload(POItem.packing_material)
+    ],
+    "pdf": [
+        joinedload(PurchaseOrder.vendor),
+        joinedload(PurchaseOrder.items).joinedload(POItem.medicine),
+        joinedload(PurchaseOrder.items).joinedload(POItem.raw_material),
+        joinedload(PurchaseOrder.items).joinedload(POItem.packing_material),
+        joinedload(PurchaseOrder.preparer),
+        joinedload(PurchaseOrder.checker),
+        joinedload(PurchaseOrder.approver),
+        joinedload(PurchaseOrder.verifier),
+        joinedload(PurchaseOrder.terms_conditions)
+    ],
+}
+
+
+class StatementRecorder:
+    """Records statements (with parameters) executed on a connection"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.statements = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.connection, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.connection, "before_cursor_execute", self._before_cursor_execute)
+
+    def rows_fetched(self) -> int:
+        """Re-run the recorded statements and count the rows they return"""
+        return sum(
+            len(self.connection.exec_driver_sql(statement, parameters).fetchall())
+            for statement, parameters in self.statements
+        )
+
+
+def seed_po(db, item_count: int, term_count: int) -> int:
+    """Create one FG PO with `item_count` items, approval users and `term_count` terms"""
+    users = [
+        User(username=f"bench_po_{role}", email=f"bench_po_{role}@example.com", hashed_password="x",
+             full_name=f"Bench {role.title()}", role=UserRole.ADMIN)
+        for role in ("preparer", "checker", "approver", "verifier")
+    ]
+    country = Country(country_code="ZPO", country_name="Bench PO Country", language="EN", currency="INR")
+    db.add_all([*users, country])
+    db.flush()
+
+    partner = Vendor(vendor_code="BPO-PARTNER", vendor_name="Bench PO Partner",
+                     vendor_type=VendorType.PARTNER, country_id=country.id)
+    manufacturer = Vendor(vendor_code="BPO-MFG", vendor_name="Bench PO Manufacturer",
+                          vendor_type=VendorType.MANUFACTURER, country_id=country.id)
+    product = ProductMaster(product_code="BPO-PROD", product_name="Bench PO Product", unit_of_measure="NOS")
+    db.add_all([partner, manufacturer, product])
+    db.flush()
+
+    pi = PI(pi_number="PI/BENCH/PO", pi_date=date.today(), country_id=country.id,
+            partner_vendor_id=partner.id, total_amount=Decimal("0"), status=PIStatus.APPROVED,
+            created_by=users[0].id)
+    db.add(pi)
+    db.flush()
+    eopa = EOPA(eopa_number="EOPA/BENCH/PO", eopa_date=date.today(), pi_id=pi.id,
+                status=EOPAStatus.APPROVED, created_by=users[0].id)
+    db.add(eopa)
+    db.flush()
+
+    po = PurchaseOrder(
+        po_number="PO/FG/BENCH/0001", po_date=date.today(), po_type=POType.FG, eopa_id=eopa.id,
+        vendor_id=manufacturer.id, status=POStatus.APPROVED, created_by=users[0].id,
+        prepared_by=users[0].id, checked_by=users[1].id, approved_by=users[2].id, verified_by=users[3].id
+    )
+    db.add(po)
+    db.flush()
+
+    medicines = [
+        MedicineMaster(medicine_code=f"BPO-MED-{line:05d}", medicine_name=f"Bench PO Medicine {line}",
+                       product_id=product.id, dosage_form="Tablet", hsn_code="30049099")
+        for line in range(item_count)
+    ]
+    db.add_all(medicines)
+    db.flush()
+
+    db.add_all([
+        POItem(po_id=po.id, medicine_id=medicine.id, ordered_quantity=Decimal("1000"),
+               fulfilled_quantity=Decimal("0"), unit="Boxes", hsn_code="30049099", gst_rate=Decimal("12.00"))
+        for medicine in medicines
+    ])
+    db.add_all([
+        POTermsConditions(po_id=po.id, term_text=f"Bench term {index + 1}", priority=index)
+        for index in range(term_count)
+    ])
+    db.flush()
+    return po.id
+
+
+def run_load(db, connection, po_id: int, options, repeat: int):
+    """Median load time over `repeat` cold loads, plus statements and rows of one load"""
+    timings = []
+    for _ in range(repeat):
+        db.expunge_all()
+        start = time.perf_counter()
+        po = db.query(PurchaseOrder).options(*options).filter(PurchaseOrder.id == po_id).first()
+        timings.append(time.perf_counter() - start)
+
+    db.expunge_all()
+    with StatementRecorder(connection) as recorder:
+        po = db.query(PurchaseOrder).options(*options).filter(PurchaseOrder.id == po_id).first()
+    return po, len(recorder.statements), recorder.rows_fetched(), statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PO eager-loading strategies")
+    parser.add_argument("--items", type=int, default=500, help="Line items on the PO")
+    parser.add_argument("--terms", type=int, default=8, help="Terms & conditions on the PO")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed loads per strategy")
+    args = parser.parse_args()
+
+    connection = engine.connect()
+    transaction = connection.begin()
+    db = sessionmaker(autocommit=False, autoflush=False, bind=connection)()
+
+    print("=" * 76)
+    print(f"PO Loader Benchmark ({args.items} items, {args.terms} terms)")
+    print("=" * 76)
+    print(f"{'profile':>8} | {'strategy':>10} | {'queries':>7} | {'rows':>8} | {'time (ms)':>10} | same items")
+    print("-" * 76)
+
+    try:
+        po_id = seed_po(db, args.items, args.terms)
+
+        for profile in ("detail", "pdf"):
+            legacy, legacy_queries, legacy_rows, legacy_time = run_load(
+                db, connection, po_id, LEGACY_OPTIONS[profile], args.repeat
+            )
+            legacy_items = sorted(item.id for item in legacy.items)
+            current, queries, rows, elapsed = run_load(
+                db, connection, po_id, po_loader_options(profile), args.repeat
+            )
+            identical = legacy_items == sorted(item.id for item in current.items)
+            if profile == "detail":
+                POResponse.model_validate(current)  # serializable without further loads
+
+            print(f"{profile:>8} | {'joinedload':>10} | {legacy_queries:>7} | {legacy_rows:>8} | {legacy_time * 1000:>10.1f} |")
+            print(f"{profile:>8} | {'profile':>10} | {queries:>7} | {rows:>8} | {elapsed * 1000:>10.1f} | {identical}")
+
+            if not identical:
+                print("   ❌ Loaded items differ between strategies")
+                sys.exit(1)
+    finally:
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+    print("-" * 76)
+    print("✅ Benchmark complete (seeded data rolled back)")
+
+
+if __name__ == "__main__":
+    main()
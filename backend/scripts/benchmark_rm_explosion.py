@@ -0,0 +1,177 @@
+"""
+Benchmark RM Explosion - per-item vs set-based BOM loading
+
+Seeds synthetic EOPAs with 10, 100 and 1000 line items inside a transaction,
+runs RMExplosionService in both modes, verifies that the output is identical
+and reports the number of SQL statements and elapsed time for each run.
+All seeded data is rolled back at the end.
+
+Usage:
+    python scripts/benchmark_rm_explosion.py [--sizes 10 100 1000] [--bom-size 4]
+"""
+import sys
+import argparse
+import time
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+# Add backend directory to path for imports
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.database.session import engine
+from app.models.user import User, UserRole
+from app.models.country import Country
+from app.models.vendor import Vendor, VendorType
+from app.models.product import ProductMaster, MedicineMaster
+from app.models.raw_material import RawMaterialMaster, MedicineRawMaterial
+from app.models.pi import PI, PIItem, PIStatus
+from app.models.eopa import EOPA, EOPAItem, EOPAStatus
+from app.services.rm_explosion_service import RMExplosionService
+
+
+class QueryCounter:
+    """Counts statements executed on a connection"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.count = 0
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.connection, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.connection, "before_cursor_execute", self._before_cursor_execute)
+
+
+def seed_eopa(db, index: int, line_count: int, bom_size: int) -> int:
+    """Create one EOPA with `line_count` lines, each medicine having `bom_size` raw materials"""
+    tag = f"b{index}"
+    user = User(
+        username=f"bench_{tag}",
+        email=f"bench_{tag}@example.com",
+        hashed_password="x",
+        full_name="Benchmark User",
+        role=UserRole.ADMIN
+    )
+    country = Country(country_code=f"Z{index:02d}", country_name=f"Bench {tag}", language="EN", currency="INR")
+    db.add_all([user, country])
+    db.flush()
+
+    partner = Vendor(vendor_code=f"BP-{tag}", vendor_name=f"Bench Partner {tag}",
+                     vendor_type=VendorType.PARTNER, country_id=country.id)
+    rm_vendors = [
+        Vendor(vendor_code=f"BRM-{tag}-{i}", vendor_name=f"Bench RM Vendor {tag} {i}",
+               vendor_type=VendorType.RM, country_id=country.id)
+        for i in range(5)
+    ]
+    product = ProductMaster(product_code=f"BPROD-{tag}", product_name="Bench Product", unit_of_measure="NOS")
+    db.add_all([partner, product, *rm_vendors])
+    db.flush()
+
+    # Shared raw material catalogue so that consolidation is exercised
+    raw_materials = [
+        RawMaterialMaster(rm_code=f"BRM-{tag}-{i:04d}", rm_name=f"Bench RM {i}", unit_of_measure="KG",
+                          default_vendor_id=rm_vendors[i % len(rm_vendors)].id, gst_rate=Decimal("18.00"))
+        for i in range(max(bom_size * 10, 20))
+    ]
+    db.add_all(raw_materials)
+    db.flush()
+
+    pi = PI(pi_number=f"PI/BENCH/{tag}", pi_date=date.today(), country_id=country.id,
+            partner_vendor_id=partner.id, total_amount=Decimal("0"), status=PIStatus.APPROVED,
+            created_by=user.id)
+    db.add(pi)
+    db.flush()
+
+    eopa = EOPA(eopa_number=f"EOPA/BENCH/{tag}", eopa_date=date.today(), pi_id=pi.id,
+                status=EOPAStatus.APPROVED, created_by=user.id)
+    db.add(eopa)
+    db.flush()
+
+    for line in range(line_count):
+        medicine = MedicineMaster(medicine_code=f"BMED-{tag}-{line:05d}", medicine_name=f"Bench Medicine {line}",
+                                  product_id=product.id, dosage_form="Tablet")
+        db.add(medicine)
+        db.flush()
+
+        for b in range(bom_size):
+            db.add(MedicineRawMaterial(
+                medicine_id=medicine.id,
+                raw_material_id=raw_materials[(line + b) % len(raw_materials)].id,
+                qty_required_per_unit=Decimal("0.0050"),
+                uom="KG",
+                wastage_percentage=Decimal("2.00")
+            ))
+
+        pi_item = PIItem(pi_id=pi.id, medicine_id=medicine.id, quantity=Decimal("1000"),
+                         unit_price=Decimal("1.00"), total_price=Decimal("1000.00"))
+        db.add(pi_item)
+        db.flush()
+        db.add(EOPAItem(eopa_id=eopa.id, pi_item_id=pi_item.id, quantity=Decimal("1000"),
+                        estimated_unit_price=Decimal("1.00"), estimated_total=Decimal("1000.00"),
+                        created_by=user.id))
+
+    db.flush()
+    return eopa.id
+
+
+def run_explosion(db, connection, eopa_id: int, set_based: bool):
+    db.expire_all()
+    service = RMExplosionService(db)
+    with QueryCounter(connection) as counter:
+        start = time.perf_counter()
+        result = service.explode_eopa_to_raw_materials(eopa_id, set_based=set_based, use_cache=False)
+        elapsed = time.perf_counter() - start
+    return result, counter.count, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RM explosion query counts")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--bom-size", type=int, default=4, help="Raw materials per medicine")
+    args = parser.parse_args()
+
+    connection = engine.connect()
+    transaction = connection.begin()
+    db = sessionmaker(autocommit=False, autoflush=False, bind=connection)()
+
+    print("=" * 72)
+    print("RM Explosion Benchmark (per-item vs set-based BOM loading)")
+    print("=" * 72)
+    print(f"{'EOPA lines':>10} | {'mode':>10} | {'queries':>8} | {'time (ms)':>10} | identical")
+    print("-" * 72)
+
+    try:
+        for index, size in enumerate(args.sizes):
+            eopa_id = seed_eopa(db, index, size, args.bom_size)
+
+            legacy, legacy_queries, legacy_time = run_explosion(db, connection, eopa_id, set_based=False)
+            bulk, bulk_queries, bulk_time = run_explosion(db, connection, eopa_id, set_based=True)
+            identical = legacy == bulk
+
+            print(f"{size:>10} | {'per-item':>10} | {legacy_queries:>8} | {legacy_time * 1000:>10.1f} |")
+            print(f"{size:>10} | {'set-based':>10} | {bulk_queries:>8} | {bulk_time * 1000:>10.1f} | {identical}")
+
+            if not identical:
+                print("   ❌ Output mismatch between modes")
+                sys.exit(1)
+    finally:
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+    print("-" * 72)
+    print("✅ Benchmark complete (seeded data rolled back)")
+
+
+if __name__ == "__main__":
+    main()
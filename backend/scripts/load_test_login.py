@@ -0,0 +1,130 @@
+"""
+Load Test - latency of other endpoints during a login burst
+
+Logs in once to obtain a token, measures a baseline of an authenticated probe
+endpoint, then fires a burst of concurrent logins while probing continuously and
+reports probe latency percentiles for both phases. With bcrypt on the event loop
+every login stalls the worker for ~250 ms and the probe p99 during the burst grows
+with the number of logins; with the password worker pool it stays close to the
+baseline.
+
+Requires a running backend (uvicorn / gunicorn) and an existing user.
+
+Usage:
+    python scripts/load_test_login.py [--base-url http://localhost:8000] [--logins 200]
+        [--username admin] [--password admin123] [--probe-path /api/users/me]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+
+
+def percentile(samples, pct):
+    """pct-th percentile (nearest rank) of samples in milliseconds"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def report(label, samples):
+    print(
+        f"  {label:<10} n={len(samples):<5} "
+        f"p50={percentile(samples, 50):8.1f} ms  "
+        f"p95={percentile(samples, 95):8.1f} ms  "
+        f"p99={percentile(samples, 99):8.1f} ms  "
+        f"max={max(samples, default=0):8.1f} ms"
+    )
+
+
+async def login(client, username, password):
+    response = await client.post("/api/auth/login", json={"username": username, "password": password})
+    return response
+
+
+async def probe_until(client, path, headers, stop: asyncio.Event, interval):
+    """Request path repeatedly until stop is set; return latencies in ms"""
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            print(f"  probe returned {response.status_code}: {response.text[:200]}")
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.logins + 10, max_keepalive_connections=args.logins + 10)
+    timeout = httpx.Timeout(120.0)
+
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+        response = await login(client, args.username, args.password)
+        if response.status_code != 200:
+            print(f"Initial login failed ({response.status_code}): {response.text[:200]}")
+            return 1
+        headers = {"Authorization": f"Bearer {response.json()['data']['access_token']}"}
+
+        print("=" * 70)
+        print(f"LOGIN BURST LOAD TEST: {args.logins} logins, probe {args.probe_path}")
+        print("=" * 70)
+
+        # Baseline
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_until(client, args.probe_path, headers, stop, args.probe_interval))
+        await asyncio.sleep(args.baseline_seconds)
+        stop.set()
+        baseline = await probe
+
+        # Burst
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_until(client, args.probe_path, headers, stop, args.probe_interval))
+        started = time.perf_counter()
+        responses = await asyncio.gather(
+            *(login(client, args.username, args.password) for _ in range(args.logins)),
+            return_exceptions=True
+        )
+        burst_seconds = time.perf_counter() - started
+        stop.set()
+        during_burst = await probe
+
+    failures = [r for r in responses if isinstance(r, Exception) or r.status_code != 200]
+
+    print(f"Logins: {args.logins - len(failures)} ok, {len(failures)} failed "
+          f"in {burst_seconds:.2f}s ({args.logins / burst_seconds:.1f}/s)")
+    print(f"Probe latency ({args.probe_path}):")
+    report("baseline", baseline)
+    report("burst", during_burst)
+    if baseline and during_burst:
+        ratio = percentile(during_burst, 99) / max(percentile(baseline, 99), 0.001)
+        print(f"  p99 during burst is {ratio:.1f}x baseline (median baseline {statistics.median(baseline):.1f} ms)")
+
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe latency during a burst of logins")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--probe-path", default="/api/users/me")
+    parser.add_argument("--probe-interval", type=float, default=0.01, help="Seconds between probes")
+    parser.add_argument("--baseline-seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    try:
+        sys.exit(asyncio.run(run(args)))
+    except httpx.ConnectError:
+        print(f"❌ ERROR: Cannot connect to backend server at {args.base_url}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
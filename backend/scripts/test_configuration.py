@@ -10,7 +10,8 @@ backend_dir = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(backend_dir))
 
 from app.database.session import SessionLocal
-from app.services.configuration_service import ConfigurationService
+from app.services.configuration_service import ConfigurationService, config_store
+from datetime import datetime
 import time
 
 def test_config_service():
@@ -84,11 +85,11 @@ def test_config_service():
     
     # Test 8: Cache age
     print("\n8️⃣  Cache status:")
-    if service._cache_timestamp:
-        age = (time.time() - service._cache_timestamp.timestamp())
+    if config_store.loaded_at:
+        age = (datetime.utcnow() - config_store.loaded_at).total_seconds()
         print(f"   ⏰ Cache age: {age:.2f} seconds")
-        print(f"   ♻️  Cache TTL: {service._cache_ttl_minutes * 60} seconds")
-        print(f"   📊 Cached items: {len(service._cache)}")
+        print(f"   ♻️  Cache TTL: {config_store.ttl.total_seconds():.0f} seconds")
+        print(f"   📊 Cached items: {len(config_store)}")
     
     print("\n" + "=" * 60)
     print("✅ All tests passed!")
@@ -6,22 +6,28 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
+from contextlib import contextmanager
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 import os
 
 from app.main import app
-from app.database.session import get_db
+from app.database.session import get_db, get_async_db, get_read_db
 from app.models.base import Base
 from app.models.user import User, UserRole
 from app.models.vendor import Vendor, VendorType
 from app.models.product import MedicineMaster, ProductMaster
+from app.models.raw_material import RawMaterialMaster, MedicineRawMaterial
+from app.models.packing_material import PackingMaterialMaster, MedicinePackingMaterial
 from app.models.country import Country
 from app.models.pi import PI, PIItem, PIStatus
 from app.models.eopa import EOPA, EOPAStatus
 from app.models.po import PurchaseOrder, POItem, POType, POStatus
 from app.models.invoice import VendorInvoice, VendorInvoiceItem, InvoiceType, InvoiceStatus
 from app.auth.utils import hash_password
+from app.services.configuration_service import config_store
+from app.auth.principal_cache import principal_cache
+from app.database.query_stats import count_queries
 
 
 # ============================================================================
@@ -70,7 +76,11 @@ def test_db(test_engine):
     
     # Truncate all tables before each test for clean state
     with db.begin_nested():
-        db.execute(text("TRUNCATE TABLE warehouse_grn, dispatch_advice, material_receipts, vendor_invoice_items, vendor_invoices, po_items, po_terms_conditions, purchase_orders, eopa_items, eopa, pi_items, pi, medicine_master, product_master, vendors, countries, users, system_configuration RESTART IDENTITY CASCADE"))
+        db.execute(text("TRUNCATE TABLE warehouse_grn, dispatch_advice, material_receipts, vendor_invoice_items, vendor_invoices, po_items, po_terms_conditions, purchase_orders, eopa_items, eopa, pi_items, pi, medicine_master, product_master, vendors, countries, users, system_configuration, document_sequences RESTART IDENTITY CASCADE"))
+    
+    # Process-wide caches must not leak values between tests
+    config_store.invalidate()
+    principal_cache.clear()
     
     try:
         yield db
@@ -81,6 +91,19 @@ def test_db(test_engine):
         connection.close()
 
 
+class SyncSessionRunner:
+    """
+    Stands in for AsyncSession in tests: read endpoints only use run_sync, which
+    here runs on the shared test session so they see the test transaction
+    """
+    
+    def __init__(self, session):
+        self.session = session
+    
+    async def run_sync(self, fn, *args, **kwargs):
+        return fn(self.session, *args, **kwargs)
+
+
 @pytest.fixture(scope="function")
 def test_client(test_db):
     """Create FastAPI test client with test database"""
@@ -90,7 +113,12 @@ def test_client(test_db):
         finally:
             pass
     
+    async def override_get_async_db():
+        yield SyncSessionRunner(test_db)
+    
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_read_db] = override_get_async_db
     client = TestClient(app)
     yield client
     app.dependency_overrides.clear()
@@ -363,6 +391,23 @@ def medicine_amoxicillin(test_db, manufacturer_vendor, rm_vendor, pm_vendor):
     return medicine
 
 
+@pytest.fixture
+def paracetamol_bom(test_db, medicine_paracetamol, rm_vendor, pm_vendor):
+    """One RM line (0.5 KG per unit) and one PM line (1 PCS per unit) for Paracetamol"""
+    raw_material = RawMaterialMaster(rm_code="RM-PCM", rm_name="Paracetamol API", unit_of_measure="KG")
+    packing_material = PackingMaterialMaster(pm_code="PM-LBL", pm_name="Label", unit_of_measure="PCS")
+    test_db.add_all([raw_material, packing_material])
+    test_db.flush()
+    test_db.add_all([
+        MedicineRawMaterial(medicine_id=medicine_paracetamol.id, raw_material_id=raw_material.id,
+                            vendor_id=rm_vendor.id, qty_required_per_unit=Decimal("0.5"), uom="KG"),
+        MedicinePackingMaterial(medicine_id=medicine_paracetamol.id, packing_material_id=packing_material.id,
+                                vendor_id=pm_vendor.id, qty_required_per_unit=Decimal("1"), uom="PCS")
+    ])
+    test_db.commit()
+    return raw_material, packing_material
+
+
 # ============================================================================
 # PI FIXTURES
 # ============================================================================
@@ -486,6 +531,22 @@ def sample_fg_po(test_db, sample_eopa, manufacturer_vendor, medicine_paracetamol
 # HELPER FUNCTIONS
 # ============================================================================
 
+@pytest.fixture
+def query_budget(test_db):
+    """
+    Assert the number of SQL statements a block runs on the test database
+
+        with query_budget(5) as stats:
+            test_client.get("/api/po/", headers=admin_headers)
+    """
+    @contextmanager
+    def _budget(max_queries):
+        with count_queries(test_db.connection()) as stats:
+            yield stats
+        assert stats.count <= max_queries, f"query budget {max_queries} exceeded: {stats.report()}"
+    return _budget
+
+
 @pytest.fixture
 def create_pi_payload(partner_vendor, medicine_paracetamol, india_country):
     """Factory for creating PI request payload"""
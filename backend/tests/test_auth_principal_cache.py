@@ -0,0 +1,70 @@
+"""
+Unit Tests for Authentication Principal Cache
+Tests: cached authorization without user queries, invalidation on role / active changes
+"""
+import pytest
+from sqlalchemy import event
+
+from app.models.user import UserRole
+from app.auth.principal_cache import principal_cache
+
+
+def _count_user_queries(db, fn):
+    """Run fn() and return (result, number of SQL statements hitting the users table)"""
+    statements = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    connection = db.connection()
+    event.listen(connection, "before_cursor_execute", _before_cursor_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(connection, "before_cursor_execute", _before_cursor_execute)
+    return result, len([s for s in statements if "FROM users" in s])
+
+
+class TestPrincipalCache:
+    """Test cached resolution of authenticated users"""
+
+    @pytest.mark.unit
+    @pytest.mark.auth
+    def test_second_request_skips_user_query(self, test_client, test_db, admin_headers):
+        """Only the first authenticated request loads the user row"""
+        test_client.get("/api/users/me", headers=admin_headers)
+
+        response, user_queries = _count_user_queries(
+            test_db,
+            lambda: test_client.get("/api/users/me", headers=admin_headers)
+        )
+
+        assert response.status_code == 200
+        assert response.json()["data"]["role"] == "ADMIN"
+        assert user_queries == 0
+        assert principal_cache.get("admin") is not None
+
+    @pytest.mark.unit
+    @pytest.mark.auth
+    def test_role_change_invalidates(self, test_client, test_db, admin_user, admin_headers):
+        """A role change takes effect on the next request"""
+        assert test_client.get("/api/users/", headers=admin_headers).status_code == 200
+
+        admin_user.role = UserRole.WAREHOUSE_MANAGER
+        test_db.commit()
+
+        response = test_client.get("/api/users/", headers=admin_headers)
+        assert response.status_code == 403
+
+    @pytest.mark.unit
+    @pytest.mark.auth
+    def test_deactivation_invalidates(self, test_client, test_db, admin_user, admin_headers):
+        """A deactivated user is rejected even if previously cached"""
+        assert test_client.get("/api/users/me", headers=admin_headers).status_code == 200
+
+        admin_user.is_active = False
+        test_db.commit()
+
+        response = test_client.get("/api/users/me", headers=admin_headers)
+        assert response.status_code == 403
+        assert principal_cache.get("admin") is None
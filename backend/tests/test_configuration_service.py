@@ -0,0 +1,183 @@
+"""
+Unit Tests for Configuration Service
+Tests: process-wide config cache, write invalidation, cross-worker version check,
+request config snapshot
+"""
+import pytest
+from datetime import datetime, timedelta
+from pydantic import ValidationError
+from sqlalchemy import event, update
+
+from app.models.configuration import SystemConfiguration
+from app.services.configuration_service import ConfigurationService, config_store
+from app.services.pdf_service import POPDFService
+from app.utils.number_generator import generate_pi_number, generate_po_number
+from app.exceptions.base import AppException
+
+
+def _count_queries(db, fn):
+    """Run fn() and return (result, number of SQL statements executed)"""
+    statements = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    connection = db.connection()
+    event.listen(connection, "before_cursor_execute", _before_cursor_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(connection, "before_cursor_execute", _before_cursor_execute)
+    return result, len(statements)
+
+
+@pytest.fixture
+def fiscal_year_config(test_db):
+    """Create fiscal_year configuration"""
+    config = SystemConfiguration(
+        config_key="fiscal_year",
+        config_value={"value": "25-26"},
+        category="system"
+    )
+    test_db.add(config)
+    test_db.commit()
+    return config
+
+
+class TestConfigurationCache:
+    """Test process-wide configuration cache"""
+
+    @pytest.mark.unit
+    def test_cache_shared_between_instances(self, test_db, fiscal_year_config):
+        """A second service instance reads from the shared cache without a query"""
+        ConfigurationService(test_db).get_config("fiscal_year")
+
+        value, query_count = _count_queries(
+            test_db,
+            lambda: ConfigurationService(test_db).get_config("fiscal_year")
+        )
+
+        assert value == {"value": "25-26"}
+        assert query_count == 0
+
+    @pytest.mark.unit
+    def test_missing_key_served_from_cache(self, test_db, fiscal_year_config):
+        """Missing keys (defaults path) do not hit the database either"""
+        service = ConfigurationService(test_db)
+        service.get_config("fiscal_year")
+
+        numbering, query_count = _count_queries(test_db, service.get_document_numbering)
+
+        assert numbering["pi_format"] == "PI/{FY}/{SEQ:04d}"
+        assert query_count == 0
+
+        with pytest.raises(AppException) as exc_info:
+            service.get_config("does_not_exist")
+        assert exc_info.value.error_code == "ERR_CONFIG_NOT_FOUND"
+
+    @pytest.mark.unit
+    def test_update_config_invalidates(self, test_db, fiscal_year_config):
+        """update_config is visible immediately in the same worker"""
+        service = ConfigurationService(test_db)
+        service.get_config("fiscal_year")
+
+        service.update_config("fiscal_year", value={"value": "26-27"})
+
+        assert ConfigurationService(test_db).get_config("fiscal_year") == {"value": "26-27"}
+
+    @pytest.mark.unit
+    def test_change_from_other_worker_detected(self, test_db, fiscal_year_config, monkeypatch):
+        """A write by another worker is picked up after the version check interval"""
+        service = ConfigurationService(test_db)
+        service.get_config("fiscal_year")
+
+        # Core UPDATE: no local invalidation, as if written by another worker
+        test_db.execute(
+            update(SystemConfiguration.__table__)
+            .where(SystemConfiguration.config_key == "fiscal_year")
+            .values(config_value={"value": "27-28"}, updated_at=datetime.utcnow())
+        )
+        test_db.commit()
+
+        assert service.get_config("fiscal_year") == {"value": "25-26"}
+
+        monkeypatch.setattr(config_store, "check_interval", timedelta(0))
+        assert service.get_config("fiscal_year") == {"value": "27-28"}
+
+    @pytest.mark.unit
+    def test_returned_values_are_copies(self, test_db, fiscal_year_config):
+        """Mutating a returned value does not corrupt the shared cache"""
+        service = ConfigurationService(test_db)
+        service.get_config("fiscal_year")["value"] = "mutated"
+
+        assert service.get_config("fiscal_year") == {"value": "25-26"}
+
+
+class TestConfigSnapshot:
+    """Test the immutable per-request configuration snapshot"""
+
+    @pytest.fixture
+    def company_config(self, test_db):
+        """Create company, currency and numbering configuration"""
+        test_db.add_all([
+            SystemConfiguration(config_key="company_name", config_value={"value": "Acme Pharma"}, category="system"),
+            SystemConfiguration(
+                config_key="company_address",
+                config_value={
+                    "street": "1 Lab Road", "city": "Pune", "state": "MH", "zip": "411001",
+                    "phone": "+91 20 5555 0000", "gst": "27AAAAA0000A1Z5"
+                },
+                category="system"
+            ),
+            SystemConfiguration(config_key="default_currency", config_value={"value": "USD"}, category="system"),
+            SystemConfiguration(
+                config_key="document_numbering",
+                config_value={"pi_format": "PINV/{FY}/{SEQ:04d}"},
+                category="system"
+            ),
+        ])
+        test_db.commit()
+
+    @pytest.mark.unit
+    def test_snapshot_reads_configuration(self, test_db, fiscal_year_config, company_config):
+        """Snapshot resolves company, currency, fiscal year and numbering with defaults"""
+        snapshot = ConfigurationService(test_db).get_snapshot()
+
+        assert snapshot.fiscal_year == "25-26"
+        assert snapshot.company.name == "Acme Pharma"
+        assert snapshot.company.address == "1 Lab Road"
+        assert snapshot.company.city == "Pune, MH 411001"
+        assert snapshot.company.email is None
+        assert snapshot.currency_code == "USD"
+        assert snapshot.currency_symbol == "$"
+        assert snapshot.numbering.pi_format == "PINV/{FY}/{SEQ:04d}"
+        assert snapshot.numbering.eopa_format == "EOPA/{FY}/{SEQ:04d}"
+
+        with pytest.raises(ValidationError):
+            snapshot.fiscal_year = "26-27"
+
+    @pytest.mark.unit
+    def test_consumers_do_not_query_configuration(self, test_db, fiscal_year_config, company_config):
+        """Number generators and PDF services use the snapshot instead of config lookups"""
+        snapshot = ConfigurationService(test_db).get_snapshot()
+        config_store.invalidate()
+
+        statements = []
+
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        connection = test_db.connection()
+        event.listen(connection, "before_cursor_execute", _before_cursor_execute)
+        try:
+            pi_number = generate_pi_number(test_db, snapshot)
+            po_number = generate_po_number(test_db, "RM", config=snapshot)
+            pdf_service = POPDFService(test_db, snapshot)
+        finally:
+            event.remove(connection, "before_cursor_execute", _before_cursor_execute)
+
+        assert pi_number == "PINV/25-26/0001"
+        assert po_number == "PO/25-26/RM/DRAFT/0001"
+        assert pdf_service.COMPANY_NAME == "Acme Pharma"
+        assert pdf_service.CURRENCY_SYMBOL == "$"
+        assert not [s for s in statements if "system_configuration" in s]
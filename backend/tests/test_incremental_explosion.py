@@ -0,0 +1,235 @@
+"""
+Unit Tests for Incremental EOPA Re-explosion
+Tests: quantity deltas applied to DRAFT FG/RM/PM PO items, removal and insertion of items, validation
+"""
+import pytest
+from decimal import Decimal
+
+from app.exceptions.base import AppException
+from app.models.eopa import EOPA, EOPAItem, EOPAStatus
+from app.models.packing_material import MedicinePackingMaterial
+from app.models.pi import PIItem
+from app.models.po import PurchaseOrder, POType, POStatus
+from app.models.product import MedicineMaster
+from app.models.raw_material import MedicineRawMaterial
+from app.services.incremental_explosion import apply_eopa_quantity_changes
+from app.services.po_service import POGenerationService
+
+
+def _generate_pos(test_db, sample_eopa, admin_user):
+    """FG/RM/PM DRAFT POs of sample_eopa (1000 units → FG 1000, RM 500 KG, PM 1000 PCS)"""
+    POGenerationService(test_db).generate_pos_from_eopa(sample_eopa.id, admin_user.id)
+    test_db.commit()
+    return {po.po_type: po for po in test_db.query(PurchaseOrder).filter(PurchaseOrder.eopa_id == sample_eopa.id)}
+
+
+def _ordered(test_db, po):
+    test_db.refresh(po)
+    return [item.ordered_quantity for item in po.items], po.total_ordered_qty
+
+
+def _add_second_medicine(test_db, sample_eopa, medicine_paracetamol, paracetamol_bom, admin_user):
+    """Second medicine of the same manufacturer on sample_eopa (500 units, 0.25 KG RM and 1 PCS PM per unit)"""
+    raw_material, packing_material = paracetamol_bom
+    medicine = MedicineMaster(
+        medicine_code="MED-IBU", medicine_name="Ibuprofen 400mg Tablets",
+        product_id=medicine_paracetamol.product_id, dosage_form="Tablet",
+        manufacturer_vendor_id=medicine_paracetamol.manufacturer_vendor_id,
+        rm_vendor_id=medicine_paracetamol.rm_vendor_id, pm_vendor_id=medicine_paracetamol.pm_vendor_id,
+        is_active=True
+    )
+    test_db.add(medicine)
+    test_db.flush()
+    pi_item = PIItem(pi_id=sample_eopa.pi_id, medicine_id=medicine.id, quantity=Decimal("500"),
+                     unit_price=Decimal("20"), total_price=Decimal("10000"))
+    test_db.add_all([
+        pi_item,
+        MedicineRawMaterial(medicine_id=medicine.id, raw_material_id=raw_material.id,
+                            vendor_id=medicine.rm_vendor_id, qty_required_per_unit=Decimal("0.25"), uom="KG"),
+        MedicinePackingMaterial(medicine_id=medicine.id, packing_material_id=packing_material.id,
+                                vendor_id=medicine.pm_vendor_id, qty_required_per_unit=Decimal("1"), uom="PCS")
+    ])
+    test_db.flush()
+    eopa_item = EOPAItem(eopa_id=sample_eopa.id, pi_item_id=pi_item.id, quantity=Decimal("500"),
+                         estimated_unit_price=Decimal("20"), estimated_total=Decimal("10000"),
+                         created_by=admin_user.id)
+    test_db.add(eopa_item)
+    test_db.commit()
+    return medicine, eopa_item
+
+
+class TestApplyQuantityChanges:
+    """Test applying EOPA item quantity deltas to DRAFT POs"""
+
+    @pytest.mark.unit
+    @pytest.mark.eopa
+    def test_delta_applied_to_each_po(self, test_db, sample_eopa, admin_user, paracetamol_bom):
+        """Test 1000 → 1200 units adds 200 FG, 100 KG RM and 200 PCS PM"""
+        pos = _generate_pos(test_db, sample_eopa, admin_user)
+        [eopa_item] = sample_eopa.items
+
+        result = apply_eopa_quantity_changes(test_db, sample_eopa, {eopa_item.id: Decimal("1200")})
+        test_db.commit()
+
+        assert result["eopa_items_changed"] == 1
+        assert result["po_items_updated"] == 3
+        assert result["po_ids"] == sorted(po.id for po in pos.values())
+        assert result["unmatched"] == []
+
+        assert _ordered(test_db, pos[POType.FG]) == ([Decimal("1200")], Decimal("1200"))
+        assert _ordered(test_db, pos[POType.RM]) == ([Decimal("600")], Decimal("600"))
+        assert _ordered(test_db, pos[POType.PM]) == ([Decimal("1200")], Decimal("1200"))
+
+        test_db.refresh(eopa_item)
+        assert eopa_item.quantity == Decimal("1200")
+        assert eopa_item.estimated_total == Decimal("60000")
+
+    @pytest.mark.unit
+    @pytest.mark.eopa
+    def test_fg_po_per_medicine(self, test_db, sample_eopa, admin_user, medicine_paracetamol, paracetamol_bom):
+        """Test a manufacturer's second medicine changes its own FG PO, not the first medicine's"""
+        medicine, eopa_item = _add_second_medicine(test_db, sample_eopa, medicine_paracetamol, paracetamol_bom, admin_user)
+        POGenerationService(test_db).generate_pos_from_eopa(sample_eopa.id, admin_user.id)
+        test_db.commit()
+        fg_pos = test_db.query(PurchaseOrder).filter(PurchaseOrder.po_type == POType.FG).order_by(PurchaseOrder.id).all()
+        assert len({po.vendor_id for po in fg_pos}) == 1
+        fg_by_medicine = {po.items[0].medicine_id: po for po in fg_pos}
+        rm_po = test_db.query(PurchaseOrder).filter(PurchaseOrder.po_type == POType.RM).one()
+
+        result = apply_eopa_quantity_changes(test_db, sample_eopa, {eopa_item.id: Decimal("800")})
+        test_db.commit()
+
+        assert (result["po_items_updated"], result["po_items_inserted"], result["unmatched"]) == (3, 0, [])
+        assert _ordered(test_db, fg_by_medicine[medicine.id]) == ([Decimal("800")], Decimal("800"))
+        assert _ordered(test_db, fg_by_medicine[medicine_paracetamol.id]) == ([Decimal("1000")], Decimal("1000"))
+        assert _ordered(test_db, rm_po) == ([Decimal("700")], Decimal("700"))  # 500 + 800 × 0.25
+
+    @pytest.mark.unit
+    @pytest.mark.eopa
+    def test_manual_edits_kept_and_removed_items_reinserted(self, test_db, sample_eopa, admin_user, paracetamol_bom):
+        """Test the delta is added to a hand-edited quantity and a removed material comes back as generated"""
+        _, packing_material = paracetamol_bom
+        packing_material.hsn_code = "48191010"
+        packing_material.gst_rate = Decimal("12.00")
+        packing_material.language = "EN"
+        pos = _generate_pos(test_db, sample_eopa, admin_user)
+        [rm_item] = pos[POType.RM].items
+        rm_item.ordered_quantity = Decimal("550")
+        [pm_item] = pos[POType.PM].items
+        test_db.delete(pm_item)
+        test_db.commit()
+        [eopa_item] = sample_eopa.items
+
+        result = apply_eopa_quantity_changes(test_db, sample_eopa, {eopa_item.id: Decimal("1100")})
+        test_db.commit()
+
+        assert (result["po_items_updated"], result["po_items_inserted"]) == (2, 1)
+        assert _ordered(test_db, pos[POType.RM]) == ([Decimal("600")], Decimal("600"))
+        assert _ordered(test_db, pos[POType.PM]) == ([Decimal("100")], Decimal("100"))
+        [pm_item] = pos[POType.PM].items
+        assert (pm_item.hsn_code, pm_item.gst_rate, pm_item.language) == ("48191010", Decimal("12.00"), "EN")
+
+    @pytest.mark.unit
+    @pytest.mark.eopa
+    def test_pm_per_language(self, test_db, sample_eopa, admin_user, medicine_paracetamol, paracetamol_bom):
+        """Test a change of the FR label changes the FR item, not the EN item of the same packing material"""
+        medicine, eopa_item = _add_second_medicine(test_db, sample_eopa, medicine_paracetamol, paracetamol_bom, admin_user)
+        _, packing_material = paracetamol_bom
+        packing_material.language = "EN"
+        test_db.query(MedicinePackingMaterial).filter(
+            MedicinePackingMaterial.medicine_id == medicine.id
+        ).one().language_override = "FR"
+        test_db.commit()
+        POGenerationService(test_db).generate_pos_from_eopa(sample_eopa.id, admin_user.id)
+        test_db.commit()
+        pm_po = test_db.query(PurchaseOrder).filter(PurchaseOrder.po_type == POType.PM).one()
+        assert sorted((item.language, item.ordered_quantity) for item in pm_po.items) == [
+            ("EN", Decimal("1000")), ("FR", Decimal("500"))
+        ]
+
+        result = apply_eopa_quantity_changes(test_db, sample_eopa, {eopa_item.id: Decimal("800")})
+        test_db.commit()
+
+        assert result["unmatched"] == []
+        test_db.refresh(pm_po)
+        assert sorted((item.language, item.ordered_quantity) for item in pm_po.items) == [
+            ("EN", Decimal("1000")), ("FR", Decimal("800"))
+        ]
+
+    @pytest.mark.unit
+    @pytest.mark.eopa
+    def test_pending_eopa_has_no_po_changes(self, test_db, sample_eopa):
+        sample_eopa.status = EOPAStatus.PENDING
+        test_db.commit()
+        [eopa_item] = sample_eopa.items
+
+        result = apply_eopa_quantity_changes(test_db, sample_eopa, {eopa_item.id: Decimal("10")})
+
+        assert result["eopa_items_changed"] == 1
+        assert result["po_ids"] == []
+        assert eopa_item.quantity == Decimal("10")
+
+    @pytest.mark.unit
+    @pytest.mark.eopa
+    def test_validation(self, test_db, sample_eopa, admin_user, paracetamol_bom):
+        pos = _generate_pos(test_db, sample_eopa, admin_user)
+        [eopa_item] = sample_eopa.items
+
+        with pytest.raises(AppException) as error:
+            apply_eopa_quantity_changes(test_db, sample_eopa, {999999: Decimal("10")})
+        assert error.value.status_code == 404
+
+        pos[POType.RM].status = POStatus.SENT
+        test_db.commit()
+        with pytest.raises(AppException) as error:
+            apply_eopa_quantity_changes(test_db, sample_eopa, {eopa_item.id: Decimal("10")})
+        assert error.value.status_code == 400
+        test_db.rollback()
+
+    @pytest.mark.unit
+    @pytest.mark.eopa
+    def test_statement_count(self, test_db, sample_eopa, admin_user, paracetamol_bom, query_budget):
+        """Editing one line reads and writes only the affected rows"""
+        _generate_pos(test_db, sample_eopa, admin_user)
+        eopa_item_id = sample_eopa.items[0].id
+        test_db.expire_all()
+        eopa = test_db.get(EOPA, sample_eopa.id)
+
+        with query_budget(11):
+            apply_eopa_quantity_changes(test_db, eopa, {eopa_item_id: Decimal("900")})
+            test_db.flush()
+
+
+class TestUpdateEOPAEndpoint:
+    """Test PUT /api/eopa/{id} with item quantities"""
+
+    @pytest.mark.integration
+    @pytest.mark.eopa
+    def test_update_quantity(self, test_client, test_db, procurement_headers, sample_eopa, admin_user, paracetamol_bom):
+        pos = _generate_pos(test_db, sample_eopa, admin_user)
+        [eopa_item] = sample_eopa.items
+
+        response = test_client.put(f"/api/eopa/{sample_eopa.id}", json={
+            "items": [{"id": eopa_item.id, "quantity": 800}]
+        }, headers=procurement_headers)
+
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["reexplosion"]["po_items_updated"] == 3
+        assert float(data["items"][0]["quantity"]) == 800
+        assert _ordered(test_db, pos[POType.RM]) == ([Decimal("400")], Decimal("400"))
+
+    @pytest.mark.integration
+    @pytest.mark.eopa
+    def test_rejects_remarks_empty_and_bad_quantity_on_approved(self, test_client, procurement_headers, sample_eopa):
+        response = test_client.put(f"/api/eopa/{sample_eopa.id}", json={"remarks": "late"}, headers=procurement_headers)
+        assert response.status_code == 400
+
+        for payload in ({}, {"items": []}):
+            response = test_client.put(f"/api/eopa/{sample_eopa.id}", json=payload, headers=procurement_headers)
+            assert response.status_code == 400
+
+        response = test_client.put(f"/api/eopa/{sample_eopa.id}", json={
+            "items": [{"id": sample_eopa.items[0].id, "quantity": 0}]
+        }, headers=procurement_headers)
+        assert response.status_code == 422
@@ -0,0 +1,268 @@
+"""
+Unit Tests for RM/PM BOM Explosion
+Tests: set-based BOM loading, parity with per-item explosion, query counts,
+shared RM/PM explosion engine, explosion result cache
+"""
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import update
+
+from app.models.raw_material import RawMaterialMaster, MedicineRawMaterial
+from app.models.packing_material import PackingMaterialMaster, MedicinePackingMaterial
+from app.services.rm_explosion_service import RMExplosionService
+from app.services.pm_explosion_service import PMExplosionService
+from app.services.material_explosion_engine import MaterialExplosionEngine
+from app.services.explosion_cache import ExplosionCache, explosion_cache
+from app.exceptions.base import AppException
+
+
+@pytest.fixture
+def rm_bom(test_db, medicine_paracetamol, rm_vendor):
+    """Create two raw materials and a BOM for Paracetamol"""
+    api = RawMaterialMaster(
+        rm_code="RM-0001",
+        rm_name="Paracetamol API",
+        unit_of_measure="KG",
+        hsn_code="29242990",
+        gst_rate=Decimal("18.00"),
+        default_vendor_id=rm_vendor.id,
+        is_active=True
+    )
+    starch = RawMaterialMaster(
+        rm_code="RM-0002",
+        rm_name="Maize Starch",
+        unit_of_measure="KG",
+        hsn_code="11081200",
+        gst_rate=Decimal("12.00"),
+        default_vendor_id=rm_vendor.id,
+        is_active=True
+    )
+    test_db.add_all([api, starch])
+    test_db.flush()
+
+    test_db.add_all([
+        MedicineRawMaterial(
+            medicine_id=medicine_paracetamol.id,
+            raw_material_id=api.id,
+            qty_required_per_unit=Decimal("0.5000"),
+            uom="KG",
+            wastage_percentage=Decimal("2.00"),
+            is_active=True
+        ),
+        MedicineRawMaterial(
+            medicine_id=medicine_paracetamol.id,
+            raw_material_id=starch.id,
+            qty_required_per_unit=Decimal("0.0500"),
+            uom="KG",
+            wastage_percentage=Decimal("0"),
+            is_active=True
+        )
+    ])
+    test_db.commit()
+    return [api, starch]
+
+
+@pytest.fixture
+def pm_bom(test_db, medicine_paracetamol, pm_vendor):
+    """Create a carton packing material and a PM BOM for Paracetamol"""
+    carton = PackingMaterialMaster(
+        pm_code="PM-0001",
+        pm_name="Paracetamol Carton",
+        pm_type="Carton",
+        language="EN",
+        artwork_version="v1.0",
+        unit_of_measure="PCS",
+        hsn_code="48191010",
+        gst_rate=Decimal("12.00"),
+        default_vendor_id=pm_vendor.id,
+        is_active=True
+    )
+    test_db.add(carton)
+    test_db.flush()
+
+    test_db.add(MedicinePackingMaterial(
+        medicine_id=medicine_paracetamol.id,
+        packing_material_id=carton.id,
+        qty_required_per_unit=Decimal("0.1000"),
+        uom="PCS",
+        wastage_percentage=Decimal("5.00"),
+        is_active=True
+    ))
+    test_db.commit()
+    return carton
+
+
+class TestRMExplosion:
+    """Test RM explosion modes"""
+
+    @pytest.mark.unit
+    @pytest.mark.eopa
+    def test_set_based_matches_per_item(self, test_db, sample_eopa, rm_bom):
+        """Set-based explosion returns exactly the same result as per-item explosion"""
+        service = RMExplosionService(test_db)
+
+        per_item = service.explode_eopa_to_raw_materials(sample_eopa.id, set_based=False)
+        test_db.expire_all()
+        set_based = service.explode_eopa_to_raw_materials(sample_eopa.id, set_based=True, use_cache=False)
+
+        assert per_item == set_based
+        assert set_based["total_vendors"] == 1
+
+        raw_materials = set_based["grouped_by_vendor"][0]["raw_materials"]
+        api_line = next(rm for rm in raw_materials if rm["raw_material_code"] == "RM-0001")
+        # 1000 units × 0.5 KG × 1.02 wastage
+        assert api_line["qty_required"] == Decimal("510")
+
+    @pytest.mark.unit
+    @pytest.mark.eopa
+    def test_set_based_query_count_is_constant(self, test_db, sample_eopa, rm_bom, query_budget):
+        """Set-based explosion loads EOPA and BOM in two statements"""
+        service = RMExplosionService(test_db)
+        eopa_id = sample_eopa.id
+        test_db.expire_all()
+
+        with query_budget(2) as stats:
+            service.explode_eopa_to_raw_materials(eopa_id, use_cache=False)
+
+        assert stats.count == 2
+
+    @pytest.mark.unit
+    @pytest.mark.eopa
+    def test_missing_bom_raises(self, test_db, sample_eopa):
+        """Medicine without BOM still raises ERR_BOM_NOT_DEFINED in set-based mode"""
+        service = RMExplosionService(test_db)
+
+        with pytest.raises(AppException) as exc_info:
+            service.explode_eopa_to_raw_materials(sample_eopa.id)
+
+        assert exc_info.value.error_code == "ERR_BOM_NOT_DEFINED"
+
+
+class TestMaterialExplosionEngine:
+    """Test shared RM/PM explosion engine"""
+
+    @pytest.mark.unit
+    @pytest.mark.eopa
+    def test_single_pass_matches_services(self, test_db, sample_eopa, rm_bom, pm_bom):
+        """One engine pass returns the same RM and PM results as the individual services"""
+        results = MaterialExplosionEngine(test_db).explode(sample_eopa.id, kinds=("RM", "PM"), use_cache=False)
+
+        assert results["RM"] == RMExplosionService(test_db).explode_eopa_to_raw_materials(sample_eopa.id)
+        assert results["PM"] == PMExplosionService(test_db).explode_eopa_to_packing_materials(sample_eopa.id)
+
+        carton_line = results["PM"]["grouped_by_vendor"][0]["packing_materials"][0]
+        # 1000 units × 0.1 PCS × 1.05 wastage
+        assert carton_line["qty_required"] == Decimal("105")
+        assert carton_line["language"] == "EN"
+
+    @pytest.mark.unit
+    @pytest.mark.eopa
+    def test_single_pass_query_count(self, test_db, sample_eopa, rm_bom, pm_bom, query_budget):
+        """EOPA graph is loaded once; each BOM kind costs one statement"""
+        eopa_id = sample_eopa.id
+        test_db.expire_all()
+
+        with query_budget(3) as stats:
+            MaterialExplosionEngine(test_db).explode(eopa_id, kinds=("RM", "PM"), use_cache=False)
+
+        assert stats.count == 3
+
+
+class TestExplosionCache:
+    """Test explosion result cache"""
+
+    @pytest.mark.unit
+    def test_lru_eviction(self):
+        """Least recently used entry is evicted once the cache is full"""
+        cache = ExplosionCache(max_size=2)
+        cache.put((1, "RM"), {"eopa_id": 1})
+        cache.put((2, "RM"), {"eopa_id": 2})
+        cache.get((1, "RM"))
+        cache.put((3, "RM"), {"eopa_id": 3})
+
+        assert cache.get((2, "RM")) is None
+        assert cache.get((1, "RM")) == {"eopa_id": 1}
+        assert len(cache) == 2
+
+    @pytest.mark.unit
+    @pytest.mark.eopa
+    def test_preview_then_generate_explodes_once(self, test_db, sample_eopa, rm_bom, query_budget):
+        """Second explosion of an unchanged EOPA only costs the version stamp query"""
+        explosion_cache.clear()
+        service = RMExplosionService(test_db)
+        eopa_id = sample_eopa.id
+
+        preview = service.explode_eopa_to_raw_materials(eopa_id)
+        test_db.expire_all()
+        with query_budget(1) as stats:
+            cached = service.explode_eopa_to_raw_materials(eopa_id)
+
+        assert cached == preview
+        assert stats.count == 1
+
+    @pytest.mark.unit
+    @pytest.mark.eopa
+    def test_bom_change_invalidates(self, test_db, sample_eopa, rm_bom):
+        """Changing a BOM row is reflected on the next explosion"""
+        explosion_cache.clear()
+        service = RMExplosionService(test_db)
+        before = service.explode_eopa_to_raw_materials(sample_eopa.id)
+
+        bom_row = test_db.query(MedicineRawMaterial).filter(
+            MedicineRawMaterial.raw_material_id == rm_bom[0].id
+        ).one()
+        bom_row.qty_required_per_unit = Decimal("1.0000")
+        test_db.commit()
+
+        after = service.explode_eopa_to_raw_materials(sample_eopa.id)
+        api_line = next(
+            rm for rm in after["grouped_by_vendor"][0]["raw_materials"]
+            if rm["raw_material_code"] == "RM-0001"
+        )
+
+        assert after != before
+        # 1000 units × 1.0 KG × 1.02 wastage
+        assert api_line["qty_required"] == Decimal("1020")
+
+    @pytest.mark.unit
+    @pytest.mark.eopa
+    def test_change_from_other_process_changes_stamp(self, test_db, sample_eopa, rm_bom):
+        """A BOM update that bypasses this process's session events still misses the cache"""
+        explosion_cache.clear()
+        service = RMExplosionService(test_db)
+        service.explode_eopa_to_raw_materials(sample_eopa.id)
+
+        # Core UPDATE does not fire ORM flush events (as if issued by another worker)
+        test_db.execute(
+            update(MedicineRawMaterial.__table__)
+            .where(MedicineRawMaterial.raw_material_id == rm_bom[0].id)
+            .values(qty_required_per_unit=Decimal("1.0000"), updated_at=datetime.utcnow())
+        )
+        test_db.commit()
+        assert len(explosion_cache) > 0
+
+        after = service.explode_eopa_to_raw_materials(sample_eopa.id)
+        api_line = next(
+            rm for rm in after["grouped_by_vendor"][0]["raw_materials"]
+            if rm["raw_material_code"] == "RM-0001"
+        )
+        assert api_line["qty_required"] == Decimal("1020")
+
+    @pytest.mark.unit
+    @pytest.mark.eopa
+    def test_eopa_item_change_invalidates(self, test_db, sample_eopa, rm_bom):
+        """Changing an EOPA item quantity is reflected on the next explosion"""
+        explosion_cache.clear()
+        service = RMExplosionService(test_db)
+        service.explode_eopa_to_raw_materials(sample_eopa.id)
+
+        sample_eopa.items[0].quantity = Decimal("2000")
+        test_db.commit()
+
+        after = service.explode_eopa_to_raw_materials(sample_eopa.id)
+        api_line = next(
+            rm for rm in after["grouped_by_vendor"][0]["raw_materials"]
+            if rm["raw_material_code"] == "RM-0001"
+        )
+        assert api_line["qty_required"] == Decimal("1020")
@@ -0,0 +1,252 @@
+"""
+Unit Tests for Cross-EOPA MRP Consolidation
+Tests: aggregation across EOPAs, netting against open POs and material balance, validation
+"""
+import pytest
+from datetime import date, datetime
+from decimal import Decimal
+
+from app.exceptions.base import AppException
+from app.models.eopa import EOPA, EOPAItem, EOPAStatus
+from app.models.invoice import VendorInvoice, InvoiceType
+from app.models.material_balance import MaterialBalance
+from app.models.po import PurchaseOrder, POItem, POType, POStatus, POConsolidatedEOPA
+from app.services.incremental_explosion import apply_eopa_quantity_changes
+from app.services.mrp_consolidation import MRPConsolidationService
+from app.services.po_service import POGenerationService
+
+
+def _add_eopas(test_db, sample_eopa, quantities, status=EOPAStatus.APPROVED):
+    """EOPAs over the same PI items as sample_eopa, one per quantity"""
+    pi_items = [eopa_item.pi_item_id for eopa_item in sample_eopa.items]
+    eopas = []
+    for index, quantity in enumerate(quantities):
+        eopa = EOPA(
+            eopa_number=f"EOPA/24-25/{index + 100:04d}",
+            eopa_date=date.today(),
+            pi_id=sample_eopa.pi_id,
+            status=status,
+            created_by=sample_eopa.created_by
+        )
+        test_db.add(eopa)
+        test_db.flush()
+        test_db.add_all([
+            EOPAItem(eopa_id=eopa.id, pi_item_id=pi_item_id, quantity=Decimal(quantity),
+                     estimated_unit_price=Decimal("50"), estimated_total=Decimal(quantity) * 50,
+                     created_by=sample_eopa.created_by)
+            for pi_item_id in pi_items
+        ])
+        eopas.append(eopa)
+    test_db.commit()
+    return eopas
+
+
+def _rm_po(test_db, sample_eopa, vendor, raw_material, status, ordered, fulfilled="0", unit="KG"):
+    po = PurchaseOrder(
+        po_number=f"PO/RM/OPEN/{status.value}", po_date=date.today(), po_type=POType.RM,
+        eopa_id=sample_eopa.id, vendor_id=vendor.id, status=status, created_by=sample_eopa.created_by
+    )
+    test_db.add(po)
+    test_db.flush()
+    test_db.add(POItem(po_id=po.id, raw_material_id=raw_material.id, ordered_quantity=Decimal(ordered),
+                       fulfilled_quantity=Decimal(fulfilled), unit=unit))
+    test_db.commit()
+    return po
+
+
+class TestMRPConsolidation:
+    """Test consolidating RM/PM demand of several EOPAs"""
+
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_one_po_per_vendor(self, test_db, sample_eopa, admin_user, paracetamol_bom):
+        """Test 1000 + 500 + 250 units give one RM PO (875 KG) and one PM PO (1750 PCS)"""
+        eopas = [sample_eopa, *_add_eopas(test_db, sample_eopa, ["500", "250"])]
+
+        result = MRPConsolidationService(test_db).consolidate([eopa.id for eopa in eopas], admin_user.id)
+
+        assert result["total_pos_created"] == 2
+        pos = {po.po_type: po for po in test_db.query(PurchaseOrder).all()}
+        assert set(pos) == {POType.RM, POType.PM}
+        assert all(po.status == POStatus.DRAFT and po.eopa_id == sample_eopa.id for po in pos.values())
+        assert all(eopa.eopa_number in pos[POType.RM].remarks for eopa in eopas)
+
+        [rm_item] = pos[POType.RM].items
+        [pm_item] = pos[POType.PM].items
+        assert rm_item.ordered_quantity == Decimal("875")
+        assert pm_item.ordered_quantity == Decimal("1750")
+
+        [rm_summary] = [summary for summary in result["purchase_orders"] if summary["po_type"] == "RM"]
+        assert rm_summary["source_eopa_ids"] == [eopa.id for eopa in eopas]
+
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_nets_open_pos_and_balance(self, test_db, sample_eopa, rm_vendor, admin_user, paracetamol_bom):
+        """Test open PO quantity (same unit only) and received-beyond-ordered stock reduce the requirement"""
+        raw_material, _ = paracetamol_bom
+        sent_po = _rm_po(test_db, sample_eopa, rm_vendor, raw_material, POStatus.SENT, "100", fulfilled="40")
+        _rm_po(test_db, sample_eopa, rm_vendor, raw_material, POStatus.CLOSED, "1000")
+        _rm_po(test_db, sample_eopa, rm_vendor, raw_material, POStatus.APPROVED, "1000", unit="GM")
+
+        invoice = VendorInvoice(invoice_number="INV-RM-1", invoice_date=date.today(), invoice_type=InvoiceType.RM,
+                                po_id=sent_po.id, vendor_id=rm_vendor.id, subtotal=Decimal("0"),
+                                total_amount=Decimal("0"), received_by=admin_user.id)
+        test_db.add(invoice)
+        test_db.flush()
+        test_db.add(MaterialBalance(raw_material_id=raw_material.id, vendor_id=rm_vendor.id, po_id=sent_po.id,
+                                    invoice_id=invoice.id, ordered_qty=Decimal("50"), received_qty=Decimal("80"),
+                                    balance_qty=Decimal("-30"), last_updated=datetime.utcnow()))
+        test_db.commit()
+
+        plan = MRPConsolidationService(test_db).plan([sample_eopa.id], kinds=["RM"])
+
+        [group] = plan["RM"]
+        [row] = group["raw_materials"]
+        assert row["gross_qty"] == Decimal("500")
+        assert row["open_po_qty"] == Decimal("60")
+        assert row["material_balance_qty"] == Decimal("30")
+        assert row["qty_required"] == Decimal("410")
+        assert test_db.query(PurchaseOrder).count() == 3  # preview writes nothing
+
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_fully_covered_vendor_skipped(self, test_db, sample_eopa, rm_vendor, paracetamol_bom):
+        raw_material, _ = paracetamol_bom
+        _rm_po(test_db, sample_eopa, rm_vendor, raw_material, POStatus.DRAFT, "600")
+
+        assert MRPConsolidationService(test_db).plan([sample_eopa.id], kinds=["RM"])["RM"] == []
+
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_validation(self, test_db, sample_eopa, paracetamol_bom):
+        [pending] = _add_eopas(test_db, sample_eopa, ["10"], status=EOPAStatus.PENDING)
+        service = MRPConsolidationService(test_db)
+
+        with pytest.raises(AppException) as error:
+            service.plan([sample_eopa.id, pending.id])
+        assert error.value.status_code == 400
+
+        with pytest.raises(AppException) as error:
+            service.plan([sample_eopa.id, 999999])
+        assert error.value.status_code == 404
+
+        with pytest.raises(AppException) as error:
+            service.plan([sample_eopa.id], kinds=["FG"])
+        assert error.value.status_code == 400
+
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_query_count_independent_of_eopas(self, test_db, sample_eopa, paracetamol_bom, query_budget):
+        """Planning 2 or 6 EOPAs runs the same statements"""
+        eopa_ids = [sample_eopa.id] + [eopa.id for eopa in _add_eopas(test_db, sample_eopa, ["10"] * 5)]
+        test_db.expire_all()
+
+        with query_budget(10) as small:
+            MRPConsolidationService(test_db).plan(eopa_ids[:2])
+        test_db.expire_all()
+        with query_budget(small.count) as large:
+            MRPConsolidationService(test_db).plan(eopa_ids)
+        assert large.count == small.count
+
+
+class TestGenerationAfterConsolidation:
+    """Test per-EOPA generation of EOPAs whose RM/PM demand is on consolidated POs"""
+
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_covered_eopas_generate_fg_only(self, test_db, sample_eopa, admin_user, paracetamol_bom):
+        """Test both covered EOPAs (the one the POs are attached to included) get FG POs and no RM/PM POs"""
+        [other] = _add_eopas(test_db, sample_eopa, ["500"])
+        consolidated = MRPConsolidationService(test_db).consolidate([sample_eopa.id, other.id], admin_user.id)
+        consolidated_ids = {po.id for po in test_db.query(PurchaseOrder)}
+        assert {(link.po_id, link.eopa_id) for link in test_db.query(POConsolidatedEOPA)} == {
+            (po_id, eopa_id) for po_id in consolidated_ids for eopa_id in (sample_eopa.id, other.id)
+        }
+
+        for eopa in (sample_eopa, other):
+            result = POGenerationService(test_db).generate_pos_from_eopa(eopa.id, admin_user.id)
+            assert (result["fg_pos_created"], result["rm_pos_created"], result["pm_pos_created"]) == (1, 0, 0)
+            assert result["consolidated_po_numbers"] == {
+                summary["po_type"]: [summary["po_number"]] for summary in consolidated["purchase_orders"]
+            }
+
+        test_db.expire_all()
+        pos = test_db.query(PurchaseOrder).all()
+        assert sorted(po.po_type.value for po in pos) == ["FG", "FG", "PM", "RM"]
+        [rm_po] = [po for po in pos if po.po_type == POType.RM]
+        assert [item.ordered_quantity for item in rm_po.items] == [Decimal("750")]
+
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_direct_rm_generation_rejected_until_cancelled(self, test_db, sample_eopa, admin_user, paracetamol_bom):
+        [other] = _add_eopas(test_db, sample_eopa, ["500"])
+        MRPConsolidationService(test_db).consolidate([sample_eopa.id, other.id], admin_user.id, kinds=["RM"])
+        service = POGenerationService(test_db)
+
+        with pytest.raises(AppException) as error:
+            service.generate_rm_pos_from_explosion(other.id, admin_user.id)
+        assert error.value.error_code == "ERR_EOPA_CONSOLIDATED"
+        assert service.generate_pm_pos_from_explosion(other.id, admin_user.id)["total_pm_pos_created"] == 1
+
+        rm_po = test_db.query(PurchaseOrder).filter(PurchaseOrder.po_type == POType.RM).one()
+        rm_po.status = POStatus.CANCELLED
+        test_db.commit()
+        assert service.generate_rm_pos_from_explosion(other.id, admin_user.id)["total_rm_pos_created"] == 1
+
+    @pytest.mark.integration
+    @pytest.mark.po
+    def test_vendor_po_of_covered_eopa(self, test_client, test_db, procurement_headers, sample_eopa,
+                                       rm_vendor, admin_user, paracetamol_bom):
+        """Test generate-po-by-vendor returns the consolidated PO for every covered EOPA"""
+        [other] = _add_eopas(test_db, sample_eopa, ["500"])
+        result = MRPConsolidationService(test_db).consolidate([sample_eopa.id, other.id], admin_user.id, kinds=["RM"])
+
+        response = test_client.post("/api/po/generate-po-by-vendor", json={
+            "eopa_id": other.id, "vendor_id": rm_vendor.id, "po_type": "RM", "items": []
+        }, headers=procurement_headers)
+
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["mode"] == "update"
+        assert data["po_number"] == result["purchase_orders"][0]["po_number"]
+
+    @pytest.mark.unit
+    @pytest.mark.eopa
+    def test_quantity_change_rejected_once_consolidated_po_sent(self, test_db, sample_eopa, admin_user, paracetamol_bom):
+        """Test a covered EOPA's quantities are locked once its consolidated PO has left DRAFT"""
+        [other] = _add_eopas(test_db, sample_eopa, ["500"])
+        MRPConsolidationService(test_db).consolidate([sample_eopa.id, other.id], admin_user.id, kinds=["RM"])
+        rm_po = test_db.query(PurchaseOrder).filter(PurchaseOrder.po_type == POType.RM).one()
+        rm_po.status = POStatus.SENT
+        test_db.commit()
+        [eopa_item] = other.items
+
+        with pytest.raises(AppException) as error:
+            apply_eopa_quantity_changes(test_db, other, {eopa_item.id: Decimal("600")})
+        assert error.value.status_code == 400
+        assert rm_po.po_number in error.value.message
+        test_db.rollback()
+
+
+class TestConsolidationEndpoint:
+    """Test POST /api/po/consolidate"""
+
+    @pytest.mark.integration
+    @pytest.mark.po
+    def test_preview_then_create(self, test_client, test_db, procurement_headers, sample_eopa, paracetamol_bom):
+        [other] = _add_eopas(test_db, sample_eopa, ["200"])
+        payload = {"eopa_ids": [sample_eopa.id, other.id], "kinds": ["RM"]}
+
+        response = test_client.post("/api/po/consolidate", json={**payload, "preview": True}, headers=procurement_headers)
+        assert response.status_code == 200
+        [group] = response.json()["data"]["RM"]
+        assert float(group["raw_materials"][0]["qty_required"]) == 600
+        assert test_db.query(PurchaseOrder).count() == 0
+
+        response = test_client.post("/api/po/consolidate", json=payload, headers=procurement_headers)
+        assert response.status_code == 200
+        assert response.json()["data"]["total_pos_created"] == 1
+
+        # The consolidated DRAFT now covers the demand
+        response = test_client.post("/api/po/consolidate", json={**payload, "preview": True}, headers=procurement_headers)
+        assert response.json()["data"]["RM"] == []
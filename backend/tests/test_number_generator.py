@@ -0,0 +1,102 @@
+"""
+Unit Tests for Document Number Generation
+Tests: counter-table allocation, seeding from existing numbers, constant query cost,
+bulk PO number reservation
+"""
+import pytest
+from sqlalchemy import event
+
+from app.models.document_sequence import DocumentSequence
+from app.models.raw_material import RawMaterialMaster
+from app.utils.number_generator import (
+    generate_po_number,
+    generate_rm_code,
+    get_financial_year,
+    reserve_po_numbers,
+)
+
+
+class TestDocumentSequence:
+    """Test sequence-table number allocation"""
+
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_po_numbers_are_sequential(self, test_db):
+        """Consecutive allocations for the same prefix return consecutive numbers"""
+        fy = get_financial_year(test_db)
+
+        first = generate_po_number(test_db, "RM", is_draft=True)
+        second = generate_po_number(test_db, "RM", is_draft=True)
+        other_type = generate_po_number(test_db, "PM", is_draft=True)
+
+        assert first == f"PO/{fy}/RM/DRAFT/0001"
+        assert second == f"PO/{fy}/RM/DRAFT/0002"
+        assert other_type == f"PO/{fy}/PM/DRAFT/0001"
+
+    @pytest.mark.unit
+    def test_counter_seeded_from_existing_codes(self, test_db):
+        """A new counter continues after the highest existing code"""
+        test_db.add_all([
+            RawMaterialMaster(rm_code="RM-0041", rm_name="Existing A", unit_of_measure="KG"),
+            RawMaterialMaster(rm_code="RM-0009", rm_name="Existing B", unit_of_measure="KG"),
+            RawMaterialMaster(rm_code="RM-LEGACY", rm_name="Legacy", unit_of_measure="KG"),
+        ])
+        test_db.flush()
+
+        assert generate_rm_code(test_db) == "RM-0042"
+
+        sequence = test_db.query(DocumentSequence).filter(
+            DocumentSequence.document_type == "RM_CODE"
+        ).one()
+        assert sequence.prefix == "RM-"
+        assert sequence.last_value == 42
+
+    @pytest.mark.unit
+    def test_allocation_is_single_statement(self, test_db):
+        """Once the counter exists, allocation is one UPDATE ... RETURNING"""
+        generate_rm_code(test_db)
+
+        statements = []
+
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        connection = test_db.connection()
+        event.listen(connection, "before_cursor_execute", _before_cursor_execute)
+        try:
+            code = generate_rm_code(test_db)
+        finally:
+            event.remove(connection, "before_cursor_execute", _before_cursor_execute)
+
+        assert code == "RM-0002"
+        assert len(statements) == 1
+        assert statements[0].lstrip().upper().startswith("UPDATE")
+
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_reserve_po_numbers_in_one_round_trip(self, test_db):
+        """Reserving 40 PO numbers advances every counter with one UPDATE"""
+        fy = get_financial_year(test_db)
+        # Create the counters first so that only the steady-state cost is measured
+        reserve_po_numbers(test_db, [("RM", None), ("FG", 1)])
+
+        statements = []
+
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        connection = test_db.connection()
+        event.listen(connection, "before_cursor_execute", _before_cursor_execute)
+        try:
+            numbers = reserve_po_numbers(test_db, [("RM", None)] * 39 + [("FG", 1)])
+        finally:
+            event.remove(connection, "before_cursor_execute", _before_cursor_execute)
+
+        assert numbers[0] == f"PO/{fy}/RM/DRAFT/0002"
+        assert numbers[38] == f"PO/{fy}/RM/DRAFT/0040"
+        assert numbers[39] == f"PO/{fy}/FG/1/0002"
+        assert len(set(numbers)) == 40
+
+        updates = [s for s in statements if s.lstrip().upper().startswith("UPDATE")]
+        assert len(updates) == 1
+        assert len(statements) <= 3
@@ -0,0 +1,122 @@
+"""
+Unit Tests for Keyset (Cursor) Pagination
+Tests: cursor round trip, page continuity under inserts, offset fallback, invalid cursors
+"""
+import pytest
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import count
+
+from app.exceptions.base import AppException
+from app.models.po import PurchaseOrder, POType, POStatus
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+_po_sequence = count(200)
+
+
+def _add_pos(test_db, template, how_many, created_at):
+    """FG POs with one-second spaced created_at, oldest first"""
+    for index in range(how_many):
+        test_db.add(PurchaseOrder(
+            po_number=f"PO/FG/24-25/{next(_po_sequence):04d}",
+            po_date=date.today(),
+            po_type=POType.FG,
+            eopa_id=template.eopa_id,
+            vendor_id=template.vendor_id,
+            status=POStatus.DRAFT,
+            total_ordered_qty=Decimal("1"),
+            total_fulfilled_qty=Decimal("0"),
+            created_by=template.created_by,
+            created_at=created_at + timedelta(seconds=index)
+        ))
+    test_db.commit()
+
+
+class TestCursor:
+    """Test cursor encoding"""
+
+    @pytest.mark.unit
+    def test_round_trip(self, sample_fg_po):
+        cursor = encode_cursor(PurchaseOrder.created_at, sample_fg_po)
+
+        assert decode_cursor(PurchaseOrder.created_at, cursor) == (sample_fg_po.created_at, sample_fg_po.id)
+
+    @pytest.mark.unit
+    def test_rejects_tampered_or_foreign_cursor(self, sample_fg_po):
+        with pytest.raises(AppException):
+            decode_cursor(PurchaseOrder.created_at, "not-a-cursor")
+        with pytest.raises(AppException):
+            decode_cursor(PurchaseOrder.po_number, encode_cursor(PurchaseOrder.created_at, sample_fg_po))
+
+
+class TestPOListPagination:
+    """Test cursor pagination of GET /api/po/"""
+
+    @pytest.mark.integration
+    @pytest.mark.po
+    def test_walk_all_pages(self, test_client, test_db, admin_headers, sample_fg_po):
+        """Following next_cursor visits every PO once, newest first"""
+        _add_pos(test_db, sample_fg_po, 6, datetime.utcnow() - timedelta(days=1))
+
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+            body = test_client.get("/api/po/", params=params, headers=admin_headers).json()
+            seen.extend(po["id"] for po in body["data"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+
+        assert len(seen) == 7 == len(set(seen))
+        assert seen[0] == sample_fg_po.id  # most recent
+
+    @pytest.mark.integration
+    @pytest.mark.po
+    def test_insert_does_not_shift_pages(self, test_client, test_db, admin_headers, sample_fg_po):
+        """A PO created between two page requests does not repeat rows on the next page"""
+        _add_pos(test_db, sample_fg_po, 4, datetime.utcnow() - timedelta(days=1))
+
+        first = test_client.get("/api/po/", params={"limit": 2}, headers=admin_headers).json()
+        _add_pos(test_db, sample_fg_po, 1, datetime.utcnow() + timedelta(minutes=1))
+        second = test_client.get(
+            "/api/po/", params={"limit": 2, "cursor": first["next_cursor"]}, headers=admin_headers
+        ).json()
+
+        first_ids = {po["id"] for po in first["data"]}
+        assert first_ids.isdisjoint(po["id"] for po in second["data"])
+        assert len(second["data"]) == 2
+
+    @pytest.mark.integration
+    @pytest.mark.po
+    def test_offset_fallback(self, test_client, test_db, admin_headers, sample_fg_po):
+        _add_pos(test_db, sample_fg_po, 2, datetime.utcnow() - timedelta(days=1))
+
+        all_ids = [po["id"] for po in test_client.get("/api/po/", headers=admin_headers).json()["data"]]
+        body = test_client.get("/api/po/", params={"skip": 1, "limit": 1}, headers=admin_headers).json()
+
+        assert [po["id"] for po in body["data"]] == all_ids[1:2]
+        assert body["next_cursor"] is not None
+
+    @pytest.mark.integration
+    @pytest.mark.po
+    def test_invalid_cursor(self, test_client, admin_headers):
+        response = test_client.get("/api/po/", params={"cursor": "garbage"}, headers=admin_headers)
+
+        assert response.status_code == 400
+        assert response.json()["error_code"] == "ERR_VALIDATION"
+
+
+class TestOtherListPagination:
+    """Lists that had no ordering page oldest first"""
+
+    @pytest.mark.integration
+    def test_vendor_list(self, test_client, admin_headers, partner_vendor, manufacturer_vendor, rm_vendor):
+        first = test_client.get("/api/vendors/", params={"limit": 2}, headers=admin_headers).json()
+        second = test_client.get(
+            "/api/vendors/", params={"limit": 2, "cursor": first["next_cursor"]}, headers=admin_headers
+        ).json()
+
+        assert [v["id"] for v in first["data"]] == [partner_vendor.id, manufacturer_vendor.id]
+        assert [v["id"] for v in second["data"]] == [rm_vendor.id]
+        assert second["next_cursor"] is None
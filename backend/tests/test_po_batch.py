@@ -0,0 +1,212 @@
+"""
+Unit Tests for Batch PO Generation
+Tests: per-EOPA results, per-EOPA rollback, job endpoints, request validation
+"""
+import pytest
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models.country import Country
+from app.models.eopa import EOPA, EOPAItem, EOPAStatus
+from app.models.packing_material import PackingMaterialMaster, MedicinePackingMaterial
+from app.models.pi import PI, PIItem, PIStatus
+from app.models.po import PurchaseOrder, POType
+from app.models.product import MedicineMaster, ProductMaster
+from app.models.raw_material import RawMaterialMaster, MedicineRawMaterial
+from app.models.user import User, UserRole
+from app.models.vendor import Vendor, VendorType
+from app.services import po_batch
+from app.services.configuration_service import config_store
+from app.services.po_batch import BatchStatus, POBatchJob, run_po_batch
+from app.services.po_service import POGenerationService
+
+
+class InlineExecutor:
+    """Runs submitted jobs in the calling thread (the test session has a single connection)"""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+class TestRunPOBatch:
+    """Test generating several EOPAs in one job"""
+
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_results_per_eopa(self, test_db, sample_eopa, admin_user, paracetamol_bom):
+        """Test a valid EOPA gets FG/RM/PM POs while a missing one is reported as failed"""
+        job = POBatchJob([sample_eopa.id, 999999], admin_user.id)
+
+        run_po_batch(job, test_db.connection())
+
+        data = job.to_dict()
+        assert data["status"] == "COMPLETED"
+        assert (data["total"], data["completed"], data["succeeded"], data["failed"]) == (2, 2, 1, 1)
+
+        generated, missing = data["eopas"]
+        assert generated["status"] == "SUCCEEDED"
+        assert generated["result"]["fg_pos_created"] == 1
+        assert generated["result"]["rm_pos_created"] == 1
+        assert generated["result"]["pm_pos_created"] == 1
+        assert data["total_pos_created"] == 3
+        assert missing["status"] == "FAILED"
+        assert missing["error_code"] == "ERR_NOT_FOUND"
+
+        po_types = {po.po_type for po in test_db.query(PurchaseOrder).filter(PurchaseOrder.eopa_id == sample_eopa.id)}
+        assert po_types == {POType.FG, POType.RM, POType.PM}
+
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_failed_eopa_rolled_back(self, test_db, sample_eopa, admin_user, paracetamol_bom, monkeypatch):
+        """Test FG and RM POs committed during generation are undone when PM generation fails"""
+        def fail(self, *args, **kwargs):
+            raise RuntimeError("PM generation failed")
+        monkeypatch.setattr(POGenerationService, "generate_pm_pos_from_explosion", fail)
+
+        job = POBatchJob([sample_eopa.id], admin_user.id)
+        run_po_batch(job, test_db.connection())
+
+        [entry] = job.to_dict()["eopas"]
+        assert entry["status"] == "FAILED"
+        assert entry["error_code"] == "ERR_PO_GENERATION"
+        assert test_db.query(PurchaseOrder).filter(PurchaseOrder.eopa_id == sample_eopa.id).count() == 0
+
+
+class TestPOBatchEndpoints:
+    """Test starting and polling batch jobs"""
+
+    @pytest.mark.integration
+    @pytest.mark.po
+    def test_start_and_poll(self, test_client, procurement_headers, sample_eopa, paracetamol_bom, monkeypatch):
+        monkeypatch.setattr(po_batch, "_job_executor", InlineExecutor())
+
+        response = test_client.post("/api/po/generate-batch", json={
+            "eopa_ids": [sample_eopa.id, sample_eopa.id]
+        }, headers=procurement_headers)
+        assert response.status_code == 200
+        job_id = response.json()["data"]["job_id"]
+
+        response = test_client.get(f"/api/po/generate-batch/{job_id}", headers=procurement_headers)
+        data = response.json()["data"]
+        assert data["status"] == BatchStatus.COMPLETED.value
+        assert [entry["eopa_id"] for entry in data["eopas"]] == [sample_eopa.id]
+        assert data["succeeded"] == 1
+
+    @pytest.mark.integration
+    @pytest.mark.po
+    def test_validation(self, test_client, procurement_headers):
+        response = test_client.post("/api/po/generate-batch", json={"eopa_ids": []}, headers=procurement_headers)
+        assert response.status_code == 400
+
+        response = test_client.post("/api/po/generate-batch", json={
+            "eopa_ids": list(range(1, po_batch.MAX_BATCH_EOPAS + 2))
+        }, headers=procurement_headers)
+        assert response.status_code == 400
+
+        response = test_client.get("/api/po/generate-batch/unknown", headers=procurement_headers)
+        assert response.status_code == 404
+
+
+def _commit_eopas(engine, count):
+    """Committed masters and `count` approved EOPAs (one PI each) visible to other connections"""
+    with Session(bind=engine) as db:
+        user = User(username="batch-admin", email="batch-admin@pharmaco.com", hashed_password="x",
+                    full_name="Batch Admin", role=UserRole.ADMIN, is_active=True)
+        country = Country(country_code="IND", country_name="India", language="English", currency="INR")
+        db.add_all([user, country])
+        db.flush()
+        partner, manufacturer, rm_vendor, pm_vendor = vendors = [
+            Vendor(vendor_code=code, vendor_name=code, vendor_type=vendor_type, country_id=country.id, is_active=True)
+            for code, vendor_type in [("PART-B", VendorType.PARTNER), ("MFG-B", VendorType.MANUFACTURER),
+                                      ("RM-B", VendorType.RM), ("PM-B", VendorType.PM)]
+        ]
+        product = ProductMaster(product_code="PROD-B", product_name="Batch Tablet", unit_of_measure="NOS")
+        raw_material = RawMaterialMaster(rm_code="RM-B", rm_name="Batch API", unit_of_measure="KG")
+        packing_material = PackingMaterialMaster(pm_code="PM-B", pm_name="Batch Label", unit_of_measure="PCS")
+        db.add_all([*vendors, product, raw_material, packing_material])
+        db.flush()
+        medicine = MedicineMaster(medicine_code="MED-B", medicine_name="Batch Tablets", product_id=product.id,
+                                  dosage_form="Tablet",
+                                  manufacturer_vendor_id=manufacturer.id, rm_vendor_id=rm_vendor.id,
+                                  pm_vendor_id=pm_vendor.id, is_active=True)
+        db.add(medicine)
+        db.flush()
+        db.add_all([
+            MedicineRawMaterial(medicine_id=medicine.id, raw_material_id=raw_material.id, vendor_id=rm_vendor.id,
+                                qty_required_per_unit=Decimal("0.5"), uom="KG"),
+            MedicinePackingMaterial(medicine_id=medicine.id, packing_material_id=packing_material.id,
+                                    vendor_id=pm_vendor.id, qty_required_per_unit=Decimal("1"), uom="PCS")
+        ])
+
+        eopa_ids = []
+        for index in range(count):
+            pi = PI(pi_number=f"PI/B/{index:04d}", pi_date=date.today(), partner_vendor_id=partner.id,
+                    country_id=country.id, total_amount=Decimal("5000"), status=PIStatus.APPROVED,
+                    created_by=user.id)
+            db.add(pi)
+            db.flush()
+            pi_item = PIItem(pi_id=pi.id, medicine_id=medicine.id, quantity=Decimal("100"),
+                             unit_price=Decimal("50"), total_price=Decimal("5000"))
+            eopa = EOPA(eopa_number=f"EOPA/B/{index:04d}", eopa_date=date.today(), pi_id=pi.id,
+                        status=EOPAStatus.APPROVED, created_by=user.id)
+            db.add_all([pi_item, eopa])
+            db.flush()
+            db.add(EOPAItem(eopa_id=eopa.id, pi_item_id=pi_item.id, quantity=Decimal("100"),
+                            estimated_unit_price=Decimal("50"), estimated_total=Decimal("5000"),
+                            created_by=user.id))
+            eopa_ids.append(eopa.id)
+
+        db.commit()
+        return user.id, eopa_ids
+
+
+class TestPOBatchConcurrency:
+    """Test the worker pool path with committed data and separate connections"""
+
+    @pytest.mark.slow
+    @pytest.mark.database
+    @pytest.mark.po
+    def test_eopas_generate_concurrently(self, test_engine, monkeypatch):
+        """Test every EOPA's transaction can be open at once (PO number locks are not held until commit)"""
+        if test_engine.dialect.name != "postgresql":
+            pytest.skip("row-level locking needs PostgreSQL")
+
+        workers = 3
+        config_store.invalidate()
+
+        # Each EOPA waits, still uncommitted, until all of them have generated their POs
+        barrier = threading.Barrier(workers, timeout=15)
+        generate = POGenerationService.generate_pos_from_eopa
+
+        def generate_then_wait(self, *args, **kwargs):
+            result = generate(self, *args, **kwargs)
+            barrier.wait()
+            return result
+
+        monkeypatch.setattr(POGenerationService, "generate_pos_from_eopa", generate_then_wait)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        monkeypatch.setattr(po_batch, "_eopa_executor", executor)
+
+        try:
+            user_id, eopa_ids = _commit_eopas(test_engine, workers)
+            job = run_po_batch(POBatchJob(eopa_ids, user_id), test_engine)
+
+            data = job.to_dict()
+            assert [entry["status"] for entry in data["eopas"]] == ["SUCCEEDED"] * workers
+            with Session(bind=test_engine) as db:
+                po_numbers = [number for (number,) in db.query(PurchaseOrder.po_number)]
+            assert len(po_numbers) == len(set(po_numbers)) == 3 * workers
+        finally:
+            executor.shutdown()
+            config_store.invalidate()
+            with test_engine.begin() as connection:
+                connection.execute(text(
+                    "TRUNCATE TABLE po_items, purchase_orders, eopa_items, eopa, pi_items, pi, "
+                    "medicine_raw_materials, medicine_packing_materials, raw_material_master, "
+                    "packing_material_master, medicine_master, product_master, vendors, countries, users, "
+                    "system_configuration, document_sequences RESTART IDENTITY CASCADE"
+                ))
@@ -0,0 +1,58 @@
+"""
+Unit Tests for PO Loader Profiles
+Tests: relationships loaded per profile, statement counts, not-found handling
+"""
+import pytest
+from sqlalchemy import inspect
+
+from app.exceptions.base import AppException
+from app.models.po_terms import POTermsConditions
+from app.services.po_loaders import load_po, po_loader_options
+
+
+def _unloaded(po):
+    return inspect(po).unloaded
+
+
+class TestPOLoaderProfiles:
+    """Test eager loading per profile"""
+
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_pdf_profile(self, test_db, sample_fg_po, query_budget):
+        """PDF profile: header with users, then one SELECT each for items and terms"""
+        test_db.add_all([
+            POTermsConditions(po_id=sample_fg_po.id, term_text=f"Term {index}", priority=index)
+            for index in range(3)
+        ])
+        test_db.commit()
+        po_id = sample_fg_po.id
+        test_db.expunge_all()
+
+        with query_budget(3):
+            po = load_po(test_db, po_id, "pdf")
+            assert len(po.terms_conditions) == 3
+            assert po.items[0].medicine.medicine_name
+
+        assert {"vendor", "items", "preparer", "approver", "terms_conditions"}.isdisjoint(_unloaded(po))
+
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_summary_profile_skips_items(self, test_db, sample_fg_po):
+        po_id = sample_fg_po.id
+        test_db.expunge_all()
+
+        po = load_po(test_db, po_id, "summary")
+
+        assert "items" in _unloaded(po)
+        assert "vendor" not in _unloaded(po)
+
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_missing_po_and_unknown_profile(self, test_db):
+        with pytest.raises(AppException) as exc_info:
+            load_po(test_db, 999999)
+        assert exc_info.value.status_code == 404
+
+        with pytest.raises(ValueError):
+            po_loader_options("everything")
@@ -372,6 +372,500 @@ class TestPORetrieval:
         for po in data:
             assert po["status"] == "OPEN"
 
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_po_summary(self, test_client, admin_headers, sample_fg_po, test_db, medicine_paracetamol):
+        """Test PO summary listing returns item aggregates without items"""
+        test_db.add(POItem(
+            po_id=sample_fg_po.id,
+            medicine_id=medicine_paracetamol.id,
+            ordered_quantity=Decimal("500"),
+            fulfilled_quantity=Decimal("100"),
+            value_amount=Decimal("2000.00"),
+            gst_amount=Decimal("240.00"),
+            total_amount=Decimal("2240.00")
+        ))
+        test_db.commit()
+
+        response = test_client.get("/api/po/summary?po_type=FG", headers=admin_headers)
+
+        assert response.status_code == 200
+        [summary] = response.json()["data"]
+        assert "items" not in summary
+        assert summary["po_number"] == sample_fg_po.po_number
+        assert summary["vendor_name"] == sample_fg_po.vendor.vendor_name
+        assert summary["eopa_number"] == sample_fg_po.eopa.eopa_number
+        assert summary["item_count"] == 2
+        assert summary["ordered_quantity"] == 1500
+        assert summary["fulfilled_quantity"] == 100
+        assert Decimal(summary["total_amount"]) == Decimal("2240.00")
+
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_po_summary_without_items(self, test_client, admin_headers, sample_fg_po, test_db):
+        """Test POs without items are listed with zero aggregates"""
+        test_db.query(POItem).filter(POItem.po_id == sample_fg_po.id).delete()
+        test_db.commit()
+
+        response = test_client.get(f"/api/po/summary?eopa_id={sample_fg_po.eopa_id}", headers=admin_headers)
+
+        assert response.status_code == 200
+        [summary] = response.json()["data"]
+        assert summary["item_count"] == 0
+        assert summary["ordered_quantity"] == 0
+        assert response.json()["next_cursor"] is None
+
+
+class TestPORecalculation:
+    """Test SQL-side recalculation of item amounts and PO totals"""
+    
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_recalculate_po_matches_python_calculation(self, test_client, admin_headers, sample_fg_po, test_db, medicine_paracetamol):
+        """Test recalculate endpoint gives the amounts of calculate_po_item_amounts"""
+        test_db.query(POItem).filter(POItem.po_id == sample_fg_po.id).update({"rate_per_unit": Decimal("7.35")})
+        test_db.add_all([
+            POItem(po_id=sample_fg_po.id, medicine_id=medicine_paracetamol.id, ordered_quantity=Decimal("225"),
+                   rate_per_unit=Decimal("1675.00"), gst_rate=Decimal("18.00")),
+            POItem(po_id=sample_fg_po.id, medicine_id=medicine_paracetamol.id, ordered_quantity=Decimal("40"),
+                   rate_per_unit=Decimal("12.50"), gst_rate=None),
+            POItem(po_id=sample_fg_po.id, medicine_id=medicine_paracetamol.id, ordered_quantity=Decimal("10"),
+                   rate_per_unit=None, gst_rate=Decimal("12.00"), value_amount=Decimal("99.00"))
+        ])
+        test_db.commit()
+        
+        response = test_client.post(f"/api/po/{sample_fg_po.id}/recalculate", headers=admin_headers)
+        
+        assert response.status_code == 200
+        data = response.json()["data"]
+        amounts = sorted(
+            (Decimal(item["value_amount"]), Decimal(item["gst_amount"]), Decimal(item["total_amount"]))
+            for item in data["items"]
+        )
+        assert amounts == [
+            (Decimal("0"), Decimal("0"), Decimal("0")),
+            (Decimal("500.00"), Decimal("0"), Decimal("500.00")),
+            (Decimal("7350.00"), Decimal("882.00"), Decimal("8232.00")),
+            (Decimal("376875.00"), Decimal("67837.50"), Decimal("444712.50")),
+        ]
+        assert Decimal(data["total_value_amount"]) == Decimal("384725.00")
+        assert Decimal(data["total_gst_amount"]) == Decimal("68719.50")
+        assert Decimal(data["total_invoice_amount"]) == Decimal("453444.50")
+    
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_recalculate_closed_po_rejected(self, test_client, admin_headers, sample_fg_po, test_db):
+        """Test closed POs cannot be recalculated"""
+        sample_fg_po.status = POStatus.CLOSED
+        test_db.commit()
+        
+        response = test_client.post(f"/api/po/{sample_fg_po.id}/recalculate", headers=admin_headers)
+        
+        assert response.status_code == 400
+    
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_bulk_recalculate_by_eopa_skips_closed(self, test_client, admin_headers, sample_fg_po, test_db, medicine_paracetamol):
+        """Test bulk recalculation covers the EOPA's POs except closed ones"""
+        po_id = sample_fg_po.id
+        closed_po = PurchaseOrder(
+            po_number="PO/FG/24-25/0002", po_date=date.today(), po_type=POType.FG,
+            eopa_id=sample_fg_po.eopa_id, vendor_id=sample_fg_po.vendor_id, status=POStatus.CLOSED,
+            total_value_amount=Decimal("1.00"), created_by=sample_fg_po.created_by
+        )
+        test_db.add(closed_po)
+        test_db.flush()
+        test_db.add(POItem(po_id=closed_po.id, medicine_id=medicine_paracetamol.id, ordered_quantity=Decimal("10"),
+                           rate_per_unit=Decimal("5.00"), gst_rate=Decimal("12.00")))
+        test_db.query(POItem).filter(POItem.po_id == po_id).update({"rate_per_unit": Decimal("2.00")})
+        test_db.commit()
+        closed_po_id = closed_po.id
+        
+        response = test_client.post(
+            "/api/po/recalculate-bulk",
+            json={"eopa_id": sample_fg_po.eopa_id},
+            headers=admin_headers
+        )
+        
+        assert response.status_code == 200
+        assert response.json()["data"] == {"po_count": 1, "item_count": 1}
+        test_db.expire_all()
+        po = test_db.get(PurchaseOrder, po_id)
+        assert po.total_value_amount == Decimal("2000.00")
+        assert po.total_gst_amount == Decimal("240.00")
+        assert po.total_invoice_amount == Decimal("2240.00")
+        assert test_db.get(PurchaseOrder, closed_po_id).total_value_amount == Decimal("1.00")
+    
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_bulk_recalculate_requires_scope(self, test_client, admin_headers):
+        """Test bulk recalculation refuses a request without po_ids, eopa_id or all_pos"""
+        response = test_client.post("/api/po/recalculate-bulk", json={}, headers=admin_headers)
+        
+        assert response.status_code == 400
+
+
+class TestPOBulkTransition:
+    """Test applying one workflow step to many POs at once"""
+    
+    @staticmethod
+    def _add_pos(test_db, sample_fg_po, statuses):
+        pos = [
+            PurchaseOrder(
+                po_number=f"PO/FG/DRAFT/BULK/{index:04d}", po_date=date.today(), po_type=POType.FG,
+                eopa_id=sample_fg_po.eopa_id, vendor_id=sample_fg_po.vendor_id, status=status,
+                created_by=sample_fg_po.created_by
+            )
+            for index, status in enumerate(statuses)
+        ]
+        test_db.add_all(pos)
+        test_db.commit()
+        return [po.id for po in pos]
+    
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_bulk_approve_reports_per_po_results(self, test_client, admin_headers, sample_fg_po, test_db, admin_user):
+        """Test valid POs are approved and invalid ones reported without failing the request"""
+        pending_ids = self._add_pos(test_db, sample_fg_po, [POStatus.PENDING_APPROVAL] * 3)
+        draft_id = sample_fg_po.id
+        
+        response = test_client.post(
+            "/api/po/bulk-transition",
+            json={"action": "approve", "po_ids": [*pending_ids, draft_id, 999999]},
+            headers=admin_headers
+        )
+        
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["applied"] == 3
+        assert data["failed"] == 2
+        assert [result["po_id"] for result in data["results"]] == [*pending_ids, draft_id, 999999]
+        assert data["results"][3]["error"] == "Only PENDING_APPROVAL POs can be approved"
+        assert data["results"][4]["error"] == "Purchase Order not found"
+        
+        test_db.expire_all()
+        for po_id in pending_ids:
+            po = test_db.get(PurchaseOrder, po_id)
+            assert po.status == POStatus.APPROVED
+            assert po.approved_by == admin_user.id
+            assert po.approved_at is not None
+        assert test_db.get(PurchaseOrder, draft_id).status == POStatus.DRAFT
+    
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_bulk_transition_all_or_nothing(self, test_client, admin_headers, sample_fg_po, test_db):
+        """Test all_or_nothing leaves every PO unchanged when one is invalid"""
+        approved_ids = self._add_pos(test_db, sample_fg_po, [POStatus.APPROVED] * 2)
+        
+        response = test_client.post(
+            "/api/po/bulk-transition",
+            json={"action": "mark_ready", "po_ids": [*approved_ids, sample_fg_po.id], "all_or_nothing": True},
+            headers=admin_headers
+        )
+        
+        assert response.status_code == 200
+        assert response.json()["data"]["applied"] == 0
+        test_db.expire_all()
+        assert all(test_db.get(PurchaseOrder, po_id).status == POStatus.APPROVED for po_id in approved_ids)
+    
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_bulk_mark_pending_assigns_final_numbers(self, test_client, admin_headers, sample_fg_po, test_db):
+        """Test bulk mark_pending gives every PO its own non-draft number"""
+        draft_ids = self._add_pos(test_db, sample_fg_po, [POStatus.DRAFT] * 3)
+        
+        response = test_client.post(
+            "/api/po/bulk-transition",
+            json={"action": "mark_pending", "po_ids": draft_ids},
+            headers=admin_headers
+        )
+        
+        assert response.status_code == 200
+        numbers = [result["po_number"] for result in response.json()["data"]["results"]]
+        assert len(set(numbers)) == 3
+        assert all("DRAFT" not in number for number in numbers)
+        test_db.expire_all()
+        assert sorted(test_db.get(PurchaseOrder, po_id).po_number for po_id in draft_ids) == sorted(numbers)
+        assert all(test_db.get(PurchaseOrder, po_id).status == POStatus.PENDING_APPROVAL for po_id in draft_ids)
+    
+    @pytest.mark.unit
+    @pytest.mark.po
+    @pytest.mark.auth
+    def test_bulk_approve_requires_admin(self, test_client, procurement_headers, sample_fg_po, test_db):
+        """Test procurement officers cannot bulk approve"""
+        pending_ids = self._add_pos(test_db, sample_fg_po, [POStatus.PENDING_APPROVAL])
+        
+        response = test_client.post(
+            "/api/po/bulk-transition",
+            json={"action": "approve", "po_ids": pending_ids},
+            headers=procurement_headers
+        )
+        
+        assert response.status_code == 403
+    
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_bulk_transition_unknown_action(self, test_client, admin_headers):
+        """Test unknown actions are rejected"""
+        response = test_client.post(
+            "/api/po/bulk-transition",
+            json={"action": "close", "po_ids": [1]},
+            headers=admin_headers
+        )
+        
+        assert response.status_code == 400
+
+
+class TestDraftPORegeneration:
+    """Test regenerating RM POs merges items into the existing DRAFT PO"""
+    
+    @staticmethod
+    def _generate(test_db, eopa, vendor, admin_user, quantities):
+        from app.services.po_service import POGenerationService
+        
+        overrides = [{
+            "vendor_id": vendor.id,
+            "items": [
+                {"raw_material_id": raw_material_id, "quantity": quantity, "uom": "KG"}
+                for raw_material_id, quantity in quantities.items()
+            ]
+        }]
+        return POGenerationService(test_db).generate_rm_pos_from_explosion(
+            eopa.id, admin_user.id, rm_po_overrides=overrides
+        )
+    
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_regeneration_merges_items_by_material(self, test_db, sample_eopa, rm_vendor, admin_user):
+        """Test unchanged items keep their rows, changed ones are updated and the rest inserted or deleted"""
+        from app.models.raw_material import RawMaterialMaster
+        
+        materials = [
+            RawMaterialMaster(rm_code=f"RM-MERGE-{index}", rm_name=f"Merge RM {index}", unit_of_measure="KG")
+            for index in range(3)
+        ]
+        test_db.add_all(materials)
+        test_db.commit()
+        rm1, rm2, rm3 = (material.id for material in materials)
+        
+        first = self._generate(test_db, sample_eopa, rm_vendor, admin_user, {rm1: 100, rm2: 50})
+        assert first["purchase_orders"][0]["item_changes"] == {"inserted": 2, "updated": 0, "deleted": 0, "unchanged": 0}
+        
+        po = test_db.query(PurchaseOrder).filter(PurchaseOrder.po_type == POType.RM).one()
+        rm1_item = test_db.query(POItem).filter(POItem.po_id == po.id, POItem.raw_material_id == rm1).one()
+        rm1_item_id = rm1_item.id
+        rm1_item.rate_per_unit = Decimal("10.00")
+        rm1_item.gst_rate = Decimal("18.00")
+        test_db.commit()
+        
+        second = self._generate(test_db, sample_eopa, rm_vendor, admin_user, {rm1: 120, rm3: 10})
+        
+        assert second["purchase_orders"][0]["item_changes"] == {"inserted": 1, "updated": 1, "deleted": 1, "unchanged": 0}
+        test_db.expire_all()
+        items = {item.raw_material_id: item for item in test_db.query(POItem).filter(POItem.po_id == po.id)}
+        assert set(items) == {rm1, rm3}
+        assert items[rm1].id == rm1_item_id
+        assert items[rm1].ordered_quantity == Decimal("120")
+        assert items[rm1].rate_per_unit == Decimal("10.00")
+        assert items[rm1].value_amount == Decimal("1200.00")
+        assert test_db.get(PurchaseOrder, po.id).total_value_amount == Decimal("1200.00")
+        assert test_db.get(PurchaseOrder, po.id).total_ordered_qty == Decimal("130")
+        
+        third = self._generate(test_db, sample_eopa, rm_vendor, admin_user, {rm1: 120, rm3: 10})
+        assert third["purchase_orders"][0]["item_changes"] == {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 2}
+        assert test_db.query(PurchaseOrder).filter(PurchaseOrder.po_type == POType.RM).count() == 1
+
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_fractional_explosion_unchanged_on_regeneration(self, test_db, sample_eopa, admin_user, paracetamol_bom):
+        """Test a quantity rounded to the column scale (1000 × 0.3333 × 1.025) is not rewritten"""
+        from app.models.raw_material import MedicineRawMaterial
+        from app.services.po_service import POGenerationService
+
+        raw_material, _ = paracetamol_bom
+        bom_row = test_db.query(MedicineRawMaterial).filter(MedicineRawMaterial.raw_material_id == raw_material.id).one()
+        bom_row.qty_required_per_unit = Decimal("0.3333")
+        bom_row.wastage_percentage = Decimal("2.5")
+        test_db.commit()
+
+        first = POGenerationService(test_db).generate_rm_pos_from_explosion(sample_eopa.id, admin_user.id)
+        test_db.commit()
+        assert first["purchase_orders"][0]["item_changes"]["inserted"] == 1
+        item = test_db.query(POItem).filter(POItem.raw_material_id == raw_material.id).one()
+        assert item.ordered_quantity == Decimal("341.633")
+
+        second = POGenerationService(test_db).generate_rm_pos_from_explosion(sample_eopa.id, admin_user.id)
+        assert second["purchase_orders"][0]["item_changes"] == {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 1}
+
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_merge_keeps_pm_items_per_language(self, test_db, sample_eopa, pm_vendor, admin_user, paracetamol_bom):
+        """Test the same packing material in two languages stays two PO items"""
+        from app.services.po_service import merge_po_items
+
+        _, packing_material = paracetamol_bom
+        po = PurchaseOrder(po_number="PO/PM/MERGE/0001", po_date=date.today(), po_type=POType.PM,
+                           eopa_id=sample_eopa.id, vendor_id=pm_vendor.id, status=POStatus.DRAFT,
+                           created_by=admin_user.id)
+        test_db.add(po)
+        test_db.flush()
+        test_db.add(POItem(po_id=po.id, packing_material_id=packing_material.id, language="EN",
+                           ordered_quantity=Decimal("1000"), fulfilled_quantity=Decimal("0"), unit="PCS"))
+        test_db.commit()
+
+        desired = [
+            {"packing_material_id": packing_material.id, "language": language, "artwork_version": "v1",
+             "ordered_quantity": Decimal(quantity), "unit": "PCS"}
+            for language, quantity in (("EN", "1000"), ("FR", "500"))
+        ]
+        changes = merge_po_items(test_db, po, [{**desired[0], "artwork_version": None}, desired[1]])
+        test_db.commit()
+
+        assert changes == {"inserted": 1, "updated": 0, "deleted": 0, "unchanged": 1}
+        assert sorted(
+            (item.language, item.ordered_quantity) for item in test_db.query(POItem).filter(POItem.po_id == po.id)
+        ) == [("EN", Decimal("1000")), ("FR", Decimal("500"))]
+
+        # Another artwork version is another item
+        changes = merge_po_items(test_db, po, desired)
+        assert changes == {"inserted": 1, "updated": 0, "deleted": 1, "unchanged": 1}
+
+
+class TestBulkPOInsert:
+    """Test writing generated PO headers and items in bulk"""
+    
+    @staticmethod
+    def _header(sample_eopa, vendor, admin_user, po_number):
+        return {
+            "po_number": po_number, "po_date": date.today(), "po_type": POType.FG,
+            "eopa_id": sample_eopa.id, "vendor_id": vendor.id, "status": POStatus.DRAFT,
+            "total_ordered_qty": Decimal("0"), "total_fulfilled_qty": Decimal("0"),
+            "created_by": admin_user.id
+        }
+    
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_insert_purchase_orders(self, test_db, sample_eopa, manufacturer_vendor, medicine_paracetamol, admin_user):
+        """Test IDs come back in header order and items are attached to their PO"""
+        from app.services.po_service import insert_purchase_orders
+        
+        headers = [self._header(sample_eopa, manufacturer_vendor, admin_user, f"PO/FG/BULK/{n}") for n in range(3)]
+        items = [
+            [{"medicine_id": medicine_paracetamol.id, "ordered_quantity": Decimal(100 * (n + 1)),
+              "fulfilled_quantity": Decimal("0"), "unit": "Boxes"}] * (n + 1)
+            for n in range(3)
+        ]
+        
+        po_ids = insert_purchase_orders(test_db, headers, items)
+        test_db.commit()
+        
+        assert [test_db.get(PurchaseOrder, po_id).po_number for po_id in po_ids] == [h["po_number"] for h in headers]
+        for n, po_id in enumerate(po_ids):
+            po_items = test_db.query(POItem).filter(POItem.po_id == po_id).all()
+            assert len(po_items) == n + 1
+            assert all(item.ordered_quantity == Decimal(100 * (n + 1)) for item in po_items)
+    
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_pm_generation_item_per_language(self, test_db, sample_eopa, medicine_paracetamol, pm_vendor,
+                                             admin_user, paracetamol_bom):
+        """Test a packing material used in two languages is generated (and regenerated) as two items"""
+        from app.models.packing_material import MedicinePackingMaterial
+        from app.services.po_service import POGenerationService
+        
+        _, packing_material = paracetamol_bom
+        packing_material.language = "EN"
+        test_db.add(MedicinePackingMaterial(medicine_id=medicine_paracetamol.id, packing_material_id=packing_material.id,
+                                            vendor_id=pm_vendor.id, qty_required_per_unit=Decimal("0.5"), uom="PCS",
+                                            language_override="FR"))
+        test_db.commit()
+        
+        first = POGenerationService(test_db).generate_pm_pos_from_explosion(sample_eopa.id, admin_user.id)
+        test_db.commit()
+        
+        [summary] = first["purchase_orders"]
+        assert summary["items_count"] == 2
+        po = test_db.query(PurchaseOrder).filter(PurchaseOrder.po_type == POType.PM).one()
+        assert sorted((item.language, item.ordered_quantity) for item in po.items) == [
+            ("EN", Decimal("1000")), ("FR", Decimal("500"))
+        ]
+        
+        second = POGenerationService(test_db).generate_pm_pos_from_explosion(sample_eopa.id, admin_user.id)
+        assert second["purchase_orders"][0]["item_changes"] == {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 2}
+    
+    @pytest.mark.unit
+    @pytest.mark.po
+    def test_insert_purchase_orders_validates_material_type(self, test_db, sample_eopa, manufacturer_vendor, admin_user):
+        """Test an item with two material types is rejected before anything is written"""
+        from app.exceptions.base import AppException
+        from app.services.po_service import insert_purchase_orders
+        
+        with pytest.raises(AppException):
+            insert_purchase_orders(
+                test_db,
+                [self._header(sample_eopa, manufacturer_vendor, admin_user, "PO/FG/BULK/INVALID")],
+                [[{"medicine_id": 1, "raw_material_id": 1, "ordered_quantity": Decimal("1")}]]
+            )
+        
+        assert test_db.query(PurchaseOrder).filter(PurchaseOrder.po_number == "PO/FG/BULK/INVALID").count() == 0
+
+
+class TestGeneratePOByVendor:
+    """Test generating a single PO for one vendor from an EOPA"""
+    
+    @pytest.mark.integration
+    @pytest.mark.po
+    def test_generate_then_reuse(self, test_client, admin_headers, sample_eopa, manufacturer_vendor, medicine_paracetamol):
+        """Test FG items are derived from the EOPA and a second call returns the DRAFT PO"""
+        payload = {"eopa_id": sample_eopa.id, "vendor_id": manufacturer_vendor.id, "po_type": "FG", "items": []}
+        
+        response = test_client.post("/api/po/generate-po-by-vendor", json=payload, headers=admin_headers)
+        assert response.status_code == 200
+        created = response.json()["data"]
+        assert created["mode"] == "create"
+        assert created["po_status"] == "DRAFT"
+        [item] = created["items"]
+        assert item["medicine_id"] == medicine_paracetamol.id
+        assert item["medicine_name"] == medicine_paracetamol.medicine_name
+        assert item["ordered_quantity"] == item["fulfilled_quantity"] == 1000
+        
+        response = test_client.post("/api/po/generate-po-by-vendor", json=payload, headers=admin_headers)
+        reused = response.json()["data"]
+        assert reused["mode"] == "update"
+        assert reused["po_id"] == created["po_id"]
+        assert reused["items"] == created["items"]
+    
+    @pytest.mark.integration
+    @pytest.mark.po
+    def test_rm_items_with_medicine_id(self, test_client, admin_headers, sample_eopa, rm_vendor,
+                                       medicine_paracetamol, paracetamol_bom):
+        """Test the documented payload (RM rows also carry the medicine_id) creates an RM-only item"""
+        raw_material, _ = paracetamol_bom
+        response = test_client.post("/api/po/generate-po-by-vendor", json={
+            "eopa_id": sample_eopa.id, "vendor_id": rm_vendor.id, "po_type": "RM",
+            "items": [{
+                "medicine_id": medicine_paracetamol.id,
+                "raw_material_id": raw_material.id,
+                "ordered_quantity": 500,
+                "unit": "kg"
+            }]
+        }, headers=admin_headers)
+
+        assert response.status_code == 200
+        [item] = response.json()["data"]["items"]
+        assert item["raw_material_id"] == raw_material.id
+        assert item["medicine_id"] is None
+        assert item["ordered_quantity"] == 500
+
+    @pytest.mark.integration
+    @pytest.mark.po
+    def test_invalid_po_type(self, test_client, admin_headers, sample_eopa, manufacturer_vendor):
+        """Test an unknown PO type is rejected"""
+        response = test_client.post("/api/po/generate-po-by-vendor", json={
+            "eopa_id": sample_eopa.id, "vendor_id": manufacturer_vendor.id, "po_type": "XX", "items": []
+        }, headers=admin_headers)
+        assert response.status_code == 400
+
 
 class TestPOAmendment:
     """Test PO amendment and change history"""
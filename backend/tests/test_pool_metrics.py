@@ -0,0 +1,62 @@
+"""
+Unit Tests for Connection Pool Telemetry
+Tests: checkout wait histogram, timeout counting, internal metrics endpoint
+"""
+import pytest
+from sqlalchemy import create_engine, exc
+
+from app.database.pool_metrics import TimedQueuePool, pool_status
+
+
+@pytest.fixture
+def timed_engine():
+    """Single-connection engine with a short checkout timeout"""
+    engine = create_engine(
+        "sqlite://",
+        poolclass=TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05
+    )
+    yield engine
+    engine.dispose()
+
+
+class TestPoolMetrics:
+    """Test checkout timing of TimedQueuePool"""
+
+    @pytest.mark.unit
+    def test_checkouts_and_timeouts_recorded(self, timed_engine):
+        """Every checkout lands in the histogram; an exhausted pool counts a timeout"""
+        with timed_engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                timed_engine.connect()
+
+            status = pool_status(timed_engine.pool)
+            assert status["checked_out"] == 1
+            assert status["overflow"] == 0
+
+        with timed_engine.connect():
+            pass
+
+        status = pool_status(timed_engine.pool)
+        assert status["pool_class"] == "TimedQueuePool"
+        assert status["checkouts"] == 2
+        assert status["timeouts"] == 1
+        assert sum(status["wait_histogram"].values()) == 2
+        assert status["checked_out"] == 0
+
+    @pytest.mark.unit
+    @pytest.mark.auth
+    def test_endpoint_admin_only(self, test_client, admin_headers, procurement_headers):
+        """Pool metrics are served to admins only"""
+        response = test_client.get("/api/internal/pool-metrics", headers=admin_headers)
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert "primary" in data["pools"]
+        assert data["configured"]["max_connections_per_engine"] == (
+            data["configured"]["pool_size"] + data["configured"]["max_overflow"]
+        )
+
+        response = test_client.get("/api/internal/pool-metrics", headers=procurement_headers)
+        assert response.status_code == 403
@@ -0,0 +1,213 @@
+"""
+Unit Tests for Per-Request Query Statistics
+Tests: statement counting, N+1 detection, stats headers, budget logging, endpoint query budgets
+"""
+import pytest
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import create_engine, text
+
+import app.main as main
+from app.config import settings
+from app.database.query_stats import count_queries, current_query_stats, track_queries
+from app.models.po import PurchaseOrder, POItem, POType, POStatus
+
+
+@pytest.fixture
+def memory_engine():
+    engine = create_engine("sqlite://")
+    yield engine
+    engine.dispose()
+
+
+def _add_fg_pos(test_db, template, count):
+    """Copies of a PO with one item each, to show query counts do not grow per row"""
+    for index in range(count):
+        po = PurchaseOrder(
+            po_number=f"PO/FG/24-25/{index + 100:04d}",
+            po_date=date.today(),
+            po_type=POType.FG,
+            eopa_id=template.eopa_id,
+            vendor_id=template.vendor_id,
+            status=POStatus.DRAFT,
+            total_ordered_qty=Decimal("10"),
+            total_fulfilled_qty=Decimal("0"),
+            created_by=template.created_by
+        )
+        test_db.add(po)
+        test_db.flush()
+        test_db.add(POItem(
+            po_id=po.id,
+            medicine_id=template.items[0].medicine_id,
+            ordered_quantity=Decimal("10"),
+            fulfilled_quantity=Decimal("0"),
+            unit="Boxes"
+        ))
+    test_db.commit()
+
+
+class TestQueryStats:
+    """Test statement collection"""
+
+    @pytest.mark.unit
+    def test_track_queries_counts_repeats(self, memory_engine):
+        """Repeated statements are grouped by SQL text and reported as N+1 candidates"""
+        with track_queries() as stats:
+            with memory_engine.connect() as conn:
+                for value in range(3):
+                    conn.execute(text("SELECT :value"), {"value": value})
+                conn.execute(text("SELECT 42"))
+
+        assert stats.count == 4
+        assert stats.total_ms >= 0
+        assert stats.repeated(3) == [{"count": 3, "statement": "SELECT ?"}]
+        assert current_query_stats() is None
+
+    @pytest.mark.unit
+    def test_untracked_and_connection_scoped(self, memory_engine):
+        """Outside track_queries nothing is collected; count_queries sees its own connection only"""
+        with memory_engine.connect() as conn, memory_engine.connect() as other:
+            with count_queries(conn) as stats:
+                conn.execute(text("SELECT 1"))
+                other.execute(text("SELECT 2"))
+
+        assert stats.count == 1
+
+
+class TestQueryStatsMiddleware:
+    """Test request-level headers and budget logging"""
+
+    @pytest.mark.unit
+    def test_headers_in_development_mode(self, test_client, admin_headers, monkeypatch):
+        """Stats headers are sent when enabled"""
+        monkeypatch.setattr(main, "EXPOSE_QUERY_STATS", True)
+
+        response = test_client.get("/api/users/", headers=admin_headers)
+
+        assert response.status_code == 200
+        assert int(response.headers["X-DB-Query-Count"]) >= 1
+        assert float(response.headers["X-DB-Query-Time-Ms"]) >= 0
+
+    @pytest.mark.unit
+    def test_headers_hidden_by_default(self, test_client, monkeypatch):
+        monkeypatch.setattr(main, "EXPOSE_QUERY_STATS", False)
+
+        response = test_client.get("/health")
+
+        assert "X-DB-Query-Count" not in response.headers
+
+    @pytest.mark.unit
+    def test_over_budget_request_logged(self, test_client, admin_headers, sample_fg_po, monkeypatch):
+        """A request above the DB time budget is logged with its request ID"""
+        events = []
+        monkeypatch.setattr(settings, "QUERY_BUDGET_PER_REQUEST", 0)
+        monkeypatch.setattr(settings, "QUERY_TIME_BUDGET_MS", 0)
+        monkeypatch.setattr(main.logger, "warning", events.append)
+
+        test_client.get("/api/po/", headers=admin_headers)
+        assert events == []
+
+        monkeypatch.setattr(settings, "QUERY_TIME_BUDGET_MS", 1e-6)
+        response = test_client.get("/api/po/", headers=admin_headers)
+
+        [event] = events
+        assert event["event"] == "QUERY_BUDGET_EXCEEDED"
+        assert event["path"] == "/api/po/"
+        assert event["request_id"] == response.headers["X-Request-ID"]
+        assert event["query_count"] >= 1
+
+    @pytest.mark.unit
+    def test_repeated_statements_logged(self, test_client, admin_headers, sample_fg_po, monkeypatch):
+        """Statements repeated QUERY_REPEAT_THRESHOLD times are logged as N+1 candidates"""
+        events = []
+        monkeypatch.setattr(settings, "QUERY_BUDGET_PER_REQUEST", 0)
+        monkeypatch.setattr(settings, "QUERY_TIME_BUDGET_MS", 0)
+        monkeypatch.setattr(settings, "QUERY_REPEAT_THRESHOLD", 1)
+        monkeypatch.setattr(main.logger, "warning", events.append)
+
+        test_client.get("/api/po/", headers=admin_headers)
+
+        [event] = events
+        assert event["event"] == "REPEATED_QUERIES"
+        assert any("purchase_orders" in entry["statement"] for entry in event["repeated"])
+
+
+class TestEndpointQueryBudgets:
+    """Query counts of list/detail endpoints must not grow with the number of rows"""
+
+    @pytest.mark.integration
+    @pytest.mark.po
+    def test_po_list(self, test_client, test_db, admin_headers, sample_fg_po, query_budget):
+        test_client.get("/api/po/", headers=admin_headers)
+        with query_budget(10) as baseline:
+            test_client.get("/api/po/", headers=admin_headers)
+
+        _add_fg_pos(test_db, sample_fg_po, 5)
+
+        with query_budget(baseline.count) as stats:
+            response = test_client.get("/api/po/", headers=admin_headers)
+        assert len(response.json()["data"]) == 6
+        assert stats.repeated(3) == []
+
+    @pytest.mark.integration
+    @pytest.mark.po
+    def test_po_detail(self, test_client, admin_headers, sample_fg_po, query_budget):
+        test_client.get("/api/users/me", headers=admin_headers)
+        with query_budget(10):
+            response = test_client.get(f"/api/po/{sample_fg_po.id}", headers=admin_headers)
+        assert response.status_code == 200
+
+    @pytest.mark.integration
+    @pytest.mark.auth
+    def test_authenticated_request_cached(self, test_client, admin_headers, query_budget):
+        """Once the principal is cached, /api/users/me needs no query at all"""
+        test_client.get("/api/users/me", headers=admin_headers)
+        with query_budget(0):
+            assert test_client.get("/api/users/me", headers=admin_headers).status_code == 200
+
+    @pytest.mark.integration
+    @pytest.mark.po
+    def test_generate_po_by_vendor(self, test_client, test_db, admin_headers, sample_eopa, medicine_paracetamol,
+                                   india_country, query_budget):
+        """RM PO derived from the BOM: same query count for 2 and for 20 BOM lines"""
+        from app.models.vendor import Vendor, VendorType
+        from app.models.raw_material import RawMaterialMaster, MedicineRawMaterial
+
+        vendors = [
+            Vendor(vendor_code=f"RMQ{n}", vendor_name=f"Budget RM Vendor {n}", vendor_type=VendorType.RM,
+                   country_id=india_country.id)
+            for n in range(3)
+        ]
+        materials = [
+            RawMaterialMaster(rm_code=f"RMQ-{n:03d}", rm_name=f"Budget RM {n}", unit_of_measure="KG")
+            for n in range(23)
+        ]
+        test_db.add_all([*vendors, *materials])
+        test_db.flush()
+        # Vendor 0 supplies 1 BOM line, vendor 1 the next 2 and vendor 2 the other 20
+        test_db.add_all([
+            MedicineRawMaterial(medicine_id=medicine_paracetamol.id, raw_material_id=material.id,
+                                vendor_id=vendors[0 if n < 1 else 1 if n < 3 else 2].id,
+                                qty_required_per_unit=Decimal("0.5"), uom="KG")
+            for n, material in enumerate(materials)
+        ])
+        test_db.commit()
+
+        eopa_id, vendor_ids = sample_eopa.id, [vendor.id for vendor in vendors]
+
+        def generate(vendor_id):
+            return test_client.post("/api/po/generate-po-by-vendor", headers=admin_headers, json={
+                "eopa_id": eopa_id, "vendor_id": vendor_id, "po_type": "RM", "items": []
+            })
+
+        # Warm-up: caches the principal and the config, creates the RM DRAFT sequence
+        generate(vendor_ids[0])
+        with query_budget(12) as baseline:
+            small = generate(vendor_ids[1])
+        with query_budget(baseline.count) as stats:
+            large = generate(vendor_ids[2])
+
+        assert len(small.json()["data"]["items"]) == 2
+        assert len(large.json()["data"]["items"]) == 20
+        assert stats.count == baseline.count
+        assert stats.repeated(2) == []
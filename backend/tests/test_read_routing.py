@@ -0,0 +1,50 @@
+"""
+Unit Tests for Read-Replica Routing
+Tests: replica selection, read-your-writes header and cookie
+"""
+import pytest
+from starlette.requests import Request
+
+from app.config import settings
+from app.database.session import READ_PRIMARY_COOKIE, READ_PRIMARY_HEADER, use_read_replica
+
+
+def _request(headers=None):
+    """Minimal GET request scope with the given headers"""
+    raw_headers = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw_headers})
+
+
+class TestReadRouting:
+    """Test get_read_db routing decisions"""
+
+    @pytest.mark.unit
+    def test_primary_without_replica(self, monkeypatch):
+        """Without READ_DATABASE_URL every read goes to the primary"""
+        monkeypatch.setattr(settings, "READ_DATABASE_URL", None)
+        assert use_read_replica(_request()) is False
+
+    @pytest.mark.unit
+    def test_read_your_writes_overrides(self, monkeypatch):
+        """Header or recent-mutation cookie pins reads to the primary"""
+        monkeypatch.setattr(settings, "READ_DATABASE_URL", "postgresql://replica/pharma_db")
+
+        assert use_read_replica(_request()) is True
+        assert use_read_replica(_request({READ_PRIMARY_HEADER: "true"})) is False
+        assert use_read_replica(_request({"Cookie": f"{READ_PRIMARY_COOKIE}=1"})) is False
+
+    @pytest.mark.unit
+    @pytest.mark.integration
+    def test_mutation_sets_cookie(self, test_client, admin_headers, monkeypatch):
+        """A successful mutation sets the read-your-writes cookie; reads do not"""
+        monkeypatch.setattr(settings, "READ_DATABASE_URL", "postgresql://replica/pharma_db")
+
+        response = test_client.get("/api/vendors/", headers=admin_headers)
+        assert READ_PRIMARY_COOKIE not in response.cookies
+
+        response = test_client.post("/api/countries/", headers=admin_headers, json={
+            "country_code": "FRA", "country_name": "France", "language": "FR", "currency": "EUR"
+        })
+        assert response.status_code == 200
+        assert f"Max-Age={settings.READ_YOUR_WRITES_SECONDS}" in response.headers["set-cookie"]
+        assert response.headers["set-cookie"].startswith(f"{READ_PRIMARY_COOKIE}=1")
@@ -0,0 +1,100 @@
+"""
+Unit Tests for the Slow Query Log
+Tests: threshold, bound parameters, request attribution, EXPLAIN sampling, internal endpoint
+"""
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.config import settings
+from app.database import slow_query_log
+from app.database.slow_query_log import slow_query_store
+
+
+@pytest.fixture
+def recorded_engine(monkeypatch):
+    """In-memory engine recording every statement"""
+    monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", 0)
+    slow_query_store.clear()
+    engine = create_engine("sqlite://")
+    slow_query_log.install(engine)
+    yield engine
+    slow_query_log.uninstall(engine)
+    engine.dispose()
+    slow_query_store.clear()
+
+
+@pytest.fixture
+def recorded_test_db(test_db, monkeypatch):
+    """Record every statement on the test database"""
+    monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", 0)
+    monkeypatch.setattr(settings, "SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 1.0)
+    engine = test_db.get_bind().engine
+    slow_query_log.install(engine)
+    slow_query_store.clear()
+    yield test_db
+    slow_query_log.uninstall(engine)
+    slow_query_store.clear()
+
+
+class TestSlowQueryLog:
+    """Test recording of slow statements"""
+
+    @pytest.mark.unit
+    def test_statement_and_parameters_recorded(self, recorded_engine):
+        with recorded_engine.connect() as conn:
+            conn.execute(text("SELECT :name"), {"name": "x" * 500})
+
+        [entry] = slow_query_store.list()
+        assert entry["statement"] == "SELECT ?"
+        assert len(entry["parameters"][0]) < 500
+        assert entry["request_id"] is None
+        assert entry["plan"] is None  # EXPLAIN is PostgreSQL only
+
+    @pytest.mark.unit
+    def test_threshold(self, recorded_engine, monkeypatch):
+        monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", 60_000)
+        with recorded_engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+        assert len(slow_query_store) == 0
+
+    @pytest.mark.unit
+    def test_store_rotates(self):
+        store = slow_query_log.SlowQueryStore(max_size=2)
+        for duration in (1, 2, 3):
+            store.add({"duration_ms": duration, "route": None})
+
+        assert [entry["duration_ms"] for entry in store.list()] == [3, 2]
+        assert store.list(min_duration_ms=3) == [{"duration_ms": 3, "route": None}]
+        assert store.recorded == 3
+
+    @pytest.mark.integration
+    @pytest.mark.po
+    def test_request_attribution(self, test_client, admin_headers, sample_fg_po, recorded_test_db):
+        """Entries carry the request ID, route template and, on PostgreSQL, the plan"""
+        response = test_client.get(f"/api/po/{sample_fg_po.id}", headers=admin_headers)
+        assert response.status_code == 200
+
+        entries = slow_query_store.list(route="/api/po/{po_id}")
+        assert entries
+        assert all(entry["request_id"] == response.headers["X-Request-ID"] for entry in entries)
+        assert entries[0]["method"] == "GET"
+        assert entries[0]["path"] == f"/api/po/{sample_fg_po.id}"
+        if recorded_test_db.get_bind().dialect.name == "postgresql":
+            assert "Buffers" in entries[0]["plan"] or "actual time" in entries[0]["plan"]
+
+    @pytest.mark.unit
+    @pytest.mark.auth
+    def test_endpoint(self, test_client, admin_headers, procurement_headers, recorded_test_db):
+        assert test_client.get("/api/internal/slow-queries", headers=procurement_headers).status_code == 403
+
+        response = test_client.get("/api/internal/slow-queries?route=/api/users/", headers=admin_headers)
+        assert response.status_code == 200
+        assert response.json()["data"]["queries"] == []
+
+        test_client.get("/api/users/", headers=admin_headers)
+        response = test_client.get("/api/internal/slow-queries?route=/api/users/", headers=admin_headers)
+        assert response.json()["data"]["queries"][0]["route"] == "/api/users/"
+
+        assert test_client.delete("/api/internal/slow-queries", headers=admin_headers).status_code == 200
+        assert len(slow_query_store) == 0